@@ -2,7 +2,7 @@
 import os
 import re
 from pathlib import Path
-from typing import List
+from typing import Callable, List, Optional
 from models.file_metadata import (
     FileMetadata, LanguageStats, ScannerTargets, 
     RepositoryAnalysis, FileCategory
@@ -18,8 +18,12 @@ class RepositoryAnalyzer:
         self.detector = LanguageDetector()
         self.classifier = FileClassifier()
     
-    def analyze(self, repo_path: str) -> RepositoryAnalysis:
-        """Run repository analysis."""
+    def analyze(
+        self,
+        repo_path: str,
+        cancel_check: Optional[Callable[[], None]] = None
+    ) -> RepositoryAnalysis:
+        """Run repository analysis; ``cancel_check`` is called per file and may raise to abort."""
         print(f"Analyzing repository: {repo_path}")
         
         # 1) Collect all files
@@ -29,6 +33,8 @@ class RepositoryAnalyzer:
         # 2) Analyze each file
         file_metadata_list = []
         for file_path in all_files:
+            if cancel_check:
+                cancel_check()
             metadata = self._analyze_file(file_path, repo_path)
             if metadata:
                 file_metadata_list.append(metadata)
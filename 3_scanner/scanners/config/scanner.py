@@ -1,13 +1,23 @@
 ﻿# scanners/config/scanner.py
 import re
 import subprocess
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional
 from models.file_metadata import FileMetadata
 from models.scan_result import ConfigResult, ConfigScanReport
 from .crypto_config_rules import CONFIG_CRYPTO_PATTERNS
 import yaml
 import xml.etree.ElementTree as ET
 
+
+def build_report(results: List[ConfigResult]) -> ConfigScanReport:
+    """Aggregate per-file results into a report (also used to merge sharded scans)."""
+    return ConfigScanReport(
+        total_files_scanned=len([r for r in results if not r.skipped]),
+        total_findings=sum(r.total_findings for r in results if not r.skipped),
+        detailed_results=results
+    )
+
+
 class ConfigScanner:
     """Config scanner."""
     _PEM_READ_BYTES = 4096
@@ -254,24 +264,24 @@ class ConfigScanner:
     
     def scan_repository(
         self, 
-        config_targets: List[FileMetadata]
+        config_targets: List[FileMetadata],
+        cancel_check: Optional[Callable[[], None]] = None
     ) -> ConfigScanReport:
         """Scan a repository."""
         print(f"\nRunning Config Scanner on {len(config_targets)} files...")
         
         results = []
         for file_meta in config_targets:
+            # Cancellation point: cancel_check raises to abort the scan
+            if cancel_check:
+                cancel_check()
             print(f"  Scanning: {file_meta.file_path}")
             result = self.scan_file(file_meta)
             results.append(result)
         
         # Aggregate results
-        total_findings = sum(r.total_findings for r in results if not r.skipped)
+        report = build_report(results)
         
-        print(f"Config scan completed: {total_findings} findings")
+        print(f"Config scan completed: {report.total_findings} findings")
         
-        return ConfigScanReport(
-            total_files_scanned=len([r for r in results if not r.skipped]),
-            total_findings=total_findings,
-            detailed_results=results
-        )
+        return report
@@ -1,11 +1,37 @@
 ﻿# scanners/sast/scanner.py
-from typing import List, Dict
+from typing import Callable, List, Dict, Optional
 from models.file_metadata import FileMetadata
 from models.scan_result import SASTResult, SASTScanReport
 from .python_analyzer import analyze_python_file
 from .javascript_analyzer import analyze_javascript_file
 from .java_analyzer import analyze_java_file
 
+
+def build_report(results: List[SASTResult]) -> SASTScanReport:
+    """Aggregate per-file results into a report (also used to merge sharded scans)."""
+    severity_count = {"HIGH": 0, "MEDIUM": 0, "LOW": 0}
+    algorithm_count = {}
+    
+    for result in results:
+        if result.skipped:
+            continue
+        
+        for vuln in result.vulnerabilities:
+            severity = vuln.get("severity", "MEDIUM")
+            severity_count[severity] = severity_count.get(severity, 0) + 1
+            
+            algo = vuln.get("algorithm", "Unknown")
+            algorithm_count[algo] = algorithm_count.get(algo, 0) + 1
+    
+    return SASTScanReport(
+        total_files_scanned=len([r for r in results if not r.skipped]),
+        total_vulnerabilities=sum(r.total_issues for r in results if not r.skipped),
+        severity_breakdown=severity_count,
+        algorithm_breakdown=algorithm_count,
+        detailed_results=results
+    )
+
+
 class SASTScanner:
     """SAST scanner."""
     
@@ -60,40 +86,24 @@ class SASTScanner:
     
     def scan_repository(
         self, 
-        sast_targets: List[FileMetadata]
+        sast_targets: List[FileMetadata],
+        cancel_check: Optional[Callable[[], None]] = None
     ) -> SASTScanReport:
         """Scan a repository."""
         print(f"\nRunning SAST Scanner on {len(sast_targets)} files...")
         
         results = []
         for file_meta in sast_targets:
+            # Cancellation point: cancel_check raises to abort the scan
+            if cancel_check:
+                cancel_check()
             print(f"  Scanning: {file_meta.file_path}")
             result = self.scan_file(file_meta)
             results.append(result)
         
         # Aggregate results
-        total_vulnerabilities = sum(r.total_issues for r in results if not r.skipped)
-        
-        severity_count = {"HIGH": 0, "MEDIUM": 0, "LOW": 0}
-        algorithm_count = {}
+        report = build_report(results)
         
-        for result in results:
-            if result.skipped:
-                continue
-            
-            for vuln in result.vulnerabilities:
-                severity = vuln.get("severity", "MEDIUM")
-                severity_count[severity] = severity_count.get(severity, 0) + 1
-                
-                algo = vuln.get("algorithm", "Unknown")
-                algorithm_count[algo] = algorithm_count.get(algo, 0) + 1
+        print(f"SAST completed: {report.total_vulnerabilities} vulnerabilities found")
         
-        print(f"SAST completed: {total_vulnerabilities} vulnerabilities found")
-        
-        return SASTScanReport(
-            total_files_scanned=len([r for r in results if not r.skipped]),
-            total_vulnerabilities=total_vulnerabilities,
-            severity_breakdown=severity_count,
-            algorithm_breakdown=algorithm_count,
-            detailed_results=results
-        )
+        return report
@@ -1,6 +1,6 @@
 ﻿# scanners/sca/scanner.py
 import re
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional
 from models.file_metadata import FileMetadata
 from models.scan_result import SCAResult, SCAScanReport
 from .parsers import PARSERS
@@ -8,6 +8,16 @@ from .vulnerability_db import load_pqc_db
 from packaging import version as pkg_version
 from packaging.specifiers import SpecifierSet
 
+
+def build_report(results: List[SCAResult]) -> SCAScanReport:
+    """Aggregate per-file results into a report (also used to merge sharded scans)."""
+    return SCAScanReport(
+        total_files_scanned=len([r for r in results if not r.skipped]),
+        total_dependencies=sum(r.total_dependencies for r in results if not r.skipped),
+        total_vulnerable=sum(r.total_vulnerabilities for r in results if not r.skipped),
+        detailed_results=results
+    )
+
 class SCAScanner:
     """SCA scanner."""
     
@@ -268,26 +278,24 @@ class SCAScanner:
     
     def scan_repository(
         self, 
-        sca_targets: List[FileMetadata]
+        sca_targets: List[FileMetadata],
+        cancel_check: Optional[Callable[[], None]] = None
     ) -> SCAScanReport:
         """Scan a repository."""
         print(f"\nRunning SCA Scanner on {len(sca_targets)} files...")
         
         results = []
         for file_meta in sca_targets:
+            # Cancellation point: cancel_check raises to abort the scan
+            if cancel_check:
+                cancel_check()
             print(f"  Scanning: {file_meta.file_path}")
             result = self.scan_file(file_meta)
             results.append(result)
         
         # Aggregate results
-        total_deps = sum(r.total_dependencies for r in results if not r.skipped)
-        total_vulns = sum(r.total_vulnerabilities for r in results if not r.skipped)
+        report = build_report(results)
         
-        print(f"SCA completed: {total_vulns}/{total_deps} vulnerable dependencies")
+        print(f"SCA completed: {report.total_vulnerable}/{report.total_dependencies} vulnerable dependencies")
         
-        return SCAScanReport(
-            total_files_scanned=len([r for r in results if not r.skipped]),
-            total_dependencies=total_deps,
-            total_vulnerable=total_vulns,
-            detailed_results=results
-        )
+        return report
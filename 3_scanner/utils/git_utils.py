@@ -4,15 +4,21 @@ import tempfile
 import os
 from urllib.parse import urlparse
 
-def clone_repository(github_url: str) -> str:
+def clone_repository(github_url: str, base_dir: str = None) -> str:
     """
     GitHub Repository 클론
     
+    Args:
+        github_url: 클론할 Repository URL
+        base_dir: 클론 위치 상위 디렉토리 (None이면 시스템 임시 디렉토리)
+    
     Returns:
         str: 클론된 Repository 경로
     """
     # 임시 디렉토리 생성
-    temp_dir = tempfile.mkdtemp(prefix="pqc_scan_")
+    if base_dir:
+        os.makedirs(base_dir, exist_ok=True)
+    temp_dir = tempfile.mkdtemp(prefix="pqc_scan_", dir=base_dir)
     
     # Repository 이름 추출
     parsed_url = urlparse(github_url)
@@ -42,3 +48,59 @@ def clone_repository(github_url: str) -> str:
             import shutil
             shutil.rmtree(temp_dir)
         raise e
+
+
+def resolve_remote_head(github_url: str, timeout: int = 30) -> str | None:
+    """
+    클론 없이 원격 Repository의 HEAD 커밋 SHA 조회 (git ls-remote)
+
+    Args:
+        github_url: 조회할 Repository URL
+        timeout: 타임아웃 (초)
+
+    Returns:
+        str | None: 커밋 SHA (조회 실패 시 None)
+    """
+    try:
+        result = subprocess.run(
+            ['git', 'ls-remote', github_url, 'HEAD'],
+            capture_output=True,
+            text=True,
+            timeout=timeout,
+            env={**os.environ, 'GIT_TERMINAL_PROMPT': '0'}  # 인증 프롬프트로 멈추지 않도록
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+
+    if result.returncode != 0:
+        return None
+    for line in result.stdout.splitlines():
+        parts = line.split()
+        if len(parts) == 2 and parts[1] == 'HEAD':
+            return parts[0]
+    return None
+
+
+def get_head_commit(repo_path: str) -> str | None:
+    """
+    클론된 Repository의 HEAD 커밋 SHA 조회
+
+    Args:
+        repo_path: 클론된 Repository 경로
+
+    Returns:
+        str | None: 커밋 SHA (조회 실패 시 None)
+    """
+    try:
+        result = subprocess.run(
+            ['git', '-C', repo_path, 'rev-parse', 'HEAD'],
+            capture_output=True,
+            text=True,
+            timeout=30
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+
+    if result.returncode != 0:
+        return None
+    return result.stdout.strip() or None
@@ -0,0 +1,56 @@
+"""add findings keyset indexes and promoted meta columns
+
+Revision ID: b2c7e9d4f610
+Revises: a1f4c8b7d901
+Create Date: 2026-10-19 10:00:00.000000
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b2c7e9d4f610"
+down_revision: Union[str, Sequence[str], None] = "a1f4c8b7d901"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("findings", sa.Column("rule_id", sa.String(length=255), nullable=True))
+    op.add_column("findings", sa.Column("scanner_type", sa.String(length=20), nullable=True))
+
+    # Backfill promoted columns from the JSONB meta payload.
+    op.execute(
+        "UPDATE findings "
+        "SET rule_id = LEFT(meta->>'rule_id', 255), "
+        "scanner_type = LEFT(meta->>'scanner_type', 20) "
+        "WHERE meta IS NOT NULL"
+    )
+
+    # Keyset pagination: WHERE scan_uuid = ? [AND filters] AND id > ? ORDER BY id LIMIT ?
+    op.create_index("ix_findings_scan_uuid_id", "findings", ["scan_uuid", "id"], unique=False)
+    op.create_index(
+        "ix_findings_scan_uuid_context_severity_id",
+        "findings",
+        ["scan_uuid", "context", "severity", "id"],
+        unique=False,
+    )
+    op.create_index("ix_findings_scan_uuid_rule_id_id", "findings", ["scan_uuid", "rule_id", "id"], unique=False)
+    op.create_index(
+        "ix_findings_scan_uuid_scanner_type_id",
+        "findings",
+        ["scan_uuid", "scanner_type", "id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_findings_scan_uuid_scanner_type_id", table_name="findings")
+    op.drop_index("ix_findings_scan_uuid_rule_id_id", table_name="findings")
+    op.drop_index("ix_findings_scan_uuid_context_severity_id", table_name="findings")
+    op.drop_index("ix_findings_scan_uuid_id", table_name="findings")
+    op.drop_column("findings", "scanner_type")
+    op.drop_column("findings", "rule_id")
@@ -0,0 +1,46 @@
+"""add ai analysis snapshot signature columns
+
+Revision ID: c5e1a8f3b720
+Revises: b2c7e9d4f610
+Create Date: 2026-10-19 11:00:00.000000
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c5e1a8f3b720"
+down_revision: Union[str, Sequence[str], None] = "b2c7e9d4f610"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("ai_analysis_snapshots", sa.Column("algorithm_signature", sa.Text(), nullable=True))
+    op.add_column("ai_analysis_snapshots", sa.Column("analysis_mode", sa.String(length=10), nullable=True))
+
+    # Backfill from the JSONB payload written by earlier versions.
+    op.execute(
+        "UPDATE ai_analysis_snapshots "
+        "SET algorithm_signature = NULLIF(BTRIM(inputs_summary->'cache'->>'algorithm_signature'), ''), "
+        "analysis_mode = CASE "
+        "WHEN inputs_summary->'debug'->>'analysis_mode' IN ('real', 'fallback', 'mock', 'error') "
+        "THEN inputs_summary->'debug'->>'analysis_mode' "
+        "ELSE 'fallback' END"
+    )
+
+    # Cache lookups only ever consider real analyses with citations, newest first.
+    op.execute(
+        "CREATE INDEX ix_ai_analysis_snapshots_signature_lookup "
+        "ON ai_analysis_snapshots (algorithm_signature, analysis_version, updated_at DESC) "
+        "WHERE analysis_mode = 'real' AND citations_count > 0"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_ai_analysis_snapshots_signature_lookup")
+    op.drop_column("ai_analysis_snapshots", "analysis_mode")
+    op.drop_column("ai_analysis_snapshots", "algorithm_signature")
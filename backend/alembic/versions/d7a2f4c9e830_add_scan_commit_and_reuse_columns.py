@@ -0,0 +1,48 @@
+"""add scan commit, ruleset fingerprint and reuse columns
+
+Revision ID: d7a2f4c9e830
+Revises: c5e1a8f3b720
+Create Date: 2026-10-19 12:00:00.000000
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d7a2f4c9e830"
+down_revision: Union[str, Sequence[str], None] = "c5e1a8f3b720"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("scans", sa.Column("commit_sha", sa.String(length=64), nullable=True))
+    op.add_column("scans", sa.Column("ruleset_fingerprint", sa.String(length=64), nullable=True))
+    op.add_column("scans", sa.Column("reused_from", postgresql.UUID(as_uuid=True), nullable=True))
+    op.create_foreign_key(
+        "fk_scans_reused_from_scans",
+        "scans",
+        "scans",
+        ["reused_from"],
+        ["uuid"],
+        ondelete="SET NULL",
+    )
+
+    # Reuse lookups only ever consider completed scans, newest first.
+    op.execute(
+        "CREATE INDEX ix_scans_commit_reuse_lookup "
+        "ON scans (commit_sha, ruleset_fingerprint, updated_at DESC) "
+        "WHERE status = 'COMPLETED' AND commit_sha IS NOT NULL"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_scans_commit_reuse_lookup")
+    op.drop_constraint("fk_scans_reused_from_scans", "scans", type_="foreignkey")
+    op.drop_column("scans", "reused_from")
+    op.drop_column("scans", "ruleset_fingerprint")
+    op.drop_column("scans", "commit_sha")
@@ -0,0 +1,35 @@
+"""add scan repo key and in-flight unique index
+
+Revision ID: e8b3c5d1f940
+Revises: d7a2f4c9e830
+Create Date: 2026-10-19 13:00:00.000000
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e8b3c5d1f940"
+down_revision: Union[str, Sequence[str], None] = "d7a2f4c9e830"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Left NULL for existing rows: a backfill could collide with scans already in flight.
+    op.add_column("scans", sa.Column("repo_key", sa.String(length=500), nullable=True))
+
+    # One queued or running scan per user and repository, enforced across API replicas.
+    op.execute(
+        "CREATE UNIQUE INDEX ux_scans_in_flight_repo "
+        "ON scans (user_uuid, repo_key) "
+        "WHERE status IN ('QUEUED', 'IN_PROGRESS') AND repo_key IS NOT NULL"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ux_scans_in_flight_repo")
+    op.drop_column("scans", "repo_key")
@@ -0,0 +1,40 @@
+"""add scan checkpoints
+
+Revision ID: f3a6d2b8c150
+Revises: e8b3c5d1f940
+Create Date: 2026-10-19 14:00:00.000000
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "f3a6d2b8c150"
+down_revision: Union[str, Sequence[str], None] = "e8b3c5d1f940"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "scan_checkpoints",
+        sa.Column("scan_uuid", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("stage", sa.String(length=20), nullable=False),
+        sa.Column("loid", sa.BigInteger(), nullable=False),
+        sa.Column("size_bytes", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.PrimaryKeyConstraint("scan_uuid", "stage"),
+    )
+    # Stale-checkpoint purge scans by age.
+    op.create_index("ix_scan_checkpoints_created_at", "scan_checkpoints", ["created_at"], unique=False)
+
+
+def downgrade() -> None:
+    # Unlink the large objects, or they would outlive the table that references them.
+    op.execute("SELECT lo_unlink(loid) FROM scan_checkpoints")
+    op.drop_index("ix_scan_checkpoints_created_at", table_name="scan_checkpoints")
+    op.drop_table("scan_checkpoints")
@@ -7,7 +7,7 @@ from datetime import datetime, timedelta, timezone
 from sqlalchemy.orm import Session
 
 from app.ai_module.schemas import AiAnalysisResponse
-from app.models import AiAnalysisSnapshot
+from app.models import AiAnalysisSnapshot, Scan
 
 logger = logging.getLogger(__name__)
 
@@ -59,9 +59,8 @@ def get_ai_analysis_snapshot(db: Session, scan_uuid: uuid_lib.UUID) -> AiAnalysi
     return db.query(AiAnalysisSnapshot).filter(AiAnalysisSnapshot.scan_uuid == scan_uuid).first()
 
 
-def _extract_cache_signature(snapshot: AiAnalysisSnapshot) -> str | None:
-    inputs = snapshot.inputs_summary or {}
-    cache_info = inputs.get("cache")
+def _extract_cache_signature(inputs_summary: dict | None) -> str | None:
+    cache_info = (inputs_summary or {}).get("cache")
     if not isinstance(cache_info, dict):
         return None
     signature = cache_info.get("algorithm_signature")
@@ -77,28 +76,44 @@ def find_cached_snapshot_by_algorithm_signature(
     max_age_hours: int,
     analysis_version: str,
 ) -> AiAnalysisSnapshot | None:
-    if not algorithm_signature.strip():
+    signature = algorithm_signature.strip()
+    if not signature:
         return None
 
     threshold = datetime.now(timezone.utc) - timedelta(hours=max(1, int(max_age_hours)))
-    candidates = (
+    return (
         db.query(AiAnalysisSnapshot)
+        .filter(AiAnalysisSnapshot.algorithm_signature == signature)
         .filter(AiAnalysisSnapshot.analysis_version == analysis_version)
+        .filter(AiAnalysisSnapshot.analysis_mode == "real")
         .filter(AiAnalysisSnapshot.citations_count > 0)
         .filter(AiAnalysisSnapshot.updated_at >= threshold)
         .order_by(AiAnalysisSnapshot.updated_at.desc())
-        .limit(300)
-        .all()
+        .limit(1)
+        .first()
     )
 
-    for snapshot in candidates:
-        debug = _extract_debug(snapshot)
-        if _safe_analysis_mode(str(debug.get("analysis_mode"))) != "real":
-            continue
-        signature = _extract_cache_signature(snapshot)
-        if signature == algorithm_signature:
-            return snapshot
-    return None
+
+def find_previous_repository_snapshot(
+    db: Session,
+    scan_uuid: uuid_lib.UUID,
+    *,
+    analysis_version: str,
+) -> AiAnalysisSnapshot | None:
+    repository_id = db.query(Scan.repository_id).filter(Scan.uuid == scan_uuid).scalar()
+    if repository_id is None:
+        return None
+    return (
+        db.query(AiAnalysisSnapshot)
+        .join(Scan, Scan.uuid == AiAnalysisSnapshot.scan_uuid)
+        .filter(Scan.repository_id == repository_id)
+        .filter(AiAnalysisSnapshot.scan_uuid != scan_uuid)
+        .filter(AiAnalysisSnapshot.analysis_version == analysis_version)
+        .filter(AiAnalysisSnapshot.analysis_mode == "real")
+        .order_by(AiAnalysisSnapshot.updated_at.desc())
+        .limit(1)
+        .first()
+    )
 
 
 def upsert_ai_analysis_snapshot(
@@ -131,6 +146,8 @@ def upsert_ai_analysis_snapshot(
     snapshot.citations_count = len(citations or [])
     snapshot.inputs_summary = payload.inputs_summary or {}
     snapshot.analysis_version = analysis_version
+    snapshot.algorithm_signature = _extract_cache_signature(payload.inputs_summary)
+    snapshot.analysis_mode = _safe_analysis_mode(payload.analysis_mode)
 
     db.add(snapshot)
     try:
@@ -1,16 +1,34 @@
 from __future__ import annotations
 
 import uuid as uuid_lib
+from typing import Iterator
 
 from fastapi import HTTPException
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
+from app.ai_module.risk_aggregation import FindingsAccumulator
+from app.models import Finding, Scan
 from app.scan_read_service import get_findings_response
 
+_FINDING_COLUMNS = (
+    Finding.id,
+    Finding.type,
+    Finding.severity,
+    Finding.algorithm,
+    Finding.context,
+    Finding.file_path,
+    Finding.line_start,
+    Finding.line_end,
+    Finding.evidence,
+    Finding.meta,
+)
+
 
 async def fetch_findings(scan_uuid: uuid_lib.UUID, db: Session, *, page_size: int = 200) -> list[dict] | None:
     items: list[dict] = []
-    offset = 0
+    after_id: int | None = None
+    first_page = True
 
     while True:
         try:
@@ -18,19 +36,58 @@ async def fetch_findings(scan_uuid: uuid_lib.UUID, db: Session, *, page_size: in
                 db,
                 scan_uuid,
                 limit=page_size,
-                offset=offset,
-                include_scan_validation=True,
+                after_id=after_id,
+                include_scan_validation=first_page,
             )
         except HTTPException as exc:
             if exc.status_code == 404:
                 return None
             raise
+        first_page = False
         batch = [item.model_dump() for item in response.items]
         if not batch:
             break
         items.extend(batch)
-        offset += len(batch)
-        if offset >= response.total:
+        if response.next_after_id is None:
             break
+        after_id = response.next_after_id
 
     return items
+
+
+def iter_finding_rows(scan_uuid: uuid_lib.UUID, db: Session, *, batch_size: int = 1000) -> Iterator[dict]:
+    """Stream findings as plain dicts through a server-side cursor.
+
+    Selecting columns instead of the Finding entity keeps rows out of the session identity map,
+    and yield_per bounds how many rows are buffered client-side at once.
+    """
+    statement = (
+        select(*_FINDING_COLUMNS)
+        .where(Finding.scan_uuid == scan_uuid)
+        .order_by(Finding.id.asc())
+        .execution_options(yield_per=max(1, int(batch_size)))
+    )
+    for row in db.execute(statement):
+        yield {
+            "id": int(row.id),
+            "type": row.type,
+            "severity": row.severity,
+            "algorithm": row.algorithm,
+            "context": row.context,
+            "file_path": row.file_path,
+            "line_start": row.line_start,
+            "line_end": row.line_end,
+            "evidence": row.evidence,
+            "meta": row.meta or {},
+        }
+
+
+async def load_findings_for_analysis(
+    scan_uuid: uuid_lib.UUID,
+    db: Session,
+    *,
+    batch_size: int = 1000,
+) -> FindingsAccumulator | None:
+    if db.execute(select(Scan.uuid).where(Scan.uuid == scan_uuid)).first() is None:
+        return None
+    return FindingsAccumulator().extend(iter_finding_rows(scan_uuid, db, batch_size=batch_size))
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import hashlib
+import re
+import uuid as uuid_lib
+from dataclasses import dataclass, field
+from typing import Any, Iterable
+
+from app.ai_module.schemas import RecommendationPayload
+
+
+def _normalize_evidence(value: Any) -> str:
+    return re.sub(r"\s+", " ", str(value or "")).strip()
+
+
+def finding_fingerprint(finding: dict) -> str:
+    """Identity of a finding that survives rescans.
+
+    Line numbers are deliberately excluded so unrelated edits above a finding do not make it
+    look new; the evidence text is whitespace-normalized for the same reason.
+    """
+    meta = finding.get("meta") or {}
+    parts = (
+        str(meta.get("scanner_type") or finding.get("context") or ""),
+        str(meta.get("rule_id") or finding.get("type") or ""),
+        str(finding.get("file_path") or ""),
+        str(finding.get("algorithm") or ""),
+        _normalize_evidence(finding.get("evidence")),
+    )
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+def _location_key(file_path: Any, rule_id: Any, scanner_type: Any) -> tuple[str, str, str]:
+    return (str(file_path or ""), str(rule_id or ""), str(scanner_type or "").upper())
+
+
+def _finding_location_key(finding: dict) -> tuple[str, str, str]:
+    meta = finding.get("meta") or {}
+    return _location_key(
+        finding.get("file_path"),
+        meta.get("rule_id") or finding.get("type"),
+        meta.get("scanner_type") or finding.get("context"),
+    )
+
+
+@dataclass
+class FindingsDelta:
+    previous_scan_uuid: uuid_lib.UUID
+    added: list[dict] = field(default_factory=list)
+    removed: list[dict] = field(default_factory=list)
+    unchanged: list[dict] = field(default_factory=list)
+
+    @property
+    def is_empty(self) -> bool:
+        return not self.added and not self.removed
+
+    @property
+    def changed_count(self) -> int:
+        return len(self.added) + len(self.removed)
+
+    def change_ratio(self) -> float:
+        baseline = max(1, len(self.added) + len(self.unchanged))
+        return self.changed_count / baseline
+
+    def to_dict(self) -> dict:
+        return {
+            "previous_scan_uuid": str(self.previous_scan_uuid),
+            "added": len(self.added),
+            "removed": len(self.removed),
+            "unchanged": len(self.unchanged),
+        }
+
+
+def compute_findings_delta(
+    current_findings: list[dict],
+    previous_findings: Iterable[dict],
+    *,
+    previous_scan_uuid: uuid_lib.UUID,
+) -> FindingsDelta:
+    previous_by_fingerprint: dict[str, dict] = {}
+    for finding in previous_findings:
+        previous_by_fingerprint.setdefault(finding_fingerprint(finding), finding)
+
+    delta = FindingsDelta(previous_scan_uuid=previous_scan_uuid)
+    current_fingerprints: set[str] = set()
+    for finding in current_findings:
+        fingerprint = finding_fingerprint(finding)
+        if fingerprint in current_fingerprints:
+            continue
+        current_fingerprints.add(fingerprint)
+        if fingerprint in previous_by_fingerprint:
+            delta.unchanged.append(finding)
+        else:
+            delta.added.append(finding)
+
+    delta.removed = [
+        finding
+        for fingerprint, finding in previous_by_fingerprint.items()
+        if fingerprint not in current_fingerprints
+    ]
+    return delta
+
+
+def carry_forward_recommendations(
+    previous_recommendations: list[RecommendationPayload],
+    delta: FindingsDelta,
+) -> list[RecommendationPayload]:
+    """Keep previous recommendations whose affected locations still point at unchanged findings.
+
+    Locations tied to removed findings are dropped; a recommendation left without any of its
+    original locations is dropped too, since the delta analysis covers that code again.
+    Location-less recommendations are generic guidance and are kept as-is.
+    """
+    unchanged_keys = {_finding_location_key(finding) for finding in delta.unchanged}
+    carried: list[RecommendationPayload] = []
+    for recommendation in previous_recommendations:
+        if not recommendation.affected_locations:
+            carried.append(recommendation)
+            continue
+        locations = [
+            location
+            for location in recommendation.affected_locations
+            if _location_key(location.file_path, location.rule_id, location.scanner_type) in unchanged_keys
+        ]
+        if not locations:
+            continue
+        carried.append(recommendation.model_copy(update={"affected_locations": locations}))
+    return carried
+
+
+def summarize_previous_analysis(
+    previous_response: Any,
+    carried_forward: list[RecommendationPayload],
+) -> dict[str, Any]:
+    return {
+        "risk_score": previous_response.risk_score,
+        "pqc_readiness_score": previous_response.pqc_readiness_score,
+        "analysis_summary": str(previous_response.analysis_summary or "")[:600],
+        "carried_forward_recommendations": [
+            {
+                "title": recommendation.title,
+                "nist_standard_reference": recommendation.nist_standard_reference,
+            }
+            for recommendation in carried_forward
+        ],
+    }
+
+
+@dataclass
+class IncrementalPlan:
+    delta: FindingsDelta
+    previous_response: Any
+    carried_forward: list[RecommendationPayload]
+
+    @property
+    def previous_summary(self) -> dict[str, Any]:
+        return summarize_previous_analysis(self.previous_response, self.carried_forward)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            **self.delta.to_dict(),
+            "carried_forward_recommendations": len(self.carried_forward),
+        }
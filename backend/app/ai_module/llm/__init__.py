@@ -1,5 +1,15 @@
 """OpenAI LLM integration for grounded AI analysis."""
 
-from app.ai_module.llm.openai_client import generate_grounded_ai_analysis
+from app.ai_module.llm.openai_client import (
+    agenerate_grounded_ai_analysis,
+    agenerate_reduced_ai_analysis,
+    generate_grounded_ai_analysis,
+    generate_reduced_ai_analysis,
+)
 
-__all__ = ["generate_grounded_ai_analysis"]
+__all__ = [
+    "agenerate_grounded_ai_analysis",
+    "agenerate_reduced_ai_analysis",
+    "generate_grounded_ai_analysis",
+    "generate_reduced_ai_analysis",
+]
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import json
+from typing import Any, Callable
+
+import httpx
+
+from app.config import OPENAI_API_KEY, OPENAI_BASE_URL
+
+DEFAULT_BASE_URL = "https://api.openai.com/v1"
+
+
+class AsyncResponsesError(RuntimeError):
+    pass
+
+
+def _base_url() -> str:
+    return (OPENAI_BASE_URL or DEFAULT_BASE_URL).rstrip("/")
+
+
+def _client(timeout_seconds: float) -> httpx.AsyncClient:
+    if not OPENAI_API_KEY:
+        raise AsyncResponsesError("OPENAI_API_KEY is not configured")
+    # A client per call: Celery tasks run each analysis in a fresh event loop, and an
+    # AsyncClient's connection pool cannot be shared across loops.
+    return httpx.AsyncClient(
+        base_url=_base_url(),
+        headers={"Authorization": f"Bearer {OPENAI_API_KEY}"},
+        timeout=httpx.Timeout(timeout_seconds),
+    )
+
+
+async def create_response(
+    *,
+    model: str,
+    messages: list[dict[str, str]],
+    timeout_seconds: float,
+) -> dict[str, Any]:
+    """POST /responses over httpx without blocking the event loop; returns the raw JSON body."""
+    async with _client(timeout_seconds) as client:
+        response = await client.post("/responses", json={"model": model, "input": messages})
+    if response.status_code >= 400:
+        raise AsyncResponsesError(f"HTTP {response.status_code}: {response.text[:300]}")
+    try:
+        data = response.json()
+    except ValueError as exc:
+        raise AsyncResponsesError(f"Invalid JSON body: {exc}") from exc
+    if not isinstance(data, dict):
+        raise AsyncResponsesError("Response body is not a JSON object")
+    return data
+
+
+async def stream_response(
+    *,
+    model: str,
+    messages: list[dict[str, str]],
+    timeout_seconds: float,
+    on_delta: Callable[[str], Any],
+) -> dict[str, Any]:
+    """POST /responses with ``stream: true``, passing each output text delta to ``on_delta``.
+
+    Returns the final response object from the ``response.completed`` event, shaped like the
+    body ``create_response`` returns.
+    """
+    deltas: list[str] = []
+    completed: dict[str, Any] | None = None
+    async with _client(timeout_seconds) as client:
+        async with client.stream(
+            "POST", "/responses", json={"model": model, "input": messages, "stream": True}
+        ) as response:
+            if response.status_code >= 400:
+                body = (await response.aread()).decode("utf-8", "replace")
+                raise AsyncResponsesError(f"HTTP {response.status_code}: {body[:300]}")
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                raw = line[len("data:") :].strip()
+                if not raw or raw == "[DONE]":
+                    continue
+                try:
+                    event = json.loads(raw)
+                except ValueError as exc:
+                    raise AsyncResponsesError(f"Invalid stream event: {exc}") from exc
+                event_type = event.get("type")
+                if event_type == "response.output_text.delta":
+                    delta = str(event.get("delta") or "")
+                    deltas.append(delta)
+                    on_delta(delta)
+                elif event_type == "response.completed":
+                    completed = event.get("response") or {}
+                elif event_type in {"response.failed", "error"}:
+                    raise AsyncResponsesError(f"Stream failed: {raw[:300]}")
+
+    if completed is None:
+        raise AsyncResponsesError("Stream ended before response.completed")
+    if not output_text_from_json(completed):
+        completed = {**completed, "output_text": "".join(deltas)}
+    return completed
+
+
+def output_text_from_json(data: dict[str, Any]) -> str:
+    output_text = data.get("output_text")
+    if isinstance(output_text, str) and output_text.strip():
+        return output_text
+    texts: list[str] = []
+    for item in data.get("output") or []:
+        if not isinstance(item, dict):
+            continue
+        for part in item.get("content") or []:
+            if isinstance(part, dict) and isinstance(part.get("text"), str):
+                texts.append(part["text"])
+    return "\n".join(texts)
@@ -1,12 +1,31 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
+import threading
+import time
+from contextlib import contextmanager
 from functools import lru_cache
-from typing import Any
+from typing import Any, Callable, Iterator
 
-from app.ai_module.llm.prompts import build_system_prompt, build_user_prompt
-from app.config import OPENAI_API_KEY, OPENAI_MODEL
+from app.ai_module.llm.async_client import create_response, output_text_from_json, stream_response
+from app.ai_module.llm.prompts import build_reduce_prompt, build_system_prompt, build_user_prompt
+from app.ai_module.llm.response_cache import get_llm_response_cache, prompt_cache_key
+from app.ai_module.llm.tokens import estimate_tokens
+from app.ai_module.resilience import CircuitOpenError, call_resilient, call_with_breaker, get_circuit_breaker
+from app.config import (
+    AI_LLM_HEDGE_DELAY_SECONDS,
+    AI_LLM_TIMEOUT_SECONDS,
+    AI_SINGLE_FLIGHT_ENABLED,
+    AI_SINGLE_FLIGHT_LOCK_TTL_SECONDS,
+    AI_SINGLE_FLIGHT_POLL_SECONDS,
+    AI_SINGLE_FLIGHT_WAIT_SECONDS,
+    OPENAI_API_KEY,
+    OPENAI_BASE_URL,
+    OPENAI_MODEL,
+)
+from app.single_flight import FlightLease, SingleFlight
 
 logger = logging.getLogger(__name__)
 
@@ -26,7 +45,13 @@ def _get_client() -> Any:
         raise LLMClientError("openai package is not installed")
     if not OPENAI_API_KEY:
         raise LLMClientError("OPENAI_API_KEY is not configured")
-    return OpenAI(api_key=OPENAI_API_KEY)
+    # OPENAI_BASE_URL points the client at a compatible endpoint, e.g. the local stub server.
+    return OpenAI(
+        api_key=OPENAI_API_KEY,
+        base_url=OPENAI_BASE_URL or None,
+        timeout=AI_LLM_TIMEOUT_SECONDS,
+        max_retries=0,
+    )
 
 
 def _extract_json_payload(raw_text: str) -> dict[str, Any]:
@@ -99,6 +124,394 @@ def _extract_output_text(response: Any) -> str:
     return ""
 
 
+def _request_completion(messages: list[dict[str, str]]) -> tuple[str, dict[str, Any]]:
+    client = _get_client()
+    try:
+        response = call_with_breaker(
+            get_circuit_breaker("llm"),
+            lambda: client.responses.create(model=OPENAI_MODEL, input=messages),
+        )
+    except CircuitOpenError:
+        logger.warning("ai_llm.request stage=circuit_open model=%s", OPENAI_MODEL)
+        raise
+    except Exception as exc:
+        logger.error("ai_llm.request stage=failed model=%s reason=%s", OPENAI_MODEL, str(exc))
+        raise LLMClientError(f"OpenAI request failed: {exc}") from exc
+
+    usage = getattr(response, "usage", None)
+    logger.info(
+        "ai_llm.request stage=success model=%s input_tokens=%s output_tokens=%s",
+        OPENAI_MODEL,
+        getattr(usage, "input_tokens", None),
+        getattr(usage, "output_tokens", None),
+    )
+    output_text = _extract_output_text(response)
+    return output_text, _extract_json_payload(output_text)
+
+
+async def _arequest_completion(
+    messages: list[dict[str, str]],
+    debug: dict[str, Any],
+    on_delta: Callable[[str], Any] | None = None,
+) -> tuple[str, dict[str, Any]]:
+    def _attempt() -> Any:
+        if on_delta is not None:
+            return stream_response(
+                model=OPENAI_MODEL,
+                messages=messages,
+                timeout_seconds=AI_LLM_TIMEOUT_SECONDS,
+                on_delta=on_delta,
+            )
+        return create_response(model=OPENAI_MODEL, messages=messages, timeout_seconds=AI_LLM_TIMEOUT_SECONDS)
+
+    def _on_hedge() -> None:
+        debug["llm_hedged"] = True
+        logger.info("ai_llm.request stage=hedged model=%s delay_seconds=%s", OPENAI_MODEL, AI_LLM_HEDGE_DELAY_SECONDS)
+
+    try:
+        data = await call_resilient(
+            _attempt,
+            breaker=get_circuit_breaker("llm"),
+            timeout_seconds=AI_LLM_TIMEOUT_SECONDS,
+            # Two racing streams would interleave their deltas, so streamed calls are not hedged.
+            hedge_delay_seconds=0.0 if on_delta is not None else AI_LLM_HEDGE_DELAY_SECONDS,
+            on_hedge=_on_hedge,
+        )
+    except CircuitOpenError:
+        logger.warning("ai_llm.request stage=circuit_open model=%s", OPENAI_MODEL)
+        raise
+    except Exception as exc:
+        logger.error("ai_llm.request stage=failed model=%s reason=%s", OPENAI_MODEL, str(exc))
+        raise LLMClientError(f"OpenAI request failed: {exc}") from exc
+
+    usage = data.get("usage") or {}
+    logger.info(
+        "ai_llm.request stage=success model=%s input_tokens=%s output_tokens=%s",
+        OPENAI_MODEL,
+        usage.get("input_tokens"),
+        usage.get("output_tokens"),
+    )
+    output_text = output_text_from_json(data)
+    return output_text, _extract_json_payload(output_text)
+
+
+_llm_flight = SingleFlight("llm_response", lock_ttl_seconds=AI_SINGLE_FLIGHT_LOCK_TTL_SECONDS)
+# cache key -> [lock, holders]; an entry is dropped once its last holder leaves, so the map only
+# ever holds the prompts currently in flight.
+_local_flights: dict[str, list[Any]] = {}
+_local_flights_lock = threading.Lock()
+
+
+@contextmanager
+def _local_flight(cache_key: str) -> Iterator[None]:
+    with _local_flights_lock:
+        entry = _local_flights.setdefault(cache_key, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _local_flights_lock:
+            entry[1] -= 1
+            if entry[1] == 0:
+                _local_flights.pop(cache_key, None)
+
+
+def _try_acquire_flight(cache_key: str) -> tuple[FlightLease | None, bool]:
+    """Return (lease, coordinated); coordinated is False when the lock backend is unavailable."""
+    if not AI_SINGLE_FLIGHT_ENABLED:
+        return None, False
+    try:
+        return _llm_flight.try_acquire(OPENAI_MODEL, cache_key), True
+    except Exception as exc:
+        logger.warning("ai_llm.cache stage=single_flight_unavailable reason=%s", str(exc))
+        return None, False
+
+
+def _wait_for_cached(cache: Any, cache_key: str) -> tuple[FlightLease | None, Any]:
+    """Wait for the leader's cached response, or take the lease over if the leader gave up.
+
+    Returns (None, cached) when the response arrived and (lease, None) when this caller should
+    request it; both are None on timeout.
+    """
+    deadline = time.monotonic() + max(0.0, AI_SINGLE_FLIGHT_WAIT_SECONDS)
+    while time.monotonic() < deadline:
+        time.sleep(max(0.05, AI_SINGLE_FLIGHT_POLL_SECONDS))
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return None, cached
+        # The leader failed (lock released) or died (lock expired) without caching a response.
+        lease, _ = _try_acquire_flight(cache_key)
+        if lease is not None:
+            return lease, None
+    return None, None
+
+
+def _store_response(
+    cache: Any,
+    cache_key: str,
+    output_text: str,
+    payload: dict[str, Any],
+    validate: Callable[[dict[str, Any]], Any] | None,
+) -> None:
+    # A payload the caller would reject must not be served to every retry for the cache TTL.
+    if validate is not None:
+        try:
+            validate(payload)
+        except Exception as exc:
+            logger.warning("ai_llm.cache stage=store_skipped reason=invalid_payload detail=%s", str(exc))
+            return
+    try:
+        cache.put(cache_key, model=OPENAI_MODEL, output_text=output_text, payload=payload)
+    except Exception as exc:
+        logger.warning("ai_llm.cache stage=store_failed reason=%s", str(exc))
+
+
+def _cached_completion(
+    messages: list[dict[str, str]],
+    debug: dict[str, Any],
+    validate: Callable[[dict[str, Any]], Any] | None = None,
+) -> dict[str, Any]:
+    cache = get_llm_response_cache()
+    if cache is None:
+        debug["llm_cache"] = "disabled"
+        return _request_completion(messages)[1]
+
+    cache_key = prompt_cache_key(OPENAI_MODEL, messages)
+    debug["llm_cache_key"] = cache_key
+    cached = cache.get(cache_key)
+    if cached is not None:
+        debug["llm_cache"] = "hit"
+        logger.info("ai_llm.cache stage=hit model=%s", OPENAI_MODEL)
+        return dict(cached.payload)
+
+    # Identical prompts in flight at the same time make one request: threads in this process
+    # queue on a local lock, other workers on the shared single-flight lock.
+    with _local_flight(cache_key):
+        cached = cache.get(cache_key)
+        if cached is not None:
+            debug["llm_cache"] = "coalesced"
+            return dict(cached.payload)
+
+        lease, coordinated = _try_acquire_flight(cache_key)
+        if lease is None and coordinated:
+            lease, cached = _wait_for_cached(cache, cache_key)
+            if cached is not None:
+                debug["llm_cache"] = "coalesced"
+                _llm_flight.record("coalesced")
+                return dict(cached.payload)
+            if lease is None:
+                _llm_flight.record("timeout")
+                logger.warning("ai_llm.cache stage=single_flight_timeout model=%s", OPENAI_MODEL)
+        if lease is not None:
+            _llm_flight.record("leader")
+
+        try:
+            output_text, payload = _request_completion(messages)
+            _store_response(cache, cache_key, output_text, payload, validate)
+        finally:
+            if lease is not None:
+                _llm_flight.release(lease)
+    debug["llm_cache"] = "miss"
+    return payload
+
+
+# In-process coalescing for the async path: callers on the same event loop await the leader's
+# future instead of queueing on a thread lock, which would block the loop.
+_async_flights: dict[tuple[int, str], asyncio.Future] = {}
+
+
+async def _await_cached(cache: Any, cache_key: str) -> tuple[FlightLease | None, Any]:
+    """Async variant of ``_wait_for_cached``."""
+    deadline = time.monotonic() + max(0.0, AI_SINGLE_FLIGHT_WAIT_SECONDS)
+    while time.monotonic() < deadline:
+        await asyncio.sleep(max(0.05, AI_SINGLE_FLIGHT_POLL_SECONDS))
+        cached = await asyncio.to_thread(cache.get, cache_key)
+        if cached is not None:
+            return None, cached
+        lease, _ = await asyncio.to_thread(_try_acquire_flight, cache_key)
+        if lease is not None:
+            return lease, None
+    return None, None
+
+
+async def _alead_completion(
+    cache: Any,
+    cache_key: str,
+    messages: list[dict[str, str]],
+    debug: dict[str, Any],
+    on_delta: Callable[[str], Any] | None,
+    validate: Callable[[dict[str, Any]], Any] | None,
+) -> dict[str, Any]:
+    lease, coordinated = await asyncio.to_thread(_try_acquire_flight, cache_key)
+    if lease is None and coordinated:
+        lease, cached = await _await_cached(cache, cache_key)
+        if cached is not None:
+            debug["llm_cache"] = "coalesced"
+            _llm_flight.record("coalesced")
+            return dict(cached.payload)
+        if lease is None:
+            _llm_flight.record("timeout")
+            logger.warning("ai_llm.cache stage=single_flight_timeout model=%s", OPENAI_MODEL)
+    if lease is not None:
+        _llm_flight.record("leader")
+
+    try:
+        output_text, payload = await _arequest_completion(messages, debug, on_delta)
+        await asyncio.to_thread(_store_response, cache, cache_key, output_text, payload, validate)
+    finally:
+        if lease is not None:
+            _llm_flight.release(lease)
+    debug["llm_cache"] = "miss"
+    return payload
+
+
+async def _acached_completion(
+    messages: list[dict[str, str]],
+    debug: dict[str, Any],
+    on_delta: Callable[[str], Any] | None = None,
+    validate: Callable[[dict[str, Any]], Any] | None = None,
+) -> dict[str, Any]:
+    cache = get_llm_response_cache()
+    if cache is None:
+        debug["llm_cache"] = "disabled"
+        return (await _arequest_completion(messages, debug, on_delta))[1]
+
+    cache_key = prompt_cache_key(OPENAI_MODEL, messages)
+    debug["llm_cache_key"] = cache_key
+    # The cache is SQLite; reads and writes run in threads so concurrent map-reduce partitions
+    # on this loop are not stalled behind disk I/O.
+    cached = await asyncio.to_thread(cache.get, cache_key)
+    if cached is not None:
+        debug["llm_cache"] = "hit"
+        logger.info("ai_llm.cache stage=hit model=%s", OPENAI_MODEL)
+        return dict(cached.payload)
+
+    loop = asyncio.get_running_loop()
+    flight_key = (id(loop), cache_key)
+    pending = _async_flights.get(flight_key)
+    if pending is not None:
+        payload = await asyncio.shield(pending)
+        debug["llm_cache"] = "coalesced"
+        return dict(payload)
+
+    future = loop.create_future()
+    _async_flights[flight_key] = future
+    try:
+        payload = await _alead_completion(cache, cache_key, messages, debug, on_delta, validate)
+    except BaseException as exc:
+        if isinstance(exc, asyncio.CancelledError):
+            future.cancel()
+        else:
+            future.set_exception(exc)
+            # Followers re-raise it; mark it retrieved so an unawaited future does not warn.
+            future.exception()
+        raise
+    else:
+        future.set_result(payload)
+    finally:
+        _async_flights.pop(flight_key, None)
+    return payload
+
+
+def _start_request(
+    messages: list[dict[str, str]],
+    debug: dict[str, Any] | None,
+    *,
+    findings_count: int,
+    chunks_count: int,
+) -> dict[str, Any]:
+    debug = debug if debug is not None else {}
+    debug["prompt_tokens"] = sum(estimate_tokens(message["content"]) for message in messages)
+    logger.info(
+        "ai_llm.request stage=start model=%s findings=%s retrieved_chunks=%s prompt_tokens=%s",
+        OPENAI_MODEL,
+        findings_count,
+        chunks_count,
+        debug["prompt_tokens"],
+    )
+    return debug
+
+
+def _complete(
+    messages: list[dict[str, str]],
+    debug: dict[str, Any] | None,
+    *,
+    findings_count: int,
+    chunks_count: int,
+    validate: Callable[[dict[str, Any]], Any] | None = None,
+) -> dict[str, Any]:
+    debug = _start_request(messages, debug, findings_count=findings_count, chunks_count=chunks_count)
+    return _cached_completion(messages, debug, validate)
+
+
+async def _acomplete(
+    messages: list[dict[str, str]],
+    debug: dict[str, Any] | None,
+    *,
+    findings_count: int,
+    chunks_count: int,
+    on_delta: Callable[[str], Any] | None = None,
+    validate: Callable[[dict[str, Any]], Any] | None = None,
+) -> dict[str, Any]:
+    debug = _start_request(messages, debug, findings_count=findings_count, chunks_count=chunks_count)
+    return await _acached_completion(messages, debug, on_delta, validate)
+
+
+def _grounded_messages(
+    *,
+    findings: list[dict[str, Any]],
+    retrieved_chunks: list[dict[str, Any]],
+    risk_metrics: dict[str, Any],
+    refactor_cost_estimate: dict[str, Any],
+    priority_rank: int,
+    inputs_summary: dict[str, Any],
+    previous_analysis: dict[str, Any] | None,
+    removed_findings: list[dict[str, Any]] | None,
+) -> list[dict[str, str]]:
+    return [
+        {"role": "system", "content": build_system_prompt()},
+        {
+            "role": "user",
+            "content": build_user_prompt(
+                findings=findings,
+                retrieved_chunks=retrieved_chunks,
+                risk_metrics=risk_metrics,
+                refactor_cost_estimate=refactor_cost_estimate,
+                priority_rank=priority_rank,
+                inputs_summary=inputs_summary,
+                previous_analysis=previous_analysis,
+                removed_findings=removed_findings,
+            ),
+        },
+    ]
+
+
+def _reduce_messages(
+    *,
+    partition_summaries: list[dict[str, Any]],
+    retrieved_chunks: list[dict[str, Any]],
+    risk_metrics: dict[str, Any],
+    refactor_cost_estimate: dict[str, Any],
+    priority_rank: int,
+    inputs_summary: dict[str, Any],
+) -> list[dict[str, str]]:
+    return [
+        {"role": "system", "content": build_system_prompt()},
+        {
+            "role": "user",
+            "content": build_reduce_prompt(
+                partition_summaries=partition_summaries,
+                retrieved_chunks=retrieved_chunks,
+                risk_metrics=risk_metrics,
+                refactor_cost_estimate=refactor_cost_estimate,
+                priority_rank=priority_rank,
+                inputs_summary=inputs_summary,
+            ),
+        },
+    ]
+
+
 def generate_grounded_ai_analysis(
     *,
     findings: list[dict[str, Any]],
@@ -107,36 +520,120 @@ def generate_grounded_ai_analysis(
     refactor_cost_estimate: dict[str, Any],
     priority_rank: int,
     inputs_summary: dict[str, Any],
+    previous_analysis: dict[str, Any] | None = None,
+    removed_findings: list[dict[str, Any]] | None = None,
+    debug: dict[str, Any] | None = None,
+    validate: Callable[[dict[str, Any]], Any] | None = None,
 ) -> dict[str, Any]:
-    client = _get_client()
-    logger.info(
-        "ai_llm.request stage=start model=%s findings=%s retrieved_chunks=%s",
-        OPENAI_MODEL,
-        len(findings),
-        len(retrieved_chunks),
+    """Call the LLM with the grounded prompt; identical prompts are served from the response cache.
+
+    When ``debug`` is given it is filled with the estimated ``prompt_tokens`` and the cache
+    outcome (``llm_cache``: hit, coalesced, miss or disabled) for the analysis debug payload.
+    Responses for which ``validate`` raises are returned but not cached.
+    """
+    messages = _grounded_messages(
+        findings=findings,
+        retrieved_chunks=retrieved_chunks,
+        risk_metrics=risk_metrics,
+        refactor_cost_estimate=refactor_cost_estimate,
+        priority_rank=priority_rank,
+        inputs_summary=inputs_summary,
+        previous_analysis=previous_analysis,
+        removed_findings=removed_findings,
+    )
+    return _complete(
+        messages, debug, findings_count=len(findings), chunks_count=len(retrieved_chunks), validate=validate
     )
-    try:
-        response = client.responses.create(
-            model=OPENAI_MODEL,
-            input=[
-                {"role": "system", "content": build_system_prompt()},
-                {
-                    "role": "user",
-                    "content": build_user_prompt(
-                        findings=findings,
-                        retrieved_chunks=retrieved_chunks,
-                        risk_metrics=risk_metrics,
-                        refactor_cost_estimate=refactor_cost_estimate,
-                        priority_rank=priority_rank,
-                        inputs_summary=inputs_summary,
-                    ),
-                },
-            ],
-        )
-    except Exception as exc:
-        logger.error("ai_llm.request stage=failed model=%s reason=%s", OPENAI_MODEL, str(exc))
-        raise LLMClientError(f"OpenAI request failed: {exc}") from exc
 
-    logger.info("ai_llm.request stage=success model=%s", OPENAI_MODEL)
-    output_text = _extract_output_text(response)
-    return _extract_json_payload(output_text)
+
+async def agenerate_grounded_ai_analysis(
+    *,
+    findings: list[dict[str, Any]],
+    retrieved_chunks: list[dict[str, Any]],
+    risk_metrics: dict[str, Any],
+    refactor_cost_estimate: dict[str, Any],
+    priority_rank: int,
+    inputs_summary: dict[str, Any],
+    previous_analysis: dict[str, Any] | None = None,
+    removed_findings: list[dict[str, Any]] | None = None,
+    debug: dict[str, Any] | None = None,
+    on_delta: Callable[[str], Any] | None = None,
+    validate: Callable[[dict[str, Any]], Any] | None = None,
+) -> dict[str, Any]:
+    """Async variant of ``generate_grounded_ai_analysis`` that does not block the event loop.
+
+    The request runs under ``AI_LLM_TIMEOUT_SECONDS`` with an optional hedged second attempt and
+    the ``llm`` circuit breaker; CircuitOpenError is raised as-is so callers can fall back.
+    With ``on_delta`` the response is streamed and each output text delta is passed to it;
+    cached responses produce no deltas.
+    """
+    messages = _grounded_messages(
+        findings=findings,
+        retrieved_chunks=retrieved_chunks,
+        risk_metrics=risk_metrics,
+        refactor_cost_estimate=refactor_cost_estimate,
+        priority_rank=priority_rank,
+        inputs_summary=inputs_summary,
+        previous_analysis=previous_analysis,
+        removed_findings=removed_findings,
+    )
+    return await _acomplete(
+        messages,
+        debug,
+        findings_count=len(findings),
+        chunks_count=len(retrieved_chunks),
+        on_delta=on_delta,
+        validate=validate,
+    )
+
+
+def generate_reduced_ai_analysis(
+    *,
+    partition_summaries: list[dict[str, Any]],
+    retrieved_chunks: list[dict[str, Any]],
+    risk_metrics: dict[str, Any],
+    refactor_cost_estimate: dict[str, Any],
+    priority_rank: int,
+    inputs_summary: dict[str, Any],
+    debug: dict[str, Any] | None = None,
+    validate: Callable[[dict[str, Any]], Any] | None = None,
+) -> dict[str, Any]:
+    """Merge per-partition analyses (the map stage of a large scan) into one analysis payload."""
+    messages = _reduce_messages(
+        partition_summaries=partition_summaries,
+        retrieved_chunks=retrieved_chunks,
+        risk_metrics=risk_metrics,
+        refactor_cost_estimate=refactor_cost_estimate,
+        priority_rank=priority_rank,
+        inputs_summary=inputs_summary,
+    )
+    findings_count = sum(int(summary.get("findings_count") or 0) for summary in partition_summaries)
+    return _complete(
+        messages, debug, findings_count=findings_count, chunks_count=len(retrieved_chunks), validate=validate
+    )
+
+
+async def agenerate_reduced_ai_analysis(
+    *,
+    partition_summaries: list[dict[str, Any]],
+    retrieved_chunks: list[dict[str, Any]],
+    risk_metrics: dict[str, Any],
+    refactor_cost_estimate: dict[str, Any],
+    priority_rank: int,
+    inputs_summary: dict[str, Any],
+    debug: dict[str, Any] | None = None,
+    validate: Callable[[dict[str, Any]], Any] | None = None,
+) -> dict[str, Any]:
+    """Async variant of ``generate_reduced_ai_analysis``."""
+    messages = _reduce_messages(
+        partition_summaries=partition_summaries,
+        retrieved_chunks=retrieved_chunks,
+        risk_metrics=risk_metrics,
+        refactor_cost_estimate=refactor_cost_estimate,
+        priority_rank=priority_rank,
+        inputs_summary=inputs_summary,
+    )
+    findings_count = sum(int(summary.get("findings_count") or 0) for summary in partition_summaries)
+    return await _acomplete(
+        messages, debug, findings_count=findings_count, chunks_count=len(retrieved_chunks), validate=validate
+    )
@@ -1,66 +1,163 @@
 from __future__ import annotations
 
 import json
-from collections import Counter
+import logging
+import posixpath
+from collections import Counter, defaultdict
 from typing import Any
 
+from app.ai_module.llm.tokens import estimate_tokens, truncate_to_tokens
+from app.config import AI_PROMPT_CONTEXT_TOKEN_BUDGET, AI_PROMPT_MAX_EXAMPLES, AI_PROMPT_TOKEN_BUDGET
+from app.severity_map import canonicalize_severity
 
-def _format_context_blocks(retrieved_chunks: list[dict[str, Any]]) -> str:
+logger = logging.getLogger(__name__)
+
+
+# Cap per retrieved chunk so one long chunk cannot use the whole context budget.
+_MAX_CHUNK_TOKENS = 350
+_MIN_BLOCK_TOKENS = 40
+_EVIDENCE_CHARS = 220
+# Successively smaller (examples, groups) limits tried until the prompt fits the token budget.
+_FINDINGS_LEVELS = ((1.0, 40), (0.5, 20), (0.25, 10), (0.1, 5), (0.0, 3))
+
+
+def _dedupe_chunks(retrieved_chunks: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    selected: list[dict[str, Any]] = []
+    texts: list[str] = []
+    for chunk in retrieved_chunks:
+        text = " ".join(str(chunk.get("text") or "").split())
+        if not text:
+            continue
+        # Overlapping chunks and lexical page snippets often repeat text already in the prompt.
+        if any(text in existing or existing in text for existing in texts):
+            continue
+        texts.append(text)
+        selected.append(chunk)
+    return selected
+
+
+def _format_context_blocks(retrieved_chunks: list[dict[str, Any]], *, token_budget: int) -> str:
     if not retrieved_chunks:
         return "(no retrieved context)"
 
     blocks: list[str] = []
-    for index, chunk in enumerate(retrieved_chunks[:4], start=1):
+    used = 0
+    for index, chunk in enumerate(_dedupe_chunks(retrieved_chunks), start=1):
         title = chunk.get("title") or "Unknown"
         page = chunk.get("page")
         doc_id = chunk.get("doc_id") or "unknown"
         section = chunk.get("section") or "N/A"
-        text = str(chunk.get("text") or "").strip()[:700]
-        blocks.append(
-            (
-                f"[DOC {index}] title={title} | section={section} | page={page} | source={doc_id}\n"
-                f"{text}"
-            )
+        header = f"[DOC {index}] title={title} | section={section} | page={page} | source={doc_id}\n"
+        available = min(_MAX_CHUNK_TOKENS, token_budget - used - estimate_tokens(header))
+        if available < _MIN_BLOCK_TOKENS:
+            break
+        text = truncate_to_tokens(str(chunk.get("text") or "").strip(), available)
+        block = f"{header}{text}"
+        blocks.append(block)
+        used += estimate_tokens(block)
+    return "\n\n".join(blocks) if blocks else "(no retrieved context)"
+
+
+def _finding_group_key(item: dict[str, Any]) -> tuple[str, str, str]:
+    meta = item.get("meta") or {}
+    rule_id = str(meta.get("rule_id") or item.get("type") or "unknown")
+    algorithm = str(item.get("algorithm") or "UNKNOWN")
+    file_path = str(item.get("file_path") or "").replace("\\", "/")
+    directory = (posixpath.dirname(file_path) or ".") if file_path else "(none)"
+    return rule_id, algorithm, directory
+
+
+def _severity_score(item: dict[str, Any]) -> int:
+    return canonicalize_severity(item.get("severity"))[1]
+
+
+def _group_findings(findings: list[dict[str, Any]]) -> list[tuple[tuple[str, str, str], list[dict[str, Any]]]]:
+    """Findings grouped by (rule, algorithm, directory), most severe and largest groups first."""
+    groups: dict[tuple[str, str, str], list[dict[str, Any]]] = defaultdict(list)
+    for item in findings:
+        groups[_finding_group_key(item)].append(item)
+    for members in groups.values():
+        members.sort(
+            key=lambda item: (-_severity_score(item), str(item.get("file_path") or ""), item.get("line_start") or 0)
         )
-    return "\n\n".join(blocks)
+    return sorted(
+        groups.items(),
+        key=lambda entry: (-_severity_score(entry[1][0]), -len(entry[1]), entry[0]),
+    )
 
 
-def _compact_findings(findings: list[dict[str, Any]]) -> dict[str, Any]:
-    severity_counter: Counter[str] = Counter()
-    algorithm_counter: Counter[str] = Counter()
+def _example_finding(item: dict[str, Any]) -> dict[str, Any]:
+    evidence = str(item.get("evidence") or "").strip()
+    if len(evidence) > _EVIDENCE_CHARS:
+        evidence = f"{evidence[:_EVIDENCE_CHARS]}..."
+    meta = item.get("meta") or {}
+    return {
+        "type": item.get("type"),
+        "severity": item.get("severity"),
+        "algorithm": item.get("algorithm"),
+        "context": item.get("context"),
+        "file_path": item.get("file_path"),
+        "line_start": item.get("line_start"),
+        "line_end": item.get("line_end"),
+        "rule_id": meta.get("rule_id"),
+        "scanner_type": meta.get("scanner_type"),
+        "evidence_excerpt": evidence or None,
+    }
+
+
+def _stratified_examples(
+    groups: list[tuple[tuple[str, str, str], list[dict[str, Any]]]],
+    *,
+    max_examples: int,
+) -> list[dict[str, Any]]:
+    # Round-robin over the groups so every (rule, algorithm, directory) is represented before
+    # any group contributes a second example.
     examples: list[dict[str, Any]] = []
+    depth = 0
+    while len(examples) < max_examples:
+        added = False
+        for _, members in groups:
+            if depth < len(members):
+                examples.append(_example_finding(members[depth]))
+                added = True
+                if len(examples) >= max_examples:
+                    break
+        if not added:
+            break
+        depth += 1
+    return examples
+
 
+def _compact_findings(
+    findings: list[dict[str, Any]],
+    *,
+    max_examples: int = 20,
+    max_groups: int = 40,
+) -> dict[str, Any]:
+    severity_counter: Counter[str] = Counter()
+    algorithm_counter: Counter[str] = Counter()
     for item in findings:
-        severity = str(item.get("severity") or "UNKNOWN")
-        severity_counter[severity] += 1
-        algorithm = str(item.get("algorithm") or "UNKNOWN")
-        algorithm_counter[algorithm] += 1
-
-    for item in findings[:20]:
-        evidence = str(item.get("evidence") or "").strip()
-        if len(evidence) > 220:
-            evidence = f"{evidence[:220]}..."
-        meta = item.get("meta") or {}
-        examples.append(
-            {
-                "type": item.get("type"),
-                "severity": item.get("severity"),
-                "algorithm": item.get("algorithm"),
-                "context": item.get("context"),
-                "file_path": item.get("file_path"),
-                "line_start": item.get("line_start"),
-                "line_end": item.get("line_end"),
-                "rule_id": meta.get("rule_id"),
-                "scanner_type": meta.get("scanner_type"),
-                "evidence_excerpt": evidence or None,
-            }
-        )
+        severity_counter[str(item.get("severity") or "UNKNOWN")] += 1
+        algorithm_counter[str(item.get("algorithm") or "UNKNOWN")] += 1
 
+    groups = _group_findings(findings)
+    finding_groups = [
+        {
+            "rule_id": rule_id,
+            "algorithm": algorithm,
+            "directory": directory,
+            "count": len(members),
+            "max_severity": members[0].get("severity"),
+        }
+        for (rule_id, algorithm, directory), members in groups[:max_groups]
+    ]
     return {
         "total_findings": len(findings),
         "counts_by_severity": dict(severity_counter),
         "top_algorithms": [name for name, _ in algorithm_counter.most_common(8)],
-        "example_findings": examples,
+        "finding_groups": finding_groups,
+        "omitted_groups": max(0, len(groups) - max_groups),
+        "example_findings": _stratified_examples(groups, max_examples=max_examples),
     }
 
 
@@ -135,16 +232,66 @@ def build_user_prompt(
     refactor_cost_estimate: dict[str, Any],
     priority_rank: int,
     inputs_summary: dict[str, Any],
+    previous_analysis: dict[str, Any] | None = None,
+    removed_findings: list[dict[str, Any]] | None = None,
+    token_budget: int | None = None,
+    context_token_budget: int | None = None,
 ) -> str:
-    compact_findings = _compact_findings(findings)
-    context_blocks = _format_context_blocks(retrieved_chunks)
+    """Render the user prompt within a token budget.
+
+    Retrieved context gets up to ``context_token_budget`` tokens; findings are aggregated by
+    (rule, algorithm, directory) and the number of groups and stratified examples shrinks until
+    the whole prompt fits ``token_budget``.
+    """
+    total_budget = int(token_budget if token_budget is not None else AI_PROMPT_TOKEN_BUDGET)
+    context_budget = int(context_token_budget if context_token_budget is not None else AI_PROMPT_CONTEXT_TOKEN_BUDGET)
+    context_blocks = _format_context_blocks(retrieved_chunks, token_budget=context_budget)
     baseline = {
         "risk_metrics": risk_metrics,
         "refactor_cost_estimate": refactor_cost_estimate,
         "priority_rank": priority_rank,
         "inputs_summary": inputs_summary,
     }
+    incremental_section = ""
+    if previous_analysis is not None:
+        incremental_section = (
+            "INCREMENTAL_RESCAN:\n"
+            "SCAN_FINDINGS_COMPACT_JSON lists only findings added since the previous analysis.\n"
+            "Carried-forward recommendations are merged by the caller; do not repeat them.\n"
+            "Only recommend work for the added findings; mention resolved findings in analysis_summary.\n\n"
+            "PREVIOUS_ANALYSIS_SUMMARY_JSON:\n"
+            f"{json.dumps(previous_analysis, ensure_ascii=False, indent=2)}\n\n"
+            "REMOVED_FINDINGS_COMPACT_JSON:\n"
+            f"{json.dumps(_compact_findings(removed_findings or [], max_examples=5, max_groups=10), ensure_ascii=False, indent=2)}\n\n"
+        )
+
+    prompt = ""
+    for example_share, max_groups in _FINDINGS_LEVELS:
+        compact_findings = _compact_findings(
+            findings,
+            max_examples=int(AI_PROMPT_MAX_EXAMPLES * example_share),
+            max_groups=max_groups,
+        )
+        prompt = _render_user_prompt(incremental_section, compact_findings, context_blocks, baseline)
+        if estimate_tokens(prompt) <= total_budget:
+            break
+    else:
+        logger.warning(
+            "ai_llm.prompt stage=over_budget budget=%s estimated_tokens=%s",
+            total_budget,
+            estimate_tokens(prompt),
+        )
+    return prompt
+
+
+def _render_user_prompt(
+    incremental_section: str,
+    compact_findings: dict[str, Any],
+    context_blocks: str,
+    baseline: dict[str, Any],
+) -> str:
     return (
+        f"{incremental_section}"
         "SCAN_FINDINGS_COMPACT_JSON:\n"
         f"{json.dumps(compact_findings, ensure_ascii=False, indent=2)}\n\n"
         "RETRIEVED_NIST_CONTEXT:\n"
@@ -160,5 +307,87 @@ def build_user_prompt(
         "6. For each recommendation include at least 1 code_fix_examples item with before_code/after_code.\n"
         "7. Use actual finding evidence and file paths. If exact code is limited, provide conservative patch-style snippets.\n"
         "8. Include citation snippets exactly from retrieved context when used.\n"
-        "9. Return JSON only.\n"
+        "9. finding_groups counts all findings per (rule_id, algorithm, directory); example_findings are representative samples.\n"
+        "10. Return JSON only.\n"
     )
+
+
+def _compact_partition_summary(summary: dict[str, Any], *, max_recommendations: int) -> dict[str, Any]:
+    analysis = summary.get("analysis") or {}
+    recommendations = []
+    for recommendation in (analysis.get("recommendations") or [])[:max_recommendations]:
+        recommendations.append(
+            {
+                "title": recommendation.get("title"),
+                "description": str(recommendation.get("description") or "")[:400],
+                "nist_standard_reference": recommendation.get("nist_standard_reference"),
+                "affected_locations": (recommendation.get("affected_locations") or [])[:2],
+                "citations": [
+                    {
+                        "doc_id": citation.get("doc_id"),
+                        "title": citation.get("title"),
+                        "section": citation.get("section"),
+                        "page": citation.get("page"),
+                        "snippet": str(citation.get("snippet") or "")[:300],
+                    }
+                    for citation in (recommendation.get("citations") or [])[:2]
+                ],
+                "confidence": recommendation.get("confidence"),
+            }
+        )
+    return {
+        "partition": summary.get("partition"),
+        "findings_count": summary.get("findings_count"),
+        "risk_score": analysis.get("risk_score"),
+        "analysis_summary": str(analysis.get("analysis_summary") or "")[:600],
+        "recommendations": recommendations,
+    }
+
+
+def build_reduce_prompt(
+    *,
+    partition_summaries: list[dict[str, Any]],
+    retrieved_chunks: list[dict[str, Any]],
+    risk_metrics: dict[str, Any],
+    refactor_cost_estimate: dict[str, Any],
+    priority_rank: int,
+    inputs_summary: dict[str, Any],
+    token_budget: int | None = None,
+    context_token_budget: int | None = None,
+) -> str:
+    """Render the reduce-stage prompt that merges per-partition analyses into one analysis."""
+    total_budget = int(token_budget if token_budget is not None else AI_PROMPT_TOKEN_BUDGET)
+    context_budget = int(context_token_budget if context_token_budget is not None else AI_PROMPT_CONTEXT_TOKEN_BUDGET)
+    context_blocks = _format_context_blocks(retrieved_chunks, token_budget=context_budget)
+    baseline = {
+        "risk_metrics": risk_metrics,
+        "refactor_cost_estimate": refactor_cost_estimate,
+        "priority_rank": priority_rank,
+        "inputs_summary": inputs_summary,
+    }
+
+    prompt = ""
+    for max_recommendations in (5, 3, 1):
+        compact = [
+            _compact_partition_summary(summary, max_recommendations=max_recommendations)
+            for summary in partition_summaries
+        ]
+        prompt = (
+            "PARTITION_ANALYSES_JSON:\n"
+            f"{json.dumps(compact, ensure_ascii=False, indent=2)}\n\n"
+            "RETRIEVED_NIST_CONTEXT:\n"
+            f"{context_blocks}\n\n"
+            "BASELINE_METRICS_JSON:\n"
+            f"{json.dumps(baseline, ensure_ascii=False, indent=2)}\n\n"
+            "Requirements:\n"
+            "1. Each PARTITION_ANALYSES_JSON entry analyzed one directory or service of the repository.\n"
+            "2. Merge them into one repository-wide analysis that keeps the required schema.\n"
+            "3. Combine recommendations that address the same migration across partitions; keep their affected_locations.\n"
+            "4. Order recommendations by risk across the whole repository, not by partition.\n"
+            "5. Keep citations only if they appear in the partition analyses or retrieved context.\n"
+            "6. Use BASELINE_METRICS_JSON for repository-wide scores.\n"
+            "7. Return JSON only.\n"
+        )
+        if estimate_tokens(prompt) <= total_budget:
+            break
+    return prompt
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+from app.config import (
+    AI_LLM_CACHE_ENABLED,
+    AI_LLM_CACHE_MAX_ENTRIES,
+    AI_LLM_CACHE_PATH,
+    AI_LLM_CACHE_TTL_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_responses (
+    cache_key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    output_text TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_llm_responses_created_at ON llm_responses (created_at);
+"""
+
+
+def _normalize_prompt(text: str) -> str:
+    # Line endings and trailing whitespace never change what the model is asked.
+    lines = str(text or "").replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines).strip()
+
+
+def prompt_cache_key(model: str, messages: list[dict[str, str]]) -> str:
+    normalized = [
+        {"role": str(message.get("role") or ""), "content": _normalize_prompt(message.get("content") or "")}
+        for message in messages
+    ]
+    digest = hashlib.sha256(json.dumps(normalized, ensure_ascii=True).encode("utf-8")).hexdigest()
+    return f"{model}:{digest}"
+
+
+@dataclass
+class CachedResponse:
+    model: str
+    output_text: str
+    payload: dict[str, Any]
+    created_at: float
+
+
+class LLMResponseCache:
+    """Local SQLite cache of LLM responses keyed by model and normalized prompt hash."""
+
+    def __init__(self, path: str, *, ttl_seconds: int = 604800, max_entries: int = 2000) -> None:
+        self._ttl_seconds = max(1, int(ttl_seconds))
+        self._max_entries = max(1, int(max_entries))
+        self._lock = threading.Lock()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def get(self, cache_key: str) -> CachedResponse | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT model, output_text, payload, created_at FROM llm_responses WHERE cache_key = ?",
+                (cache_key,),
+            ).fetchone()
+        if row is None:
+            return None
+        model, output_text, payload, created_at = row
+        if time.time() - float(created_at) > self._ttl_seconds:
+            return None
+        try:
+            data = json.loads(payload)
+        except ValueError:
+            return None
+        if not isinstance(data, dict):
+            return None
+        return CachedResponse(model=model, output_text=output_text, payload=data, created_at=float(created_at))
+
+    def put(self, cache_key: str, *, model: str, output_text: str, payload: dict[str, Any]) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_responses (cache_key, model, output_text, payload, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (cache_key, model, output_text, json.dumps(payload, ensure_ascii=True), now),
+            )
+            self._conn.execute("DELETE FROM llm_responses WHERE created_at < ?", (now - self._ttl_seconds,))
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM llm_responses").fetchone()
+            overflow = int(count) - self._max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM llm_responses WHERE cache_key IN "
+                    "(SELECT cache_key FROM llm_responses ORDER BY created_at ASC LIMIT ?)",
+                    (overflow,),
+                )
+            self._conn.commit()
+
+    def count(self) -> int:
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM llm_responses").fetchone()
+        return int(count)
+
+
+@lru_cache(maxsize=1)
+def get_llm_response_cache() -> LLMResponseCache | None:
+    if not AI_LLM_CACHE_ENABLED or not AI_LLM_CACHE_PATH:
+        return None
+    try:
+        return LLMResponseCache(
+            AI_LLM_CACHE_PATH,
+            ttl_seconds=AI_LLM_CACHE_TTL_SECONDS,
+            max_entries=AI_LLM_CACHE_MAX_ENTRIES,
+        )
+    except sqlite3.Error as exc:
+        logger.warning("ai_llm.cache stage=open_failed path=%s reason=%s", AI_LLM_CACHE_PATH, str(exc))
+        return None
@@ -0,0 +1,237 @@
+"""Local stand-in for the OpenAI Responses API, for tests and latency benchmarks.
+
+Point the client at it with ``OPENAI_BASE_URL=http://127.0.0.1:<port>/v1``. Every request returns
+a schema-valid analysis built from the prompt after ``latency_seconds``, without calling a model.
+``latency_overrides`` delays the next requests individually, e.g. one slow call to exercise hedging.
+Requests with ``"stream": true`` get the text as ``response.output_text.delta`` server-sent events.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import threading
+import time
+import uuid as uuid_lib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+_STREAM_CHUNK_CHARS = 64
+_DOC_HEADER = re.compile(r"^\[DOC \d+\] title=(.*?) \| section=(.*?) \| page=(.*?) \| source=(.*)$", re.MULTILINE)
+
+
+def _section_json(prompt: str, name: str) -> Any:
+    marker = f"{name}:\n"
+    start = prompt.find(marker)
+    if start < 0:
+        return None
+    body = prompt[start + len(marker) :]
+    end = body.find("\n\n")
+    try:
+        return json.loads(body if end < 0 else body[:end])
+    except ValueError:
+        return None
+
+
+def _citations(prompt: str) -> list[dict[str, Any]]:
+    citations = []
+    for match in _DOC_HEADER.finditer(prompt):
+        title, section, page, source = match.groups()
+        snippet = prompt[match.end() :].lstrip("\n").split("\n", 1)[0][:200]
+        citations.append(
+            {
+                "doc_id": source.strip(),
+                "title": title.strip(),
+                "section": section.strip(),
+                "page": int(page) if page.strip().isdigit() else None,
+                "url": None,
+                "snippet": snippet,
+            }
+        )
+    return citations
+
+
+def _recommendation(title: str, locations: list[dict[str, Any]], citations: list[dict[str, Any]]) -> dict[str, Any]:
+    return {
+        "title": title,
+        "description": f"Migrate {title} to NIST post-quantum algorithms.",
+        "nist_standard_reference": citations[0]["title"] if citations else "NIST IR 8547",
+        "affected_locations": locations[:3],
+        "code_fix_examples": [],
+        "citations": citations[:1],
+        "confidence": 0.6,
+    }
+
+
+def build_stub_analysis(prompt: str) -> dict[str, Any]:
+    """Deterministic analysis for a map, reduce or single-call prompt."""
+    citations = _citations(prompt)
+    baseline = _section_json(prompt, "BASELINE_METRICS_JSON") or {}
+    risk_metrics = baseline.get("risk_metrics") or {}
+    recommendations: list[dict[str, Any]] = []
+
+    partitions = _section_json(prompt, "PARTITION_ANALYSES_JSON")
+    if isinstance(partitions, list):
+        merged: dict[str, dict[str, Any]] = {}
+        for partition in partitions:
+            for item in partition.get("recommendations") or []:
+                title = str(item.get("title") or "Recommendation")
+                entry = merged.setdefault(title, _recommendation(title, [], citations))
+                entry["affected_locations"] = (entry["affected_locations"] + (item.get("affected_locations") or []))[:3]
+        recommendations = list(merged.values())
+        summary = f"Merged {len(partitions)} partition analyses."
+    else:
+        findings = _section_json(prompt, "SCAN_FINDINGS_COMPACT_JSON") or {}
+        examples = findings.get("example_findings") or []
+        for group in (findings.get("finding_groups") or [])[:5]:
+            locations = [
+                {key: example.get(key) for key in ("file_path", "line_start", "line_end", "rule_id", "scanner_type")}
+                for example in examples
+                if example.get("rule_id") == group.get("rule_id") and example.get("file_path")
+            ]
+            recommendations.append(_recommendation(f"{group.get('algorithm')} in {group.get('rule_id')}", locations, citations))
+        summary = f"Analyzed {findings.get('total_findings', 0)} findings."
+
+    return {
+        "risk_score": int(risk_metrics.get("risk_score") or 0),
+        "pqc_readiness_score": int(risk_metrics.get("pqc_readiness_score") or 0),
+        "severity_weighted_index": float(risk_metrics.get("severity_weighted_index") or 0.0),
+        "refactor_cost_estimate": baseline.get("refactor_cost_estimate")
+        or {"level": "LOW", "explanation": "stub", "affected_files": 0},
+        "priority_rank": max(1, int(baseline.get("priority_rank") or 1)),
+        "recommendations": recommendations,
+        "analysis_summary": summary,
+        "confidence_score": 0.6,
+        "citation_missing": not citations,
+        "inputs_summary": {},
+    }
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    server: "StubLLMServer"
+
+    def do_POST(self) -> None:  # noqa: N802 - http.server naming
+        if not self.path.rstrip("/").endswith("/responses"):
+            self._send(404, {"error": {"message": f"unknown path {self.path}"}})
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send(400, {"error": {"message": "invalid JSON body"}})
+            return
+
+        latency = self.server.record_request(request)
+        if latency > 0:
+            time.sleep(latency)
+        if self.server.fail_status:
+            self._send(self.server.fail_status, {"error": {"message": "stub failure"}})
+            return
+
+        messages = request.get("input") or []
+        prompt = "\n".join(str(message.get("content") or "") for message in messages if isinstance(message, dict))
+        text = json.dumps(build_stub_analysis(prompt))
+        body = {
+            "id": f"resp_{uuid_lib.uuid4().hex}",
+            "object": "response",
+            "status": "completed",
+            "model": request.get("model"),
+            "output_text": text,
+            "output": [
+                {
+                    "type": "message",
+                    "role": "assistant",
+                    "content": [{"type": "output_text", "text": text, "annotations": []}],
+                }
+            ],
+            "usage": {"input_tokens": len(prompt) // 4, "output_tokens": len(text) // 4},
+        }
+        if request.get("stream"):
+            self._send_stream(text, body)
+        else:
+            self._send(200, body)
+
+    def _send_stream(self, text: str, body: dict[str, Any]) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        events = [
+            {"type": "response.output_text.delta", "delta": text[start : start + _STREAM_CHUNK_CHARS]}
+            for start in range(0, len(text), _STREAM_CHUNK_CHARS)
+        ]
+        events.append({"type": "response.completed", "response": body})
+        for event in events:
+            self.wfile.write(f"event: {event['type']}\ndata: {json.dumps(event)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+    def _send(self, status: int, body: dict[str, Any]) -> None:
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002 - http.server signature
+        return None
+
+
+class StubLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, *, latency_seconds: float = 0.0) -> None:
+        super().__init__((host, port), _StubHandler)
+        self.latency_seconds = float(latency_seconds)
+        self.fail_status = 0
+        self.latency_overrides: list[float] = []
+        self.requests: list[dict[str, Any]] = []
+        self._requests_lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def record_request(self, request: dict[str, Any]) -> float:
+        """Record the request and return how long to delay its response."""
+        with self._requests_lock:
+            self.requests.append(request)
+            if self.latency_overrides:
+                return float(self.latency_overrides.pop(0))
+        return self.latency_seconds
+
+    def start(self) -> "StubLLMServer":
+        self._thread = threading.Thread(target=self.serve_forever, name="stub-llm", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Serve a local stand-in for the OpenAI Responses API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds to wait before each response")
+    args = parser.parse_args(argv)
+
+    server = StubLLMServer(args.host, args.port, latency_seconds=args.latency)
+    print(f"Stub LLM server listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:  # pragma: no cover - interactive use
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    raise SystemExit(main())
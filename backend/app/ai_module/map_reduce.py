@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from app.ai_module.business_impact import estimate_refactor_cost
+from app.ai_module.llm.openai_client import agenerate_grounded_ai_analysis, agenerate_reduced_ai_analysis
+from app.ai_module.rag.retriever import retrieve_guidance_for_findings
+from app.ai_module.resilience import CircuitOpenError
+from app.ai_module.risk_aggregation import FindingsAccumulator
+from app.config import (
+    AI_MAP_REDUCE_CONCURRENCY,
+    AI_MAP_REDUCE_ENABLED,
+    AI_MAP_REDUCE_MAX_PARTITIONS,
+    AI_MAP_REDUCE_MIN_FINDINGS,
+    AI_RAG_TOP_K,
+)
+
+logger = logging.getLogger(__name__)
+
+# Monorepo layouts where the service, not the container directory, is the unit of ownership.
+_SERVICE_CONTAINERS = frozenset({"apps", "libs", "modules", "packages", "services"})
+ROOT_PARTITION = "(root)"
+OTHER_PARTITION = "(other)"
+
+
+class MapReduceError(RuntimeError):
+    pass
+
+
+def partition_key(finding: dict) -> str:
+    file_path = str(finding.get("file_path") or "").replace("\\", "/").strip("/")
+    parts = [part for part in file_path.split("/") if part and part != "."]
+    if len(parts) <= 1:
+        return ROOT_PARTITION
+    if parts[0].lower() in _SERVICE_CONTAINERS and len(parts) > 2:
+        return f"{parts[0]}/{parts[1]}"
+    return parts[0]
+
+
+def partition_findings(findings: list[dict], *, max_partitions: int) -> dict[str, list[dict]]:
+    """Group findings by top-level directory or service; the smallest groups share one partition."""
+    groups: dict[str, list[dict]] = defaultdict(list)
+    for finding in findings:
+        groups[partition_key(finding)].append(finding)
+
+    ordered = sorted(groups.items(), key=lambda item: (-len(item[1]), item[0]))
+    limit = max(1, int(max_partitions))
+    if len(ordered) <= limit:
+        return dict(ordered)
+
+    partitions = dict(ordered[: limit - 1])
+    partitions[OTHER_PARTITION] = [finding for _, members in ordered[limit - 1 :] for finding in members]
+    return partitions
+
+
+def should_map_reduce(findings: list[dict]) -> bool:
+    if not AI_MAP_REDUCE_ENABLED or len(findings) < max(1, AI_MAP_REDUCE_MIN_FINDINGS):
+        return False
+    return len({partition_key(finding) for finding in findings}) > 1
+
+
+@dataclass
+class MapReduceResult:
+    payload: dict[str, Any]
+    retrieved_chunks: list[dict[str, Any]]
+    partitions: list[dict[str, Any]] = field(default_factory=list)
+    stage_latency_ms: dict[str, float] = field(default_factory=dict)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "partitions": self.partitions,
+            "stage_latency_ms": self.stage_latency_ms,
+        }
+
+
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 1)
+
+
+async def _map_partition(
+    name: str,
+    findings: list[dict],
+    *,
+    top_k: int,
+    validate: Callable[[dict[str, Any]], Any] | None = None,
+) -> dict[str, Any]:
+    started = time.perf_counter()
+    aggregate = FindingsAccumulator().extend(findings)
+    retrieval = await asyncio.to_thread(retrieve_guidance_for_findings, aggregate.findings, top_k=top_k)
+    if retrieval.failure_reason:
+        raise MapReduceError(retrieval.failure_reason)
+    retrieval_ms = _elapsed_ms(started)
+
+    llm_debug: dict[str, Any] = {}
+    risk_metrics = aggregate.risk_metrics()
+    analysis = await agenerate_grounded_ai_analysis(
+        findings=aggregate.findings,
+        retrieved_chunks=retrieval.chunks,
+        risk_metrics=risk_metrics,
+        refactor_cost_estimate=estimate_refactor_cost(aggregate.findings).model_dump(),
+        priority_rank=1,
+        inputs_summary={**aggregate.inputs_summary(), "partition": name},
+        debug=llm_debug,
+        validate=validate,
+    )
+    if validate is not None:
+        # A malformed partition analysis is left out of the reduce, like a failed one.
+        validate(analysis)
+    return {
+        "partition": name,
+        "findings_count": len(aggregate.findings),
+        "analysis": analysis,
+        "retrieved_chunks": retrieval.chunks,
+        "retrieval_ms": retrieval_ms,
+        "latency_ms": _elapsed_ms(started),
+        "llm_cache": llm_debug.get("llm_cache"),
+        "prompt_tokens": llm_debug.get("prompt_tokens"),
+    }
+
+
+def _merge_chunks(global_chunks: list[dict[str, Any]], partition_chunks: list[list[dict[str, Any]]]) -> list[dict]:
+    merged: list[dict[str, Any]] = []
+    seen: set[tuple] = set()
+    for chunk in [*global_chunks, *(chunk for rows in partition_chunks for chunk in rows)]:
+        key = (chunk.get("doc_id"), chunk.get("page"), str(chunk.get("text") or "")[:200])
+        if key in seen:
+            continue
+        seen.add(key)
+        merged.append(chunk)
+    return merged
+
+
+async def run_map_reduce_analysis(
+    findings: list[dict],
+    *,
+    retrieved_chunks: list[dict[str, Any]],
+    risk_metrics: dict[str, Any],
+    refactor_cost_estimate: dict[str, Any],
+    priority_rank: int,
+    inputs_summary: dict[str, Any],
+    max_partitions: int | None = None,
+    concurrency: int | None = None,
+    top_k: int | None = None,
+    debug: dict[str, Any] | None = None,
+    validate: Callable[[dict[str, Any]], Any] | None = None,
+) -> MapReduceResult:
+    """Analyze each partition concurrently (map), then merge the partition analyses (reduce).
+
+    LLM calls share the event loop, bounded by a semaphore of ``concurrency``; retrieval runs in
+    worker threads. ``validate`` checks every partition and the reduced payload before they are
+    cached. Partitions whose analysis fails or is rejected are left out of the reduce; if all fail,
+    MapReduceError. An open LLM circuit aborts the whole run with CircuitOpenError.
+    """
+    partitions = partition_findings(findings, max_partitions=max_partitions or AI_MAP_REDUCE_MAX_PARTITIONS)
+    semaphore = asyncio.Semaphore(max(1, int(concurrency or AI_MAP_REDUCE_CONCURRENCY)))
+    chunk_k = int(top_k or AI_RAG_TOP_K)
+
+    async def _run(name: str, members: list[dict]) -> dict[str, Any] | None:
+        async with semaphore:
+            try:
+                return await _map_partition(name, members, top_k=chunk_k, validate=validate)
+            except CircuitOpenError:
+                raise
+            except Exception as exc:
+                logger.warning(
+                    "ai_analysis stage=map_partition_failed partition=%s findings=%s reason=%s",
+                    name,
+                    len(members),
+                    str(exc),
+                )
+                return None
+
+    started = time.perf_counter()
+    mapped = await asyncio.gather(*(_run(name, members) for name, members in partitions.items()))
+    map_ms = _elapsed_ms(started)
+    summaries = [summary for summary in mapped if summary is not None]
+    if not summaries:
+        raise MapReduceError(f"All {len(partitions)} partition analyses failed")
+
+    reduce_chunks = _merge_chunks(retrieved_chunks, [summary["retrieved_chunks"] for summary in summaries])
+    reduce_debug: dict[str, Any] = {}
+    started = time.perf_counter()
+    payload = await agenerate_reduced_ai_analysis(
+        partition_summaries=summaries,
+        retrieved_chunks=reduce_chunks,
+        risk_metrics=risk_metrics,
+        refactor_cost_estimate=refactor_cost_estimate,
+        priority_rank=priority_rank,
+        inputs_summary=inputs_summary,
+        debug=reduce_debug,
+        validate=validate,
+    )
+    reduce_ms = _elapsed_ms(started)
+
+    result = MapReduceResult(
+        payload=payload,
+        retrieved_chunks=reduce_chunks,
+        partitions=[
+            {
+                "partition": summary["partition"],
+                "findings_count": summary["findings_count"],
+                "retrieval_ms": summary["retrieval_ms"],
+                "latency_ms": summary["latency_ms"],
+                "llm_cache": summary["llm_cache"],
+                "prompt_tokens": summary["prompt_tokens"],
+            }
+            for summary in summaries
+        ],
+        stage_latency_ms={
+            "map": map_ms,
+            "map_partition_max": max(summary["latency_ms"] for summary in summaries),
+            "reduce": reduce_ms,
+        },
+    )
+    if debug is not None:
+        debug["map_reduce"] = {
+            **result.to_dict(),
+            "partitions_total": len(partitions),
+            "partitions_failed": len(partitions) - len(summaries),
+            "reduce_llm_cache": reduce_debug.get("llm_cache"),
+            "reduce_prompt_tokens": reduce_debug.get("prompt_tokens"),
+        }
+    logger.info(
+        "ai_analysis stage=map_reduce_completed partitions=%s failed=%s map_ms=%s reduce_ms=%s",
+        len(partitions),
+        len(partitions) - len(summaries),
+        map_ms,
+        reduce_ms,
+    )
+    return result
@@ -1,7 +1,8 @@
 from __future__ import annotations
 
-import json
+import asyncio
 import logging
+import time
 import uuid as uuid_lib
 from collections import Counter
 from typing import Any
@@ -10,33 +11,52 @@ from sqlalchemy.orm import Session
 
 from app.ai_analysis_store import (
     find_cached_snapshot_by_algorithm_signature,
+    find_previous_repository_snapshot,
     serialize_ai_analysis_snapshot,
     upsert_ai_analysis_snapshot,
 )
-from app.ai_module.api_client import fetch_findings
+from app.ai_module.api_client import iter_finding_rows, load_findings_for_analysis
 from app.ai_module.business_impact import estimate_refactor_cost
 from app.ai_module.confidence import compute_confidence_score
-from app.ai_module.llm.openai_client import generate_grounded_ai_analysis
+from app.ai_module.incremental import (
+    IncrementalPlan,
+    carry_forward_recommendations,
+    compute_findings_delta,
+)
+from app.ai_module.llm.openai_client import agenerate_grounded_ai_analysis
+from app.ai_module.map_reduce import run_map_reduce_analysis, should_map_reduce
 from app.ai_module.recommendation_engine import build_recommendations
 from app.ai_module.rag.ingest import ingest_corpus
-from app.ai_module.rag.retriever import inspect_rag_corpus, retrieve_relevant_chunks_with_debug
-from app.ai_module.risk_aggregation import compute_risk_metrics, deduplicate_findings, summarize_inputs
+from app.ai_module.rag.retriever import inspect_rag_corpus, retrieve_guidance_for_findings
+from app.ai_module.resilience import CircuitOpenError, get_circuit_breaker
+from app.ai_module.risk_aggregation import FindingsAccumulator
 from app.ai_module.schemas import AiAnalysisResponse
+from app.analysis_events import AnalysisEventPublisher
 from app.config import (
     AI_ALLOW_DETERMINISTIC_FALLBACK,
     AI_ANALYSIS_VERSION,
     AI_AUTO_INGEST_ON_EMPTY_VECTOR,
     AI_CACHE_ENABLED,
     AI_CACHE_MAX_AGE_HOURS,
+    AI_INCREMENTAL_ENABLED,
+    AI_INCREMENTAL_MAX_CHANGE_RATIO,
     AI_RAG_CORPUS_PATH,
     AI_RAG_TOP_K,
+    AI_SINGLE_FLIGHT_ENABLED,
+    AI_SINGLE_FLIGHT_LOCK_TTL_SECONDS,
+    AI_SINGLE_FLIGHT_POLL_SECONDS,
+    AI_SINGLE_FLIGHT_WAIT_SECONDS,
     AI_VECTOR_COLLECTION,
     OPENAI_EMBEDDING_MODEL,
     OPENAI_MODEL,
 )
+from app.single_flight import FlightLease, SingleFlight, SingleFlightError
 
 logger = logging.getLogger(__name__)
 
+# Coalesces concurrent analyses that share (algorithm signature, analysis version).
+_analysis_flight = SingleFlight("ai_analysis", lock_ttl_seconds=AI_SINGLE_FLIGHT_LOCK_TTL_SECONDS)
+
 
 def _select_affected_locations(findings: list[dict], recommendation_text: str, max_locations: int = 3) -> list[dict]:
     text = recommendation_text.lower()
@@ -261,26 +281,6 @@ def _build_analysis_summary(findings: list[dict], inputs_summary: dict, citation
     return f"Findings summary: {scanner_summary}. Dominant rules: {rule_summary}. {citation_summary}"
 
 
-def build_rag_query(findings: list[dict]) -> str:
-    reduced: list[dict] = []
-    for finding in findings[:30]:
-        reduced.append(
-            {
-                "type": finding.get("type"),
-                "severity": finding.get("severity"),
-                "algorithm": finding.get("algorithm"),
-                "context": finding.get("context"),
-                "file_path": finding.get("file_path"),
-                "meta": finding.get("meta"),
-            }
-        )
-    return (
-        "Find the most relevant NIST guidance for PQC migration, cryptographic transition, "
-        "TLS, IPsec, key establishment, digital signatures, and key management "
-        f"for these findings:\n{json.dumps(reduced, ensure_ascii=False)}"
-    )
-
-
 def build_algorithm_signature(findings: list[dict]) -> str:
     algorithms: set[str] = set()
     for finding in findings:
@@ -309,6 +309,7 @@ def _build_debug_payload(
     debug_message: str | None = None,
     failure_reason: str | None = None,
     rag_details: dict[str, Any] | None = None,
+    llm_details: dict[str, Any] | None = None,
 ) -> dict[str, Any]:
     return {
         "analysis_mode": analysis_mode,
@@ -321,6 +322,7 @@ def _build_debug_payload(
         "debug_message": debug_message,
         "failure_reason": failure_reason,
         "rag_details": rag_details or {},
+        "llm_details": llm_details or {},
     }
 
 
@@ -525,20 +527,101 @@ def _ensure_real_rag_ready(
     )
 
 
+def _carry_forward_analysis(
+    incremental: IncrementalPlan,
+    *,
+    findings: list[dict],
+    inputs_summary: dict,
+    risk_metrics: dict[str, int | float],
+    refactor_cost,
+    priority_rank: int,
+    algorithm_signature: str,
+) -> tuple[AiAnalysisResponse, list[dict], list[str]]:
+    """Rescan with only resolved findings: reuse the previous analysis without RAG or LLM calls."""
+    previous = incremental.previous_response
+    removed_count = len(incremental.delta.removed)
+    analysis_summary = str(previous.analysis_summary or "").strip()
+    if removed_count:
+        analysis_summary = f"{analysis_summary} Rescan resolved {removed_count} finding(s); no new findings.".strip()
+
+    response = previous.model_copy(
+        update={
+            "risk_score": int(risk_metrics["risk_score"]),
+            "pqc_readiness_score": int(risk_metrics["pqc_readiness_score"]),
+            "severity_weighted_index": float(risk_metrics["severity_weighted_index"]),
+            "refactor_cost_estimate": refactor_cost,
+            "priority_rank": priority_rank,
+            "recommendations": incremental.carried_forward,
+            "analysis_summary": analysis_summary,
+        }
+    )
+    citations, nist_references, citation_missing = _normalize_payload_for_storage(response)
+    response = response.model_copy(
+        update={
+            "confidence_score": compute_confidence_score(
+                findings=findings,
+                inputs_summary=inputs_summary,
+                citation_missing=citation_missing,
+                citations_count=len(citations),
+            ),
+            "citation_missing": citation_missing,
+            "inputs_summary": inputs_summary,
+        }
+    )
+    debug_payload = _build_debug_payload(
+        analysis_mode="real",
+        rag_corpus_loaded=previous.rag_corpus_loaded,
+        rag_chunks_retrieved=0,
+        citations_available=bool(citations),
+        llm_model_used=previous.llm_model_used,
+        embedding_model_used=previous.embedding_model_used,
+        vector_store_collection=previous.vector_store_collection,
+        debug_message="Carried forward previous repository analysis; no new findings",
+        failure_reason=None,
+    )
+    response = _apply_debug_to_response(response, debug_payload)
+    response = _apply_cache_metadata(response, algorithm_signature=algorithm_signature, cache_hit=False)
+    logger.info(
+        "ai_analysis stage=carried_forward previous_scan_uuid=%s removed=%s recommendations=%s",
+        str(incremental.delta.previous_scan_uuid),
+        removed_count,
+        len(response.recommendations),
+    )
+    return response, citations, nist_references
+
+
 async def analyze_findings(
     findings: list[dict],
     *,
     corpus_path: str | None = None,
     algorithm_signature: str | None = None,
+    aggregate: FindingsAccumulator | None = None,
+    incremental: IncrementalPlan | None = None,
+    events: AnalysisEventPublisher | None = None,
 ) -> tuple[AiAnalysisResponse, list[dict], list[str]]:
-    source_count = len(findings)
-    prepared_findings = deduplicate_findings(findings)
-    inputs_summary = summarize_inputs(prepared_findings, source_count=source_count)
-    risk_metrics = compute_risk_metrics(prepared_findings)
+    if aggregate is None:
+        aggregate = FindingsAccumulator().extend(findings)
+    source_count = aggregate.source_count
+    prepared_findings = aggregate.findings
+    inputs_summary = aggregate.inputs_summary()
+    risk_metrics = aggregate.risk_metrics()
     refactor_cost = estimate_refactor_cost(prepared_findings)
     priority_rank = _compute_priority_rank(prepared_findings, int(risk_metrics["risk_score"]))
     effective_signature = algorithm_signature or build_algorithm_signature(prepared_findings)
 
+    if incremental is not None:
+        inputs_summary["incremental"] = incremental.to_dict()
+        if not incremental.delta.added:
+            return _carry_forward_analysis(
+                incremental,
+                findings=prepared_findings,
+                inputs_summary=inputs_summary,
+                risk_metrics=risk_metrics,
+                refactor_cost=refactor_cost,
+                priority_rank=priority_rank,
+                algorithm_signature=effective_signature,
+            )
+
     logger.info(
         "ai_analysis stage=start findings_source=%s findings_deduped=%s fallback_enabled=%s",
         source_count,
@@ -591,13 +674,34 @@ async def analyze_findings(
             algorithm_signature=effective_signature,
         )
 
-    rag_query = build_rag_query(prepared_findings)
-    retrieval_result = retrieve_relevant_chunks_with_debug(rag_query, top_k=AI_RAG_TOP_K)
+    # Incremental rescans only need guidance for the findings that changed.
+    changed_findings = incremental.delta.added + incremental.delta.removed if incremental else prepared_findings
+    retrieval_result = await asyncio.to_thread(retrieve_guidance_for_findings, changed_findings, top_k=AI_RAG_TOP_K)
     rag_debug["rag_chunks_retrieved"] = len(retrieval_result.chunks)
     rag_debug["vector_store_collection"] = retrieval_result.vector_store_collection or rag_debug.get(
         "vector_store_collection"
     )
 
+    if events is not None and not retrieval_result.failure_reason:
+        events.emit(
+            "retrieval_done",
+            chunks=len(retrieval_result.chunks),
+            doc_ids=sorted({str(chunk.get("doc_id")) for chunk in retrieval_result.chunks if chunk.get("doc_id")}),
+        )
+
+    if retrieval_result.failure_reason and get_circuit_breaker("embeddings").state == "open":
+        return _fallback_analysis(
+            findings=prepared_findings,
+            inputs_summary=inputs_summary,
+            risk_metrics=risk_metrics,
+            refactor_cost=refactor_cost,
+            priority_rank=priority_rank,
+            corpus_path=corpus_path,
+            failure_reason=f"Embeddings circuit open: {retrieval_result.failure_reason}",
+            rag_debug=rag_debug,
+            algorithm_signature=effective_signature,
+        )
+
     if retrieval_result.failure_reason:
         return _ensure_real_rag_ready(
             findings=prepared_findings,
@@ -624,17 +728,75 @@ async def analyze_findings(
             algorithm_signature=effective_signature,
         )
 
+    llm_debug: dict[str, Any] = {}
+    # One prompt cannot represent tens of thousands of findings; large scans are analyzed per
+    # directory/service partition and merged.
+    use_map_reduce = incremental is None and should_map_reduce(prepared_findings)
+    if events is not None:
+        events.emit("llm_started", model=OPENAI_MODEL, map_reduce=use_map_reduce)
+    prompt_chunks = retrieval_result.chunks
     try:
-        llm_payload = generate_grounded_ai_analysis(
+        if use_map_reduce:
+            map_reduce = await run_map_reduce_analysis(
+                prepared_findings,
+                retrieved_chunks=retrieval_result.chunks,
+                risk_metrics=risk_metrics,
+                refactor_cost_estimate=refactor_cost.model_dump(),
+                priority_rank=priority_rank,
+                inputs_summary=inputs_summary,
+                debug=llm_debug,
+                validate=AiAnalysisResponse.model_validate,
+            )
+            llm_payload = map_reduce.payload
+            # The reduce prompt (and its citations) used the global chunks plus every partition's.
+            prompt_chunks = map_reduce.retrieved_chunks
+            rag_debug["rag_chunks_retrieved"] = len(prompt_chunks)
+        else:
+            llm_payload = await agenerate_grounded_ai_analysis(
+                findings=incremental.delta.added if incremental else prepared_findings,
+                retrieved_chunks=retrieval_result.chunks,
+                risk_metrics=risk_metrics,
+                refactor_cost_estimate=refactor_cost.model_dump(),
+                priority_rank=priority_rank,
+                inputs_summary=inputs_summary,
+                previous_analysis=incremental.previous_summary if incremental else None,
+                removed_findings=incremental.delta.removed if incremental else None,
+                debug=llm_debug,
+                on_delta=events.token_delta if events is not None else None,
+                validate=AiAnalysisResponse.model_validate,
+            )
+        if events is not None:
+            events.flush_tokens()
+        response = AiAnalysisResponse.model_validate(llm_payload)
+        if incremental is not None:
+            response = _enrich_recommendations_for_code_fix(response, incremental.delta.added)
+            # The LLM only saw the delta, so scores come from the deterministic full-scan baseline.
+            response = response.model_copy(
+                update={
+                    "recommendations": incremental.carried_forward + response.recommendations,
+                    "risk_score": int(risk_metrics["risk_score"]),
+                    "pqc_readiness_score": int(risk_metrics["pqc_readiness_score"]),
+                    "severity_weighted_index": float(risk_metrics["severity_weighted_index"]),
+                    "refactor_cost_estimate": refactor_cost,
+                    "priority_rank": priority_rank,
+                }
+            )
+        else:
+            response = _enrich_recommendations_for_code_fix(response, prepared_findings)
+    except CircuitOpenError as exc:
+        # The provider is known to be down: answer from the deterministic engine right away
+        # instead of failing every queued analysis after a full timeout.
+        return _fallback_analysis(
             findings=prepared_findings,
-            retrieved_chunks=retrieval_result.chunks,
+            inputs_summary=inputs_summary,
             risk_metrics=risk_metrics,
-            refactor_cost_estimate=refactor_cost.model_dump(),
+            refactor_cost=refactor_cost,
             priority_rank=priority_rank,
-            inputs_summary=inputs_summary,
+            corpus_path=corpus_path,
+            failure_reason=f"LLM circuit open: {exc}",
+            rag_debug=rag_debug,
+            algorithm_signature=effective_signature,
         )
-        response = AiAnalysisResponse.model_validate(llm_payload)
-        response = _enrich_recommendations_for_code_fix(response, prepared_findings)
     except Exception as exc:
         return _ensure_real_rag_ready(
             findings=prepared_findings,
@@ -668,17 +830,29 @@ async def analyze_findings(
     debug_payload = _build_debug_payload(
         analysis_mode="real",
         rag_corpus_loaded=True,
-        rag_chunks_retrieved=len(retrieval_result.chunks),
+        rag_chunks_retrieved=len(prompt_chunks),
         citations_available=bool(citations),
         llm_model_used=OPENAI_MODEL,
         embedding_model_used=OPENAI_EMBEDDING_MODEL,
         vector_store_collection=retrieval_result.vector_store_collection or AI_VECTOR_COLLECTION,
-        debug_message="Real RAG + LLM path completed",
+        debug_message=(
+            "Incremental RAG + LLM path completed"
+            if incremental
+            else "Map-reduce RAG + LLM path completed"
+            if use_map_reduce
+            else "Real RAG + LLM path completed"
+        ),
         failure_reason=None,
         rag_details=rag_debug,
+        llm_details=llm_debug,
     )
     response = _apply_debug_to_response(response, debug_payload)
     response = _apply_cache_metadata(response, algorithm_signature=effective_signature, cache_hit=False)
+    if events is not None:
+        events.emit(
+            "recommendations_parsed",
+            recommendations=[recommendation.model_dump(mode="json") for recommendation in response.recommendations],
+        )
     logger.info(
         "ai_analysis stage=completed mode=real citations=%s recommendations=%s",
         len(citations),
@@ -687,73 +861,243 @@ async def analyze_findings(
     return response, citations, nist_references
 
 
-async def compute_and_persist_ai_analysis(scan_uuid: uuid_lib.UUID, db: Session) -> AiAnalysisResponse | None:
-    logger.info("ai_analysis stage=task_start scan_uuid=%s", str(scan_uuid))
-    findings = await fetch_findings(scan_uuid, db)
-    if findings is None:
-        logger.warning("ai_analysis stage=no_findings scan_uuid=%s", str(scan_uuid))
+def _find_reusable_snapshot(db: Session, scan_uuid: uuid_lib.UUID, algorithm_signature: str):
+    cached_snapshot = find_cached_snapshot_by_algorithm_signature(
+        db,
+        algorithm_signature=algorithm_signature,
+        max_age_hours=AI_CACHE_MAX_AGE_HOURS,
+        analysis_version=AI_ANALYSIS_VERSION,
+    )
+    if cached_snapshot is None or cached_snapshot.scan_uuid == scan_uuid:
         return None
+    return cached_snapshot
 
-    deduped_findings = deduplicate_findings(findings)
-    algorithm_signature = build_algorithm_signature(deduped_findings)
-
-    if AI_CACHE_ENABLED:
-        cached_snapshot = find_cached_snapshot_by_algorithm_signature(
-            db,
-            algorithm_signature=algorithm_signature,
-            max_age_hours=AI_CACHE_MAX_AGE_HOURS,
-            analysis_version=AI_ANALYSIS_VERSION,
-        )
-        if cached_snapshot is not None and cached_snapshot.scan_uuid != scan_uuid:
-            cached_payload = serialize_ai_analysis_snapshot(cached_snapshot)
-            cached_payload = _enrich_recommendations_for_code_fix(cached_payload, deduped_findings)
-            cached_payload = _apply_cache_metadata(
-                cached_payload,
-                algorithm_signature=algorithm_signature,
-                cache_hit=True,
-                cache_source_scan=str(cached_snapshot.scan_uuid),
-            )
-            cached_payload = cached_payload.model_copy(
-                update={
-                    "analysis_mode": "real",
-                    "debug_message": "Reused cached AI analysis for matching algorithm signature",
-                    "failure_reason": None,
-                }
-            )
-            cached_citations = list(cached_snapshot.citations or [])
-            cached_refs = [
-                ref.strip()
-                for ref in str(cached_snapshot.nist_standard_reference or "").split(",")
-                if ref.strip()
-            ] or ["N/A"]
-            upsert_ai_analysis_snapshot(
-                db,
-                scan_uuid,
-                cached_payload,
-                citations=cached_citations,
-                nist_references=cached_refs,
-                analysis_version=AI_ANALYSIS_VERSION,
-            )
-            logger.info(
-                "ai_analysis stage=cache_hit scan_uuid=%s source_scan_uuid=%s signature=%s",
-                str(scan_uuid),
-                str(cached_snapshot.scan_uuid),
-                algorithm_signature,
-            )
-            return cached_payload
 
-    response, citations, nist_references = await analyze_findings(
-        findings,
+def _persist_cached_snapshot(
+    db: Session,
+    scan_uuid: uuid_lib.UUID,
+    cached_snapshot,
+    *,
+    findings: list[dict],
+    algorithm_signature: str,
+    coalesced: bool = False,
+    incremental: IncrementalPlan | None = None,
+) -> AiAnalysisResponse:
+    """Store ``cached_snapshot`` as this scan's analysis.
+
+    Without ``incremental`` it is a signature cache hit; with it, an incremental rescan whose
+    findings did not change, recorded as such so the two are told apart in the debug payload.
+    """
+    cached_payload = serialize_ai_analysis_snapshot(cached_snapshot)
+    cached_payload = _enrich_recommendations_for_code_fix(cached_payload, findings)
+    cached_payload = _apply_cache_metadata(
+        cached_payload,
         algorithm_signature=algorithm_signature,
+        cache_hit=incremental is None,
+        cache_source_scan=str(cached_snapshot.scan_uuid),
     )
+    if incremental is not None:
+        next_inputs_summary = dict(cached_payload.inputs_summary)
+        next_inputs_summary["incremental"] = {**incremental.to_dict(), "mode": "unchanged"}
+        cached_payload = cached_payload.model_copy(update={"inputs_summary": next_inputs_summary})
+    if coalesced:
+        next_inputs_summary = dict(cached_payload.inputs_summary)
+        next_inputs_summary["cache"] = {**next_inputs_summary["cache"], "coalesced": True}
+        cached_payload = cached_payload.model_copy(update={"inputs_summary": next_inputs_summary})
+    cached_payload = cached_payload.model_copy(
+        update={
+            "analysis_mode": "real",
+            "debug_message": (
+                "Incremental rescan: no finding changes"
+                if incremental is not None
+                else "Reused cached AI analysis for matching algorithm signature"
+            ),
+            "failure_reason": None,
+        }
+    )
+    cached_citations = list(cached_snapshot.citations or [])
+    cached_refs = [
+        ref.strip()
+        for ref in str(cached_snapshot.nist_standard_reference or "").split(",")
+        if ref.strip()
+    ] or ["N/A"]
     upsert_ai_analysis_snapshot(
         db,
         scan_uuid,
-        response,
-        citations=citations,
-        nist_references=nist_references,
+        cached_payload,
+        citations=cached_citations,
+        nist_references=cached_refs,
         analysis_version=AI_ANALYSIS_VERSION,
     )
+    logger.info(
+        "ai_analysis stage=%s scan_uuid=%s source_scan_uuid=%s signature=%s coalesced=%s",
+        "incremental_unchanged" if incremental is not None else "cache_hit",
+        str(scan_uuid),
+        str(cached_snapshot.scan_uuid),
+        algorithm_signature,
+        coalesced,
+    )
+    return cached_payload
+
+
+def _try_acquire_flight(algorithm_signature: str) -> FlightLease | None:
+    try:
+        return _analysis_flight.try_acquire(algorithm_signature, AI_ANALYSIS_VERSION)
+    except Exception as exc:
+        raise SingleFlightError(str(exc)) from exc
+
+
+async def _wait_for_flight(
+    db: Session,
+    scan_uuid: uuid_lib.UUID,
+    algorithm_signature: str,
+) -> tuple[FlightLease | None, Any]:
+    """Become the leader for this signature, or wait for the current leader's snapshot.
+
+    Returns (lease, None) when this task should compute, or (None, snapshot) when a concurrent
+    task already produced a reusable snapshot. On timeout both are None and the caller computes.
+    """
+    lease = _try_acquire_flight(algorithm_signature)
+    if lease is not None:
+        _analysis_flight.record("leader")
+        return lease, None
+
+    logger.info("ai_analysis stage=single_flight_wait scan_uuid=%s signature=%s", str(scan_uuid), algorithm_signature)
+    deadline = time.monotonic() + max(0.0, AI_SINGLE_FLIGHT_WAIT_SECONDS)
+    while time.monotonic() < deadline:
+        await asyncio.sleep(max(0.05, AI_SINGLE_FLIGHT_POLL_SECONDS))
+        cached_snapshot = _find_reusable_snapshot(db, scan_uuid, algorithm_signature)
+        if cached_snapshot is not None:
+            _analysis_flight.record("coalesced")
+            return None, cached_snapshot
+        # The leader finished without a reusable (real) snapshot or died; take over.
+        lease = _try_acquire_flight(algorithm_signature)
+        if lease is not None:
+            _analysis_flight.record("leader")
+            return lease, None
+
+    _analysis_flight.record("timeout")
+    logger.warning(
+        "ai_analysis stage=single_flight_timeout scan_uuid=%s signature=%s",
+        str(scan_uuid),
+        algorithm_signature,
+    )
+    return None, None
+
+
+def _plan_incremental_analysis(
+    db: Session,
+    scan_uuid: uuid_lib.UUID,
+    findings: list[dict],
+) -> tuple[Any, IncrementalPlan] | None:
+    previous_snapshot = find_previous_repository_snapshot(db, scan_uuid, analysis_version=AI_ANALYSIS_VERSION)
+    if previous_snapshot is None:
+        return None
+
+    delta = compute_findings_delta(
+        findings,
+        iter_finding_rows(previous_snapshot.scan_uuid, db),
+        previous_scan_uuid=previous_snapshot.scan_uuid,
+    )
+    if delta.change_ratio() > AI_INCREMENTAL_MAX_CHANGE_RATIO:
+        logger.info(
+            "ai_analysis stage=incremental_skipped scan_uuid=%s delta=%s reason=change_ratio_exceeded",
+            str(scan_uuid),
+            delta.to_dict(),
+        )
+        return None
+
+    previous_response = serialize_ai_analysis_snapshot(previous_snapshot)
+    plan = IncrementalPlan(
+        delta=delta,
+        previous_response=previous_response,
+        carried_forward=carry_forward_recommendations(previous_response.recommendations, delta),
+    )
+    logger.info("ai_analysis stage=incremental_planned scan_uuid=%s plan=%s", str(scan_uuid), plan.to_dict())
+    return previous_snapshot, plan
+
+
+async def compute_and_persist_ai_analysis(
+    scan_uuid: uuid_lib.UUID,
+    db: Session,
+    *,
+    events: AnalysisEventPublisher | None = None,
+) -> AiAnalysisResponse | None:
+    """Analyze a scan's findings and persist the snapshot.
+
+    ``events`` receives stage events (findings_loaded, retrieval_done, llm_started, llm_delta,
+    recommendations_parsed) for live streaming; the caller publishes the terminal event.
+    """
+    logger.info("ai_analysis stage=task_start scan_uuid=%s", str(scan_uuid))
+    aggregate = await load_findings_for_analysis(scan_uuid, db)
+    if aggregate is None:
+        logger.warning("ai_analysis stage=no_findings scan_uuid=%s", str(scan_uuid))
+        return None
+    if events is not None:
+        events.emit("findings_loaded", findings=len(aggregate.findings))
+
+    deduped_findings = aggregate.findings
+    algorithm_signature = build_algorithm_signature(deduped_findings)
+
+    lease: FlightLease | None = None
+    if AI_CACHE_ENABLED:
+        coalesced = False
+        cached_snapshot = _find_reusable_snapshot(db, scan_uuid, algorithm_signature)
+        if cached_snapshot is None and AI_SINGLE_FLIGHT_ENABLED:
+            try:
+                lease, cached_snapshot = await _wait_for_flight(db, scan_uuid, algorithm_signature)
+            except SingleFlightError as exc:
+                logger.warning("ai_analysis stage=single_flight_unavailable reason=%s", str(exc))
+            coalesced = cached_snapshot is not None
+            if lease is not None and cached_snapshot is None:
+                # A previous leader may have persisted between our cache check and lock acquisition.
+                cached_snapshot = _find_reusable_snapshot(db, scan_uuid, algorithm_signature)
+        if cached_snapshot is not None:
+            try:
+                return _persist_cached_snapshot(
+                    db,
+                    scan_uuid,
+                    cached_snapshot,
+                    findings=deduped_findings,
+                    algorithm_signature=algorithm_signature,
+                    coalesced=coalesced,
+                )
+            finally:
+                if lease is not None:
+                    _analysis_flight.release(lease)
+
+    try:
+        planned = _plan_incremental_analysis(db, scan_uuid, deduped_findings) if AI_INCREMENTAL_ENABLED else None
+        incremental = None
+        if planned is not None:
+            previous_snapshot, incremental = planned
+            if incremental.delta.is_empty:
+                return _persist_cached_snapshot(
+                    db,
+                    scan_uuid,
+                    previous_snapshot,
+                    findings=deduped_findings,
+                    algorithm_signature=algorithm_signature,
+                    incremental=incremental,
+                )
+        response, citations, nist_references = await analyze_findings(
+            deduped_findings,
+            algorithm_signature=algorithm_signature,
+            aggregate=aggregate,
+            incremental=incremental,
+            events=events,
+        )
+        upsert_ai_analysis_snapshot(
+            db,
+            scan_uuid,
+            response,
+            citations=citations,
+            nist_references=nist_references,
+            analysis_version=AI_ANALYSIS_VERSION,
+        )
+    finally:
+        if lease is not None:
+            _analysis_flight.release(lease)
     logger.info(
         "ai_analysis stage=persisted scan_uuid=%s mode=%s citations=%s",
         str(scan_uuid),
@@ -2,6 +2,7 @@ from app.ai_module.rag.ingest import ingest_corpus
 from app.ai_module.rag.retriever import (
     inspect_rag_corpus,
     retrieve_citations,
+    retrieve_guidance_for_findings,
     retrieve_relevant_chunks,
     retrieve_relevant_chunks_with_debug,
 )
@@ -10,6 +11,7 @@ __all__ = [
     "ingest_corpus",
     "inspect_rag_corpus",
     "retrieve_citations",
+    "retrieve_guidance_for_findings",
     "retrieve_relevant_chunks",
     "retrieve_relevant_chunks_with_debug",
 ]
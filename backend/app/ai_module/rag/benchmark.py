@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from app.ai_module.rag.embeddings import hashing_embed_texts
+from app.ai_module.rag.ingest import _batched, _document_chunks
+from app.ai_module.rag.loader import document_pages, extract_corpus_documents
+from app.ai_module.rag.vector_store import VectorStoreError, open_vector_store
+from app.config import AI_RAG_CORPUS_PATH
+
+DEFAULT_QUERIES = [
+    "RSA key generation migration to ML-KEM",
+    "ECDSA signatures replacement with ML-DSA",
+    "SHA-1 deprecation and approved hash functions",
+    "Diffie-Hellman key agreement transition",
+    "TLS 1.2 cipher suite configuration guidance",
+    "stateful hash-based signatures LMS XMSS",
+    "security strength of 2048-bit RSA",
+    "key encapsulation mechanism parameter sets",
+]
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(fraction * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def _result_key(row: dict) -> tuple:
+    return (row.get("doc_id"), row.get("section"), row.get("text"))
+
+
+def _exact_top_k(
+    chunks: list[dict],
+    embeddings: list[list[float]],
+    queries: list[list[float]],
+    top_k: int,
+) -> list[set]:
+    """Ground truth from a full sort (no argpartition), independent of any store implementation."""
+    scores = np.asarray(embeddings, dtype=np.float64) @ np.asarray(queries, dtype=np.float64).T
+    truth: list[set] = []
+    for query_index in range(scores.shape[1]):
+        ranked = np.argsort(-scores[:, query_index], kind="stable")[:top_k]
+        truth.append({_result_key(chunks[int(index)]) for index in ranked})
+    return truth
+
+
+def run_benchmark(
+    *,
+    corpus_path: str,
+    backends: list[str],
+    chunk_size: int = 1200,
+    overlap: int = 150,
+    query_count: int = 64,
+    top_k: int = 4,
+    batch_size: int = 16,
+    dim: int = 512,
+) -> dict:
+    """Build each backend from the same offline (hashing) embeddings and compare query cost and recall."""
+    root = Path(corpus_path).expanduser()
+    chunks: list[dict] = []
+    for file_path, pages in extract_corpus_documents(root).items():
+        chunks.extend(_document_chunks(document_pages(file_path, pages), chunk_size=chunk_size, overlap=overlap))
+    if not chunks:
+        raise SystemExit(f"No chunks found in corpus: {root}")
+
+    embeddings = hashing_embed_texts([str(chunk.get("text") or "") for chunk in chunks], dim=dim)
+    query_texts = [DEFAULT_QUERIES[index % len(DEFAULT_QUERIES)] for index in range(max(1, query_count))]
+    query_embeddings = hashing_embed_texts(query_texts, dim=dim)
+    expected = _exact_top_k(chunks, embeddings, query_embeddings[: len(DEFAULT_QUERIES)], top_k)
+
+    report: dict = {"chunks": len(chunks), "dim": dim, "queries": len(query_texts), "top_k": top_k, "backends": {}}
+    for backend in backends:
+        with tempfile.TemporaryDirectory(prefix=f"qshield_bench_{backend}_") as persist_dir:
+            try:
+                store = open_vector_store(collection_name="benchmark", persist_dir=persist_dir, backend=backend)
+            except VectorStoreError as exc:
+                report["backends"][backend] = {"skipped": str(exc)}
+                continue
+
+            started = time.perf_counter()
+            for chunk_batch, embedding_batch in zip(_batched(chunks, 256), _batched(embeddings, 256)):
+                store.upsert_chunks(chunk_batch, embedding_batch)
+            store.flush()
+            build_seconds = time.perf_counter() - started
+
+            latencies_ms: list[float] = []
+            single_results: list[list[dict]] = []
+            for query in query_embeddings:
+                started = time.perf_counter()
+                single_results.append(store.query(query, top_k=top_k))
+                latencies_ms.append((time.perf_counter() - started) * 1000)
+
+            started = time.perf_counter()
+            for query_batch in _batched(query_embeddings, max(1, batch_size)):
+                store.query_batch(query_batch, top_k=top_k)
+            batch_seconds = time.perf_counter() - started
+
+            recalls = [
+                len({_result_key(row) for row in rows} & truth) / max(1, len(truth))
+                for rows, truth in zip(single_results, expected)
+            ]
+            report["backends"][backend] = {
+                "build_seconds": round(build_seconds, 4),
+                "query_p50_ms": round(statistics.median(latencies_ms), 3),
+                "query_p95_ms": round(_percentile(latencies_ms, 0.95), 3),
+                "batch_queries_per_second": round(len(query_embeddings) / max(batch_seconds, 1e-9), 1),
+                "recall_at_k": round(statistics.mean(recalls), 4),
+            }
+    return report
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark vector store backends offline with hashing embeddings")
+    parser.add_argument("--corpus-path", default=AI_RAG_CORPUS_PATH, help="Folder with .pdf/.txt/.md files")
+    parser.add_argument("--backends", default="numpy,chroma", help="Comma-separated backends to compare")
+    parser.add_argument("--chunk-size", type=int, default=1200)
+    parser.add_argument("--overlap", type=int, default=150)
+    parser.add_argument("--queries", type=int, default=64)
+    parser.add_argument("--top-k", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--dim", type=int, default=512)
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(
+        corpus_path=args.corpus_path,
+        backends=[backend.strip() for backend in args.backends.split(",") if backend.strip()],
+        chunk_size=args.chunk_size,
+        overlap=args.overlap,
+        query_count=args.queries,
+        top_k=args.top_k,
+        batch_size=args.batch_size,
+        dim=args.dim,
+    )
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    raise SystemExit(main())
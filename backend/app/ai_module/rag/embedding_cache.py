@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from array import array
+from functools import lru_cache
+from pathlib import Path
+
+from app.config import (
+    AI_EMBEDDING_CACHE_ENABLED,
+    AI_EMBEDDING_CACHE_MAX_ENTRIES,
+    AI_EMBEDDING_CACHE_PATH,
+)
+
+logger = logging.getLogger(__name__)
+
+# SQLite caps the number of bound parameters per statement; stay well below the lowest default.
+_LOOKUP_CHUNK_SIZE = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    text_hash TEXT NOT NULL,
+    model TEXT NOT NULL,
+    dim INTEGER NOT NULL,
+    vector BLOB NOT NULL,
+    last_used_at REAL NOT NULL,
+    PRIMARY KEY (text_hash, model)
+);
+CREATE INDEX IF NOT EXISTS ix_embeddings_last_used_at ON embeddings (last_used_at);
+"""
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(str(text).encode("utf-8")).hexdigest()
+
+
+def _pack(vector: list[float]) -> bytes:
+    return array("f", vector).tobytes()
+
+
+def _unpack(blob: bytes) -> list[float]:
+    values = array("f")
+    values.frombytes(blob)
+    return values.tolist()
+
+
+class EmbeddingCache:
+    """Disk-backed embedding cache keyed by (sha256(text), model), stored as float32 blobs."""
+
+    def __init__(self, path: str, *, max_entries: int = 200_000) -> None:
+        self._path = path
+        self._max_entries = max(1, int(max_entries))
+        self._lock = threading.Lock()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    def get_many(self, hashes: list[str], model: str) -> dict[str, list[float]]:
+        unique_hashes = list(dict.fromkeys(hashes))
+        found: dict[str, list[float]] = {}
+        if not unique_hashes:
+            return found
+
+        with self._lock:
+            for index in range(0, len(unique_hashes), _LOOKUP_CHUNK_SIZE):
+                chunk = unique_hashes[index : index + _LOOKUP_CHUNK_SIZE]
+                placeholders = ",".join("?" for _ in chunk)
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *chunk],
+                ).fetchall()
+                for hash_value, blob in rows:
+                    found[hash_value] = _unpack(blob)
+
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used_at = ? WHERE text_hash = ? AND model = ?",
+                    [(now, hash_value, model) for hash_value in found],
+                )
+                self._conn.commit()
+        return found
+
+    def put_many(self, items: dict[str, list[float]], model: str) -> None:
+        if not items:
+            return
+        now = time.time()
+        rows = [
+            (hash_value, model, len(vector), _pack(vector), now)
+            for hash_value, vector in items.items()
+            if vector
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (text_hash, model, dim, vector, last_used_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._evict_locked()
+            self._conn.commit()
+
+    def _evict_locked(self) -> None:
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        overflow = int(count) - self._max_entries
+        if overflow <= 0:
+            return
+        self._conn.execute(
+            "DELETE FROM embeddings WHERE rowid IN "
+            "(SELECT rowid FROM embeddings ORDER BY last_used_at ASC LIMIT ?)",
+            (overflow,),
+        )
+        logger.info("ai_rag.embedding_cache stage=evicted count=%s", overflow)
+
+    def count(self) -> int:
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        return int(count)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+@lru_cache(maxsize=1)
+def get_embedding_cache() -> EmbeddingCache | None:
+    if not AI_EMBEDDING_CACHE_ENABLED or not AI_EMBEDDING_CACHE_PATH:
+        return None
+    try:
+        return EmbeddingCache(AI_EMBEDDING_CACHE_PATH, max_entries=AI_EMBEDDING_CACHE_MAX_ENTRIES)
+    except sqlite3.Error as exc:
+        # A broken cache file must never block embeddings; fall back to uncached calls.
+        logger.warning(
+            "ai_rag.embedding_cache stage=open_failed path=%s reason=%s",
+            AI_EMBEDDING_CACHE_PATH,
+            str(exc),
+        )
+        return None
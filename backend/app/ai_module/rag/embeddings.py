@@ -1,9 +1,24 @@
 from __future__ import annotations
 
+import hashlib
+import logging
+import math
+import re
 from functools import lru_cache
 from typing import Any
 
-from app.config import OPENAI_API_KEY, OPENAI_EMBEDDING_MODEL
+from app.ai_module.rag.embedding_cache import get_embedding_cache, text_hash
+from app.ai_module.resilience import CircuitOpenError, call_with_breaker, get_circuit_breaker
+from app.config import (
+    AI_EMBEDDING_PROVIDER,
+    AI_EMBEDDING_TIMEOUT_SECONDS,
+    AI_HASHING_EMBEDDING_DIM,
+    OPENAI_API_KEY,
+    OPENAI_BASE_URL,
+    OPENAI_EMBEDDING_MODEL,
+)
+
+logger = logging.getLogger(__name__)
 
 try:
     from openai import OpenAI
@@ -21,15 +36,93 @@ def _get_client() -> Any:
         raise EmbeddingsError("openai package is not installed")
     if not OPENAI_API_KEY:
         raise EmbeddingsError("OPENAI_API_KEY is not configured")
-    return OpenAI(api_key=OPENAI_API_KEY)
+    return OpenAI(
+        api_key=OPENAI_API_KEY,
+        base_url=OPENAI_BASE_URL or None,
+        timeout=AI_EMBEDDING_TIMEOUT_SECONDS,
+        max_retries=0,
+    )
+
+
+def _embed_with_provider(texts: list[str]) -> list[list[float]]:
+    client = _get_client()
+    try:
+        # A provider outage opens the breaker so ingest and retrieval fail fast instead of
+        # each waiting out the request timeout.
+        response = call_with_breaker(
+            get_circuit_breaker("embeddings"),
+            lambda: client.embeddings.create(model=OPENAI_EMBEDDING_MODEL, input=texts),
+        )
+    except CircuitOpenError as exc:
+        raise EmbeddingsError(str(exc)) from exc
+    except Exception as exc:
+        # Timeouts and provider errors surface as EmbeddingsError so retrieval degrades
+        # to lexical hits and the analysis falls back instead of failing outright.
+        raise EmbeddingsError(f"Embedding request failed: {exc}") from exc
+    return [list(item.embedding) for item in response.data]
+
+
+def _hashing_features(text: str) -> list[str]:
+    tokens = re.findall(r"[a-z0-9]+", str(text).lower())
+    return tokens + [f"{left} {right}" for left, right in zip(tokens, tokens[1:])]
+
+
+def hashing_embed_texts(texts: list[str], *, dim: int | None = None) -> list[list[float]]:
+    """Deterministic, offline stand-in for a real embedding model (signed feature hashing).
+
+    Texts sharing tokens and bigrams land close together, which is enough to exercise and
+    benchmark the retrieval path without network access or API cost.
+    """
+    size = max(8, int(dim or AI_HASHING_EMBEDDING_DIM))
+    vectors: list[list[float]] = []
+    for text in texts:
+        vector = [0.0] * size
+        for feature in _hashing_features(text):
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % size
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+        vectors.append([value / norm for value in vector])
+    return vectors
+
+
+def embedding_model_name() -> str:
+    if AI_EMBEDDING_PROVIDER == "hashing":
+        return f"hashing-{max(8, AI_HASHING_EMBEDDING_DIM)}"
+    return OPENAI_EMBEDDING_MODEL
 
 
 def embed_texts(texts: list[str]) -> list[list[float]]:
     if not texts:
         return []
-    client = _get_client()
-    response = client.embeddings.create(
-        model=OPENAI_EMBEDDING_MODEL,
-        input=texts,
+    if AI_EMBEDDING_PROVIDER == "hashing":
+        return hashing_embed_texts(texts)
+
+    cache = get_embedding_cache()
+    if cache is None:
+        return _embed_with_provider(texts)
+
+    hashes = [text_hash(text) for text in texts]
+    cached = cache.get_many(hashes, OPENAI_EMBEDDING_MODEL)
+
+    # Only unique cache misses are sent to the provider.
+    missing: dict[str, str] = {}
+    for hash_value, text in zip(hashes, texts):
+        if hash_value not in cached and hash_value not in missing:
+            missing[hash_value] = text
+
+    if missing:
+        fresh = _embed_with_provider(list(missing.values()))
+        if len(fresh) != len(missing):
+            raise EmbeddingsError("embedding provider returned an unexpected number of vectors")
+        fresh_by_hash = dict(zip(missing.keys(), fresh))
+        cache.put_many(fresh_by_hash, OPENAI_EMBEDDING_MODEL)
+        cached.update(fresh_by_hash)
+
+    logger.info(
+        "ai_rag.embeddings stage=cache requested=%s hits=%s misses=%s",
+        len(texts),
+        len(texts) - sum(1 for hash_value in hashes if hash_value in missing),
+        len(missing),
     )
-    return [list(item.embedding) for item in response.data]
+    return [cached[hash_value] for hash_value in hashes]
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import json
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Callable
+
+from app.ai_module.rag.embeddings import embed_texts, embedding_model_name
+from app.ai_module.rag.indexer import build_or_update_index
+from app.ai_module.rag.queries import SIGNAL_QUERIES
+from app.ai_module.rag.ranking import fuse_ranked_lists, mmr_select
+from app.ai_module.rag.vector_store import VectorStore
+
+logger = logging.getLogger(__name__)
+
+
+def guidance_map_path(store: VectorStore) -> Path:
+    backend_name = getattr(store, "backend_name", "chroma")
+    return Path(store.persist_dir) / f"guidance_map_{backend_name}_{store.collection_name}.json"
+
+
+def _lexical_lists(queries: list[str], *, corpus_path: str | None, top_k: int) -> list[list[dict]]:
+    try:
+        index = build_or_update_index(corpus_path)
+        if index is None:
+            return [[] for _ in queries]
+        return [index.search(query, top_k=top_k) for query in queries]
+    except (sqlite3.Error, OSError) as exc:
+        logger.warning("ai_rag.guidance stage=lexical_failed reason=%s", str(exc))
+        return [[] for _ in queries]
+
+
+def build_guidance_map(
+    store: VectorStore,
+    *,
+    corpus_version: str,
+    top_k: int,
+    corpus_path: str | None = None,
+    embed: Callable[[list[str]], list[list[float]]] = embed_texts,
+) -> dict[str, Any]:
+    """Retrieve and persist the top-k chunks for every known algorithm/rule signal.
+
+    Uses the same hybrid ranking as live retrieval (vector + BM25 fusion, then MMR), so analysis
+    can read guidance for known signals without embedding or querying at request time.
+    """
+    keys = list(SIGNAL_QUERIES)
+    queries = [SIGNAL_QUERIES[key] for key in keys]
+    candidate_k = max(1, int(top_k)) * 2
+    vector_lists = store.query_batch(embed(queries), top_k=candidate_k, include_embeddings=True)
+    lexical_lists = _lexical_lists(queries, corpus_path=corpus_path, top_k=candidate_k)
+
+    signals = {
+        key: mmr_select(fuse_ranked_lists([vector_rows], [lexical_rows]), top_k=top_k)
+        for key, vector_rows, lexical_rows in zip(keys, vector_lists, lexical_lists)
+    }
+    data = {
+        "corpus_version": corpus_version,
+        "embedding_model": embedding_model_name(),
+        "top_k": int(top_k),
+        "signals": signals,
+    }
+    path = guidance_map_path(store)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".json.tmp")
+    tmp_path.write_text(json.dumps(data, ensure_ascii=True), encoding="utf-8")
+    tmp_path.replace(path)
+    logger.info(
+        "ai_rag.guidance stage=built path=%s signals=%s top_k=%s",
+        str(path),
+        len(signals),
+        top_k,
+    )
+    return data
+
+
+_loaded: dict[str, tuple[tuple[int, int], dict[str, Any]]] = {}
+_loaded_lock = threading.Lock()
+
+
+def load_guidance_map(store: VectorStore) -> dict[str, Any] | None:
+    """Read the persisted guidance map for a store, re-reading only when the file changes."""
+    if not getattr(store, "persist_dir", None):
+        return None
+    path = guidance_map_path(store)
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    key = str(path)
+    with _loaded_lock:
+        cached = _loaded.get(key)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError) as exc:
+        logger.warning("ai_rag.guidance stage=load_failed path=%s reason=%s", str(path), str(exc))
+        return None
+    if not isinstance(data, dict) or not isinstance(data.get("signals"), dict):
+        return None
+    with _loaded_lock:
+        _loaded[key] = (stamp, data)
+    return data
+
+
+def is_guidance_current(data: dict[str, Any] | None, *, corpus_version: str | None, top_k: int) -> bool:
+    return bool(
+        data
+        and corpus_version
+        and data.get("corpus_version") == corpus_version
+        and data.get("embedding_model") == embedding_model_name()
+        and int(data.get("top_k") or 0) >= int(top_k)
+    )
@@ -1,17 +1,32 @@
 from __future__ import annotations
 
-import json
+import logging
 import re
-from functools import lru_cache
+import sqlite3
+import threading
 from pathlib import Path
 
+from app.ai_module.rag.loader import extract_corpus_documents, file_content_hash, list_corpus_files
 from app.config import AI_RAG_CACHE_PATH, AI_RAG_CORPUS_PATH
 
+logger = logging.getLogger(__name__)
 
-try:
-    from pypdf import PdfReader
-except Exception:  # pragma: no cover - optional dependency at runtime
-    PdfReader = None
+INDEX_FILENAME = ".qshield_ai_rag_index.sqlite3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS indexed_documents (
+    doc_id TEXT PRIMARY KEY,
+    content_hash TEXT NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS chunks USING fts5(
+    snippet,
+    doc_id UNINDEXED,
+    title UNINDEXED,
+    section UNINDEXED,
+    page UNINDEXED,
+    tokenize = 'porter unicode61'
+);
+"""
 
 
 def _normalize_text(value: str) -> str:
@@ -36,110 +51,205 @@ def _chunk_page_text(text: str, *, doc_id: str, title: str, page_number: int) ->
                 "section": f"page {page_number}",
                 "page": page_number,
                 "snippet": snippet,
-                "search_text": snippet.lower(),
             }
         )
     return chunks
 
 
-def _read_pdf_chunks(file_path: Path) -> list[dict]:
-    if PdfReader is None:
-        return []
-
-    try:
-        reader = PdfReader(str(file_path))
-    except Exception:
-        return []
-
+def _document_chunks(file_path: Path, pages: list[dict]) -> list[dict]:
     chunks: list[dict] = []
-    for page_index, page in enumerate(reader.pages, start=1):
-        try:
-            page_text = page.extract_text() or ""
-        except Exception:
-            page_text = ""
+    for page in pages:
         chunks.extend(
             _chunk_page_text(
-                page_text,
+                str(page.get("text") or ""),
                 doc_id=file_path.name,
                 title=file_path.stem,
-                page_number=page_index,
+                page_number=int(page.get("page") or 1),
             )
         )
     return chunks
 
 
-def _read_text_chunks(file_path: Path) -> list[dict]:
-    try:
-        text = file_path.read_text(encoding="utf-8")
-    except Exception:
-        return []
-    return _chunk_page_text(text, doc_id=file_path.name, title=file_path.stem, page_number=1)
+# Terms that match most corpus pages cost BM25 time without changing the ranking.
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from in into is it of on or that the this to with".split()
+)
+
+
+def _match_expression(query: str) -> str:
+    # Quote every term so FTS5 operators and punctuation in the query are treated as plain text.
+    terms = dict.fromkeys(
+        token
+        for token in re.findall(r"[a-z0-9]+", query.lower())
+        if len(token) > 1 and token not in _STOPWORDS
+    )
+    return " OR ".join(f'"{term}"' for term in terms)
+
+
+class LexicalIndex:
+    """SQLite FTS5 index over the corpus, ranked with BM25 and updated per changed document."""
+
+    def __init__(self, path: Path) -> None:
+        self._path = path
+        self._lock = threading.Lock()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    def sync(self, corpus_root: Path) -> int:
+        """Re-index documents whose content hash changed and drop removed ones; return chunks written."""
+        files = list_corpus_files(corpus_root)
+        hashes = {file_path: file_content_hash(file_path) for file_path in files}
+        with self._lock:
+            indexed = dict(self._conn.execute("SELECT doc_id, content_hash FROM indexed_documents").fetchall())
+
+        changed = [file_path for file_path in files if indexed.get(file_path.name) != hashes[file_path]]
+        removed = set(indexed) - {file_path.name for file_path in files}
+        if not changed and not removed:
+            return 0
+
+        # Page text comes from the extracted-text cache shared with vector ingestion.
+        extracted = extract_corpus_documents(corpus_root, files=changed, content_hashes=hashes) if changed else {}
+        written = 0
+        with self._lock:
+            with self._conn:
+                for doc_id in removed | {file_path.name for file_path in changed}:
+                    self._conn.execute("DELETE FROM chunks WHERE doc_id = ?", (doc_id,))
+                    self._conn.execute("DELETE FROM indexed_documents WHERE doc_id = ?", (doc_id,))
+                for file_path in changed:
+                    rows = [
+                        (chunk["snippet"], chunk["doc_id"], chunk["title"], chunk["section"], chunk["page"])
+                        for chunk in _document_chunks(file_path, extracted.get(file_path, []))
+                    ]
+                    self._conn.executemany(
+                        "INSERT INTO chunks (snippet, doc_id, title, section, page) VALUES (?, ?, ?, ?, ?)",
+                        rows,
+                    )
+                    self._conn.execute(
+                        "INSERT INTO indexed_documents (doc_id, content_hash) VALUES (?, ?)",
+                        (file_path.name, hashes[file_path]),
+                    )
+                    written += len(rows)
+
+        logger.info(
+            "ai_rag.lexical_index stage=synced path=%s changed=%s removed=%s chunks_written=%s",
+            str(self._path),
+            len(changed),
+            len(removed),
+            written,
+        )
+        return written
+
+    def search(self, query: str, *, top_k: int = 3) -> list[dict]:
+        expression = _match_expression(query)
+        if not expression:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT doc_id, title, section, page, snippet FROM chunks "
+                "WHERE chunks MATCH ? ORDER BY bm25(chunks) LIMIT ?",
+                (expression, max(1, int(top_k))),
+            ).fetchall()
+        return [
+            {
+                "doc_id": doc_id,
+                "title": title,
+                "section": section,
+                "page": page,
+                "url": None,
+                "snippet": snippet,
+            }
+            for doc_id, title, section, page, snippet in rows
+        ]
 
+    def count(self) -> int:
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM chunks").fetchone()
+        return int(count)
 
-def _cache_path_for(corpus_path: str | None = None) -> Path | None:
+
+def _index_path_for(root: Path) -> Path:
     cache_path = AI_RAG_CACHE_PATH.strip() if AI_RAG_CACHE_PATH else ""
     if cache_path:
-        return Path(cache_path)
-    raw_path = str(corpus_path or AI_RAG_CORPUS_PATH or "").strip()
-    if not raw_path:
-        return None
-    root = Path(raw_path).expanduser()
-    return root / ".qshield_ai_rag_index.json"
+        path = Path(cache_path)
+        # Deployments that pointed AI_RAG_CACHE_PATH at the old JSON index keep a sibling file.
+        return path.with_suffix(".sqlite3") if path.suffix.lower() == ".json" else path
+    return root / INDEX_FILENAME
 
 
-def _load_cache(cache_path: Path) -> list[dict] | None:
-    if not cache_path.exists():
-        return None
-    try:
-        data = json.loads(cache_path.read_text(encoding="utf-8"))
-    except Exception:
-        return None
-    if isinstance(data, list):
-        return data
-    return None
+def _corpus_stamp(root: Path) -> tuple:
+    # In-place edits do not touch the directory mtime, so per-file stats are part of the stamp.
+    stamp: list[tuple[str, int, int]] = []
+    for file_path in list_corpus_files(root):
+        stat = file_path.stat()
+        stamp.append((file_path.name, stat.st_mtime_ns, stat.st_size))
+    return tuple(stamp)
 
 
-def _save_cache(cache_path: Path, chunks: list[dict]) -> None:
-    try:
-        cache_path.write_text(json.dumps(chunks, ensure_ascii=True), encoding="utf-8")
-    except Exception:
-        return
+_indexes: dict[str, tuple[tuple | None, LexicalIndex]] = {}
+_indexes_lock = threading.Lock()
 
 
-@lru_cache(maxsize=4)
-def build_or_load_index(corpus_path: str | None = None) -> list[dict]:
+def _corpus_root(corpus_path: str | None) -> Path | None:
     raw_path = str(corpus_path or AI_RAG_CORPUS_PATH or "").strip()
     if not raw_path:
-        return []
-
+        return None
     root = Path(raw_path).expanduser()
     if not root.exists() or not root.is_dir():
-        return []
+        return None
+    return root
 
-    cache_path = _cache_path_for(str(root))
-    if cache_path:
-        cached = _load_cache(cache_path)
-        if cached is not None:
-            return cached
 
-    chunks: list[dict] = []
-    for file_path in sorted(root.iterdir()):
-        if not file_path.is_file():
-            continue
-        suffix = file_path.suffix.lower()
-        if suffix == ".pdf":
-            chunks.extend(_read_pdf_chunks(file_path))
-        elif suffix in {".txt", ".md"}:
-            chunks.extend(_read_text_chunks(file_path))
-
-    if cache_path and chunks:
-        _save_cache(cache_path, chunks)
-    return chunks
+def build_or_update_index(corpus_path: str | None = None) -> LexicalIndex | None:
+    """Open the lexical index for a corpus, syncing it when a corpus file was added, edited or removed."""
+    root = _corpus_root(corpus_path)
+    if root is None:
+        return None
+
+    stamp = _corpus_stamp(root)
+    key = str(root)
+    with _indexes_lock:
+        entry = _indexes.get(key)
+        if entry is not None and entry[0] == stamp:
+            return entry[1]
+        index = entry[1] if entry is not None else LexicalIndex(_index_path_for(root))
+        index.sync(root)
+        _indexes[key] = (stamp, index)
+        return index
+
+
+def open_index(corpus_path: str | None = None) -> LexicalIndex | None:
+    """Open a corpus's existing lexical index without syncing it; None until one has been built.
+
+    For query paths: stat-ing, hashing and re-indexing the corpus is left to ingest_corpus and the
+    indexer CLI, so a lookup never waits on PDF extraction.
+    """
+    root = _corpus_root(corpus_path)
+    if root is None:
+        return None
+
+    key = str(root)
+    with _indexes_lock:
+        entry = _indexes.get(key)
+        if entry is not None:
+            return entry[1]
+        path = _index_path_for(root)
+        if not path.exists():
+            return None
+        index = LexicalIndex(path)
+        # No stamp: the next build_or_update_index call still syncs it.
+        _indexes[key] = (None, index)
+        return index
 
 
 def main() -> int:
-    chunks = build_or_load_index()
-    print(f"Indexed {len(chunks)} chunks")
+    index = build_or_update_index()
+    print(f"Indexed {index.count() if index else 0} chunks")
     return 0
 
 
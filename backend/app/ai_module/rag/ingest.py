@@ -1,14 +1,35 @@
 from __future__ import annotations
 
 import argparse
+import hashlib
+import json
 import logging
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Iterator
+from typing import Iterable, Iterator
 
-from app.ai_module.rag.embeddings import embed_texts
-from app.ai_module.rag.loader import iter_corpus_pages
-from app.ai_module.rag.vector_store import DEFAULT_COLLECTION_NAME, VectorStore
-from app.config import AI_RAG_CORPUS_PATH
+from app.ai_module.rag.embeddings import EmbeddingsError, embed_texts, embedding_model_name
+from app.ai_module.rag.guidance import build_guidance_map, is_guidance_current, load_guidance_map
+from app.ai_module.rag.indexer import build_or_update_index
+from app.ai_module.rag.loader import (
+    document_pages,
+    extract_corpus_documents,
+    file_content_hash,
+    list_corpus_files,
+)
+from app.ai_module.rag.vector_store import DEFAULT_COLLECTION_NAME, VectorStore, get_vector_store
+from app.config import (
+    AI_RAG_CORPUS_PATH,
+    AI_RAG_EMBED_CONCURRENCY,
+    AI_RAG_EMBED_MAX_RETRIES,
+    AI_RAG_EMBED_RETRY_BACKOFF_SECONDS,
+    AI_RAG_PRECOMPUTE_GUIDANCE,
+    AI_RAG_TOP_K,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -42,6 +63,166 @@ def _batched(items: list[dict], batch_size: int) -> Iterator[list[dict]]:
         yield items[index : index + batch_size]
 
 
+def _document_chunks(pages: Iterable[dict], *, chunk_size: int, overlap: int) -> list[dict]:
+    chunks: list[dict] = []
+    for page in pages:
+        page_chunks = chunk_text(str(page.get("text") or ""), chunk_size=chunk_size, overlap=overlap)
+        for chunk_index, text in enumerate(page_chunks, start=1):
+            chunks.append(
+                {
+                    "chunk_id": f"{page.get('doc_id')}::p{page.get('page')}::c{chunk_index}",
+                    "doc_id": page.get("doc_id"),
+                    "title": page.get("title"),
+                    "page": page.get("page"),
+                    "section": page.get("section"),
+                    "url": page.get("url"),
+                    "text": text,
+                    "source_path": page.get("source_path"),
+                }
+            )
+    return chunks
+
+
+class IngestManifest:
+    """Per-collection record of which document versions are already in the vector store."""
+
+    def __init__(self, path: Path, documents: dict[str, dict] | None = None) -> None:
+        self.path = path
+        self.documents: dict[str, dict] = dict(documents or {})
+
+    @staticmethod
+    def path_for(store: VectorStore) -> Path:
+        backend_name = getattr(store, "backend_name", "chroma")
+        return Path(store.persist_dir) / f"ingest_manifest_{backend_name}_{store.collection_name}.json"
+
+    @classmethod
+    def for_store(cls, store: VectorStore) -> "IngestManifest":
+        path = cls.path_for(store)
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except Exception:
+            data = {}
+        documents = data.get("documents") if isinstance(data, dict) else None
+        return cls(path, documents if isinstance(documents, dict) else None)
+
+    def is_current(self, doc_id: str, entry: dict) -> bool:
+        return self.documents.get(doc_id) == entry
+
+    def save(self) -> None:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.path.write_text(
+                json.dumps({"documents": self.documents}, ensure_ascii=True, sort_keys=True),
+                encoding="utf-8",
+            )
+        except Exception as exc:
+            logger.warning("ai_rag.ingest stage=manifest_save_failed path=%s reason=%s", str(self.path), str(exc))
+
+
+_fingerprints: dict[str, tuple[tuple[int, int], str]] = {}
+_fingerprints_lock = threading.Lock()
+
+
+def manifest_fingerprint(store: VectorStore) -> str | None:
+    """Hash of the store's ingestion manifest, i.e. the corpus version behind the vectors.
+
+    Returns None when the store has no manifest, so callers can skip version-keyed caching.
+    """
+    persist_dir = getattr(store, "persist_dir", None)
+    if not persist_dir:
+        return None
+    path = IngestManifest.path_for(store)
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    key = str(path)
+    with _fingerprints_lock:
+        cached = _fingerprints.get(key)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+    try:
+        digest = hashlib.sha256(path.read_bytes()).hexdigest()
+    except OSError:
+        return None
+    with _fingerprints_lock:
+        _fingerprints[key] = (stamp, digest)
+    return digest
+
+
+def _embed_with_retry(texts: list[str]) -> list[list[float]]:
+    attempts = max(0, AI_RAG_EMBED_MAX_RETRIES) + 1
+    for attempt in range(1, attempts + 1):
+        try:
+            return embed_texts(texts)
+        except EmbeddingsError:
+            # Configuration errors (missing key/package) will not fix themselves.
+            raise
+        except Exception as exc:
+            if attempt >= attempts:
+                raise
+            delay = AI_RAG_EMBED_RETRY_BACKOFF_SECONDS * (2 ** (attempt - 1))
+            delay += random.uniform(0, delay / 2)
+            logger.warning(
+                "ai_rag.ingest stage=embed_retry attempt=%s delay_seconds=%.2f reason=%s",
+                attempt,
+                delay,
+                str(exc),
+            )
+            time.sleep(delay)
+    return []
+
+
+def _embed_batches_concurrently(
+    batches: list[list[dict]],
+    *,
+    concurrency: int,
+) -> Iterator[tuple[list[dict], list[list[float]]]]:
+    """Yield (batch, embeddings) as batches complete, with at most `concurrency` requests in flight."""
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        futures = {
+            executor.submit(_embed_with_retry, [str(item.get("text") or "") for item in batch]): batch
+            for batch in batches
+        }
+        try:
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+def _sync_lexical_index(corpus_path: str) -> None:
+    # Retrieval only opens the BM25 index, so it is brought up to date here, at ingest time.
+    try:
+        build_or_update_index(corpus_path)
+    except (sqlite3.Error, OSError) as exc:
+        logger.warning("ai_rag.ingest stage=lexical_index_failed reason=%s", str(exc))
+
+
+def _refresh_guidance_map(store: VectorStore, *, corpus_path: str) -> None:
+    """Rebuild the precomputed per-signal guidance when the corpus version or settings changed."""
+    if not AI_RAG_PRECOMPUTE_GUIDANCE:
+        return
+    corpus_version = manifest_fingerprint(store)
+    if corpus_version is None or store.count() <= 0:
+        return
+    if is_guidance_current(load_guidance_map(store), corpus_version=corpus_version, top_k=AI_RAG_TOP_K):
+        return
+    try:
+        build_guidance_map(
+            store,
+            corpus_version=corpus_version,
+            top_k=AI_RAG_TOP_K,
+            corpus_path=corpus_path,
+            embed=_embed_with_retry,
+        )
+    except Exception as exc:
+        # Analysis falls back to live retrieval, so a failed precompute must not fail the ingest.
+        logger.warning("ai_rag.ingest stage=guidance_failed reason=%s", str(exc))
+
+
 def ingest_corpus(
     *,
     corpus_path: str | None = None,
@@ -51,6 +232,11 @@ def ingest_corpus(
     collection_name: str = DEFAULT_COLLECTION_NAME,
     reset: bool = False,
 ) -> int:
+    """Bring the vector collection in line with the corpus and return the number of chunks embedded.
+
+    Documents whose content hash and chunking parameters match the ingestion manifest are skipped;
+    documents removed from the corpus have their vectors deleted.
+    """
     target_path = str(corpus_path or AI_RAG_CORPUS_PATH or "").strip()
     if not target_path:
         logger.warning("ai_rag.ingest status=skipped reason=no_corpus_path")
@@ -61,47 +247,98 @@ def ingest_corpus(
         logger.warning("ai_rag.ingest status=skipped reason=missing_corpus_dir path=%s", str(root))
         return 0
 
-    pdf_count = len(list(root.glob("*.pdf")))
-    text_count = len(list(root.glob("*.txt"))) + len(list(root.glob("*.md")))
+    files = list_corpus_files(root)
+    pdf_count = sum(1 for file_path in files if file_path.suffix.lower() == ".pdf")
     logger.info(
         "ai_rag.ingest stage=corpus_detected path=%s pdf_count=%s text_count=%s",
         str(root),
         pdf_count,
-        text_count,
+        len(files) - pdf_count,
+    )
+    _sync_lexical_index(str(root))
+
+    store = get_vector_store(collection_name=collection_name)
+    manifest = IngestManifest.for_store(store)
+    if reset:
+        store.reset()
+        manifest.documents.clear()
+        logger.info("ai_rag.ingest stage=vector_reset collection=%s", store.collection_name)
+    elif manifest.documents and store.count() == 0:
+        # The vector DB was wiped underneath the manifest; nothing recorded there is present anymore.
+        manifest.documents.clear()
+
+    content_hashes = {file_path: file_content_hash(file_path) for file_path in files}
+    params = {"chunk_size": int(chunk_size), "overlap": int(overlap), "embedding_model": embedding_model_name()}
+    expected = {
+        file_path.name: {"content_hash": content_hashes[file_path], **params}
+        for file_path in files
+    }
+    changed_files = [
+        file_path for file_path in files if not manifest.is_current(file_path.name, expected[file_path.name])
+    ]
+
+    removed_doc_ids = sorted(set(manifest.documents) - set(expected))
+    for doc_id in removed_doc_ids:
+        store.delete_document(doc_id)
+        manifest.documents.pop(doc_id, None)
+
+    logger.info(
+        "ai_rag.ingest stage=manifest_diff unchanged=%s changed=%s removed=%s",
+        len(files) - len(changed_files),
+        len(changed_files),
+        len(removed_doc_ids),
     )
+    if not changed_files:
+        if removed_doc_ids:
+            store.flush()
+            manifest.save()
+        _refresh_guidance_map(store, corpus_path=str(root))
+        logger.info("ai_rag.ingest stage=completed chunks_created=0 collection=%s", store.collection_name)
+        return 0
 
+    extracted = extract_corpus_documents(root, files=changed_files, content_hashes=content_hashes)
     chunks: list[dict] = []
-    for page in iter_corpus_pages(root):
-        page_chunks = chunk_text(str(page.get("text") or ""), chunk_size=chunk_size, overlap=overlap)
-        for chunk_index, text in enumerate(page_chunks, start=1):
-            chunks.append(
-                {
-                    "chunk_id": f"{page.get('doc_id')}::p{page.get('page')}::c{chunk_index}",
-                    "doc_id": page.get("doc_id"),
-                    "title": page.get("title"),
-                    "page": page.get("page"),
-                    "section": page.get("section"),
-                    "url": page.get("url"),
-                    "text": text,
-                    "source_path": page.get("source_path"),
-                }
-            )
+    pending_batches: dict[str, int] = {}
+    safe_batch_size = max(1, int(batch_size))
+    batches: list[list[dict]] = []
+    for file_path in changed_files:
+        doc_chunks = _document_chunks(
+            document_pages(file_path, extracted.get(file_path, [])),
+            chunk_size=chunk_size,
+            overlap=overlap,
+        )
+        # Drop the previous version first so chunks that no longer exist do not linger.
+        if file_path.name in manifest.documents:
+            store.delete_document(file_path.name)
+            manifest.documents.pop(file_path.name, None)
+        if not doc_chunks:
+            continue
+        chunks.extend(doc_chunks)
+        doc_batches = list(_batched(doc_chunks, safe_batch_size))
+        pending_batches[file_path.name] = len(doc_batches)
+        batches.extend(doc_batches)
 
     if not chunks:
+        store.flush()
+        manifest.save()
         logger.warning("ai_rag.ingest status=skipped reason=no_chunks_created path=%s", str(root))
         return 0
 
-    store = VectorStore(collection_name=collection_name)
-    if reset:
-        store.reset()
-        logger.info("ai_rag.ingest stage=vector_reset collection=%s", store.collection_name)
-
-    safe_batch_size = max(1, int(batch_size))
     embedded_total = 0
-    for batch in _batched(chunks, safe_batch_size):
-        embeddings = embed_texts([str(item.get("text") or "") for item in batch])
-        store.upsert_chunks(batch, embeddings)
-        embedded_total += len(embeddings)
+    try:
+        for batch, embeddings in _embed_batches_concurrently(batches, concurrency=AI_RAG_EMBED_CONCURRENCY):
+            store.upsert_chunks(batch, embeddings)
+            embedded_total += len(embeddings)
+            doc_id = str(batch[0].get("doc_id"))
+            pending_batches[doc_id] -= 1
+            if pending_batches[doc_id] == 0:
+                manifest.documents[doc_id] = expected[doc_id]
+    finally:
+        # Persist progress even on failure so a retry only redoes the unfinished documents.
+        store.flush()
+        manifest.save()
+
+    _refresh_guidance_map(store, corpus_path=str(root))
     logger.info(
         "ai_rag.ingest stage=completed chunks_created=%s embeddings_stored=%s collection=%s",
         len(chunks),
@@ -1,69 +1,196 @@
 from __future__ import annotations
 
+import hashlib
+import json
+import logging
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from typing import Iterator
 
+from app.config import AI_RAG_EXTRACT_WORKERS, AI_RAG_TEXT_CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
 try:
     from pypdf import PdfReader
 except Exception:  # pragma: no cover - optional dependency in tests
     PdfReader = None
 
 
-def load_pdf_pages(pdf_path: Path) -> Iterator[dict]:
+CORPUS_SUFFIXES = {".pdf", ".txt", ".md"}
+TEXT_CACHE_DIRNAME = ".qshield_text_cache"
+
+
+def file_content_hash(file_path: Path) -> str:
+    digest = hashlib.sha256()
+    with file_path.open("rb") as handle:
+        for block in iter(lambda: handle.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def list_corpus_files(corpus_path: Path) -> list[Path]:
+    if not corpus_path.exists() or not corpus_path.is_dir():
+        return []
+    return [
+        file_path
+        for file_path in sorted(corpus_path.iterdir())
+        if file_path.is_file() and file_path.suffix.lower() in CORPUS_SUFFIXES
+    ]
+
+
+def extract_pdf_text(pdf_path: str) -> list[dict]:
+    """Return non-empty pages as {"page", "text"}; top-level so it can run in a worker process."""
     if PdfReader is None:
-        return
+        return []
     try:
-        reader = PdfReader(str(pdf_path))
+        reader = PdfReader(pdf_path)
     except Exception:
-        return
+        return []
 
+    pages: list[dict] = []
     for page_number, page in enumerate(reader.pages, start=1):
         try:
             text = (page.extract_text() or "").strip()
         except Exception:
             text = ""
-        if not text:
-            continue
+        if text:
+            pages.append({"page": page_number, "text": text})
+    return pages
+
+
+def extract_text_file(file_path: str) -> list[dict]:
+    try:
+        text = Path(file_path).read_text(encoding="utf-8").strip()
+    except Exception:
+        return []
+    if not text:
+        return []
+    return [{"page": 1, "text": text}]
+
+
+def _extract(file_path: Path) -> list[dict]:
+    if file_path.suffix.lower() == ".pdf":
+        return extract_pdf_text(str(file_path))
+    return extract_text_file(str(file_path))
+
+
+class ExtractedTextCache:
+    """Per-document extracted page text, keyed by content hash so edits invalidate it."""
+
+    def __init__(self, cache_dir: Path) -> None:
+        self._cache_dir = cache_dir
+
+    def _entry_path(self, content_hash: str) -> Path:
+        return self._cache_dir / f"{content_hash}.json"
+
+    def get(self, content_hash: str) -> list[dict] | None:
+        entry_path = self._entry_path(content_hash)
+        if not entry_path.exists():
+            return None
+        try:
+            data = json.loads(entry_path.read_text(encoding="utf-8"))
+        except Exception:
+            return None
+        return data if isinstance(data, list) else None
+
+    def put(self, content_hash: str, pages: list[dict]) -> None:
+        try:
+            self._cache_dir.mkdir(parents=True, exist_ok=True)
+            self._entry_path(content_hash).write_text(json.dumps(pages, ensure_ascii=True), encoding="utf-8")
+        except Exception:
+            return
+
+
+def text_cache_for(corpus_path: Path) -> ExtractedTextCache:
+    cache_dir = Path(AI_RAG_TEXT_CACHE_DIR) if AI_RAG_TEXT_CACHE_DIR else corpus_path / TEXT_CACHE_DIRNAME
+    return ExtractedTextCache(cache_dir)
+
+
+def _extract_in_pool(files: list[Path], workers: int) -> dict[Path, list[dict]]:
+    pdf_files = [file_path for file_path in files if file_path.suffix.lower() == ".pdf"]
+    extracted: dict[Path, list[dict]] = {}
+    if workers > 1 and len(pdf_files) > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=min(workers, len(pdf_files))) as pool:
+                for file_path, pages in zip(pdf_files, pool.map(extract_pdf_text, [str(p) for p in pdf_files])):
+                    extracted[file_path] = pages
+        except Exception as exc:
+            # Environments without working multiprocessing still get a (serial) result.
+            logger.warning("ai_rag.extract stage=pool_failed reason=%s", str(exc))
+            extracted.clear()
+
+    for file_path in files:
+        if file_path not in extracted:
+            extracted[file_path] = _extract(file_path)
+    return extracted
+
+
+def extract_corpus_documents(
+    corpus_path: Path,
+    *,
+    files: list[Path] | None = None,
+    content_hashes: dict[Path, str] | None = None,
+    workers: int | None = None,
+) -> dict[Path, list[dict]]:
+    """Extract page text for corpus documents, reusing the shared extracted-text cache.
+
+    Only documents missing from the cache are parsed; PDFs are parsed in a process pool.
+    """
+    files = list_corpus_files(corpus_path) if files is None else list(files)
+    hashes = dict(content_hashes or {})
+    cache = text_cache_for(corpus_path)
+
+    documents: dict[Path, list[dict]] = {}
+    misses: list[Path] = []
+    for file_path in files:
+        content_hash = hashes.get(file_path) or file_content_hash(file_path)
+        hashes[file_path] = content_hash
+        cached = cache.get(content_hash)
+        if cached is None:
+            misses.append(file_path)
+        else:
+            documents[file_path] = cached
+
+    if misses:
+        extracted = _extract_in_pool(misses, AI_RAG_EXTRACT_WORKERS if workers is None else int(workers))
+        for file_path, pages in extracted.items():
+            # Empty results are not cached: they may come from a missing parser, not an empty document.
+            if pages:
+                cache.put(hashes[file_path], pages)
+            documents[file_path] = pages
+
+    logger.info(
+        "ai_rag.extract stage=completed documents=%s cache_hits=%s extracted=%s",
+        len(files),
+        len(files) - len(misses),
+        len(misses),
+    )
+    return {file_path: documents[file_path] for file_path in files}
+
+
+def document_pages(file_path: Path, pages: list[dict]) -> Iterator[dict]:
+    for page in pages:
+        page_number = int(page.get("page") or 1)
         yield {
-            "doc_id": pdf_path.name,
-            "title": pdf_path.stem,
+            "doc_id": file_path.name,
+            "title": file_path.stem,
             "page": page_number,
             "section": f"page {page_number}",
             "url": None,
-            "text": text,
-            "source_path": str(pdf_path),
+            "text": str(page.get("text") or ""),
+            "source_path": str(file_path),
         }
 
 
-def load_text_document(file_path: Path) -> Iterator[dict]:
-    try:
-        text = file_path.read_text(encoding="utf-8").strip()
-    except Exception:
-        return
+def load_pdf_pages(pdf_path: Path) -> Iterator[dict]:
+    yield from document_pages(pdf_path, extract_pdf_text(str(pdf_path)))
 
-    if not text:
-        return
 
-    yield {
-        "doc_id": file_path.name,
-        "title": file_path.stem,
-        "page": 1,
-        "section": "page 1",
-        "url": None,
-        "text": text,
-        "source_path": str(file_path),
-    }
+def load_text_document(file_path: Path) -> Iterator[dict]:
+    yield from document_pages(file_path, extract_text_file(str(file_path)))
 
 
 def iter_corpus_pages(corpus_path: Path) -> Iterator[dict]:
-    if not corpus_path.exists() or not corpus_path.is_dir():
-        return
-
-    for file_path in sorted(corpus_path.iterdir()):
-        if not file_path.is_file():
-            continue
-        suffix = file_path.suffix.lower()
-        if suffix == ".pdf":
-            yield from load_pdf_pages(file_path)
-        elif suffix in {".txt", ".md"}:
-            yield from load_text_document(file_path)
+    for file_path, pages in extract_corpus_documents(corpus_path).items():
+        yield from document_pages(file_path, pages)
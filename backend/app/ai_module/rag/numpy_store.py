@@ -0,0 +1,281 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any
+
+from app.ai_module.rag.vector_store import (
+    DEFAULT_COLLECTION_NAME,
+    VectorStoreError,
+    chunk_id_for,
+    chunk_metadata,
+    result_row,
+)
+from app.config import AI_VECTOR_DB_DIR, AI_VECTOR_DTYPE
+
+try:
+    import numpy as np
+except Exception:  # pragma: no cover - optional dependency in tests
+    np = None
+
+logger = logging.getLogger(__name__)
+
+VECTORS_FILENAME = "vectors.npy"
+METADATA_FILENAME = "metadata.json"
+# Rows are scored in blocks so float16 matrices are upcast a slice at a time, not all at once.
+_SCORE_BLOCK_ROWS = 65_536
+
+
+class NumpyVectorStore:
+    """Exact cosine-similarity store backed by a memory-mapped .npy matrix and a JSON sidecar.
+
+    Vectors are L2-normalized on write, so a query is a single matrix product followed by an
+    argpartition top-k. Writes are buffered in memory and persisted by flush(); readers in other
+    processes pick up a flushed matrix on their next call.
+    """
+
+    backend_name = "numpy"
+
+    def __init__(
+        self,
+        *,
+        collection_name: str = DEFAULT_COLLECTION_NAME,
+        persist_dir: str | None = None,
+        dtype: str | None = None,
+    ) -> None:
+        if np is None:
+            raise VectorStoreError("numpy package is not installed")
+        selected_dtype = (dtype or AI_VECTOR_DTYPE or "float32").strip().lower()
+        if selected_dtype not in {"float32", "float16"}:
+            raise VectorStoreError(f"Unsupported vector dtype: {selected_dtype}")
+        self._collection_name = collection_name
+        self._persist_dir = persist_dir or AI_VECTOR_DB_DIR
+        self._dtype = np.dtype(selected_dtype)
+        self._dir = Path(self._persist_dir) / f"numpy_{collection_name}"
+        self._lock = threading.RLock()
+        self._matrix: Any = np.zeros((0, 0), dtype=self._dtype)
+        self._pending: list[Any] = []
+        self._rows: list[dict[str, Any]] = []
+        self._index: dict[str, int] = {}
+        self._loaded_stamp: tuple[int, int] | None = None
+        self._dirty = False
+        self._load()
+
+    @property
+    def collection_name(self) -> str:
+        return self._collection_name
+
+    @property
+    def persist_dir(self) -> str:
+        return self._persist_dir
+
+    def _stamp(self) -> tuple[int, int] | None:
+        try:
+            stat = (self._dir / METADATA_FILENAME).stat()
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _load(self) -> None:
+        stamp = self._stamp()
+        if stamp is None:
+            self._matrix = np.zeros((0, 0), dtype=self._dtype)
+            self._rows = []
+        else:
+            try:
+                sidecar = json.loads((self._dir / METADATA_FILENAME).read_text(encoding="utf-8"))
+                matrix = np.load(self._dir / VECTORS_FILENAME, mmap_mode="r")
+            except Exception as exc:
+                raise VectorStoreError(f"Failed to open numpy vector store at {self._dir}: {exc}") from exc
+            rows = sidecar.get("rows") if isinstance(sidecar, dict) else None
+            if not isinstance(rows, list) or len(rows) != int(matrix.shape[0]):
+                raise VectorStoreError(f"Numpy vector store at {self._dir} is inconsistent; re-run ingest")
+            self._matrix = matrix
+            self._rows = rows
+        self._pending = []
+        self._index = {str(row.get("id")): position for position, row in enumerate(self._rows)}
+        self._loaded_stamp = stamp
+        self._dirty = False
+
+    def refresh(self) -> None:
+        with self._lock:
+            if not self._dirty and self._stamp() != self._loaded_stamp:
+                self._load()
+
+    def _consolidate(self) -> None:
+        if not self._pending:
+            return
+        blocks = [np.asarray(self._matrix, dtype=self._dtype)] if self._matrix.size else []
+        self._matrix = np.vstack(blocks + self._pending)
+        self._pending = []
+
+    def _writable(self) -> None:
+        self._consolidate()
+        if not isinstance(self._matrix, np.memmap) and self._matrix.flags.writeable:
+            return
+        self._matrix = np.array(self._matrix, dtype=self._dtype)
+
+    def _normalized(self, vectors: list[list[float]]) -> Any:
+        matrix = np.asarray(vectors, dtype=np.float32)
+        if matrix.ndim != 2:
+            raise VectorStoreError("embeddings must be a list of equal-length vectors")
+        dim = self._dimension()
+        if dim and matrix.shape[1] != dim:
+            raise VectorStoreError(f"embedding dimension {matrix.shape[1]} does not match store dimension {dim}")
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def _dimension(self) -> int:
+        if self._matrix.size:
+            return int(self._matrix.shape[1])
+        if self._pending:
+            return int(self._pending[0].shape[1])
+        return 0
+
+    def reset(self) -> None:
+        with self._lock:
+            self._matrix = np.zeros((0, 0), dtype=self._dtype)
+            self._pending = []
+            self._rows = []
+            self._index = {}
+            self._dirty = True
+            self.flush()
+
+    def upsert_chunks(self, chunks: list[dict[str, Any]], embeddings: list[list[float]]) -> None:
+        if len(chunks) != len(embeddings):
+            raise VectorStoreError("chunks and embeddings length mismatch")
+        pairs = [(chunk, embedding) for chunk, embedding in zip(chunks, embeddings) if embedding]
+        if not pairs:
+            return
+
+        with self._lock:
+            self.refresh()
+            vectors = self._normalized([embedding for _, embedding in pairs]).astype(self._dtype)
+            new_rows: list[dict[str, Any]] = []
+            new_vectors: list[Any] = []
+            for position, ((chunk, _), vector) in enumerate(zip(pairs, vectors)):
+                chunk_id = chunk_id_for(chunk, position)
+                row = {"id": chunk_id, "text": str(chunk.get("text") or ""), "metadata": chunk_metadata(chunk)}
+                existing = self._index.get(chunk_id)
+                if existing is not None and existing >= len(self._rows):
+                    # Repeated within this batch: the row is still pending, so replace it there.
+                    new_rows[existing - len(self._rows)] = row
+                    new_vectors[existing - len(self._rows)] = vector
+                    continue
+                if existing is not None:
+                    self._writable()
+                    self._matrix[existing] = vector
+                    self._rows[existing] = row
+                    continue
+                self._index[chunk_id] = len(self._rows) + len(new_rows)
+                new_rows.append(row)
+                new_vectors.append(vector)
+
+            if new_vectors:
+                self._pending.append(np.stack(new_vectors))
+                self._rows.extend(new_rows)
+            self._dirty = True
+
+    def delete_document(self, doc_id: str) -> None:
+        with self._lock:
+            self.refresh()
+            keep = [
+                position
+                for position, row in enumerate(self._rows)
+                if str((row.get("metadata") or {}).get("doc_id")) != str(doc_id)
+            ]
+            if len(keep) == len(self._rows):
+                return
+            self._consolidate()
+            if keep:
+                self._matrix = np.array(self._matrix[keep], dtype=self._dtype)
+            else:
+                self._matrix = np.zeros((0, 0), dtype=self._dtype)
+            self._rows = [self._rows[position] for position in keep]
+            self._index = {str(row.get("id")): position for position, row in enumerate(self._rows)}
+            self._dirty = True
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            self._consolidate()
+            self._dir.mkdir(parents=True, exist_ok=True)
+            vectors_tmp = self._dir / f"{VECTORS_FILENAME}.tmp"
+            metadata_tmp = self._dir / f"{METADATA_FILENAME}.tmp"
+            with vectors_tmp.open("wb") as handle:
+                np.save(handle, np.ascontiguousarray(self._matrix, dtype=self._dtype))
+            metadata_tmp.write_text(
+                json.dumps({"dtype": self._dtype.name, "rows": self._rows}, ensure_ascii=True),
+                encoding="utf-8",
+            )
+            # The sidecar is replaced last: readers key their reload off its stat.
+            os.replace(vectors_tmp, self._dir / VECTORS_FILENAME)
+            os.replace(metadata_tmp, self._dir / METADATA_FILENAME)
+            logger.info(
+                "ai_rag.numpy_store stage=flushed collection=%s rows=%s dtype=%s",
+                self._collection_name,
+                len(self._rows),
+                self._dtype.name,
+            )
+            self._load()
+
+    def count(self) -> int:
+        with self._lock:
+            self.refresh()
+            return len(self._rows)
+
+    def query(self, query_embedding: list[float], *, top_k: int = 6) -> list[dict[str, Any]]:
+        if not query_embedding:
+            return []
+        return self.query_batch([query_embedding], top_k=top_k)[0]
+
+    def query_batch(
+        self,
+        query_embeddings: list[list[float]],
+        *,
+        top_k: int = 6,
+        include_embeddings: bool = False,
+    ) -> list[list[dict[str, Any]]]:
+        if not query_embeddings:
+            return []
+        with self._lock:
+            self.refresh()
+            self._consolidate()
+            matrix = self._matrix
+            rows = self._rows
+        if not rows:
+            return [[] for _ in query_embeddings]
+
+        queries = self._normalized(query_embeddings)
+        scores = np.empty((int(matrix.shape[0]), queries.shape[0]), dtype=np.float32)
+        for start in range(0, int(matrix.shape[0]), _SCORE_BLOCK_ROWS):
+            block = np.asarray(matrix[start : start + _SCORE_BLOCK_ROWS], dtype=np.float32)
+            scores[start : start + block.shape[0]] = block @ queries.T
+
+        k = max(1, min(int(top_k), len(rows)))
+        if k < len(rows):
+            candidates = np.argpartition(-scores, k - 1, axis=0)[:k]
+        else:
+            candidates = np.tile(np.arange(len(rows))[:, None], (1, queries.shape[0]))
+
+        results: list[list[dict[str, Any]]] = []
+        for query_index in range(queries.shape[0]):
+            column = candidates[:, query_index]
+            ordered = column[np.argsort(-scores[column, query_index], kind="stable")]
+            hits: list[dict[str, Any]] = []
+            for position in ordered:
+                row = result_row(
+                    rows[position].get("text"),
+                    rows[position].get("metadata"),
+                    float(1.0 - scores[position, query_index]),
+                )
+                if include_embeddings:
+                    row["embedding"] = np.asarray(matrix[position], dtype=np.float32)
+                hits.append(row)
+            results.append(hits)
+        return results
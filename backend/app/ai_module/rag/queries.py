@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+from collections import Counter
+
+from app.scoring.criteria import infer_algorithm_from_library
+
+# Short retrieval queries per algorithm family / config rule. Keys match the algorithm labels the
+# scanners emit and the rule names in 3_scanner/scanners/config/crypto_config_rules.py.
+SIGNAL_QUERIES: dict[str, str] = {
+    "RSA": "RSA key transport and RSA signatures transition to ML-KEM and ML-DSA, RSA security strength",
+    "ECC/ECDSA": "ECDSA signatures and ECDH key agreement transition to ML-DSA and ML-KEM",
+    "DSA/DH": "DSA signatures and Diffie-Hellman key agreement deprecation and transition to ML-KEM",
+    "Weak Hash": "SHA-1 and MD5 hash function deprecation, approved SHA-2 and SHA-3 hash functions",
+    "outdated_tls": "TLS 1.0 and TLS 1.1 deprecation, TLS 1.2 and TLS 1.3 server configuration requirements",
+    "rsa_cipher": "TLS cipher suites with RSA key exchange, recommended ephemeral key establishment",
+    "ecdsa_cipher": "TLS ECDHE and ECDSA cipher suites, quantum-vulnerable key exchange in TLS",
+    "dhe_cipher": "TLS DHE cipher suites, finite field Diffie-Hellman groups and post-quantum KEMs",
+    "weak_cipher": "DES, 3DES and RC4 disallowed ciphers, approved AES block cipher modes",
+}
+
+_KNOWN_KEYS = {key.lower(): key for key in SIGNAL_QUERIES}
+_UNKNOWN_ALGORITHMS = {"", "unknown", "none", "n/a"}
+
+
+def signal_key(finding: dict) -> str:
+    """Cluster key for a finding: its algorithm family if known, otherwise its rule id."""
+    meta = finding.get("meta") or {}
+    algorithm = str(finding.get("algorithm") or "").strip()
+    if algorithm.lower() in _KNOWN_KEYS:
+        return _KNOWN_KEYS[algorithm.lower()]
+
+    rule_id = str(meta.get("rule_id") or finding.get("type") or "").strip()
+    if rule_id.lower() in _KNOWN_KEYS:
+        return _KNOWN_KEYS[rule_id.lower()]
+
+    if algorithm.lower() in _UNKNOWN_ALGORITHMS:
+        algorithm = ""
+    inferred = infer_algorithm_from_library(algorithm or meta.get("library"))
+    return inferred or algorithm or rule_id or "unknown"
+
+
+def query_for_signal(key: str) -> str:
+    return SIGNAL_QUERIES.get(key) or f"NIST guidance for migrating {key} cryptography to post-quantum algorithms"
+
+
+def cluster_signal_keys(findings: list[dict], *, max_keys: int = 6) -> list[str]:
+    """Signal keys of the algorithm/rule clusters in the findings, largest clusters first."""
+    counts: Counter[str] = Counter(signal_key(finding) for finding in findings if isinstance(finding, dict))
+    ordered = sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+    return [key for key, _ in ordered[: max(1, int(max_keys))]]
+
+
+def build_cluster_queries(findings: list[dict], *, max_queries: int = 6) -> list[str]:
+    """One short retrieval query per algorithm/rule cluster, largest clusters first."""
+    return [query_for_signal(key) for key in cluster_signal_keys(findings, max_keys=max_queries)]
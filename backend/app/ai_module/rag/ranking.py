@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+from typing import Any
+
+import numpy as np
+
+RRF_K = 60
+MMR_LAMBDA = 0.7
+
+
+def _chunk_key(chunk: dict[str, Any]) -> tuple:
+    return (chunk.get("doc_id"), chunk.get("section"), str(chunk.get("text") or "")[:200])
+
+
+def _page_key(chunk: dict[str, Any]) -> tuple:
+    return (chunk.get("doc_id"), chunk.get("page"))
+
+
+def fuse_ranked_lists(
+    vector_lists: list[list[dict[str, Any]]],
+    lexical_lists: list[list[dict[str, Any]]],
+) -> list[tuple[dict[str, Any], float]]:
+    """Reciprocal rank fusion of per-query vector hits with per-query lexical hits.
+
+    Lexical hits come from a differently chunked index, so they are matched to vector chunks by
+    page; lexical pages with no vector chunk become candidates of their own.
+    """
+    candidates: dict[tuple, dict[str, Any]] = {}
+    scores: dict[tuple, float] = {}
+    for rows in vector_lists:
+        for rank, chunk in enumerate(rows):
+            key = _chunk_key(chunk)
+            candidates.setdefault(key, chunk)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (RRF_K + rank + 1)
+
+    page_scores: dict[tuple, float] = {}
+    page_hits: dict[tuple, dict[str, Any]] = {}
+    for rows in lexical_lists:
+        for rank, hit in enumerate(rows):
+            key = _page_key(hit)
+            page_scores[key] = page_scores.get(key, 0.0) + 1.0 / (RRF_K + rank + 1)
+            page_hits.setdefault(key, hit)
+
+    matched_pages: set[tuple] = set()
+    for key, chunk in candidates.items():
+        page_key = _page_key(chunk)
+        if page_key in page_scores:
+            scores[key] += page_scores[page_key]
+            matched_pages.add(page_key)
+
+    for page_key, hit in page_hits.items():
+        if page_key in matched_pages:
+            continue
+        chunk = {
+            "text": str(hit.get("snippet") or ""),
+            "doc_id": str(hit.get("doc_id") or "unknown"),
+            "title": str(hit.get("title") or "Unknown"),
+            "section": str(hit.get("section") or "N/A"),
+            "page": int(hit["page"]) if hit.get("page") is not None else None,
+            "url": hit.get("url"),
+            "source_path": None,
+            "distance": None,
+        }
+        key = _chunk_key(chunk)
+        candidates.setdefault(key, chunk)
+        scores[key] = scores.get(key, 0.0) + page_scores[page_key]
+
+    fused = [(candidates[key], score) for key, score in scores.items()]
+    fused.sort(key=lambda item: -item[1])
+    return fused
+
+
+def _candidate_matrix(candidates: list[tuple[dict[str, Any], float]]) -> Any:
+    """Unit-normalized chunk embeddings; lexical-only candidates without one get a zero row."""
+    dim = next((len(chunk["embedding"]) for chunk, _ in candidates if chunk.get("embedding") is not None), 0)
+    matrix = np.zeros((len(candidates), dim), dtype=np.float32)
+    for index, (chunk, _) in enumerate(candidates):
+        embedding = chunk.get("embedding")
+        if embedding is not None and len(embedding) == dim:
+            matrix[index] = np.asarray(embedding, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def mmr_select(
+    candidates: list[tuple[dict[str, Any], float]],
+    *,
+    top_k: int,
+    lambda_weight: float = MMR_LAMBDA,
+) -> list[dict[str, Any]]:
+    """Greedy maximal marginal relevance over the fused candidates, vectorized with NumPy.
+
+    Redundancy uses the chunk embeddings returned by the vector store, so near-duplicate
+    (e.g. overlapping) chunks are skipped in favour of the next most relevant distinct one.
+    """
+    if not candidates:
+        return []
+    k = max(1, min(int(top_k), len(candidates)))
+    relevance = np.asarray([score for _, score in candidates], dtype=np.float32)
+    relevance = relevance / (float(relevance.max()) or 1.0)
+    vectors = _candidate_matrix(candidates)
+
+    selected: list[int] = []
+    max_similarity = np.zeros(len(candidates), dtype=np.float32)
+    available = np.ones(len(candidates), dtype=bool)
+    for _ in range(k):
+        marginal = lambda_weight * relevance - (1.0 - lambda_weight) * max_similarity
+        marginal[~available] = -np.inf
+        best = int(np.argmax(marginal))
+        selected.append(best)
+        available[best] = False
+        np.maximum(max_similarity, vectors @ vectors[best], out=max_similarity)
+    return [
+        {key: value for key, value in candidates[index][0].items() if key != "embedding"}
+        for index in selected
+    ]
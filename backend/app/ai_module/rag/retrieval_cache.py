@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+from app.config import (
+    AI_RETRIEVAL_CACHE_ENABLED,
+    AI_RETRIEVAL_CACHE_MAX_ENTRIES,
+    AI_RETRIEVAL_CACHE_PATH,
+    AI_RETRIEVAL_CACHE_TTL_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS retrievals (
+    cache_key TEXT PRIMARY KEY,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_retrievals_created_at ON retrievals (created_at);
+"""
+
+
+def _normalize_query(query: str) -> str:
+    return re.sub(r"\s+", " ", str(query or "")).strip().lower()
+
+
+def build_retrieval_cache_key(
+    queries: list[str],
+    *,
+    collection_name: str,
+    backend_name: str,
+    embedding_model: str,
+    corpus_version: str,
+    top_k: int,
+) -> str:
+    # Fusion and MMR do not depend on query order, so the query set is sorted.
+    material = {
+        "queries": sorted({_normalize_query(query) for query in queries}),
+        "collection": collection_name,
+        "backend": backend_name,
+        "embedding_model": embedding_model,
+        "corpus_version": corpus_version,
+        "top_k": int(top_k),
+    }
+    return hashlib.sha256(json.dumps(material, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class RetrievalCache:
+    """Local SQLite cache of retrieved chunks with a TTL and a size cap."""
+
+    def __init__(self, path: str, *, ttl_seconds: int = 86400, max_entries: int = 5000) -> None:
+        self._ttl_seconds = max(1, int(ttl_seconds))
+        self._max_entries = max(1, int(max_entries))
+        self._lock = threading.Lock()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def get(self, cache_key: str) -> dict[str, Any] | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, created_at FROM retrievals WHERE cache_key = ?",
+                (cache_key,),
+            ).fetchone()
+        if row is None:
+            return None
+        payload, created_at = row
+        if time.time() - float(created_at) > self._ttl_seconds:
+            return None
+        try:
+            data = json.loads(payload)
+        except ValueError:
+            return None
+        return data if isinstance(data, dict) else None
+
+    def put(self, cache_key: str, payload: dict[str, Any]) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO retrievals (cache_key, payload, created_at) VALUES (?, ?, ?)",
+                (cache_key, json.dumps(payload, ensure_ascii=True), now),
+            )
+            self._conn.execute("DELETE FROM retrievals WHERE created_at < ?", (now - self._ttl_seconds,))
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM retrievals").fetchone()
+            overflow = int(count) - self._max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM retrievals WHERE cache_key IN "
+                    "(SELECT cache_key FROM retrievals ORDER BY created_at ASC LIMIT ?)",
+                    (overflow,),
+                )
+            self._conn.commit()
+
+
+@lru_cache(maxsize=1)
+def get_retrieval_cache() -> RetrievalCache | None:
+    if not AI_RETRIEVAL_CACHE_ENABLED or not AI_RETRIEVAL_CACHE_PATH:
+        return None
+    try:
+        return RetrievalCache(
+            AI_RETRIEVAL_CACHE_PATH,
+            ttl_seconds=AI_RETRIEVAL_CACHE_TTL_SECONDS,
+            max_entries=AI_RETRIEVAL_CACHE_MAX_ENTRIES,
+        )
+    except sqlite3.Error as exc:
+        logger.warning(
+            "ai_rag.retrieval_cache stage=open_failed path=%s reason=%s",
+            AI_RETRIEVAL_CACHE_PATH,
+            str(exc),
+        )
+        return None
@@ -1,27 +1,50 @@
 from __future__ import annotations
 
 import logging
-import re
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from pathlib import Path
 
-from app.ai_module.rag.embeddings import EmbeddingsError, embed_texts
-from app.ai_module.rag.indexer import build_or_load_index
-from app.ai_module.rag.vector_store import VectorStore, VectorStoreError
+from app.ai_module.rag.embeddings import EmbeddingsError, embed_texts, embedding_model_name
+from app.ai_module.rag.guidance import is_guidance_current, load_guidance_map
+from app.ai_module.rag.indexer import build_or_update_index, open_index
+from app.ai_module.rag.ingest import manifest_fingerprint
+from app.ai_module.rag.queries import cluster_signal_keys, query_for_signal
+from app.ai_module.rag.ranking import fuse_ranked_lists, mmr_select
+from app.ai_module.rag.retrieval_cache import build_retrieval_cache_key, get_retrieval_cache
+from app.ai_module.rag.vector_store import VectorStoreError, get_vector_store
 from app.ai_module.schemas import Citation
 from app.config import AI_RAG_CORPUS_PATH
 
 logger = logging.getLogger(__name__)
 
 
-def _tokenize(value: str) -> set[str]:
-    return set(token for token in re.findall(r"[a-z0-9\-]+", value.lower()) if len(token) > 1)
-
-
 class RetrievalError(RuntimeError):
     pass
 
 
+_corpus_counts_cache: dict[str, tuple[int, int, int]] = {}
+_corpus_counts_lock = threading.Lock()
+
+
+def _corpus_file_counts(root: Path) -> tuple[int, int]:
+    """Count supported corpus files, re-globbing only when the directory mtime changes."""
+    mtime_ns = root.stat().st_mtime_ns
+    key = str(root)
+    with _corpus_counts_lock:
+        cached = _corpus_counts_cache.get(key)
+        if cached is not None and cached[0] == mtime_ns:
+            return cached[1], cached[2]
+
+    pdf_count = len(list(root.glob("*.pdf")))
+    text_count = len(list(root.glob("*.txt"))) + len(list(root.glob("*.md")))
+    with _corpus_counts_lock:
+        _corpus_counts_cache[key] = (mtime_ns, pdf_count, text_count)
+    return pdf_count, text_count
+
+
 @dataclass
 class RagCorpusStatus:
     corpus_path: str
@@ -61,6 +84,10 @@ class RetrievalResult:
     vector_store_collection: str | None = None
     vector_count_before_query: int = 0
     failure_reason: str | None = None
+    query_count: int = 0
+    lexical_hits: int = 0
+    cache_hit: bool = False
+    precomputed_signals: int = 0
 
     @property
     def success(self) -> bool:
@@ -69,6 +96,10 @@ class RetrievalResult:
     def to_dict(self) -> dict:
         return {
             "top_k": self.top_k,
+            "query_count": self.query_count,
+            "lexical_hits": self.lexical_hits,
+            "cache_hit": self.cache_hit,
+            "precomputed_signals": self.precomputed_signals,
             "retrieved_count": len(self.chunks),
             "vector_store_collection": self.vector_store_collection,
             "vector_count_before_query": self.vector_count_before_query,
@@ -83,8 +114,7 @@ def inspect_rag_corpus(corpus_path: str | None = None) -> RagCorpusStatus:
     pdf_count = 0
     text_count = 0
     if exists and root is not None:
-        pdf_count = len(list(root.glob("*.pdf")))
-        text_count = len(list(root.glob("*.txt"))) + len(list(root.glob("*.md")))
+        pdf_count, text_count = _corpus_file_counts(root)
 
     status = RagCorpusStatus(
         corpus_path=str(root) if root else "",
@@ -95,7 +125,7 @@ def inspect_rag_corpus(corpus_path: str | None = None) -> RagCorpusStatus:
     )
 
     try:
-        store = VectorStore()
+        store = get_vector_store()
         status.vector_store_collection = store.collection_name
         status.vector_store_ready = True
         status.vector_count = store.count()
@@ -118,16 +148,58 @@ def inspect_rag_corpus(corpus_path: str | None = None) -> RagCorpusStatus:
     return status
 
 
-def retrieve_relevant_chunks_with_debug(query_text: str, *, top_k: int = 6) -> RetrievalResult:
-    result = RetrievalResult(query_text=query_text, top_k=top_k)
-    query = query_text.strip()
-    if not query:
+# BM25 lookups run while the query embedding request is in flight, so they add no latency.
+_lexical_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="rag-lexical")
+
+
+def _lexical_candidates(queries: list[str], *, top_k: int, corpus_path: str | None = None) -> list[list[dict]]:
+    try:
+        index = open_index(corpus_path)
+        if index is None:
+            return []
+        return [index.search(query, top_k=top_k) for query in queries]
+    except (sqlite3.Error, OSError) as exc:
+        logger.warning("ai_rag.retrieve lexical_failed reason=%s", str(exc))
+        return []
+
+
+def _retrieval_cache_key(store, queries: list[str], *, top_k: int) -> str | None:
+    # Without an ingestion manifest there is no corpus version to key on, so nothing is cached.
+    corpus_version = manifest_fingerprint(store)
+    if corpus_version is None:
+        return None
+    return build_retrieval_cache_key(
+        queries,
+        collection_name=store.collection_name,
+        backend_name=getattr(store, "backend_name", "chroma"),
+        embedding_model=embedding_model_name(),
+        corpus_version=corpus_version,
+        top_k=top_k,
+    )
+
+
+def retrieve_relevant_chunks_with_debug(
+    query_text: str | list[str],
+    *,
+    top_k: int = 6,
+    corpus_path: str | None = None,
+) -> RetrievalResult:
+    """Hybrid retrieval for one query or a list of per-cluster queries.
+
+    All queries are embedded in one call and sent to the vector store as one batch; vector and
+    BM25 hits are fused with reciprocal rank fusion and diversified with MMR. The BM25 index of
+    ``corpus_path`` is only opened here; ingest_corpus keeps it in sync with the corpus.
+    """
+    raw_queries = [query_text] if isinstance(query_text, str) else list(query_text)
+    queries = list(dict.fromkeys(str(query).strip() for query in raw_queries if str(query or "").strip()))
+    result = RetrievalResult(query_text=" | ".join(queries), top_k=top_k, query_count=len(queries))
+    if not queries:
         result.failure_reason = "Retrieval query is empty"
         logger.warning("ai_rag.retrieve status=%s", result.to_dict())
         return result
 
     try:
-        store = VectorStore()
+        store = get_vector_store()
         result.vector_store_collection = store.collection_name
         result.vector_count_before_query = store.count()
     except VectorStoreError as exc:
@@ -140,24 +212,116 @@ def retrieve_relevant_chunks_with_debug(query_text: str, *, top_k: int = 6) -> R
         logger.warning("ai_rag.retrieve status=%s", result.to_dict())
         return result
 
+    cache_key = _retrieval_cache_key(store, queries, top_k=top_k)
+    cache = get_retrieval_cache() if cache_key is not None else None
+    if cache is not None and cache_key is not None:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            result.chunks = list(cached.get("chunks") or [])
+            result.lexical_hits = int(cached.get("lexical_hits") or 0)
+            result.cache_hit = True
+            logger.info("ai_rag.retrieve status=%s", result.to_dict())
+            return result
+
+    # Over-fetch per query so fusion and MMR have alternatives to choose from.
+    candidate_k = max(1, int(top_k)) * 2
+    lexical_future = _lexical_executor.submit(_lexical_candidates, queries, top_k=candidate_k, corpus_path=corpus_path)
+
     try:
-        query_embedding = embed_texts([query])[0]
+        query_embeddings = embed_texts(queries)
+        if len(query_embeddings) != len(queries):
+            raise ValueError("embedding count does not match query count")
     except (EmbeddingsError, IndexError, ValueError) as exc:
         result.failure_reason = f"Embedding generation failed: {exc}"
         logger.error("ai_rag.retrieve status=%s", result.to_dict())
         return result
 
     try:
-        result.chunks = store.query(query_embedding, top_k=top_k)
+        vector_lists = store.query_batch(query_embeddings, top_k=candidate_k, include_embeddings=True)
     except Exception as exc:
         result.failure_reason = f"Vector query failed: {exc}"
         logger.error("ai_rag.retrieve status=%s", result.to_dict())
         return result
 
+    lexical_lists = lexical_future.result()
+    result.lexical_hits = sum(len(rows) for rows in lexical_lists)
+    result.chunks = mmr_select(fuse_ranked_lists(vector_lists, lexical_lists), top_k=top_k)
+    if cache is not None and cache_key is not None and result.chunks:
+        try:
+            cache.put(cache_key, {"chunks": result.chunks, "lexical_hits": result.lexical_hits})
+        except (sqlite3.Error, TypeError, ValueError) as exc:
+            logger.warning("ai_rag.retrieve cache_store_failed reason=%s", str(exc))
+
     logger.info("ai_rag.retrieve status=%s", result.to_dict())
     return result
 
 
+def _interleave(lists: list[list[dict]], *, top_k: int) -> list[dict]:
+    # Round-robin across clusters so the largest cluster cannot crowd out the others.
+    selected: list[dict] = []
+    seen: set[tuple] = set()
+    for rank in range(max((len(rows) for rows in lists), default=0)):
+        for rows in lists:
+            if rank >= len(rows):
+                continue
+            chunk = rows[rank]
+            key = (chunk.get("doc_id"), chunk.get("section"), str(chunk.get("text") or "")[:200])
+            if key in seen:
+                continue
+            seen.add(key)
+            selected.append(chunk)
+            if len(selected) >= top_k:
+                return selected
+    return selected
+
+
+def retrieve_guidance_for_findings(findings: list[dict], *, top_k: int = 6) -> RetrievalResult:
+    """Guidance chunks for the findings' algorithm/rule clusters.
+
+    Known signals are read from the map precomputed at ingest time, so they cost no embedding or
+    vector search; only signals missing from the map go through live hybrid retrieval.
+    """
+    keys = cluster_signal_keys(findings)
+    try:
+        store = get_vector_store()
+    except VectorStoreError as exc:
+        result = RetrievalResult(query_text=" | ".join(keys), top_k=top_k, query_count=len(keys))
+        result.failure_reason = f"Vector store unavailable: {exc}"
+        logger.error("ai_rag.retrieve status=%s", result.to_dict())
+        return result
+
+    guidance = load_guidance_map(store)
+    if not is_guidance_current(guidance, corpus_version=manifest_fingerprint(store), top_k=top_k):
+        guidance = None
+    signals = guidance.get("signals", {}) if guidance else {}
+    precomputed = {key: signals[key][:top_k] for key in keys if signals.get(key)}
+    live_keys = [key for key in keys if key not in precomputed]
+
+    if live_keys:
+        result = retrieve_relevant_chunks_with_debug([query_for_signal(key) for key in live_keys], top_k=top_k)
+        if result.failure_reason and precomputed:
+            logger.warning("ai_rag.retrieve live_fallback_failed reason=%s", result.failure_reason)
+            result.failure_reason = None
+            result.chunks = []
+    else:
+        result = RetrievalResult(query_text="", top_k=top_k, vector_store_collection=store.collection_name)
+
+    if precomputed:
+        # Live hits for the unknown signals take the slot of the largest unknown cluster.
+        ordered: list[list[dict]] = []
+        for key in keys:
+            if key in precomputed:
+                ordered.append(precomputed[key])
+            elif key == live_keys[0] and result.chunks:
+                ordered.append(result.chunks)
+        result.chunks = _interleave(ordered, top_k=top_k)
+        result.precomputed_signals = len(precomputed)
+        result.query_text = " | ".join(keys)
+        result.vector_store_collection = result.vector_store_collection or store.collection_name
+        logger.info("ai_rag.retrieve status=%s", result.to_dict())
+    return result
+
+
 def retrieve_relevant_chunks(query_text: str, *, top_k: int = 6, raise_on_error: bool = False) -> list[dict]:
     result = retrieve_relevant_chunks_with_debug(query_text, top_k=top_k)
     if raise_on_error and result.failure_reason:
@@ -166,22 +330,17 @@ def retrieve_relevant_chunks(query_text: str, *, top_k: int = 6, raise_on_error:
 
 
 def _retrieve_legacy_citations(query: str, *, top_k: int = 3, corpus_path: str | None = None) -> list[Citation]:
-    query_tokens = _tokenize(query)
-    if not query_tokens:
+    index = build_or_update_index(corpus_path)
+    if index is None:
+        return []
+    try:
+        ranked = index.search(query, top_k=top_k)
+    except sqlite3.Error as exc:
+        logger.warning("ai_rag.retrieve_citations legacy_index_failed reason=%s", str(exc))
         return []
-
-    ranked: list[tuple[int, int, dict]] = []
-    for chunk in build_or_load_index(corpus_path):
-        search_text = str(chunk.get("search_text") or "")
-        overlap = sum(1 for token in query_tokens if token in search_text)
-        if overlap <= 0:
-            continue
-        ranked.append((overlap, len(search_text), chunk))
-
-    ranked.sort(key=lambda item: (-item[0], item[1]))
 
     citations: list[Citation] = []
-    for _, _, chunk in ranked[:top_k]:
+    for chunk in ranked:
         citations.append(
             Citation(
                 doc_id=str(chunk.get("doc_id") or "unknown"),
@@ -196,7 +355,7 @@ def _retrieve_legacy_citations(query: str, *, top_k: int = 3, corpus_path: str |
 
 
 def retrieve_citations(query: str, *, top_k: int = 3, corpus_path: str | None = None) -> list[Citation]:
-    result = retrieve_relevant_chunks_with_debug(query, top_k=top_k)
+    result = retrieve_relevant_chunks_with_debug(query, top_k=top_k, corpus_path=corpus_path)
     if result.chunks:
         citations: list[Citation] = []
         for chunk in result.chunks:
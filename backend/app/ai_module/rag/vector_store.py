@@ -1,8 +1,11 @@
 from __future__ import annotations
 
+import logging
+import os
+import threading
 from typing import Any
 
-from app.config import AI_VECTOR_COLLECTION, AI_VECTOR_DB_DIR
+from app.config import AI_VECTOR_BACKEND, AI_VECTOR_COLLECTION, AI_VECTOR_DB_DIR
 
 try:
     import chromadb
@@ -10,6 +13,8 @@ except Exception:  # pragma: no cover - optional dependency in tests
     chromadb = None
 
 
+logger = logging.getLogger(__name__)
+
 DEFAULT_COLLECTION_NAME = AI_VECTOR_COLLECTION
 
 
@@ -17,7 +22,38 @@ class VectorStoreError(RuntimeError):
     pass
 
 
+def chunk_id_for(chunk: dict[str, Any], position: int) -> str:
+    return str(chunk.get("chunk_id") or f"{chunk.get('doc_id')}::{chunk.get('page')}::{position}")
+
+
+def chunk_metadata(chunk: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "doc_id": chunk.get("doc_id"),
+        "title": chunk.get("title"),
+        "page": chunk.get("page"),
+        "section": chunk.get("section"),
+        "url": chunk.get("url"),
+        "source_path": chunk.get("source_path"),
+    }
+
+
+def result_row(text: Any, metadata: dict[str, Any] | None, distance: float | None) -> dict[str, Any]:
+    meta = metadata or {}
+    return {
+        "text": str(text or ""),
+        "doc_id": str(meta.get("doc_id") or "unknown"),
+        "title": str(meta.get("title") or "Unknown"),
+        "section": str(meta.get("section") or "N/A"),
+        "page": int(meta["page"]) if meta.get("page") is not None else None,
+        "url": meta.get("url"),
+        "source_path": meta.get("source_path"),
+        "distance": distance,
+    }
+
+
 class VectorStore:
+    backend_name = "chroma"
+
     def __init__(
         self,
         *,
@@ -34,6 +70,26 @@ class VectorStore:
             metadata={"hnsw:space": "cosine"},
         )
 
+    def refresh(self) -> None:
+        """Re-resolve the collection handle, e.g. after another process reset the collection."""
+        self.collection = self.client.get_or_create_collection(
+            name=self._collection_name,
+            metadata={"hnsw:space": "cosine"},
+        )
+
+    def _with_refresh(self, operation):
+        try:
+            return operation()
+        except Exception as exc:
+            # A long-lived handle goes stale when the collection is dropped and recreated elsewhere.
+            logger.info(
+                "ai_rag.vector_store stage=refresh collection=%s reason=%s",
+                self._collection_name,
+                str(exc),
+            )
+            self.refresh()
+            return operation()
+
     def reset(self) -> None:
         try:
             self.client.delete_collection(self._collection_name)
@@ -58,19 +114,10 @@ class VectorStore:
         for chunk, embedding in zip(chunks, embeddings):
             if not embedding:
                 continue
-            ids.append(str(chunk.get("chunk_id") or f"{chunk.get('doc_id')}::{chunk.get('page')}::{len(ids)}"))
+            ids.append(chunk_id_for(chunk, len(ids)))
             documents.append(str(chunk.get("text") or ""))
             filtered_embeddings.append(embedding)
-            metadatas.append(
-                {
-                    "doc_id": chunk.get("doc_id"),
-                    "title": chunk.get("title"),
-                    "page": chunk.get("page"),
-                    "section": chunk.get("section"),
-                    "url": chunk.get("url"),
-                    "source_path": chunk.get("source_path"),
-                }
-            )
+            metadatas.append(chunk_metadata(chunk))
 
         if not ids:
             return
@@ -82,38 +129,117 @@ class VectorStore:
             embeddings=filtered_embeddings,
         )
 
+    def delete_document(self, doc_id: str) -> None:
+        self.collection.delete(where={"doc_id": doc_id})
+
     def query(self, query_embedding: list[float], *, top_k: int = 6) -> list[dict[str, Any]]:
         if not query_embedding:
             return []
-        result = self.collection.query(query_embeddings=[query_embedding], n_results=max(1, int(top_k)))
-
-        docs = (result.get("documents") or [[]])[0]
-        metadatas = (result.get("metadatas") or [[]])[0]
-        distances = (result.get("distances") or [[]])[0]
-
-        rows: list[dict[str, Any]] = []
-        for index, (doc, metadata) in enumerate(zip(docs, metadatas)):
-            meta = metadata or {}
-            distance = None
-            if isinstance(distances, list) and index < len(distances):
-                distance = distances[index]
-            rows.append(
-                {
-                    "text": str(doc or ""),
-                    "doc_id": str(meta.get("doc_id") or "unknown"),
-                    "title": str(meta.get("title") or "Unknown"),
-                    "section": str(meta.get("section") or "N/A"),
-                    "page": int(meta["page"]) if meta.get("page") is not None else None,
-                    "url": meta.get("url"),
-                    "source_path": meta.get("source_path"),
-                    "distance": distance,
-                }
+        return self.query_batch([query_embedding], top_k=top_k)[0]
+
+    def query_batch(
+        self,
+        query_embeddings: list[list[float]],
+        *,
+        top_k: int = 6,
+        include_embeddings: bool = False,
+    ) -> list[list[dict[str, Any]]]:
+        if not query_embeddings:
+            return []
+        include = ["documents", "metadatas", "distances"] + (["embeddings"] if include_embeddings else [])
+        result = self._with_refresh(
+            lambda: self.collection.query(
+                query_embeddings=query_embeddings,
+                n_results=max(1, int(top_k)),
+                include=include,
             )
-        return rows
+        )
+
+        batches: list[list[dict[str, Any]]] = []
+        all_docs = result.get("documents") or []
+        all_metadatas = result.get("metadatas") or []
+        all_distances = result.get("distances") or []
+        all_embeddings = result.get("embeddings")
+        if all_embeddings is None:
+            all_embeddings = []
+        for query_index in range(len(query_embeddings)):
+            docs = all_docs[query_index] if query_index < len(all_docs) else []
+            metadatas = all_metadatas[query_index] if query_index < len(all_metadatas) else []
+            distances = all_distances[query_index] if query_index < len(all_distances) else []
+            embeddings = all_embeddings[query_index] if query_index < len(all_embeddings) else []
+            rows: list[dict[str, Any]] = []
+            for index, (doc, metadata) in enumerate(zip(docs, metadatas)):
+                distance = None
+                if isinstance(distances, list) and index < len(distances):
+                    distance = distances[index]
+                row = result_row(doc, metadata, distance)
+                if include_embeddings and index < len(embeddings):
+                    row["embedding"] = embeddings[index]
+                rows.append(row)
+            batches.append(rows)
+        return batches
+
+    def flush(self) -> None:
+        """Chroma persists on write; present for parity with the NumPy backend."""
+        return None
 
     def count(self) -> int:
-        return int(self.collection.count())
+        return int(self._with_refresh(lambda: self.collection.count()))
 
     @property
     def collection_name(self) -> str:
         return self._collection_name
+
+    @property
+    def persist_dir(self) -> str:
+        return self._persist_dir
+
+
+_registry: dict[tuple[str, str], Any] = {}
+_registry_lock = threading.Lock()
+_registry_pid = os.getpid()
+
+
+def open_vector_store(
+    *,
+    collection_name: str = DEFAULT_COLLECTION_NAME,
+    persist_dir: str | None = None,
+    backend: str | None = None,
+) -> Any:
+    selected = (backend or AI_VECTOR_BACKEND).strip().lower()
+    if selected == "numpy":
+        from app.ai_module.rag.numpy_store import NumpyVectorStore
+
+        return NumpyVectorStore(collection_name=collection_name, persist_dir=persist_dir)
+    if selected != "chroma":
+        raise VectorStoreError(f"Unsupported AI_VECTOR_BACKEND: {selected}")
+    return VectorStore(collection_name=collection_name, persist_dir=persist_dir)
+
+
+def get_vector_store(
+    *,
+    collection_name: str = DEFAULT_COLLECTION_NAME,
+    persist_dir: str | None = None,
+) -> Any:
+    """Return the process-wide store for a collection, opening it on first use.
+
+    Chroma clients must not be shared across fork boundaries, so the registry is
+    rebuilt when it is first touched from a new (e.g. Celery prefork child) process.
+    """
+    global _registry_pid
+    key = (persist_dir or AI_VECTOR_DB_DIR, collection_name)
+    with _registry_lock:
+        if _registry_pid != os.getpid():
+            _registry.clear()
+            _registry_pid = os.getpid()
+        store = _registry.get(key)
+        if store is None:
+            store = open_vector_store(collection_name=collection_name, persist_dir=persist_dir)
+            _registry[key] = store
+            logger.info("ai_rag.vector_store stage=opened collection=%s persist_dir=%s", key[1], key[0])
+        return store
+
+
+def clear_vector_store_registry() -> None:
+    with _registry_lock:
+        _registry.clear()
@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Awaitable, Callable, TypeVar
+
+from app.config import AI_BREAKER_FAILURE_THRESHOLD, AI_BREAKER_RESET_SECONDS
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker for one upstream dependency.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and calls fail immediately
+    for ``reset_seconds``; then one trial call is let through (half-open) and its outcome closes
+    or re-opens the circuit.
+    """
+
+    def __init__(self, name: str, *, failure_threshold: int, reset_seconds: float) -> None:
+        self.name = name
+        self._failure_threshold = max(1, int(failure_threshold))
+        self._reset_seconds = max(0.0, float(reset_seconds))
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state_locked()
+
+    def _state_locked(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self._reset_seconds:
+            return "half_open"
+        return "open"
+
+    def before_call(self) -> None:
+        with self._lock:
+            state = self._state_locked()
+            if state == "closed":
+                return
+            if state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+        raise CircuitOpenError(f"{self.name} circuit is open after {self._failures} consecutive failures")
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info("circuit_breaker stage=closed name=%s", self.name)
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._failures >= self._failure_threshold:
+                if self._state_locked() != "open":
+                    logger.warning(
+                        "circuit_breaker stage=opened name=%s failures=%s reset_seconds=%s",
+                        self.name,
+                        self._failures,
+                        self._reset_seconds,
+                    )
+                self._opened_at = time.monotonic()
+
+    def record_cancelled(self) -> None:
+        # A cancelled call says nothing about upstream health; just free the half-open slot.
+        with self._lock:
+            self._trial_in_flight = False
+
+    def reset(self) -> None:
+        self.record_success()
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(name: str) -> CircuitBreaker:
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                name,
+                failure_threshold=AI_BREAKER_FAILURE_THRESHOLD,
+                reset_seconds=AI_BREAKER_RESET_SECONDS,
+            )
+            _breakers[name] = breaker
+        return breaker
+
+
+def call_with_breaker(breaker: CircuitBreaker, func: Callable[[], T]) -> T:
+    breaker.before_call()
+    try:
+        result = func()
+    except Exception:
+        breaker.record_failure()
+        raise
+    breaker.record_success()
+    return result
+
+
+async def _hedged(
+    attempt: Callable[[], Awaitable[T]],
+    *,
+    hedge_delay_seconds: float,
+    on_hedge: Callable[[], Any] | None,
+) -> T:
+    attempts: list[asyncio.Future] = [asyncio.ensure_future(attempt())]
+    try:
+        if hedge_delay_seconds <= 0:
+            return await attempts[0]
+
+        done, _ = await asyncio.wait(attempts, timeout=hedge_delay_seconds)
+        if not done:
+            # The first attempt is slower than usual: race a second one and keep whichever wins.
+            if on_hedge is not None:
+                on_hedge()
+            attempts.append(asyncio.ensure_future(attempt()))
+
+        pending = set(attempts)
+        error: BaseException | None = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+        assert error is not None
+        raise error
+    finally:
+        for future in attempts:
+            if not future.done():
+                future.cancel()
+
+
+async def call_resilient(
+    attempt: Callable[[], Awaitable[T]],
+    *,
+    breaker: CircuitBreaker,
+    timeout_seconds: float,
+    hedge_delay_seconds: float = 0.0,
+    on_hedge: Callable[[], Any] | None = None,
+) -> T:
+    """Run an async upstream call under a deadline, with an optional hedged second attempt.
+
+    Raises CircuitOpenError without calling upstream while the breaker is open, and TimeoutError
+    when the deadline passes. Each call counts as one success or failure for the breaker.
+    """
+    breaker.before_call()
+    try:
+        result = await asyncio.wait_for(
+            _hedged(attempt, hedge_delay_seconds=hedge_delay_seconds, on_hedge=on_hedge),
+            timeout=max(0.001, float(timeout_seconds)),
+        )
+    except asyncio.TimeoutError as exc:
+        breaker.record_failure()
+        raise TimeoutError(f"{breaker.name} call exceeded {timeout_seconds}s deadline") from exc
+    except asyncio.CancelledError:
+        breaker.record_cancelled()
+        raise
+    except Exception:
+        breaker.record_failure()
+        raise
+    breaker.record_success()
+    return result
@@ -1,13 +1,34 @@
 from __future__ import annotations
 
 from collections import Counter
+from collections.abc import Iterable
 
 from app.scoring import (
+    build_score_signal_from_finding,
     build_score_signals_from_findings,
     compute_pqc_readiness_score,
     compute_risk_score,
     compute_severity_weighted_index,
+    pqc_readiness_score_from_total,
+    risk_score_from_total,
+    severity_weighted_index_from_total,
 )
+from app.scoring.criteria import score_signal_points
+
+
+def _dedup_key(finding: dict) -> tuple:
+    meta = finding.get("meta") or {}
+    return (
+        finding.get("type"),
+        finding.get("severity"),
+        finding.get("algorithm"),
+        finding.get("file_path"),
+        finding.get("line_start"),
+        finding.get("line_end"),
+        meta.get("rule_id"),
+        meta.get("scanner_type"),
+        finding.get("evidence"),
+    )
 
 
 def deduplicate_findings(findings: list[dict]) -> list[dict]:
@@ -17,18 +38,7 @@ def deduplicate_findings(findings: list[dict]) -> list[dict]:
     for finding in findings:
         if not isinstance(finding, dict):
             continue
-        meta = finding.get("meta") or {}
-        key = (
-            finding.get("type"),
-            finding.get("severity"),
-            finding.get("algorithm"),
-            finding.get("file_path"),
-            finding.get("line_start"),
-            finding.get("line_end"),
-            meta.get("rule_id"),
-            meta.get("scanner_type"),
-            finding.get("evidence"),
-        )
+        key = _dedup_key(finding)
         if key in seen:
             continue
         seen.add(key)
@@ -71,3 +81,67 @@ def compute_risk_metrics(findings: list[dict]) -> dict[str, int | float]:
         "pqc_readiness_score": compute_pqc_readiness_score(signals, scale=100),
         "severity_weighted_index": compute_severity_weighted_index(signals),
     }
+
+
+class FindingsAccumulator:
+    """Incremental equivalent of deduplicate_findings + summarize_inputs + compute_risk_metrics.
+
+    Findings are fed one at a time as rows arrive from the database, so large scans never need
+    an intermediate list of raw rows before deduplication and aggregation.
+    """
+
+    def __init__(self) -> None:
+        self.findings: list[dict] = []
+        self.source_count = 0
+        self._seen: set[tuple] = set()
+        self._scanner_counts: Counter[str] = Counter()
+        self._severity_counts: Counter[str] = Counter()
+        self._rule_counts: Counter[str] = Counter()
+        self._meta_duplicate_count = 0
+        self._weighted_total = 0.0
+
+    def add(self, finding: dict) -> bool:
+        self.source_count += 1
+        if not isinstance(finding, dict):
+            return False
+        key = _dedup_key(finding)
+        if key in self._seen:
+            return False
+        self._seen.add(key)
+        self.findings.append(finding)
+
+        meta = finding.get("meta") or {}
+        self._scanner_counts[str(meta.get("scanner_type") or finding.get("context") or "UNKNOWN")] += 1
+        self._severity_counts[str(finding.get("severity") or "UNKNOWN")] += 1
+        self._rule_counts[str(meta.get("rule_id") or finding.get("type") or "unknown")] += 1
+        self._meta_duplicate_count += max(0, int(meta.get("duplicate_count", 1)) - 1)
+
+        signal = build_score_signal_from_finding(finding)
+        self._weighted_total += score_signal_points(signal.get("severity"), signal.get("algorithm"))
+        return True
+
+    def extend(self, findings: Iterable[dict]) -> "FindingsAccumulator":
+        for finding in findings:
+            self.add(finding)
+        return self
+
+    def inputs_summary(self) -> dict:
+        duplicate_count = max(0, self.source_count - len(self.findings)) + self._meta_duplicate_count
+        duplicate_ratio = 0.0
+        if self.source_count > 0:
+            duplicate_ratio = round(duplicate_count / self.source_count, 4)
+        return {
+            "total_findings": len(self.findings),
+            "source_findings": self.source_count,
+            "counts_by_scanner_type": dict(self._scanner_counts),
+            "counts_by_severity": dict(self._severity_counts),
+            "top_rules": [rule for rule, _ in self._rule_counts.most_common(5)],
+            "duplicate_ratio": duplicate_ratio,
+        }
+
+    def risk_metrics(self) -> dict[str, int | float]:
+        return {
+            "risk_score": risk_score_from_total(self._weighted_total),
+            "pqc_readiness_score": pqc_readiness_score_from_total(self._weighted_total, scale=100),
+            "severity_weighted_index": severity_weighted_index_from_total(self._weighted_total, len(self.findings)),
+        }
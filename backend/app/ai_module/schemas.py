@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from datetime import datetime
 from typing import Literal
 
 from pydantic import BaseModel, Field
@@ -74,3 +75,5 @@ class AiAnalysisStartResponse(BaseModel):
     status: str
     scan_id: str
     ai_analysis_id: str | None = None
+    # Set when a queued run will replace an existing snapshot; pass it to the stream as ``after``.
+    snapshot_updated_at: datetime | None = None
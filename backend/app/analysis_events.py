@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+from app.config import AI_STREAM_BACKEND, AI_STREAM_HEARTBEAT_SECONDS, AI_STREAM_TIMEOUT_SECONDS, REDIS_URL
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis
+    import redis.asyncio as redis_asyncio
+except Exception:  # pragma: no cover - optional dependency in tests
+    redis = None
+    redis_asyncio = None
+
+
+CHANNEL_PREFIX = "qshield:ai_analysis_events"
+TERMINAL_STAGES = frozenset({"completed", "failed"})
+
+# Token deltas are batched so a long completion is a few dozen messages, not thousands.
+_TOKEN_FLUSH_CHARS = 200
+_TOKEN_FLUSH_SECONDS = 0.25
+
+# Events are emitted from inside the streaming LLM call, so publishing happens on one
+# background thread: the analysis loop never waits on Redis, and events stay in order.
+_publish_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ai-events")
+_CLOSE_TIMEOUT_SECONDS = 5.0
+
+
+class AnalysisEventsError(RuntimeError):
+    pass
+
+
+def channel_for(scan_uuid: Any) -> str:
+    return f"{CHANNEL_PREFIX}:{scan_uuid}"
+
+
+class _RedisSubscription:
+    def __init__(self, client: Any, channel: str) -> None:
+        self._client = client
+        self._channel = channel
+        self._pubsub = client.pubsub(ignore_subscribe_messages=True)
+
+    async def open(self) -> None:
+        await self._pubsub.subscribe(self._channel)
+
+    async def get(self, timeout: float) -> dict[str, Any] | None:
+        message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout)
+        if message is None:
+            return None
+        return json.loads(message["data"])
+
+    async def close(self) -> None:
+        try:
+            await self._pubsub.unsubscribe(self._channel)
+            await self._pubsub.aclose()
+        finally:
+            await self._client.aclose()
+
+
+class RedisEventBackend:
+    """Redis pub/sub: the Celery worker publishes, API processes subscribe per open stream."""
+
+    def __init__(self, url: str) -> None:
+        self._url = url
+        self._client = redis.Redis.from_url(url)
+
+    def publish(self, channel: str, event: dict[str, Any]) -> None:
+        self._client.publish(channel, json.dumps(event, default=str))
+
+    async def subscribe(self, channel: str) -> _RedisSubscription:
+        subscription = _RedisSubscription(redis_asyncio.Redis.from_url(self._url), channel)
+        await subscription.open()
+        return subscription
+
+
+class _MemorySubscription:
+    def __init__(self, backend: "InMemoryEventBackend", channel: str) -> None:
+        self._backend = backend
+        self._channel = channel
+        self._loop = asyncio.get_running_loop()
+        self._queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue()
+
+    def deliver(self, event: dict[str, Any]) -> None:
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, event)
+
+    async def get(self, timeout: float) -> dict[str, Any] | None:
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def close(self) -> None:
+        self._backend.unsubscribe(self._channel, self)
+
+
+class InMemoryEventBackend:
+    """Process-local stand-in with the same fire-and-forget semantics as Redis pub/sub."""
+
+    def __init__(self) -> None:
+        self._subscribers: dict[str, list[_MemorySubscription]] = defaultdict(list)
+        self._mutex = threading.Lock()
+
+    def publish(self, channel: str, event: dict[str, Any]) -> None:
+        with self._mutex:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            subscription.deliver(event)
+
+    async def subscribe(self, channel: str) -> _MemorySubscription:
+        subscription = _MemorySubscription(self, channel)
+        with self._mutex:
+            self._subscribers[channel].append(subscription)
+        return subscription
+
+    def unsubscribe(self, channel: str, subscription: _MemorySubscription) -> None:
+        with self._mutex:
+            members = self._subscribers.get(channel, [])
+            if subscription in members:
+                members.remove(subscription)
+
+
+@lru_cache(maxsize=1)
+def get_event_backend() -> RedisEventBackend | InMemoryEventBackend:
+    if AI_STREAM_BACKEND == "memory":
+        return InMemoryEventBackend()
+    if redis is None:
+        raise AnalysisEventsError("redis package is not installed")
+    return RedisEventBackend(REDIS_URL)
+
+
+class AnalysisEventPublisher:
+    """Publishes the stage events of one analysis run; publishing never fails the analysis."""
+
+    def __init__(self, scan_uuid: Any, *, backend: RedisEventBackend | InMemoryEventBackend | None = None) -> None:
+        self.scan_uuid = str(scan_uuid)
+        self._channel = channel_for(scan_uuid)
+        self._backend = backend
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._token_buffer: list[str] = []
+        self._token_chars = 0
+        self._last_flush = time.monotonic()
+        self._pending: Future | None = None
+
+    def emit(self, stage: str, **data: Any) -> None:
+        with self._lock:
+            self._seq += 1
+            event = {"seq": self._seq, "stage": stage, "scan_uuid": self.scan_uuid, "ts": time.time(), **data}
+            self._pending = _publish_executor.submit(self._publish, event)
+
+    def _publish(self, event: dict[str, Any]) -> None:
+        try:
+            backend = self._backend if self._backend is not None else get_event_backend()
+            backend.publish(self._channel, event)
+        except Exception as exc:
+            logger.warning("ai_analysis_events stage=publish_failed event=%s reason=%s", event["stage"], str(exc))
+
+    def close(self, timeout: float = _CLOSE_TIMEOUT_SECONDS) -> None:
+        """Wait until every emitted event has been handed to the backend."""
+        pending = self._pending
+        if pending is None:
+            return
+        try:
+            pending.result(timeout=timeout)
+        except Exception as exc:
+            logger.warning("ai_analysis_events stage=close_timeout scan_uuid=%s reason=%r", self.scan_uuid, exc)
+
+    def token_delta(self, text: str) -> None:
+        if not text:
+            return
+        self._token_buffer.append(text)
+        self._token_chars += len(text)
+        if self._token_chars >= _TOKEN_FLUSH_CHARS or time.monotonic() - self._last_flush >= _TOKEN_FLUSH_SECONDS:
+            self.flush_tokens()
+
+    def flush_tokens(self) -> None:
+        self._last_flush = time.monotonic()
+        if not self._token_buffer:
+            return
+        text = "".join(self._token_buffer)
+        self._token_buffer = []
+        self._token_chars = 0
+        self.emit("llm_delta", text=text)
+
+
+def format_sse(event: dict[str, Any]) -> str:
+    lines = []
+    if event.get("seq") is not None:
+        lines.append(f"id: {event['seq']}")
+    lines.append(f"event: {event.get('stage') or 'message'}")
+    lines.append(f"data: {json.dumps(event, default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+
+async def stream_analysis_events(
+    scan_uuid: Any,
+    *,
+    load_snapshot: Callable[[], Awaitable[dict[str, Any] | None]],
+    backend: RedisEventBackend | InMemoryEventBackend | None = None,
+    heartbeat_seconds: float | None = None,
+    timeout_seconds: float | None = None,
+) -> AsyncIterator[str]:
+    """Yield SSE frames for one scan's analysis until it completes, fails or the stream times out.
+
+    The channel is subscribed before the persisted snapshot is checked, so an analysis that
+    finishes in between is still seen: either as the snapshot or as its ``completed`` event.
+    ``load_snapshot`` returns None for a snapshot that a queued run is about to replace, so
+    the stream waits for that run instead of ending on the old result.
+    """
+    backend = backend if backend is not None else get_event_backend()
+    heartbeat = max(0.05, float(heartbeat_seconds if heartbeat_seconds is not None else AI_STREAM_HEARTBEAT_SECONDS))
+    deadline = time.monotonic() + max(0.0, float(timeout_seconds if timeout_seconds is not None else AI_STREAM_TIMEOUT_SECONDS))
+
+    subscription = await backend.subscribe(channel_for(scan_uuid))
+    try:
+        yield format_sse({"stage": "subscribed", "scan_uuid": str(scan_uuid)})
+        snapshot = await load_snapshot()
+        if snapshot is not None:
+            yield format_sse({"stage": "completed", "scan_uuid": str(scan_uuid), "analysis": snapshot})
+            return
+
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                yield format_sse({"stage": "timeout", "scan_uuid": str(scan_uuid)})
+                return
+            event = await subscription.get(timeout=min(heartbeat, remaining))
+            if event is None:
+                # SSE comment line; keeps proxies from closing an idle connection.
+                yield ": keepalive\n\n"
+                continue
+            yield format_sse(event)
+            if event.get("stage") in TERMINAL_STAGES:
+                return
+    finally:
+        try:
+            await subscription.close()
+        except Exception as exc:
+            logger.warning("ai_analysis_events stage=unsubscribe_failed scan_uuid=%s reason=%s", str(scan_uuid), str(exc))
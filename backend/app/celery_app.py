@@ -1,11 +1,19 @@
-import os
-
 from celery import Celery
+from kombu import Queue
 
-from app.config import REDIS_URL
+from app.config import (
+    AI_ANALYSIS_QUEUE,
+    CELERY_BROKER_URL,
+    CELERY_CPU_QUEUE,
+    CELERY_IO_QUEUE,
+    CELERY_QUEUE_METRICS_ENABLED,
+    CELERY_RESULT_BACKEND,
+    CELERY_VISIBILITY_TIMEOUT_SECONDS,
+)
+from app.queue_metrics import install_queue_metrics
 
-BROKER_URL = os.getenv("CELERY_BROKER_URL", REDIS_URL)
-RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND", REDIS_URL)
+BROKER_URL = CELERY_BROKER_URL
+RESULT_BACKEND = CELERY_RESULT_BACKEND
 
 celery_app = Celery(
     "qshield",
@@ -21,4 +29,26 @@ celery_app.conf.update(
     accept_content=["json"],
     timezone="Asia/Seoul",
     enable_utc=True,
+    # Network-bound clones, CPU-bound scans and LLM-bound analyses each get a queue, so a burst
+    # of one kind never starves the others; run one worker pool per queue.
+    task_queues=[Queue(CELERY_IO_QUEUE), Queue(CELERY_CPU_QUEUE), Queue(AI_ANALYSIS_QUEUE)],
+    task_default_queue=CELERY_CPU_QUEUE,
+    task_routes={
+        "clone_scan_repository": {"queue": CELERY_IO_QUEUE},
+        "scan_cloned_repository": {"queue": CELERY_CPU_QUEUE},
+        "scan_shard": {"queue": CELERY_CPU_QUEUE},
+        "merge_scan_shards": {"queue": CELERY_CPU_QUEUE},
+        "cleanup_scan_shards": {"queue": CELERY_CPU_QUEUE},
+        "run_scan_pipeline": {"queue": CELERY_CPU_QUEUE},
+        "run_ai_analysis": {"queue": AI_ANALYSIS_QUEUE},
+    },
+    # Every task here runs for seconds to minutes: take one message at a time and acknowledge it
+    # only when done, so a lost worker's task is redelivered instead of dropped.
+    task_acks_late=True,
+    task_reject_on_worker_lost=True,
+    worker_prefetch_multiplier=1,
+    broker_transport_options={"visibility_timeout": CELERY_VISIBILITY_TIMEOUT_SECONDS},
 )
+
+if CELERY_QUEUE_METRICS_ENABLED:
+    install_queue_metrics()
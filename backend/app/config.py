@@ -42,23 +42,97 @@ def _resolve_env_path(value: str | None) -> str:
 
 DATABASE_URL_SYNC = os.getenv("DATABASE_URL_SYNC")
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", REDIS_URL)
+CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND", REDIS_URL)
+CELERY_IO_QUEUE = os.getenv("CELERY_IO_QUEUE", "io").strip() or "io"
+CELERY_CPU_QUEUE = os.getenv("CELERY_CPU_QUEUE", "cpu").strip() or "cpu"
+# Redis redelivers unacknowledged (acks_late) tasks after this; keep it above the longest task.
+CELERY_VISIBILITY_TIMEOUT_SECONDS = int(os.getenv("CELERY_VISIBILITY_TIMEOUT_SECONDS", "21600"))
+CELERY_QUEUE_METRICS_ENABLED = _env_bool("CELERY_QUEUE_METRICS_ENABLED", default=True)
+# Clones land here; point it at a volume shared by io and cpu workers when they run on different hosts.
+SCAN_WORKSPACE_DIR = os.getenv("SCAN_WORKSPACE_DIR", "").strip() or None
+# Cancel flags live in Redis; running scans read them every N files or interval, whichever comes first.
+SCAN_CANCEL_BACKEND = os.getenv("SCAN_CANCEL_BACKEND", "redis").strip().lower()
+SCAN_CANCEL_CHECK_EVERY_FILES = int(os.getenv("SCAN_CANCEL_CHECK_EVERY_FILES", "25"))
+SCAN_CANCEL_CHECK_INTERVAL_SECONDS = float(os.getenv("SCAN_CANCEL_CHECK_INTERVAL_SECONDS", "2"))
+SCAN_CANCEL_TTL_SECONDS = int(os.getenv("SCAN_CANCEL_TTL_SECONDS", "86400"))
+# Stage checkpoints let a redelivered scan task resume; "disk" (default: <workspace>/qshield_checkpoints) or "postgres".
+SCAN_CHECKPOINT_ENABLED = _env_bool("SCAN_CHECKPOINT_ENABLED", default=True)
+SCAN_CHECKPOINT_BACKEND = os.getenv("SCAN_CHECKPOINT_BACKEND", "disk").strip().lower()
+SCAN_CHECKPOINT_DIR = os.getenv("SCAN_CHECKPOINT_DIR", "").strip() or None
+SCAN_CHECKPOINT_TTL_SECONDS = int(os.getenv("SCAN_CHECKPOINT_TTL_SECONDS", "172800"))
+# Copy the results of a completed scan of the same repository, commit and ruleset instead of rescanning.
+SCAN_REUSE_ENABLED = _env_bool("SCAN_REUSE_ENABLED", default=True)
+# Repositories with at least SCAN_SHARD_MIN_FILES scanner targets are scanned by parallel shard tasks.
+SCAN_SHARDING_ENABLED = _env_bool("SCAN_SHARDING_ENABLED", default=True)
+SCAN_SHARD_MIN_FILES = int(os.getenv("SCAN_SHARD_MIN_FILES", "5000"))
+SCAN_SHARD_FILES_PER_SHARD = int(os.getenv("SCAN_SHARD_FILES_PER_SHARD", "2000"))
+SCAN_SHARD_MAX_SHARDS = int(os.getenv("SCAN_SHARD_MAX_SHARDS", "32"))
 CORS_ORIGINS = os.getenv("CORS_ORIGINS", "http://localhost:5173").split(",")
 AUTH_SECRET_KEY = os.getenv("AUTH_SECRET_KEY", "dev-insecure-change-me")
 AUTH_ACCESS_TOKEN_EXPIRES_MINUTES = int(os.getenv("AUTH_ACCESS_TOKEN_EXPIRES_MINUTES", "60"))
 AUTH_ALGORITHM = "HS256"
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-5.4-pro")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "").strip()
 OPENAI_EMBEDDING_MODEL = os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-3-large")
 AI_RAG_CORPUS_PATH = _resolve_env_path(os.getenv("AI_RAG_CORPUS_PATH", ""))
 AI_RAG_CACHE_PATH = _resolve_env_path(os.getenv("AI_RAG_CACHE_PATH", ""))
 AI_VECTOR_DB_DIR = _resolve_env_path(os.getenv("AI_VECTOR_DB_DIR", "./.qshield_chroma"))
 AI_VECTOR_COLLECTION = os.getenv("AI_VECTOR_COLLECTION", "qshield_nist_rag")
+AI_VECTOR_BACKEND = os.getenv("AI_VECTOR_BACKEND", "chroma").strip().lower()
+AI_VECTOR_DTYPE = os.getenv("AI_VECTOR_DTYPE", "float32").strip().lower()
+AI_EMBEDDING_PROVIDER = os.getenv("AI_EMBEDDING_PROVIDER", "openai").strip().lower()
+AI_HASHING_EMBEDDING_DIM = int(os.getenv("AI_HASHING_EMBEDDING_DIM", "512"))
+AI_EMBEDDING_CACHE_ENABLED = _env_bool("AI_EMBEDDING_CACHE_ENABLED", default=True)
+AI_EMBEDDING_CACHE_PATH = _resolve_env_path(os.getenv("AI_EMBEDDING_CACHE_PATH", "./.qshield_embedding_cache.sqlite3"))
+AI_EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("AI_EMBEDDING_CACHE_MAX_ENTRIES", "200000"))
+AI_RAG_TEXT_CACHE_DIR = _resolve_env_path(os.getenv("AI_RAG_TEXT_CACHE_DIR", ""))
+AI_RAG_EXTRACT_WORKERS = int(os.getenv("AI_RAG_EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+AI_RAG_EMBED_CONCURRENCY = int(os.getenv("AI_RAG_EMBED_CONCURRENCY", "4"))
+AI_RAG_EMBED_MAX_RETRIES = int(os.getenv("AI_RAG_EMBED_MAX_RETRIES", "3"))
+AI_RAG_EMBED_RETRY_BACKOFF_SECONDS = float(os.getenv("AI_RAG_EMBED_RETRY_BACKOFF_SECONDS", "1.0"))
+AI_RETRIEVAL_CACHE_ENABLED = _env_bool("AI_RETRIEVAL_CACHE_ENABLED", default=True)
+AI_RETRIEVAL_CACHE_PATH = _resolve_env_path(os.getenv("AI_RETRIEVAL_CACHE_PATH", "./.qshield_retrieval_cache.sqlite3"))
+AI_RETRIEVAL_CACHE_TTL_SECONDS = int(os.getenv("AI_RETRIEVAL_CACHE_TTL_SECONDS", "86400"))
+AI_RETRIEVAL_CACHE_MAX_ENTRIES = int(os.getenv("AI_RETRIEVAL_CACHE_MAX_ENTRIES", "5000"))
 AI_RAG_TOP_K = int(os.getenv("AI_RAG_TOP_K", "4"))
+AI_RAG_PRECOMPUTE_GUIDANCE = _env_bool("AI_RAG_PRECOMPUTE_GUIDANCE", default=True)
 AI_ALLOW_DETERMINISTIC_FALLBACK = _env_bool("AI_ALLOW_DETERMINISTIC_FALLBACK", default=False)
 AI_AUTO_INGEST_ON_EMPTY_VECTOR = _env_bool("AI_AUTO_INGEST_ON_EMPTY_VECTOR", default=False)
 AI_CACHE_ENABLED = _env_bool("AI_CACHE_ENABLED", default=True)
 AI_CACHE_MAX_AGE_HOURS = int(os.getenv("AI_CACHE_MAX_AGE_HOURS", "168"))
 AI_ANALYSIS_VERSION = os.getenv("AI_ANALYSIS_VERSION", "v1")
+AI_PROMPT_TOKEN_BUDGET = int(os.getenv("AI_PROMPT_TOKEN_BUDGET", "8000"))
+AI_PROMPT_CONTEXT_TOKEN_BUDGET = int(os.getenv("AI_PROMPT_CONTEXT_TOKEN_BUDGET", "2500"))
+AI_PROMPT_MAX_EXAMPLES = int(os.getenv("AI_PROMPT_MAX_EXAMPLES", "20"))
+AI_MAP_REDUCE_ENABLED = _env_bool("AI_MAP_REDUCE_ENABLED", default=True)
+AI_MAP_REDUCE_MIN_FINDINGS = int(os.getenv("AI_MAP_REDUCE_MIN_FINDINGS", "2000"))
+AI_MAP_REDUCE_MAX_PARTITIONS = int(os.getenv("AI_MAP_REDUCE_MAX_PARTITIONS", "8"))
+AI_MAP_REDUCE_CONCURRENCY = int(os.getenv("AI_MAP_REDUCE_CONCURRENCY", "4"))
+AI_LLM_TIMEOUT_SECONDS = float(os.getenv("AI_LLM_TIMEOUT_SECONDS", "120"))
+AI_LLM_HEDGE_DELAY_SECONDS = float(os.getenv("AI_LLM_HEDGE_DELAY_SECONDS", "0"))
+AI_EMBEDDING_TIMEOUT_SECONDS = float(os.getenv("AI_EMBEDDING_TIMEOUT_SECONDS", "30"))
+AI_BREAKER_FAILURE_THRESHOLD = int(os.getenv("AI_BREAKER_FAILURE_THRESHOLD", "5"))
+AI_BREAKER_RESET_SECONDS = float(os.getenv("AI_BREAKER_RESET_SECONDS", "30"))
+AI_LLM_CACHE_ENABLED = _env_bool("AI_LLM_CACHE_ENABLED", default=True)
+AI_LLM_CACHE_PATH = _resolve_env_path(os.getenv("AI_LLM_CACHE_PATH", "./.qshield_llm_cache.sqlite3"))
+AI_LLM_CACHE_TTL_SECONDS = int(os.getenv("AI_LLM_CACHE_TTL_SECONDS", "604800"))
+AI_LLM_CACHE_MAX_ENTRIES = int(os.getenv("AI_LLM_CACHE_MAX_ENTRIES", "2000"))
+AI_SINGLE_FLIGHT_ENABLED = _env_bool("AI_SINGLE_FLIGHT_ENABLED", default=True)
+AI_SINGLE_FLIGHT_WAIT_SECONDS = float(os.getenv("AI_SINGLE_FLIGHT_WAIT_SECONDS", "180"))
+AI_SINGLE_FLIGHT_LOCK_TTL_SECONDS = float(os.getenv("AI_SINGLE_FLIGHT_LOCK_TTL_SECONDS", "600"))
+AI_SINGLE_FLIGHT_POLL_SECONDS = float(os.getenv("AI_SINGLE_FLIGHT_POLL_SECONDS", "1.0"))
+AI_INCREMENTAL_ENABLED = _env_bool("AI_INCREMENTAL_ENABLED", default=True)
+AI_INCREMENTAL_MAX_CHANGE_RATIO = float(os.getenv("AI_INCREMENTAL_MAX_CHANGE_RATIO", "0.5"))
+SINGLE_FLIGHT_BACKEND = os.getenv("SINGLE_FLIGHT_BACKEND", "redis").strip().lower()
+AI_AUTO_ANALYSIS_ENABLED = _env_bool("AI_AUTO_ANALYSIS_ENABLED", default=True)
+AI_ANALYSIS_QUEUE = os.getenv("AI_ANALYSIS_QUEUE", "ai").strip() or "ai"
+AI_ANALYSIS_RATE_LIMIT = os.getenv("AI_ANALYSIS_RATE_LIMIT", "30/m").strip() or None
+AI_STREAM_ENABLED = _env_bool("AI_STREAM_ENABLED", default=True)
+AI_STREAM_BACKEND = os.getenv("AI_STREAM_BACKEND", "redis").strip().lower()
+AI_STREAM_HEARTBEAT_SECONDS = float(os.getenv("AI_STREAM_HEARTBEAT_SECONDS", "15"))
+AI_STREAM_TIMEOUT_SECONDS = float(os.getenv("AI_STREAM_TIMEOUT_SECONDS", "600"))
 
 if not DATABASE_URL_SYNC:
     raise RuntimeError("DATABASE_URL_SYNC is not set. Check backend/.env")
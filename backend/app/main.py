@@ -1,9 +1,16 @@
-from fastapi import FastAPI
+import logging
+from uuid import UUID
+
+from fastapi import Depends, FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from app.config import CORS_ORIGINS
+from app.queue_metrics import queue_metrics
 from app.routes.auth import router as auth_router
 from app.routes.repositories import router as repositories_router
 from app.routes.scans import router as scans_router
+from app.security import require_user_uuid_from_auth_header
+
+logger = logging.getLogger(__name__)
 
 app = FastAPI(title="Q-shield Backend")
 
@@ -22,3 +29,19 @@ app.include_router(repositories_router)
 @app.get("/health")
 async def health():
     return {"ok": True}
+
+
+def get_request_user_uuid(
+    authorization: str | None = Header(default=None, alias="Authorization"),
+) -> UUID:
+    return require_user_uuid_from_auth_header(authorization)
+
+
+@app.get("/metrics/queues")
+def get_queue_metrics(_user_uuid: UUID = Depends(get_request_user_uuid)):
+    """Depth, task starts and average queue wait per Celery queue, for sizing each worker pool."""
+    try:
+        return {"queues": queue_metrics()}
+    except Exception:
+        logger.exception("queue_metrics stage=read_failed")
+        raise HTTPException(status_code=503, detail="Queue metrics unavailable")
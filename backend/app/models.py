@@ -87,6 +87,9 @@ class OAuthToken(Base):
     identity: Mapped["AuthIdentity"] = relationship(back_populates="oauth_tokens")
 
 
+SCAN_IN_FLIGHT_STATUSES = ("QUEUED", "IN_PROGRESS")
+
+
 class Scan(Base):
     __tablename__ = "scans"
 
@@ -107,6 +110,16 @@ class Scan(Base):
     progress: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
     message: Mapped[str] = mapped_column(String(300), nullable=False, default="Queued")
     error_log: Mapped[str | None] = mapped_column(Text, nullable=True)
+    # Normalized repository URL; at most one QUEUED/IN_PROGRESS scan per (user, repo_key), see ux_scans_in_flight_repo.
+    repo_key: Mapped[str | None] = mapped_column(String(500), nullable=True)
+    # (repository, commit, ruleset) identifies a scan's results; completed scans are reused by it.
+    commit_sha: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    ruleset_fingerprint: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    reused_from: Mapped[uuid_lib.UUID | None] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("scans.uuid", ondelete="SET NULL"),
+        nullable=True,
+    )
     created_at: Mapped[str] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at: Mapped[str] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
 
@@ -123,6 +136,19 @@ class Scan(Base):
     )
 
 
+class ScanCheckpoint(Base):
+    """Index of scan stage checkpoints kept as Postgres large objects (SCAN_CHECKPOINT_BACKEND=postgres)."""
+
+    __tablename__ = "scan_checkpoints"
+
+    # No FK to scans: rows outlive a deleted scan until purged, so their large objects get unlinked.
+    scan_uuid: Mapped[uuid_lib.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True)
+    stage: Mapped[str] = mapped_column(String(20), primary_key=True)
+    loid: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    size_bytes: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    created_at: Mapped[str] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
 class Finding(Base):
     __tablename__ = "findings"
 
@@ -137,6 +163,9 @@ class Finding(Base):
     line_end: Mapped[int | None] = mapped_column(Integer, nullable=True)
     evidence: Mapped[str | None] = mapped_column(Text, nullable=True)
     meta: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
+    # Promoted copies of meta->>'rule_id' / meta->>'scanner_type' so filters can use plain btree indexes.
+    rule_id: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    scanner_type: Mapped[str | None] = mapped_column(String(20), nullable=True)
 
     scan: Mapped["Scan"] = relationship(back_populates="findings")
 
@@ -199,6 +228,9 @@ class AiAnalysisSnapshot(Base):
     citations_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
     inputs_summary: Mapped[dict] = mapped_column(JSONB, nullable=False, default=dict)
     analysis_version: Mapped[str] = mapped_column(String(20), nullable=False, default="v1")
+    # Promoted from inputs_summary for the indexed algorithm-signature cache lookup.
+    algorithm_signature: Mapped[str | None] = mapped_column(Text, nullable=True)
+    analysis_mode: Mapped[str | None] = mapped_column(String(10), nullable=True)
     created_at: Mapped[str] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at: Mapped[str] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
 
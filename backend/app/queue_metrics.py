@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import logging
+import time
+from functools import lru_cache
+from typing import Any
+
+from app.config import AI_ANALYSIS_QUEUE, CELERY_BROKER_URL, CELERY_CPU_QUEUE, CELERY_IO_QUEUE
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis
+except Exception:  # pragma: no cover - optional dependency in tests
+    redis = None
+
+
+KEY_PREFIX = "qshield:queue_metrics"
+ENQUEUED_AT_HEADER = "qshield_enqueued_at"
+
+
+class QueueMetricsError(RuntimeError):
+    pass
+
+
+def metric_queues() -> list[str]:
+    return list(dict.fromkeys([CELERY_IO_QUEUE, CELERY_CPU_QUEUE, AI_ANALYSIS_QUEUE]))
+
+
+def _decode(value: Any) -> str:
+    if isinstance(value, bytes):
+        return value.decode("utf-8")
+    return str(value)
+
+
+@lru_cache(maxsize=1)
+def get_metrics_client() -> Any:
+    if redis is None:
+        raise QueueMetricsError("redis package is not installed")
+    # Depths are read from the broker's queue lists, so the metrics live next to them.
+    return redis.Redis.from_url(CELERY_BROKER_URL)
+
+
+def stamp_enqueued(headers: dict[str, Any]) -> None:
+    headers.setdefault(ENQUEUED_AT_HEADER, time.time())
+
+
+def record_task_started(queue: str, enqueued_at: float | None, *, client: Any | None = None) -> float | None:
+    """Count a task start on ``queue`` and add its queue wait; returns the wait in ms."""
+    client = client if client is not None else get_metrics_client()
+    key = f"{KEY_PREFIX}:{queue}"
+    wait_ms = None
+    client.hincrby(key, "started", 1)
+    if enqueued_at is not None:
+        wait_ms = max(0.0, (time.time() - float(enqueued_at)) * 1000)
+        client.hincrby(key, "waited", 1)
+        client.hincrbyfloat(key, "wait_ms_total", round(wait_ms, 1))
+        client.hset(key, "wait_ms_last", round(wait_ms, 1))
+    return wait_ms
+
+
+def queue_metrics(queues: list[str] | None = None, *, client: Any | None = None) -> dict[str, dict[str, Any]]:
+    """Current depth plus cumulative start count and queue wait per queue."""
+    client = client if client is not None else get_metrics_client()
+    result: dict[str, dict[str, Any]] = {}
+    for queue in queues or metric_queues():
+        raw = {_decode(name): _decode(value) for name, value in (client.hgetall(f"{KEY_PREFIX}:{queue}") or {}).items()}
+        waited = int(raw.get("waited") or 0)
+        wait_total = float(raw.get("wait_ms_total") or 0.0)
+        result[queue] = {
+            # kombu's Redis transport keeps each queue as a list named after it.
+            "depth": int(client.llen(queue)),
+            "started": int(raw.get("started") or 0),
+            "avg_wait_ms": round(wait_total / waited, 1) if waited else None,
+            "last_wait_ms": float(raw["wait_ms_last"]) if raw.get("wait_ms_last") else None,
+        }
+    return result
+
+
+def _on_before_publish(headers: dict[str, Any] | None = None, **_kwargs: Any) -> None:
+    if headers is not None:
+        stamp_enqueued(headers)
+
+
+def _on_task_prerun(task: Any = None, **_kwargs: Any) -> None:
+    request = getattr(task, "request", None)
+    if request is None:
+        return
+    queue = (getattr(request, "delivery_info", None) or {}).get("routing_key")
+    if not queue:
+        return
+    enqueued_at = getattr(request, ENQUEUED_AT_HEADER, None) or (getattr(request, "headers", None) or {}).get(
+        ENQUEUED_AT_HEADER
+    )
+    try:
+        wait_ms = record_task_started(queue, enqueued_at)
+    except Exception as exc:
+        logger.warning("queue_metrics stage=record_failed queue=%s reason=%s", queue, str(exc))
+        return
+    logger.info("queue_metrics stage=task_started queue=%s task=%s wait_ms=%s", queue, task.name, wait_ms)
+
+
+def install_queue_metrics() -> None:
+    from celery.signals import before_task_publish, task_prerun
+
+    before_task_publish.connect(_on_before_publish, weak=False, dispatch_uid="qshield_queue_metrics_publish")
+    task_prerun.connect(_on_task_prerun, weak=False, dispatch_uid="qshield_queue_metrics_prerun")
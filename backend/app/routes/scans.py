@@ -1,4 +1,9 @@
+import asyncio
+import logging
+
 from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from sqlalchemy import or_
 from datetime import datetime, timezone
@@ -6,9 +11,13 @@ from uuid import UUID
 from urllib.parse import urlparse, unquote
 
 from app.ai_analysis_store import get_ai_analysis_snapshot, serialize_ai_analysis_snapshot
-from app.db import get_db
-from app.models import InventorySnapshot, HeatmapSnapshot, Recommendation, Repository, Scan
+from app.analysis_events import stream_analysis_events
+from app.config import AI_ANALYSIS_VERSION, AI_AUTO_ANALYSIS_ENABLED
+from app.db import SessionLocal, get_db
+from app.models import SCAN_IN_FLIGHT_STATUSES, InventorySnapshot, HeatmapSnapshot, Recommendation, Repository, Scan
+from app.scan_cancellation import request_scan_cancel
 from app.scan_read_service import get_findings_response
+from app.scan_reuse import normalize_repo_url
 from app.security import require_user_uuid_from_auth_header
 from app.schemas import (
     ScanCreateRequest, ScanCreateResponse,
@@ -20,11 +29,12 @@ from app.schemas import (
     AiAnalysisResponse, AiAnalysisStartResponse,
     HeatmapResponse, HeatmapNode,
 )
-from app.tasks import run_scan_pipeline
+from app.tasks import dispatch_scan_pipeline
 from app.tasks_ai import run_ai_analysis
 
 
 router = APIRouter(prefix="/api/scans", tags=["scans"])
+logger = logging.getLogger(__name__)
 
 
 def extract_repo_name(github_url: str) -> str:
@@ -199,6 +209,40 @@ def _convert_heatmap_node(node: dict) -> HeatmapNode:
     )
 
 
+def _find_in_flight_scan(db: Session, user_uuid: UUID, repo_key: str) -> Scan | None:
+    return (
+        _scoped_scan_query(db, user_uuid)
+        .filter(Scan.repo_key == repo_key)
+        .filter(Scan.status.in_(SCAN_IN_FLIGHT_STATUSES))
+        .order_by(Scan.created_at.desc())
+        .first()
+    )
+
+
+def _cancel_in_flight_scan(scan: Scan, message: str) -> bool:
+    """Cancel ``scan``; False when the flag for its running tasks could not be set."""
+    # The status frees the in-flight slot and stops queued tasks; the flag stops running ones.
+    scan.status = "CANCELLED"
+    scan.message = message
+    if request_scan_cancel(scan.uuid):
+        return True
+    # Running tasks then scan to the end, but their conditional COMPLETED update keeps CANCELLED.
+    logger.warning("scan_cancel stage=flag_missing scan_uuid=%s running tasks finish their scan first", str(scan.uuid))
+    return False
+
+
+def _supersede_in_flight_scans(db: Session, user_uuid: UUID, repo_key: str) -> None:
+    in_flight = (
+        _scoped_scan_query(db, user_uuid)
+        .filter(Scan.repo_key == repo_key)
+        .filter(Scan.status.in_(SCAN_IN_FLIGHT_STATUSES))
+        .all()
+    )
+    for scan in in_flight:
+        _cancel_in_flight_scan(scan, "Superseded by a forced rescan")
+    db.flush()
+
+
 @router.post("", response_model=ScanCreateResponse, status_code=202)
 def create_scan(
     payload: ScanCreateRequest,
@@ -209,6 +253,15 @@ def create_scan(
     if not github_url:
         raise HTTPException(status_code=400, detail="githubUrl is required")
 
+    # Double-clicks and client retries attach to the scan already queued or running.
+    repo_key = normalize_repo_url(github_url)
+    if payload.force:
+        _supersede_in_flight_scans(db, user_uuid, repo_key)
+    else:
+        in_flight = _find_in_flight_scan(db, user_uuid, repo_key)
+        if in_flight is not None:
+            return ScanCreateResponse(uuid=str(in_flight.uuid), coalesced=True)
+
     repo_name = extract_repo_name(github_url)
     repository = _get_or_create_repository(db, user_uuid, github_url)
     repository.last_scanned_at = datetime.now(timezone.utc)
@@ -218,14 +271,23 @@ def create_scan(
         repository_id=repository.id,
         github_url=github_url,
         repo_name=repo_name,
+        repo_key=repo_key,
         status="QUEUED",
         progress=0.0,
         message="Queued",
     )
     db.add(scan)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        # A concurrent request (possibly on another replica) won ux_scans_in_flight_repo.
+        db.rollback()
+        in_flight = _find_in_flight_scan(db, user_uuid, repo_key)
+        if in_flight is None:
+            raise
+        return ScanCreateResponse(uuid=str(in_flight.uuid), coalesced=True)
     db.refresh(scan)
-    run_scan_pipeline.delay(str(scan.uuid))
+    dispatch_scan_pipeline(str(scan.uuid))
 
     return ScanCreateResponse(uuid=str(scan.uuid))
 
@@ -251,6 +313,8 @@ def get_scan_status(
         status=_map_status(scan.status),
         progress=_progress_percent(scan.progress),
         githubUrl=scan.github_url,
+        commitSha=scan.commit_sha,
+        reusedFrom=str(scan.reused_from) if scan.reused_from else None,
     )
 
 
@@ -303,19 +367,55 @@ def delete_scan(
     if not scan:
         raise HTTPException(status_code=404, detail="Scan not found")
 
+    # Stop its tasks too, or they keep scanning and fail persisting into the deleted row.
+    if scan.status in SCAN_IN_FLIGHT_STATUSES:
+        request_scan_cancel(scan.uuid)
     db.delete(scan)
     db.commit()
     return None
 
 
+@router.post("/{uuid}/cancel", response_model=ScanStatusResponse, status_code=202)
+def cancel_scan(
+    uuid: str,
+    db: Session = Depends(get_db),
+    user_uuid: UUID = Depends(get_request_user_uuid),
+):
+    try:
+        scan_uuid = UUID(uuid)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid uuid")
+
+    scan = _scoped_scan_query(db, user_uuid).filter(Scan.uuid == scan_uuid).first()
+    if not scan:
+        raise HTTPException(status_code=404, detail="Scan not found")
+
+    if scan.status in SCAN_IN_FLIGHT_STATUSES:
+        _cancel_in_flight_scan(scan, "Cancelled")
+        db.commit()
+    elif scan.status != "CANCELLED":
+        raise HTTPException(status_code=409, detail=f"Scan is already {scan.status}")
+
+    return ScanStatusResponse(
+        uuid=str(scan.uuid),
+        status=_map_status(scan.status),
+        progress=_progress_percent(scan.progress),
+        githubUrl=scan.github_url,
+        commitSha=scan.commit_sha,
+        reusedFrom=str(scan.reused_from) if scan.reused_from else None,
+    )
+
+
 @router.get("/{uuid}/findings", response_model=FindingsResponse)
 def get_findings(
     uuid: str,
     db: Session = Depends(get_db),
     scanner_type: str | None = Query(default=None),
     severity: str | None = Query(default=None),
+    rule_id: str | None = Query(default=None),
     limit: int = Query(default=50, ge=1, le=500),
     offset: int = Query(default=0, ge=0),
+    after_id: int | None = Query(default=None, ge=0),
     user_uuid: UUID = Depends(get_request_user_uuid),
 ):
     try:
@@ -328,8 +428,10 @@ def get_findings(
         scan_uuid,
         scanner_type=scanner_type,
         severity=severity,
+        rule_id=rule_id,
         limit=limit,
         offset=offset,
+        after_id=after_id,
         user_uuid=user_uuid,
     )
 
@@ -356,6 +458,8 @@ def bulk_delete_scans(
         return ScanBulkDeleteResponse(deletedCount=0)
 
     for scan in scans:
+        if scan.status in SCAN_IN_FLIGHT_STATUSES:
+            request_scan_cancel(scan.uuid)
         db.delete(scan)
     db.commit()
 
@@ -515,6 +619,11 @@ def get_recommendations(
     return RecommendationsResponse(uuid=str(scan_uuid), recommendations=items)
 
 
+def _is_fresh_snapshot(snapshot) -> bool:
+    # Error snapshots and ones from an older analysis version are recomputed on request.
+    return snapshot.analysis_version == AI_ANALYSIS_VERSION and snapshot.analysis_mode != "error"
+
+
 @router.post("/{uuid}/ai-analysis", response_model=AiAnalysisStartResponse, status_code=202)
 def create_ai_analysis(
     uuid: str,
@@ -532,18 +641,28 @@ def create_ai_analysis(
         raise HTTPException(status_code=404, detail="Scan not found")
 
     existing = get_ai_analysis_snapshot(db, scan_uuid)
-    if existing is not None and not force:
+    if existing is not None and not force and _is_fresh_snapshot(existing):
         return AiAnalysisStartResponse(
             status="READY",
             scan_id=str(scan_uuid),
             ai_analysis_id=str(existing.scan_uuid),
         )
 
+    if AI_AUTO_ANALYSIS_ENABLED and not force and scan.status in SCAN_IN_FLIGHT_STATUSES:
+        # The analysis is already chained to the running scan.
+        return AiAnalysisStartResponse(
+            status="QUEUED",
+            scan_id=str(scan_uuid),
+            ai_analysis_id=str(existing.scan_uuid) if existing else None,
+            snapshot_updated_at=existing.updated_at if existing else None,
+        )
+
     run_ai_analysis.delay(str(scan_uuid))
     return AiAnalysisStartResponse(
         status="QUEUED",
         scan_id=str(scan_uuid),
         ai_analysis_id=str(existing.scan_uuid) if existing else None,
+        snapshot_updated_at=existing.updated_at if existing else None,
     )
 
 
@@ -569,7 +688,61 @@ def get_ai_analysis(
     return serialize_ai_analysis_snapshot(snapshot)
 
 
+def _as_utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
 
 
+def _load_ai_analysis_payload(scan_uuid: UUID, after: datetime | None = None) -> dict | None:
+    # The stream outlives the request-scoped session, so it reads with its own.
+    db = SessionLocal()
+    try:
+        snapshot = get_ai_analysis_snapshot(db, scan_uuid)
+        if snapshot is None:
+            return None
+        if after is not None:
+            # The client queued a run to replace the snapshot it already has; wait for the new one.
+            if _as_utc(snapshot.updated_at) <= _as_utc(after):
+                return None
+        elif not _is_fresh_snapshot(snapshot):
+            # Stale and error snapshots are re-queued by POST /ai-analysis.
+            return None
+        return serialize_ai_analysis_snapshot(snapshot).model_dump(mode="json")
+    finally:
+        db.close()
+
+
+@router.get("/{uuid}/ai-analysis/stream")
+def stream_ai_analysis(
+    uuid: str,
+    after: datetime | None = None,
+    user_uuid: UUID = Depends(get_request_user_uuid),
+):
+    """Server-Sent Events for a running analysis: stage events, LLM deltas, then the result.
 
+    Ends with a ``completed`` event carrying the persisted analysis, a ``failed`` event, or
+    ``timeout``. An existing snapshot is sent immediately only when it is fresh, or, with
+    ``after`` (``snapshot_updated_at`` from POST /ai-analysis), when it is newer than that.
+    """
+    try:
+        scan_uuid = UUID(uuid)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid uuid")
+
+    # Not Depends(get_db): a yield dependency is only closed after the response body finishes,
+    # so every open stream would pin a pooled connection for up to AI_STREAM_TIMEOUT_SECONDS.
+    db = SessionLocal()
+    try:
+        scan_exists = _scoped_scan_query(db, user_uuid).filter(Scan.uuid == scan_uuid).first() is not None
+    finally:
+        db.close()
+    if not scan_exists:
+        raise HTTPException(status_code=404, detail="Scan not found")
 
+    return StreamingResponse(
+        stream_analysis_events(
+            scan_uuid,
+            load_snapshot=lambda: asyncio.to_thread(_load_ai_analysis_payload, scan_uuid, after),
+        ),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
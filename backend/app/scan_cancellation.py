@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from functools import lru_cache
+from typing import Any
+
+from app.config import (
+    REDIS_URL,
+    SCAN_CANCEL_BACKEND,
+    SCAN_CANCEL_CHECK_EVERY_FILES,
+    SCAN_CANCEL_CHECK_INTERVAL_SECONDS,
+    SCAN_CANCEL_TTL_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis
+except Exception:  # pragma: no cover - optional dependency in tests
+    redis = None
+
+
+KEY_PREFIX = "qshield:scan_cancel"
+
+
+class ScanCancellationError(RuntimeError):
+    pass
+
+
+class ScanCancelled(RuntimeError):
+    """Raised inside a scan task at the first cancellation point after a cancel request."""
+
+
+def _cancel_key(scan_uuid: Any) -> str:
+    return f"{KEY_PREFIX}:{scan_uuid}"
+
+
+class RedisCancelBackend:
+    def __init__(self, client: Any) -> None:
+        self._client = client
+
+    def set(self, key: str, ttl_seconds: int) -> None:
+        self._client.set(key, "1", ex=max(1, int(ttl_seconds)))
+
+    def is_set(self, key: str) -> bool:
+        return bool(self._client.exists(key))
+
+
+class InMemoryCancelBackend:
+    """Process-local stand-in with the same semantics as the Redis backend (for dev and tests)."""
+
+    def __init__(self) -> None:
+        self._flags: dict[str, float] = {}
+        self._mutex = threading.Lock()
+
+    def set(self, key: str, ttl_seconds: int) -> None:
+        with self._mutex:
+            self._flags[key] = time.monotonic() + max(1, int(ttl_seconds))
+
+    def is_set(self, key: str) -> bool:
+        with self._mutex:
+            expires_at = self._flags.get(key)
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._flags.pop(key, None)
+                return False
+            return expires_at is not None
+
+
+@lru_cache(maxsize=1)
+def get_cancel_backend() -> RedisCancelBackend | InMemoryCancelBackend:
+    if SCAN_CANCEL_BACKEND == "memory":
+        return InMemoryCancelBackend()
+    if redis is None:
+        raise ScanCancellationError("redis package is not installed")
+    return RedisCancelBackend(redis.Redis.from_url(REDIS_URL))
+
+
+def request_scan_cancel(scan_uuid: Any) -> bool:
+    """Flag a scan as cancelled for its running tasks; False if the flag could not be set."""
+    try:
+        get_cancel_backend().set(_cancel_key(scan_uuid), SCAN_CANCEL_TTL_SECONDS)
+    except Exception as exc:
+        logger.warning("scan_cancel stage=flag_failed scan_uuid=%s reason=%s", str(scan_uuid), str(exc))
+        return False
+    logger.info("scan_cancel stage=requested scan_uuid=%s", str(scan_uuid))
+    return True
+
+
+def is_scan_cancelled(scan_uuid: Any) -> bool:
+    # A flag store outage must not fail scans; they just cannot be cancelled meanwhile.
+    try:
+        return get_cancel_backend().is_set(_cancel_key(scan_uuid))
+    except Exception as exc:
+        logger.warning("scan_cancel stage=check_failed scan_uuid=%s reason=%s", str(scan_uuid), str(exc))
+        return False
+
+
+class CancellationCheck:
+    """Per-file callback for the analyzer and scanners that raises ScanCancelled once flagged.
+
+    The flag is read every ``every_files`` calls or ``interval_seconds``, whichever comes first,
+    so a cancel takes effect within one batch of files (or one slow file) without a Redis round
+    trip per file.
+    """
+
+    def __init__(
+        self,
+        scan_uuid: Any,
+        *,
+        every_files: int | None = None,
+        interval_seconds: float | None = None,
+    ) -> None:
+        self.scan_uuid = str(scan_uuid)
+        self._every_files = max(1, int(every_files if every_files is not None else SCAN_CANCEL_CHECK_EVERY_FILES))
+        self._interval = max(
+            0.0, float(interval_seconds if interval_seconds is not None else SCAN_CANCEL_CHECK_INTERVAL_SECONDS)
+        )
+        self._calls = 0
+        self._last_check = time.monotonic()
+
+    def __call__(self) -> None:
+        self._calls += 1
+        if self._calls >= self._every_files or time.monotonic() - self._last_check >= self._interval:
+            self.check()
+
+    def check(self) -> None:
+        """Read the flag now; used at stage boundaries."""
+        self._calls = 0
+        self._last_check = time.monotonic()
+        if is_scan_cancelled(self.scan_uuid):
+            raise ScanCancelled(f"Scan {self.scan_uuid} was cancelled")
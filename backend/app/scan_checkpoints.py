@@ -0,0 +1,265 @@
+"""Per-stage checkpoints for scan tasks.
+
+With ``acks_late`` a scan task whose worker dies is redelivered from the start. Each finished
+stage (clone, file analysis, SAST, SCA, Config) is saved here under the scan uuid, so the
+redelivered task resumes after the last one instead of cloning and scanning again.
+Checkpoints are removed when the scan completes, fails or is cancelled; ones left by scans that
+never finish are purged after SCAN_CHECKPOINT_TTL_SECONDS.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+import zlib
+from dataclasses import asdict
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+from app.config import (
+    SCAN_CHECKPOINT_BACKEND,
+    SCAN_CHECKPOINT_DIR,
+    SCAN_CHECKPOINT_ENABLED,
+    SCAN_CHECKPOINT_TTL_SECONDS,
+    SCAN_WORKSPACE_DIR,
+)
+from app.scan_sharding import metadata_from_dict, metadata_to_dict
+
+from models.file_metadata import ScannerTargets  # noqa: E402  (3_scanner is on sys.path via scan_sharding)
+from models.scan_result import (  # noqa: E402
+    ConfigResult,
+    ConfigScanReport,
+    SASTResult,
+    SASTScanReport,
+    SCAResult,
+    SCAScanReport,
+)
+
+logger = logging.getLogger(__name__)
+
+# zlib-compressed JSON behind a format tag; scan reports shrink to a fraction of their JSON size.
+_FORMAT_TAG = b"QSC1"
+
+_REPORT_TYPES = {
+    "sast": (SASTScanReport, SASTResult),
+    "sca": (SCAScanReport, SCAResult),
+    "config": (ConfigScanReport, ConfigResult),
+}
+
+
+class ScanCheckpointError(RuntimeError):
+    pass
+
+
+def encode_checkpoint(payload: Any) -> bytes:
+    return _FORMAT_TAG + zlib.compress(json.dumps(payload, default=str, separators=(",", ":")).encode("utf-8"), 6)
+
+
+def decode_checkpoint(data: bytes) -> Any:
+    if not data.startswith(_FORMAT_TAG):
+        raise ScanCheckpointError("Unknown checkpoint format")
+    return json.loads(zlib.decompress(data[len(_FORMAT_TAG) :]).decode("utf-8"))
+
+
+def targets_to_payload(scanner_targets: ScannerTargets) -> dict[str, list[dict[str, Any]]]:
+    return {
+        "sast": [metadata_to_dict(item) for item in scanner_targets.sast_targets],
+        "sca": [metadata_to_dict(item) for item in scanner_targets.sca_targets],
+        "config": [metadata_to_dict(item) for item in scanner_targets.config_targets],
+    }
+
+
+def targets_from_payload(payload: dict[str, list[dict[str, Any]]]) -> ScannerTargets:
+    return ScannerTargets(
+        sast_targets=[metadata_from_dict(item) for item in payload["sast"]],
+        sca_targets=[metadata_from_dict(item) for item in payload["sca"]],
+        config_targets=[metadata_from_dict(item) for item in payload["config"]],
+    )
+
+
+def report_to_payload(report: Any) -> dict[str, Any]:
+    payload = asdict(report)
+    payload.pop("scanned_at", None)
+    return payload
+
+
+def report_from_payload(kind: str, payload: dict[str, Any]) -> Any:
+    report_type, result_type = _REPORT_TYPES[kind]
+    fields = {**payload, "detailed_results": [result_type(**row) for row in payload["detailed_results"]]}
+    return report_type(**fields)
+
+
+class DiskCheckpointStore:
+    """One directory per scan; point SCAN_CHECKPOINT_DIR at the shared workspace volume."""
+
+    def __init__(self, root: str | Path) -> None:
+        self._root = Path(root)
+
+    def _path(self, scan_uuid: str, stage: str) -> Path:
+        return self._root / scan_uuid / f"{stage}.ckpt"
+
+    def save(self, scan_uuid: str, stage: str, data: bytes) -> None:
+        path = self._path(scan_uuid, stage)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp_path.write_bytes(data)
+        # Atomic, so a worker killed mid-write never leaves a truncated checkpoint behind.
+        os.replace(tmp_path, path)
+
+    def load(self, scan_uuid: str, stage: str) -> bytes | None:
+        try:
+            return self._path(scan_uuid, stage).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def delete(self, scan_uuid: str) -> None:
+        shutil.rmtree(self._root / scan_uuid, ignore_errors=True)
+
+    def purge_stale(self, max_age_seconds: float) -> int:
+        if not self._root.is_dir():
+            return 0
+        cutoff = time.time() - max_age_seconds
+        purged = 0
+        for entry in self._root.iterdir():
+            if entry.is_dir() and entry.stat().st_mtime < cutoff:
+                shutil.rmtree(entry, ignore_errors=True)
+                purged += 1
+        return purged
+
+
+class PostgresCheckpointStore:
+    """Checkpoints as Postgres large objects, indexed by the ``scan_checkpoints`` table."""
+
+    def __init__(self, engine: Any) -> None:
+        self._engine = engine
+
+    def _run(self, work: Any) -> Any:
+        # Large objects need the raw psycopg2 connection and a transaction around every access.
+        conn = self._engine.raw_connection()
+        try:
+            result = work(conn, conn.cursor())
+            conn.commit()
+            return result
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def save(self, scan_uuid: str, stage: str, data: bytes) -> None:
+        def _work(conn, cur):
+            lob = conn.lobject(0, "wb")
+            lob.write(data)
+            loid = lob.oid
+            lob.close()
+            cur.execute(
+                "SELECT loid FROM scan_checkpoints WHERE scan_uuid = %s AND stage = %s FOR UPDATE",
+                (scan_uuid, stage),
+            )
+            previous = cur.fetchone()
+            cur.execute(
+                "INSERT INTO scan_checkpoints (scan_uuid, stage, loid, size_bytes) VALUES (%s, %s, %s, %s) "
+                "ON CONFLICT (scan_uuid, stage) DO UPDATE "
+                "SET loid = EXCLUDED.loid, size_bytes = EXCLUDED.size_bytes, created_at = now()",
+                (scan_uuid, stage, loid, len(data)),
+            )
+            if previous:
+                conn.lobject(previous[0]).unlink()
+
+        self._run(_work)
+
+    def load(self, scan_uuid: str, stage: str) -> bytes | None:
+        def _work(conn, cur):
+            cur.execute("SELECT loid FROM scan_checkpoints WHERE scan_uuid = %s AND stage = %s", (scan_uuid, stage))
+            row = cur.fetchone()
+            if row is None:
+                return None
+            return bytes(conn.lobject(row[0], "rb").read())
+
+        return self._run(_work)
+
+    def _delete_where(self, clause: str, params: tuple) -> int:
+        def _work(conn, cur):
+            cur.execute(f"DELETE FROM scan_checkpoints WHERE {clause} RETURNING loid", params)
+            rows = cur.fetchall()
+            for (loid,) in rows:
+                conn.lobject(loid).unlink()
+            return len(rows)
+
+        return self._run(_work)
+
+    def delete(self, scan_uuid: str) -> None:
+        self._delete_where("scan_uuid = %s", (scan_uuid,))
+
+    def purge_stale(self, max_age_seconds: float) -> int:
+        return self._delete_where("created_at < now() - make_interval(secs => %s)", (float(max_age_seconds),))
+
+
+@lru_cache(maxsize=1)
+def get_checkpoint_store() -> DiskCheckpointStore | PostgresCheckpointStore:
+    if SCAN_CHECKPOINT_BACKEND == "postgres":
+        from app.db import engine
+
+        return PostgresCheckpointStore(engine)
+    root = SCAN_CHECKPOINT_DIR or str(Path(SCAN_WORKSPACE_DIR or tempfile.gettempdir()) / "qshield_checkpoints")
+    return DiskCheckpointStore(root)
+
+
+class ScanCheckpoints:
+    """Stage checkpoints of one scan. Store errors are logged, never raised: a checkpoint that
+    cannot be written or read only costs the redelivered task that stage's work."""
+
+    def __init__(self, scan_uuid: Any, *, store: DiskCheckpointStore | PostgresCheckpointStore | None = None) -> None:
+        self.scan_uuid = str(scan_uuid)
+        self._store = store
+        self.enabled = SCAN_CHECKPOINT_ENABLED
+
+    def _get_store(self) -> DiskCheckpointStore | PostgresCheckpointStore:
+        return self._store if self._store is not None else get_checkpoint_store()
+
+    def save(self, stage: str, payload: Any) -> None:
+        if not self.enabled:
+            return
+        try:
+            data = encode_checkpoint(payload)
+            self._get_store().save(self.scan_uuid, stage, data)
+        except Exception as exc:
+            logger.warning("scan_checkpoint stage=save_failed scan_uuid=%s name=%s reason=%s", self.scan_uuid, stage, str(exc))
+            return
+        logger.info("scan_checkpoint stage=saved scan_uuid=%s name=%s bytes=%s", self.scan_uuid, stage, len(data))
+
+    def load(self, stage: str) -> Any | None:
+        if not self.enabled:
+            return None
+        try:
+            data = self._get_store().load(self.scan_uuid, stage)
+            payload = decode_checkpoint(data) if data is not None else None
+        except Exception as exc:
+            logger.warning("scan_checkpoint stage=load_failed scan_uuid=%s name=%s reason=%s", self.scan_uuid, stage, str(exc))
+            return None
+        if payload is not None:
+            logger.info("scan_checkpoint stage=resumed scan_uuid=%s name=%s", self.scan_uuid, stage)
+        return payload
+
+    def clear(self) -> None:
+        if not self.enabled:
+            return
+        try:
+            self._get_store().delete(self.scan_uuid)
+        except Exception as exc:
+            logger.warning("scan_checkpoint stage=clear_failed scan_uuid=%s reason=%s", self.scan_uuid, str(exc))
+
+
+def purge_stale_checkpoints() -> int:
+    if not SCAN_CHECKPOINT_ENABLED:
+        return 0
+    try:
+        return get_checkpoint_store().purge_stale(SCAN_CHECKPOINT_TTL_SECONDS)
+    except Exception as exc:
+        logger.warning("scan_checkpoint stage=purge_failed reason=%s", str(exc))
+        return 0
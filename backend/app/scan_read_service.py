@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import threading
+import time
 import uuid as uuid_lib
 
 from fastapi import HTTPException
@@ -9,13 +11,49 @@ from app.models import Finding, Scan
 from app.schemas import FindingItem, FindingsResponse
 from app.severity_map import canonicalize_severity
 
+_TOTAL_CACHE_TTL_SECONDS = 300.0
+_TOTAL_CACHE_MAX_ENTRIES = 1024
+_total_cache: dict[tuple, tuple[float, int]] = {}
+_total_cache_lock = threading.Lock()
 
-def _validate_scan_access(db: Session, scan_uuid: uuid_lib.UUID, user_uuid: uuid_lib.UUID | None = None) -> None:
+
+def _scan_version(
+    db: Session,
+    scan_uuid: uuid_lib.UUID,
+    user_uuid: uuid_lib.UUID | None = None,
+    *,
+    require: bool = True,
+):
+    """The scan's ``updated_at``, which moves whenever a pipeline rewrites its findings."""
     query = db.query(Scan).filter(Scan.uuid == scan_uuid)
     if user_uuid is not None:
         query = query.filter(Scan.user_uuid == user_uuid)
-    if not query.first():
-        raise HTTPException(status_code=404, detail="Scan not found")
+    scan = query.first()
+    if scan is None:
+        if require:
+            raise HTTPException(status_code=404, detail="Scan not found")
+        return None
+    return scan.updated_at
+
+
+def _get_cached_total(cache_key: tuple) -> int | None:
+    with _total_cache_lock:
+        entry = _total_cache.get(cache_key)
+        if entry is None:
+            return None
+        stored_at, total = entry
+        if time.monotonic() - stored_at > _TOTAL_CACHE_TTL_SECONDS:
+            _total_cache.pop(cache_key, None)
+            return None
+        return total
+
+
+def _store_cached_total(cache_key: tuple, total: int) -> None:
+    with _total_cache_lock:
+        if len(_total_cache) >= _TOTAL_CACHE_MAX_ENTRIES and cache_key not in _total_cache:
+            oldest_key = min(_total_cache, key=lambda key: _total_cache[key][0])
+            _total_cache.pop(oldest_key, None)
+        _total_cache[cache_key] = (time.monotonic(), total)
 
 
 def get_findings_response(
@@ -24,32 +62,47 @@ def get_findings_response(
     *,
     scanner_type: str | None = None,
     severity: str | None = None,
+    rule_id: str | None = None,
     limit: int = 50,
     offset: int = 0,
+    after_id: int | None = None,
     user_uuid: uuid_lib.UUID | None = None,
     include_scan_validation: bool = True,
 ) -> FindingsResponse:
-    if include_scan_validation:
-        _validate_scan_access(db, scan_uuid, user_uuid=user_uuid)
+    scan_version = _scan_version(db, scan_uuid, user_uuid=user_uuid, require=include_scan_validation)
 
     query = db.query(Finding).filter(Finding.scan_uuid == scan_uuid)
 
-    if scanner_type:
-        query = query.filter(Finding.context == str(scanner_type).upper())
+    normalized_scanner_type = str(scanner_type).upper() if scanner_type else None
+    normalized_severity = None
+    if normalized_scanner_type:
+        query = query.filter(Finding.context == normalized_scanner_type)
     if severity:
         normalized_severity, _ = canonicalize_severity(severity)
         query = query.filter(Finding.severity == normalized_severity)
+    if rule_id:
+        query = query.filter(Finding.rule_id == rule_id)
+
+    # The total only changes when a scan pipeline rewrites its findings, so it is counted on the
+    # first page of a listing and reused for the deeper keyset pages. Findings are written by scan
+    # workers, out of reach of this process's cache, so the key carries the scan's updated_at,
+    # which every pipeline bumps when it persists or reuses results.
+    cache_key = (scan_uuid, scan_version, normalized_scanner_type, normalized_severity, rule_id)
+    total = _get_cached_total(cache_key) if after_id is not None else None
+    if total is None:
+        total = int(query.count())
+        _store_cached_total(cache_key, total)
 
-    total = int(query.count())
     safe_limit = max(1, min(int(limit or 50), 500))
-    safe_offset = max(0, int(offset or 0))
+    if after_id is not None:
+        # Keyset pagination: seek past the last seen id instead of scanning and discarding OFFSET rows.
+        safe_offset = 0
+        page_query = query.filter(Finding.id > int(after_id)).order_by(Finding.id.asc())
+    else:
+        safe_offset = max(0, int(offset or 0))
+        page_query = query.order_by(Finding.id.asc()).offset(safe_offset)
 
-    records = (
-        query.order_by(Finding.id.asc())
-        .offset(safe_offset)
-        .limit(safe_limit)
-        .all()
-    )
+    records = page_query.limit(safe_limit).all()
 
     items = [
         FindingItem(
@@ -66,11 +119,14 @@ def get_findings_response(
         )
         for record in records
     ]
+    next_after_id = items[-1].id if len(items) >= safe_limit else None
 
     return FindingsResponse(
         scan_id=str(scan_uuid),
         total=total,
         limit=safe_limit,
         offset=safe_offset,
+        after_id=after_id,
+        next_after_id=next_after_id,
         items=items,
     )
@@ -0,0 +1,131 @@
+"""Reuse of completed scan results by (repository, commit, ruleset).
+
+A scan's results depend only on the repository content at one commit and on the code that scans
+and normalizes it, so a completed scan with the same three values is copied into a new scan
+instead of cloning and scanning again.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import uuid as uuid_lib
+from functools import lru_cache
+from pathlib import Path
+from urllib.parse import urlparse
+
+from sqlalchemy import delete, insert, literal, select
+from sqlalchemy.orm import Session
+
+from app.models import Finding, HeatmapSnapshot, InventorySnapshot, Recommendation, Scan
+
+logger = logging.getLogger(__name__)
+
+APP_DIR = Path(__file__).parent
+PROJECT_DIR = APP_DIR.parent.parent
+SCANNER_PATH = PROJECT_DIR / "3_scanner"
+
+# Everything that decides what a scan persists: scanner rules and code, and the backend's
+# normalization of their reports.
+RULESET_SOURCES = (
+    SCANNER_PATH / "scanners",
+    SCANNER_PATH / "language_detector",
+    SCANNER_PATH / "config.py",
+    APP_DIR / "tasks.py",
+    APP_DIR / "scan_sharding.py",
+    APP_DIR / "severity_map.py",
+    APP_DIR / "scoring",
+)
+_RULESET_SUFFIXES = {".py", ".json", ".yaml", ".yml"}
+
+# Result tables copied into a reusing scan, keyed by scan_uuid.
+_RESULT_MODELS = (InventorySnapshot, HeatmapSnapshot, Recommendation, Finding)
+
+_CANDIDATE_LIMIT = 20
+
+
+def _ruleset_files(source: Path) -> list[Path]:
+    if source.is_file():
+        return [source]
+    if not source.is_dir():
+        return []
+    return sorted(
+        path
+        for path in source.rglob("*")
+        if path.is_file() and path.suffix in _RULESET_SUFFIXES and "__pycache__" not in path.parts
+    )
+
+
+@lru_cache(maxsize=1)
+def ruleset_fingerprint() -> str:
+    """SHA-256 over the scanner rules and result normalization code this process runs."""
+    digest = hashlib.sha256()
+    for source in RULESET_SOURCES:
+        for path in _ruleset_files(source):
+            digest.update(path.relative_to(PROJECT_DIR).as_posix().encode("utf-8"))
+            digest.update(b"\0")
+            digest.update(path.read_bytes())
+            digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def normalize_repo_url(url: str) -> str:
+    """``https://GitHub.com/Org/Repo.git/`` and ``https://github.com/org/repo`` name the same repository."""
+    parsed = urlparse((url or "").strip())
+    path = parsed.path.strip("/")
+    if path.endswith(".git"):
+        path = path[:-4]
+    return f"{(parsed.hostname or '').lower()}/{path.lower()}"
+
+
+def find_reusable_scan(db: Session, scan: Scan) -> Scan | None:
+    """Newest completed scan of the same repository, commit and ruleset, from any user."""
+    if not scan.commit_sha or not scan.ruleset_fingerprint:
+        return None
+    candidates = (
+        db.query(Scan)
+        .filter(Scan.status == "COMPLETED")
+        .filter(Scan.commit_sha == scan.commit_sha)
+        .filter(Scan.ruleset_fingerprint == scan.ruleset_fingerprint)
+        .filter(Scan.uuid != scan.uuid)
+        .order_by(Scan.updated_at.desc())
+        .limit(_CANDIDATE_LIMIT)
+        .all()
+    )
+    # Forks share commits; only the same repository yields identical results (e.g. the heatmap root name).
+    repo_key = normalize_repo_url(scan.github_url)
+    return next((candidate for candidate in candidates if normalize_repo_url(candidate.github_url) == repo_key), None)
+
+
+def copy_statements(source_uuid: uuid_lib.UUID, target_uuid: uuid_lib.UUID) -> list:
+    """Statements replacing the target scan's result rows with copies of the source scan's."""
+    statements = []
+    for model in _RESULT_MODELS:
+        table = model.__table__
+        columns = [column for column in table.columns if column.name not in ("id", "scan_uuid")]
+        source_rows = select(literal(target_uuid, type_=table.c.scan_uuid.type), *columns).where(
+            table.c.scan_uuid == source_uuid
+        )
+        if "id" in table.c:
+            source_rows = source_rows.order_by(table.c.id)
+        statements.append(delete(table).where(table.c.scan_uuid == target_uuid))
+        statements.append(insert(table).from_select(["scan_uuid", *[column.name for column in columns]], source_rows))
+    return statements
+
+
+def reuse_scan_results(db: Session, scan: Scan, source: Scan) -> None:
+    """Copy ``source``'s results into ``scan`` and complete it, in one transaction."""
+    for statement in copy_statements(source.uuid, scan.uuid):
+        db.execute(statement)
+    # Point at the scan that actually ran, not at another copy.
+    scan.reused_from = source.reused_from or source.uuid
+    scan.status = "COMPLETED"
+    scan.progress = 1.0
+    scan.message = f"Scan completed (reused results for commit {scan.commit_sha[:12]})"
+    db.commit()
+    logger.info(
+        "scan_reuse stage=reused scan_uuid=%s source=%s commit=%s",
+        str(scan.uuid),
+        str(scan.reused_from),
+        scan.commit_sha,
+    )
@@ -0,0 +1,196 @@
+"""Fan-out scanning for very large repositories.
+
+The file walk runs once; its scanner targets are split into size-balanced shards and written to
+a plan next to the clone, in the shared scan workspace. Each shard task scans its slice and
+writes a partial report beside the plan; the merge step rebuilds full SAST/SCA/Config reports
+in the original target order, so the persisted results match an unsharded scan.
+"""
+
+from __future__ import annotations
+
+import heapq
+import json
+import math
+import os
+import shutil
+import sys
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any
+
+from app.config import SCAN_SHARD_FILES_PER_SHARD, SCAN_SHARD_MAX_SHARDS, SCAN_SHARD_MIN_FILES
+
+SCANNER_PATH = Path(__file__).parent.parent.parent / "3_scanner"
+if str(SCANNER_PATH) not in sys.path:
+    sys.path.insert(0, str(SCANNER_PATH))
+
+from models.file_metadata import FileCategory, FileMetadata  # noqa: E402
+from models.scan_result import (  # noqa: E402
+    ConfigResult,
+    ConfigScanReport,
+    SASTResult,
+    SASTScanReport,
+    SCAResult,
+    SCAScanReport,
+)
+from scanners.config.scanner import build_report as build_config_report  # noqa: E402
+from scanners.sast.scanner import build_report as build_sast_report  # noqa: E402
+from scanners.sca.scanner import build_report as build_sca_report  # noqa: E402
+
+TARGET_KINDS = ("sast", "sca", "config")
+
+
+class ScanShardError(RuntimeError):
+    pass
+
+
+def shard_dir(repo_path: str) -> Path:
+    path = Path(repo_path)
+    return path.parent / f"{path.name}.shards"
+
+
+def shard_count_for(total_targets: int) -> int:
+    """Shards to use for ``total_targets`` files; below 2 the repository is scanned in one task."""
+    if total_targets < max(1, SCAN_SHARD_MIN_FILES):
+        return 0
+    count = min(max(1, SCAN_SHARD_MAX_SHARDS), math.ceil(total_targets / max(1, SCAN_SHARD_FILES_PER_SHARD)))
+    return count if count >= 2 else 0
+
+
+def balance_shards(sizes: list[int], shard_count: int) -> list[list[int]]:
+    """Assign item indexes to ``shard_count`` shards, largest first onto the lightest shard."""
+    heap = [(0, shard) for shard in range(shard_count)]
+    shards: list[list[int]] = [[] for _ in range(shard_count)]
+    for index in sorted(range(len(sizes)), key=lambda item: (-sizes[item], item)):
+        load, shard = heapq.heappop(heap)
+        shards[shard].append(index)
+        # Count every file as at least 1 KiB so many tiny files still spread out.
+        heapq.heappush(heap, (load + max(1024, sizes[index]), shard))
+    return [sorted(members) for members in shards]
+
+
+def metadata_to_dict(metadata: FileMetadata) -> dict[str, Any]:
+    payload = asdict(metadata)
+    payload["category"] = metadata.category.value
+    payload.pop("created_at", None)
+    return payload
+
+
+def metadata_from_dict(payload: dict[str, Any]) -> FileMetadata:
+    return FileMetadata(**{**payload, "category": FileCategory(payload["category"])})
+
+
+def _write_json(path: Path, payload: Any) -> None:
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_text(json.dumps(payload, default=str), encoding="utf-8")
+    # Atomic so the merge step and progress counting never read a half-written file.
+    os.replace(tmp_path, path)
+
+
+def write_shard_plan(scanner_targets: Any, repo_path: str) -> int:
+    """Write the shard plan for a repository's scanner targets; returns the shard count (0 = do not shard)."""
+    targets = {
+        "sast": list(scanner_targets.sast_targets),
+        "sca": list(scanner_targets.sca_targets),
+        "config": list(scanner_targets.config_targets),
+    }
+    items = [(kind, index) for kind in TARGET_KINDS for index in range(len(targets[kind]))]
+    shard_count = shard_count_for(len(items))
+    if not shard_count:
+        return 0
+
+    sizes = [int(targets[kind][index].size_bytes or 0) for kind, index in items]
+    shards = []
+    for members in balance_shards(sizes, shard_count):
+        shard: dict[str, list[int]] = {kind: [] for kind in TARGET_KINDS}
+        for member in members:
+            kind, index = items[member]
+            shard[kind].append(index)
+        shards.append(shard)
+
+    directory = shard_dir(repo_path)
+    shutil.rmtree(directory, ignore_errors=True)
+    directory.mkdir(parents=True)
+    _write_json(
+        directory / "plan.json",
+        {
+            "targets": {kind: [metadata_to_dict(item) for item in targets[kind]] for kind in TARGET_KINDS},
+            "shards": shards,
+        },
+    )
+    return shard_count
+
+
+def _load_plan(repo_path: str) -> dict[str, Any]:
+    path = shard_dir(repo_path) / "plan.json"
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError) as exc:
+        raise ScanShardError(f"Shard plan is unavailable at {path}: {exc}") from exc
+
+
+def load_shard_targets(repo_path: str, shard_index: int) -> dict[str, list[tuple[int, FileMetadata]]]:
+    plan = _load_plan(repo_path)
+    shard = plan["shards"][shard_index]
+    return {
+        kind: [(index, metadata_from_dict(plan["targets"][kind][index])) for index in shard[kind]]
+        for kind in TARGET_KINDS
+    }
+
+
+def write_partial_report(
+    repo_path: str,
+    shard_index: int,
+    *,
+    targets: dict[str, list[tuple[int, FileMetadata]]],
+    sast_report: SASTScanReport,
+    sca_report: SCAScanReport,
+    config_report: ConfigScanReport,
+) -> int:
+    """Store one shard's per-file results, keyed by target index; returns the shards finished so far."""
+    reports = {"sast": sast_report, "sca": sca_report, "config": config_report}
+    payload = {}
+    for kind in TARGET_KINDS:
+        results = reports[kind].detailed_results
+        if len(results) != len(targets[kind]):
+            raise ScanShardError(f"{kind} scanner returned {len(results)} results for {len(targets[kind])} targets")
+        payload[kind] = [[index, asdict(result)] for (index, _), result in zip(targets[kind], results)]
+    _write_json(shard_dir(repo_path) / f"shard_{shard_index:04d}.json", payload)
+    return finished_shard_count(repo_path)
+
+
+def partial_report_exists(repo_path: str, shard_index: int) -> bool:
+    return (shard_dir(repo_path) / f"shard_{shard_index:04d}.json").exists()
+
+
+def finished_shard_count(repo_path: str) -> int:
+    return len(list(shard_dir(repo_path).glob("shard_*.json")))
+
+
+def _ordered_results(partials: list[dict[str, Any]], kind: str) -> list[dict[str, Any]]:
+    rows = [row for partial in partials for row in partial[kind]]
+    return [result for _, result in sorted(rows, key=lambda row: row[0])]
+
+
+def merge_partial_reports(repo_path: str, shard_count: int) -> tuple[SASTScanReport, SCAScanReport, ConfigScanReport]:
+    """Rebuild full reports from every shard, in the original target order."""
+    directory = shard_dir(repo_path)
+    partials = []
+    for shard_index in range(shard_count):
+        path = directory / f"shard_{shard_index:04d}.json"
+        try:
+            partials.append(json.loads(path.read_text(encoding="utf-8")))
+        except (OSError, ValueError) as exc:
+            raise ScanShardError(f"Shard {shard_index} report is unavailable: {exc}") from exc
+
+    # The scanners' own aggregation, so sharded and unsharded reports cannot drift apart.
+    return (
+        build_sast_report([SASTResult(**row) for row in _ordered_results(partials, "sast")]),
+        build_sca_report([SCAResult(**row) for row in _ordered_results(partials, "sca")]),
+        build_config_report([ConfigResult(**row) for row in _ordered_results(partials, "config")]),
+    )
+
+
+def remove_shard_dir(repo_path: str | None) -> None:
+    if repo_path:
+        shutil.rmtree(shard_dir(repo_path), ignore_errors=True)
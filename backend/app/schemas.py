@@ -8,9 +8,11 @@ from app.ai_module.schemas import AiAnalysisResponse, AiAnalysisStartResponse
 class ScanCreateRequest(BaseModel):
     github_url: Optional[str] = None
     githubUrl: Optional[str] = None
+    force: bool = False
 
 class ScanCreateResponse(BaseModel):
     uuid: str
+    coalesced: bool = False
 
 
 # 2) GET /api/scans/{uuid}/status
@@ -19,6 +21,8 @@ class ScanStatusResponse(BaseModel):
     status: str
     progress: int = Field(ge=0, le=100)
     githubUrl: Optional[str] = None
+    commitSha: Optional[str] = None
+    reusedFrom: Optional[str] = None
 
 
 # 3) GET /api/scans
@@ -100,6 +104,8 @@ class FindingsResponse(BaseModel):
     total: int
     limit: int
     offset: int
+    after_id: Optional[int] = None
+    next_after_id: Optional[int] = None
     items: List[FindingItem]
 
 
@@ -31,16 +31,20 @@ def build_score_signals_from_reports(sast_report, sca_report) -> list[dict[str,
     return signals
 
 
+def build_score_signal_from_finding(finding: dict) -> dict[str, str | None]:
+    meta = finding.get("meta") or {}
+    algorithm = finding.get("algorithm")
+    if not algorithm:
+        algorithm = infer_algorithm_from_library(meta.get("library") or finding.get("type"))
+    return _build_signal(finding.get("severity"), algorithm)
+
+
 def build_score_signals_from_findings(findings: Iterable[dict]) -> list[dict[str, str | None]]:
     signals: list[dict[str, str | None]] = []
     for finding in findings:
         if not isinstance(finding, dict):
             continue
-        meta = finding.get("meta") or {}
-        algorithm = finding.get("algorithm")
-        if not algorithm:
-            algorithm = infer_algorithm_from_library(meta.get("library") or finding.get("type"))
-        signals.append(_build_signal(finding.get("severity"), algorithm))
+        signals.append(build_score_signal_from_finding(finding))
     return signals
 
 
@@ -53,8 +57,7 @@ def calculate_weighted_total(signals: Iterable[dict[str, str | None]]) -> float:
     return total
 
 
-def compute_pqc_readiness_score(signals: Iterable[dict[str, str | None]], scale: int = 10) -> int:
-    weighted_total = calculate_weighted_total(signals)
+def pqc_readiness_score_from_total(weighted_total: float, scale: int = 10) -> int:
     if weighted_total <= 0:
         return 100 if scale == 100 else 10
 
@@ -65,17 +68,29 @@ def compute_pqc_readiness_score(signals: Iterable[dict[str, str | None]], scale:
     return legacy_score
 
 
-def compute_risk_score(signals: Iterable[dict[str, str | None]]) -> int:
-    weighted_total = calculate_weighted_total(signals)
+def risk_score_from_total(weighted_total: float) -> int:
     if weighted_total <= 0:
         return 0
     normalized = min(1.0, weighted_total / 27.0)
     return int(round(normalized * 100))
 
 
+def severity_weighted_index_from_total(weighted_total: float, signal_count: int) -> float:
+    if signal_count <= 0:
+        return 0.0
+    return round(weighted_total / signal_count, 4)
+
+
+def compute_pqc_readiness_score(signals: Iterable[dict[str, str | None]], scale: int = 10) -> int:
+    return pqc_readiness_score_from_total(calculate_weighted_total(signals), scale=scale)
+
+
+def compute_risk_score(signals: Iterable[dict[str, str | None]]) -> int:
+    return risk_score_from_total(calculate_weighted_total(signals))
+
+
 def compute_severity_weighted_index(signals: Iterable[dict[str, str | None]]) -> float:
     signal_list = [signal for signal in signals if isinstance(signal, dict)]
     if not signal_list:
         return 0.0
-    weighted_total = calculate_weighted_total(signal_list)
-    return round(weighted_total / len(signal_list), 4)
+    return severity_weighted_index_from_total(calculate_weighted_total(signal_list), len(signal_list))
@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import threading
+import time
+import uuid as uuid_lib
+from collections import Counter
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any
+
+from app.config import REDIS_URL, SINGLE_FLIGHT_BACKEND
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis
+except Exception:  # pragma: no cover - optional dependency in tests
+    redis = None
+
+
+KEY_PREFIX = "qshield:single_flight"
+METRICS_KEY = f"{KEY_PREFIX}:metrics"
+
+# Delete the lock only if it is still held by the caller's token.
+_RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class SingleFlightError(RuntimeError):
+    pass
+
+
+class RedisLockBackend:
+    def __init__(self, client: Any) -> None:
+        self._client = client
+        self._release = client.register_script(_RELEASE_SCRIPT)
+
+    def acquire(self, key: str, token: str, ttl_ms: int) -> bool:
+        return bool(self._client.set(key, token, nx=True, px=max(1, int(ttl_ms))))
+
+    def release(self, key: str, token: str) -> None:
+        self._release(keys=[key], args=[token])
+
+    def is_locked(self, key: str) -> bool:
+        return bool(self._client.exists(key))
+
+    def incr_metric(self, name: str, amount: int = 1) -> None:
+        self._client.hincrby(METRICS_KEY, name, amount)
+
+    def metrics(self) -> dict[str, int]:
+        raw = self._client.hgetall(METRICS_KEY) or {}
+        return {_decode(name): int(value) for name, value in raw.items()}
+
+
+class InMemoryLockBackend:
+    """Process-local stand-in with the same semantics as the Redis backend (for dev and tests)."""
+
+    def __init__(self) -> None:
+        self._locks: dict[str, tuple[str, float]] = {}
+        self._metrics: Counter[str] = Counter()
+        self._mutex = threading.Lock()
+
+    def _purge_expired(self, key: str) -> None:
+        entry = self._locks.get(key)
+        if entry is not None and entry[1] <= time.monotonic():
+            self._locks.pop(key, None)
+
+    def acquire(self, key: str, token: str, ttl_ms: int) -> bool:
+        with self._mutex:
+            self._purge_expired(key)
+            if key in self._locks:
+                return False
+            self._locks[key] = (token, time.monotonic() + max(1, int(ttl_ms)) / 1000.0)
+            return True
+
+    def release(self, key: str, token: str) -> None:
+        with self._mutex:
+            entry = self._locks.get(key)
+            if entry is not None and entry[0] == token:
+                self._locks.pop(key, None)
+
+    def is_locked(self, key: str) -> bool:
+        with self._mutex:
+            self._purge_expired(key)
+            return key in self._locks
+
+    def incr_metric(self, name: str, amount: int = 1) -> None:
+        with self._mutex:
+            self._metrics[name] += amount
+
+    def metrics(self) -> dict[str, int]:
+        with self._mutex:
+            return dict(self._metrics)
+
+
+def _decode(value: Any) -> str:
+    if isinstance(value, bytes):
+        return value.decode("utf-8")
+    return str(value)
+
+
+@lru_cache(maxsize=1)
+def get_lock_backend() -> RedisLockBackend | InMemoryLockBackend:
+    if SINGLE_FLIGHT_BACKEND == "memory":
+        return InMemoryLockBackend()
+    if redis is None:
+        raise SingleFlightError("redis package is not installed")
+    return RedisLockBackend(redis.Redis.from_url(REDIS_URL))
+
+
+def build_flight_key(namespace: str, *parts: str) -> str:
+    digest = hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+    return f"{KEY_PREFIX}:{namespace}:{digest}"
+
+
+@dataclass
+class FlightLease:
+    key: str
+    token: str
+
+
+class SingleFlight:
+    """Distributed single-flight: one holder computes, other callers wait for its result."""
+
+    def __init__(
+        self,
+        namespace: str,
+        *,
+        lock_ttl_seconds: float,
+        backend: RedisLockBackend | InMemoryLockBackend | None = None,
+    ) -> None:
+        self._namespace = namespace
+        self._lock_ttl_ms = int(max(1.0, float(lock_ttl_seconds)) * 1000)
+        self._backend = backend
+
+    @property
+    def backend(self) -> RedisLockBackend | InMemoryLockBackend:
+        if self._backend is None:
+            self._backend = get_lock_backend()
+        return self._backend
+
+    def try_acquire(self, *parts: str) -> FlightLease | None:
+        key = build_flight_key(self._namespace, *parts)
+        token = uuid_lib.uuid4().hex
+        if self.backend.acquire(key, token, self._lock_ttl_ms):
+            return FlightLease(key=key, token=token)
+        return None
+
+    def release(self, lease: FlightLease) -> None:
+        try:
+            self.backend.release(lease.key, lease.token)
+        except Exception as exc:
+            # The lock expires on its own; a failed release only delays waiting callers.
+            logger.warning("single_flight stage=release_failed key=%s reason=%s", lease.key, str(exc))
+
+    def record(self, outcome: str) -> None:
+        try:
+            self.backend.incr_metric(f"{self._namespace}:{outcome}")
+        except Exception as exc:
+            logger.warning("single_flight stage=metric_failed outcome=%s reason=%s", outcome, str(exc))
+
+    def metrics(self) -> dict[str, int]:
+        prefix = f"{self._namespace}:"
+        return {
+            name[len(prefix):]: count
+            for name, count in self.backend.metrics().items()
+            if name.startswith(prefix)
+        }
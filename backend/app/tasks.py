@@ -7,12 +7,38 @@ import time
 import uuid as uuid_lib
 from pathlib import Path
 
+from celery import chain, chord
+from celery.exceptions import Ignore
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
 from app.celery_app import celery_app
-from app.config import DATABASE_URL_SYNC
-from app.models import Finding, HeatmapSnapshot, InventorySnapshot, Recommendation, Scan
+from app.config import (
+    AI_AUTO_ANALYSIS_ENABLED,
+    DATABASE_URL_SYNC,
+    SCAN_REUSE_ENABLED,
+    SCAN_SHARDING_ENABLED,
+    SCAN_WORKSPACE_DIR,
+)
+from app.models import SCAN_IN_FLIGHT_STATUSES, Finding, HeatmapSnapshot, InventorySnapshot, Recommendation, Scan
+from app.scan_checkpoints import (
+    ScanCheckpoints,
+    purge_stale_checkpoints,
+    report_from_payload,
+    report_to_payload,
+    targets_from_payload,
+    targets_to_payload,
+)
+from app.scan_cancellation import CancellationCheck, ScanCancelled, is_scan_cancelled, request_scan_cancel
+from app.scan_reuse import find_reusable_scan, reuse_scan_results, ruleset_fingerprint
+from app.scan_sharding import (
+    load_shard_targets,
+    merge_partial_reports,
+    partial_report_exists,
+    remove_shard_dir,
+    write_partial_report,
+    write_shard_plan,
+)
 from app.scoring import build_score_signals_from_reports, compute_pqc_readiness_score
 from app.scoring.criteria import score_signal_points
 from app.severity_map import CANONICAL_SEVERITIES, canonicalize_severity
@@ -26,7 +52,7 @@ from language_detector.repository_analyzer import RepositoryAnalyzer  # noqa: E4
 from scanners.config.scanner import ConfigScanner  # noqa: E402
 from scanners.sast.scanner import SASTScanner  # noqa: E402
 from scanners.sca.scanner import SCAScanner  # noqa: E402
-from utils.git_utils import clone_repository  # noqa: E402
+from utils.git_utils import clone_repository, get_head_commit, resolve_remote_head  # noqa: E402
 
 # Celery runs outside FastAPI dependency scope, create a local session.
 engine = create_engine(DATABASE_URL_SYNC, echo=False, pool_pre_ping=True)
@@ -34,12 +60,195 @@ SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
 logger = logging.getLogger(__name__)
 
 
+def _mark_scan_failed(db, scan_uuid_obj, error: Exception) -> None:
+    try:
+        if scan_uuid_obj is not None:
+            scan = db.query(Scan).filter(Scan.uuid == scan_uuid_obj).first()
+            # A cancelled scan's tasks fail on purpose (or on its removed clone); keep CANCELLED.
+            if scan and scan.status != "CANCELLED":
+                scan.status = "FAILED"
+                scan.progress = float(scan.progress or 0.0)
+                scan.message = f"Error: {str(error)}"
+                if hasattr(scan, "error_log"):
+                    scan.error_log = str(error)
+                db.commit()
+    except Exception:
+        pass
+
+
+def _mark_scan_cancelled(db, scan_uuid_obj) -> None:
+    # The cancel endpoint already set CANCELLED; this covers a flag set without the row update.
+    try:
+        if scan_uuid_obj is not None:
+            db.rollback()
+            db.query(Scan).filter(Scan.uuid == scan_uuid_obj, Scan.status.in_(SCAN_IN_FLIGHT_STATUSES)).update(
+                {"status": "CANCELLED", "message": "Cancelled"},
+                synchronize_session=False,
+            )
+            db.commit()
+    except Exception:
+        pass
+
+
+def _mark_scan_completed(db, scan_uuid_obj) -> bool:
+    """Complete the scan unless it was cancelled meanwhile; False when it no longer was in flight."""
+    # Conditional, so a cancel after the last cancellation point (or one whose flag could not be
+    # set) is not overwritten.
+    completed = (
+        db.query(Scan)
+        .filter(Scan.uuid == scan_uuid_obj, Scan.status.in_(SCAN_IN_FLIGHT_STATUSES))
+        .update(
+            {"status": "COMPLETED", "progress": 1.0, "message": "Scan completed successfully"},
+            synchronize_session=False,
+        )
+    )
+    db.commit()
+    return bool(completed)
+
+
+def _abort_cancelled(db, scan_uuid_obj, repo_path: str | None) -> None:
+    """Release everything a cancelled scan holds, then stop the task and the rest of its workflow."""
+    _mark_scan_cancelled(db, scan_uuid_obj)
+    if scan_uuid_obj is not None:
+        ScanCheckpoints(scan_uuid_obj).clear()
+    remove_shard_dir(repo_path)
+    _remove_clone(repo_path)
+    logger.info("scan_cancel stage=aborted scan_uuid=%s", str(scan_uuid_obj))
+    # Ignore acknowledges the message without a result, so chained tasks (the AI analysis) never run.
+    raise Ignore()
+
+
+def _ensure_in_flight(scan, scan_uuid: str) -> None:
+    # Cancelled, superseded by a forced rescan, or deleted while queued.
+    if scan is None or scan.status not in SCAN_IN_FLIGHT_STATUSES:
+        raise ScanCancelled(f"Scan {scan_uuid} is no longer queued or running")
+
+
+def _reuse_previous_scan(db, scan) -> bool:
+    """Complete ``scan`` from an earlier scan of the same commit and ruleset, without cloning.
+
+    The commit is resolved with an anonymous ``git ls-remote``, the same access the clone has,
+    so results are only shared for repositories the requester could have cloned anyway.
+    """
+    if not SCAN_REUSE_ENABLED:
+        return False
+    scan.ruleset_fingerprint = ruleset_fingerprint()
+    scan.commit_sha = resolve_remote_head(scan.github_url)
+    db.commit()
+    source = find_reusable_scan(db, scan)
+    if source is None:
+        return False
+    reuse_scan_results(db, scan, source)
+    return True
+
+
+def _record_scanned_commit(scan, repo_path: str) -> None:
+    # The remote HEAD may have moved since it was resolved; record what was actually scanned.
+    scan.commit_sha = get_head_commit(repo_path) or scan.commit_sha
+    scan.ruleset_fingerprint = ruleset_fingerprint()
+
+
+def _saved_clone(checkpoints: ScanCheckpoints) -> dict:
+    """The clone checkpoint, if its directory survived the worker that made it."""
+    saved = checkpoints.load("clone") or {}
+    return saved if os.path.isdir(saved.get("repo_path") or "") else {}
+
+
+def _checkpoint_clone(checkpoints: ScanCheckpoints, scan, repo_path: str) -> None:
+    if _saved_clone(checkpoints).get("repo_path") == repo_path:
+        return
+    # Later stages hold absolute paths into the clone they were made from; drop those of another clone.
+    checkpoints.clear()
+    checkpoints.save("clone", {"repo_path": repo_path, "commit_sha": scan.commit_sha})
+
+
+def _checkpointed_report(checkpoints: ScanCheckpoints, kind: str, run_scanner):
+    payload = checkpoints.load(kind)
+    if payload is not None:
+        return report_from_payload(kind, payload)
+    report = run_scanner()
+    checkpoints.save(kind, report_to_payload(report))
+    return report
+
+
+def _remove_clone(repo_path: str | None) -> None:
+    if repo_path and os.path.exists(repo_path):
+        try:
+            shutil.rmtree(repo_path)
+        except Exception:
+            pass
+
+
+@celery_app.task(name="clone_scan_repository")
+def clone_scan_repository(scan_uuid: str) -> str | None:
+    """Clone the scan's repository into SCAN_WORKSPACE_DIR (io queue); returns the clone path."""
+    purge_stale_checkpoints()
+    db = SessionLocal()
+    scan_uuid_obj = None
+    repo_path = None
+    checkpoints = ScanCheckpoints(scan_uuid)
+    try:
+        scan_uuid_obj = uuid_lib.UUID(scan_uuid)
+        scan = db.query(Scan).filter(Scan.uuid == scan_uuid_obj).first()
+        _ensure_in_flight(scan, scan_uuid)
+        # Redelivered after the clone finished: hand on the same clone.
+        repo_path = _saved_clone(checkpoints).get("repo_path")
+        if repo_path:
+            return repo_path
+        scan.status = "IN_PROGRESS"
+        scan.progress = 0.05
+        scan.message = "Resolving commit..."
+        db.commit()
+        if _reuse_previous_scan(db, scan):
+            return None
+        scan.progress = 0.10
+        scan.message = "Cloning repository..."
+        db.commit()
+        repo_path = clone_repository(scan.github_url, base_dir=SCAN_WORKSPACE_DIR)
+        CancellationCheck(scan_uuid).check()
+        _checkpoint_clone(checkpoints, scan, repo_path)
+        return repo_path
+    except ScanCancelled:
+        _abort_cancelled(db, scan_uuid_obj, repo_path)
+    except Exception as e:
+        _mark_scan_failed(db, scan_uuid_obj, e)
+        raise
+    finally:
+        db.close()
+
+
+@celery_app.task(name="scan_cloned_repository", bind=True)
+def scan_cloned_repository(self, repo_path: str | None, scan_uuid: str):
+    """Scan a clone made by clone_scan_repository (cpu queue), then remove it.
+
+    ``repo_path`` is None when the clone was skipped because earlier results were reused.
+
+    Large repositories are replaced by a chord of scan_shard tasks and merge_scan_shards; the
+    rest of the workflow chain (the AI analysis) runs after the merge.
+    """
+    if repo_path is None:
+        return
+    shard_count = _run_scan(scan_uuid, repo_path, allow_sharding=True)
+    if shard_count:
+        return self.replace(build_shard_workflow(scan_uuid, repo_path, shard_count))
+
+
 @celery_app.task(name="run_scan_pipeline")
 def run_scan_pipeline(scan_uuid: str):
+    """Clone and scan in one task; kept for callers that enqueue a scan directly."""
+    purge_stale_checkpoints()
+    _run_scan(scan_uuid, None)
+
+
+def _run_scan(scan_uuid: str, repo_path: str | None, *, allow_sharding: bool = False) -> int:
+    """Scan a repository and persist the results; returns the shard count when the scan was sharded instead."""
     db = SessionLocal()
     scan_uuid_obj = None
-    repo_path = None
     scan = None
+    shard_count = 0
+    cancel_check = CancellationCheck(scan_uuid)
+    # Stage outputs survive a killed worker, so the redelivered task resumes after the last one.
+    checkpoints = ScanCheckpoints(scan_uuid)
 
     def _update(status=None, progress=None, message=None, error_log=None):
         """Update scan state and commit."""
@@ -61,105 +270,279 @@ def run_scan_pipeline(scan_uuid: str):
         scan_uuid_obj = uuid_lib.UUID(scan_uuid)
 
         scan = db.query(Scan).filter(Scan.uuid == scan_uuid_obj).first()
-        if not scan:
-            return
-
-        # 1) Clone
-        _update(status="IN_PROGRESS", progress=0.10, message="Cloning repository...")
-        repo_path = clone_repository(scan.github_url)
+        _ensure_in_flight(scan, scan_uuid)
+
+        # 1) Clone (already done by clone_scan_repository in the io/cpu workflow)
+        if repo_path is None:
+            repo_path = _saved_clone(checkpoints).get("repo_path")
+        if repo_path is None:
+            _update(status="IN_PROGRESS", progress=0.05, message="Resolving commit...")
+            if _reuse_previous_scan(db, scan):
+                return 0
+            _update(progress=0.10, message="Cloning repository...")
+            repo_path = clone_repository(scan.github_url, base_dir=SCAN_WORKSPACE_DIR)
+        _record_scanned_commit(scan, repo_path)
+        _checkpoint_clone(checkpoints, scan, repo_path)
 
         # 2) Language analysis
+        cancel_check.check()
         _update(progress=0.25, message="Analyzing languages...")
-        analyzer = RepositoryAnalyzer()
-        analysis_result = analyzer.analyze(repo_path)
+        targets_payload = checkpoints.load("analysis")
+        if targets_payload is not None:
+            scanner_targets = targets_from_payload(targets_payload)
+        else:
+            analyzer = RepositoryAnalyzer()
+            scanner_targets = analyzer.analyze(repo_path, cancel_check=cancel_check).scanner_targets
+            checkpoints.save("analysis", targets_to_payload(scanner_targets))
+
+        # Large repositories: hand the targets to scan_shard tasks, which reuse this clone.
+        if allow_sharding and SCAN_SHARDING_ENABLED:
+            shard_count = write_shard_plan(scanner_targets, repo_path)
+            if shard_count:
+                _update(progress=0.30, message=f"Scanning in {shard_count} shards (0/{shard_count})...")
+                logger.info("scan_sharding stage=planned scan_uuid=%s shards=%s", scan_uuid, shard_count)
+                return shard_count
 
         # 3) SAST
+        cancel_check.check()
         _update(progress=0.40, message="Running SAST Scanner...")
-        sast_scanner = SASTScanner()
-        sast_report = sast_scanner.scan_repository(analysis_result.scanner_targets.sast_targets)
+        sast_report = _checkpointed_report(
+            checkpoints,
+            "sast",
+            lambda: SASTScanner().scan_repository(scanner_targets.sast_targets, cancel_check=cancel_check),
+        )
 
         # 4) SCA
+        cancel_check.check()
         _update(progress=0.55, message="Running SCA Scanner...")
-        sca_scanner = SCAScanner()
-        sca_report = sca_scanner.scan_repository(analysis_result.scanner_targets.sca_targets)
+        sca_report = _checkpointed_report(
+            checkpoints,
+            "sca",
+            lambda: SCAScanner().scan_repository(scanner_targets.sca_targets, cancel_check=cancel_check),
+        )
 
         # 5) Config
+        cancel_check.check()
         _update(progress=0.70, message="Running Config Scanner...")
-        config_scanner = ConfigScanner()
-        config_report = config_scanner.scan_repository(analysis_result.scanner_targets.config_targets)
+        config_report = _checkpointed_report(
+            checkpoints,
+            "config",
+            lambda: ConfigScanner().scan_repository(scanner_targets.config_targets, cancel_check=cancel_check),
+        )
 
         # 6) Process & Persist
+        cancel_check.check()
         _update(progress=0.85, message="Processing results...")
+        _persist_scan_results(
+            db, scan_uuid_obj, repo_path, sast_report, sca_report, config_report, cancel_check=cancel_check
+        )
 
-        inv_data = {
-            "pqc_readiness_score": _calculate_pqc_score(sast_report, sca_report),
-            "algorithm_ratios": _extract_algorithm_ratios(sast_report),
-            "inventory_table": _extract_inventory_table(sast_report, sca_report, repo_path),
-        }
-        heat_data = _build_heatmap_tree(repo_path, analysis_result, sast_report)
-        recommendations = _extract_recommendations(sast_report, sca_report)
-        findings = _normalize_findings(sast_report, sca_report, config_report, repo_path)
-
-        # Persist results in a single transaction.
-        with db.begin():
-            inv = InventorySnapshot(
-                scan_uuid=scan_uuid_obj,
-                pqc_readiness_score=int(inv_data["pqc_readiness_score"] or 0),
-                algorithm_ratios=inv_data["algorithm_ratios"] or [],
-                inventory_table=inv_data["inventory_table"] or [],
-            )
+        _update(progress=0.95, message="Finalizing...")
 
-            heat = HeatmapSnapshot(
-                scan_uuid=scan_uuid_obj,
-                tree=heat_data or {},
-            )
+        # 7) Done
+        if not _mark_scan_completed(db, scan_uuid_obj):
+            raise ScanCancelled(f"Scan {scan_uuid} was cancelled before it completed")
+        checkpoints.clear()
+        return 0
 
-            # scan_uuid is PK/UNIQUE, use merge for upsert.
-            db.merge(inv)
-            db.merge(heat)
+    except ScanCancelled:
+        _abort_cancelled(db, scan_uuid_obj, repo_path)
 
-            # Replace recommendations for this scan_uuid.
-            db.query(Recommendation).filter(Recommendation.scan_uuid == scan_uuid_obj).delete()
-            for rec in recommendations:
-                db.add(Recommendation(scan_uuid=scan_uuid_obj, **rec))
+    except Exception as e:
+        # Failure handling: update scan row if exists. Nothing retries a failed scan, so drop its checkpoints.
+        _mark_scan_failed(db, scan_uuid_obj, e)
+        checkpoints.clear()
+        raise
 
-            # Replace findings for this scan_uuid.
-            db.query(Finding).filter(Finding.scan_uuid == scan_uuid_obj).delete()
-            for finding in findings:
-                db.add(Finding(scan_uuid=scan_uuid_obj, **finding))
+    finally:
+        # Clone repo cleanup; a sharded scan's clone is removed by merge_scan_shards.
+        if not shard_count:
+            _remove_clone(repo_path)
+        db.close()
 
-        _update(progress=0.95, message="Finalizing...")
 
-        # 7) Done
-        _update(status="COMPLETED", progress=1.0, message="Scan completed successfully")
-        return
+def _persist_scan_results(
+    db, scan_uuid_obj, repo_path: str, sast_report, sca_report, config_report, *, cancel_check=None
+) -> None:
+    # Cancellation points between post-processing stages; nothing is written until all succeed.
+    check = cancel_check.check if cancel_check is not None else (lambda: None)
+    inv_data = {
+        "pqc_readiness_score": _calculate_pqc_score(sast_report, sca_report),
+        "algorithm_ratios": _extract_algorithm_ratios(sast_report),
+        "inventory_table": _extract_inventory_table(sast_report, sca_report, repo_path),
+    }
+    check()
+    heat_data = _build_heatmap_tree(repo_path, None, sast_report)
+    check()
+    recommendations = _extract_recommendations(sast_report, sca_report)
+    findings = _normalize_findings(sast_report, sca_report, config_report, repo_path)
+    check()
+
+    # Persist results in a single transaction.
+    with db.begin():
+        inv = InventorySnapshot(
+            scan_uuid=scan_uuid_obj,
+            pqc_readiness_score=int(inv_data["pqc_readiness_score"] or 0),
+            algorithm_ratios=inv_data["algorithm_ratios"] or [],
+            inventory_table=inv_data["inventory_table"] or [],
+        )
+
+        heat = HeatmapSnapshot(
+            scan_uuid=scan_uuid_obj,
+            tree=heat_data or {},
+        )
 
+        # scan_uuid is PK/UNIQUE, use merge for upsert.
+        db.merge(inv)
+        db.merge(heat)
+
+        # Replace recommendations for this scan_uuid.
+        db.query(Recommendation).filter(Recommendation.scan_uuid == scan_uuid_obj).delete()
+        for rec in recommendations:
+            db.add(Recommendation(scan_uuid=scan_uuid_obj, **rec))
+
+        # Replace findings for this scan_uuid.
+        db.query(Finding).filter(Finding.scan_uuid == scan_uuid_obj).delete()
+        for finding in findings:
+            db.add(Finding(scan_uuid=scan_uuid_obj, **_promoted_finding_columns(finding), **finding))
+
+
+@celery_app.task(name="scan_shard")
+def scan_shard(scan_uuid: str, repo_path: str, shard_index: int, shard_count: int):
+    """Run the scanners on one shard of a large repository and store its partial report (cpu queue)."""
+    db = SessionLocal()
+    scan_uuid_obj = None
+    cancel_check = CancellationCheck(scan_uuid)
+    try:
+        scan_uuid_obj = uuid_lib.UUID(scan_uuid)
+        cancel_check.check()
+        # A sibling shard may have failed the scan while this one was queued.
+        _ensure_in_flight(db.query(Scan).filter(Scan.uuid == scan_uuid_obj).first(), scan_uuid)
+        # Redelivered after its partial report was written: nothing left to scan.
+        if partial_report_exists(repo_path, shard_index):
+            logger.info("scan_sharding stage=shard_resumed scan_uuid=%s shard=%s", scan_uuid, shard_index)
+            return
+        targets = load_shard_targets(repo_path, shard_index)
+        sast_report = SASTScanner().scan_repository([meta for _, meta in targets["sast"]], cancel_check=cancel_check)
+        sca_report = SCAScanner().scan_repository([meta for _, meta in targets["sca"]], cancel_check=cancel_check)
+        config_report = ConfigScanner().scan_repository(
+            [meta for _, meta in targets["config"]], cancel_check=cancel_check
+        )
+        done = write_partial_report(
+            repo_path,
+            shard_index,
+            targets=targets,
+            sast_report=sast_report,
+            sca_report=sca_report,
+            config_report=config_report,
+        )
+
+        # Shards finish in any order: only ever move progress forward.
+        progress = 0.30 + 0.55 * done / shard_count
+        db.query(Scan).filter(
+            Scan.uuid == scan_uuid_obj,
+            Scan.status == "IN_PROGRESS",
+            Scan.progress < progress,
+        ).update(
+            {"progress": progress, "message": f"Scanning in {shard_count} shards ({done}/{shard_count})..."},
+            synchronize_session=False,
+        )
+        db.commit()
+        logger.info("scan_sharding stage=shard_done scan_uuid=%s shard=%s done=%s/%s", scan_uuid, shard_index, done, shard_count)
+    except ScanCancelled:
+        # Sibling shards stop at their next check; failures on the removed clone count as cancelled too.
+        _abort_cancelled(db, scan_uuid_obj, repo_path)
     except Exception as e:
-        # Failure handling: update scan row if exists.
-        try:
-            if scan_uuid_obj is not None:
-                scan = db.query(Scan).filter(Scan.uuid == scan_uuid_obj).first()
-                if scan:
-                    scan.status = "FAILED"
-                    scan.progress = float(scan.progress or 0.0)
-                    scan.message = f"Error: {str(e)}"
-                    if hasattr(scan, "error_log"):
-                        scan.error_log = str(e)
-                    db.commit()
-        except Exception:
-            pass
+        if is_scan_cancelled(scan_uuid):
+            _abort_cancelled(db, scan_uuid_obj, repo_path)
+        _mark_scan_failed(db, scan_uuid_obj, e)
+        # The merge step will never run: stop running siblings at their next cancellation point.
+        # Their abort leaves FAILED in place, since only in-flight scans are marked CANCELLED.
+        request_scan_cancel(scan_uuid)
         raise
+    finally:
+        db.close()
 
+
+@celery_app.task(name="merge_scan_shards")
+def merge_scan_shards(scan_uuid: str, repo_path: str, shard_count: int):
+    """Merge every shard's partial report, persist the results and remove the clone (cpu queue)."""
+    db = SessionLocal()
+    scan_uuid_obj = None
+    try:
+        scan_uuid_obj = uuid_lib.UUID(scan_uuid)
+        scan = db.query(Scan).filter(Scan.uuid == scan_uuid_obj).first()
+        _ensure_in_flight(scan, scan_uuid)
+        scan.progress = 0.85
+        scan.message = "Processing results..."
+        db.commit()
+
+        cancel_check = CancellationCheck(scan_uuid)
+        cancel_check.check()
+        sast_report, sca_report, config_report = merge_partial_reports(repo_path, shard_count)
+        _persist_scan_results(
+            db, scan_uuid_obj, repo_path, sast_report, sca_report, config_report, cancel_check=cancel_check
+        )
+
+        if not _mark_scan_completed(db, scan_uuid_obj):
+            raise ScanCancelled(f"Scan {scan_uuid} was cancelled before it completed")
+    except ScanCancelled:
+        _abort_cancelled(db, scan_uuid_obj, repo_path)
+    except Exception as e:
+        _mark_scan_failed(db, scan_uuid_obj, e)
+        raise
     finally:
-        # Clone repo cleanup
-        if repo_path and os.path.exists(repo_path):
-            try:
-                shutil.rmtree(repo_path)
-            except Exception:
-                pass
+        ScanCheckpoints(scan_uuid).clear()
+        remove_shard_dir(repo_path)
+        _remove_clone(repo_path)
         db.close()
 
 
+@celery_app.task(name="cleanup_scan_shards")
+def cleanup_scan_shards(scan_uuid: str, repo_path: str):
+    """Errback of the shard chord: when a shard fails the merge step never runs, so remove the
+    clone, the partial reports and the checkpoints here."""
+    ScanCheckpoints(scan_uuid).clear()
+    remove_shard_dir(repo_path)
+    _remove_clone(repo_path)
+    logger.info("scan_sharding stage=cleaned_up scan_uuid=%s", scan_uuid)
+
+
+def build_shard_workflow(scan_uuid: str, repo_path: str, shard_count: int):
+    header = [scan_shard.si(scan_uuid, repo_path, index, shard_count) for index in range(shard_count)]
+    merge = merge_scan_shards.si(scan_uuid, repo_path, shard_count)
+    # Linked to the body: Celery calls the body's errbacks when any header task fails.
+    merge.link_error(cleanup_scan_shards.si(scan_uuid, repo_path))
+    return chord(header, merge)
+
+
+def build_scan_workflow(scan_uuid: str):
+    """Clone (io queue) then scan (cpu queue), chained to the AI analysis when AI_AUTO_ANALYSIS_ENABLED.
+
+    The analysis runs only if the scan succeeds and is routed to the ``ai`` queue by name, so
+    scan workers do not need to import the AI module.
+    """
+    scan = chain(clone_scan_repository.si(scan_uuid), scan_cloned_repository.s(scan_uuid))
+    if not AI_AUTO_ANALYSIS_ENABLED:
+        return scan
+    return chain(*scan.tasks, celery_app.signature("run_ai_analysis", args=(scan_uuid,), immutable=True))
+
+
+def dispatch_scan_pipeline(scan_uuid: str):
+    return build_scan_workflow(scan_uuid).apply_async()
+
+
+def _promoted_finding_columns(finding: dict) -> dict:
+    """Copy indexed meta keys into their dedicated columns."""
+    meta = finding.get("meta") or {}
+    rule_id = meta.get("rule_id")
+    scanner_type = meta.get("scanner_type")
+    return {
+        "rule_id": str(rule_id)[:255] if rule_id else None,
+        "scanner_type": str(scanner_type)[:20] if scanner_type else None,
+    }
+
+
 def _calculate_pqc_score(sast_report, sca_report) -> int:
     """Calculate a PQC readiness score (0-10) using shared scoring criteria."""
     signals = build_score_signals_from_reports(sast_report, sca_report)
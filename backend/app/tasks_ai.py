@@ -8,29 +8,43 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
 from app.ai_module.orchestrator import compute_and_persist_ai_analysis
+from app.analysis_events import AnalysisEventPublisher
 from app.celery_app import celery_app
-from app.config import DATABASE_URL_SYNC
+from app.config import AI_ANALYSIS_RATE_LIMIT, AI_STREAM_ENABLED, DATABASE_URL_SYNC
 
 engine = create_engine(DATABASE_URL_SYNC, echo=False, pool_pre_ping=True)
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
 logger = logging.getLogger(__name__)
 
 
-@celery_app.task(name="run_ai_analysis")
+@celery_app.task(name="run_ai_analysis", rate_limit=AI_ANALYSIS_RATE_LIMIT)
 def run_ai_analysis(scan_uuid: str):
     db = SessionLocal()
+    events = AnalysisEventPublisher(scan_uuid) if AI_STREAM_ENABLED else None
     try:
         logger.info("ai_analysis_task stage=start scan_uuid=%s", scan_uuid)
         scan_uuid_obj = uuid_lib.UUID(scan_uuid)
-        result = asyncio.run(compute_and_persist_ai_analysis(scan_uuid_obj, db))
+        if events is not None:
+            events.emit("started")
+        result = asyncio.run(compute_and_persist_ai_analysis(scan_uuid_obj, db, events=events))
         logger.info(
             "ai_analysis_task stage=done scan_uuid=%s mode=%s",
             scan_uuid,
             getattr(result, "analysis_mode", None),
         )
+        if events is not None:
+            # Published only after the snapshot is persisted, so GET /ai-analysis already serves it.
+            if result is None:
+                events.emit("failed", reason="No findings to analyze")
+            else:
+                events.emit("completed", analysis=result.model_dump(mode="json"))
         return result.model_dump() if result is not None else None
     except Exception as exc:
         logger.exception("ai_analysis_task stage=failed scan_uuid=%s reason=%s", scan_uuid, str(exc))
+        if events is not None:
+            events.emit("failed", reason=str(exc))
         raise
     finally:
+        if events is not None:
+            events.close()
         db.close()
@@ -2,6 +2,7 @@ import asyncio
 import os
 import sys
 import uuid as uuid_lib
+from datetime import datetime, timezone
 from pathlib import Path
 from types import SimpleNamespace
 
@@ -11,18 +12,34 @@ os.environ.setdefault("AI_ALLOW_DETERMINISTIC_FALLBACK", "false")
 ROOT = Path(__file__).resolve().parents[1]
 sys.path.insert(0, str(ROOT))
 
+from app.ai_module.api_client import fetch_findings
 from app.ai_module.orchestrator import analyze_findings
+from app.ai_module.risk_aggregation import (
+    FindingsAccumulator,
+    compute_risk_metrics,
+    deduplicate_findings,
+    summarize_inputs,
+)
 import app.ai_module.orchestrator as orchestrator
 from app.ai_module.schemas import AiAnalysisResponse
 from app.models import Finding, Scan
 import app.routes.scans as scans
+from app.ai_analysis_store import upsert_ai_analysis_snapshot
 from app.scan_read_service import get_findings_response
 
 
+def _returns(payload):
+    async def _call(**_kwargs):
+        return payload
+
+    return _call
+
+
 class _FakeBinary:
     def __init__(self, expression):
         self.key = expression.left.key
         self.value = getattr(expression.right, "value", None)
+        self.operator = expression.operator
 
 
 class FakeQuery:
@@ -33,7 +50,7 @@ class FakeQuery:
         filtered = self._items
         for expression in expressions:
             binary = _FakeBinary(expression)
-            filtered = [item for item in filtered if getattr(item, binary.key) == binary.value]
+            filtered = [item for item in filtered if binary.operator(getattr(item, binary.key), binary.value)]
         return FakeQuery(filtered)
 
     def order_by(self, *_args, **_kwargs):
@@ -65,6 +82,15 @@ class FakeDB:
     def query(self, model):
         return FakeQuery(self._mapping.get(model, []))
 
+    def add(self, item):
+        self._mapping.setdefault(type(item), []).append(item)
+
+    def commit(self):
+        return None
+
+    def refresh(self, _item):
+        return None
+
 
 def _build_finding_record(scan_uuid, item_id, severity, context, file_path):
     return SimpleNamespace(
@@ -115,7 +141,7 @@ def test_findings_api_schema_and_filters():
     scan_uuid = uuid_lib.uuid4()
     user_uuid = uuid_lib.uuid4()
     db = FakeDB(
-        scans_data=[SimpleNamespace(uuid=scan_uuid, user_uuid=user_uuid)],
+        scans_data=[SimpleNamespace(uuid=scan_uuid, user_uuid=user_uuid, updated_at=1)],
         findings_data=[
             _build_finding_record(scan_uuid, 1, "HIGH", "SAST", "src/auth.py"),
             _build_finding_record(scan_uuid, 2, "LOW", "CONFIG", "nginx.conf"),
@@ -141,10 +167,108 @@ def test_findings_api_schema_and_filters():
     assert response.items[0].meta["rule_id"] == "rsa_generation"
 
 
+def test_findings_keyset_pagination_walks_all_pages():
+    scan_uuid = uuid_lib.uuid4()
+    db = FakeDB(
+        scans_data=[SimpleNamespace(uuid=scan_uuid, user_uuid=None, updated_at=1)],
+        findings_data=[
+            _build_finding_record(scan_uuid, item_id, "HIGH", "SAST", f"src/file_{item_id}.py")
+            for item_id in range(1, 6)
+        ],
+    )
+
+    first_page = get_findings_response(db, scan_uuid, limit=2)
+    assert [item.id for item in first_page.items] == [1, 2]
+    assert first_page.total == 5
+    assert first_page.next_after_id == 2
+
+    second_page = get_findings_response(db, scan_uuid, limit=2, after_id=first_page.next_after_id)
+    assert [item.id for item in second_page.items] == [3, 4]
+    assert second_page.total == 5
+    assert second_page.offset == 0
+
+    last_page = get_findings_response(db, scan_uuid, limit=2, after_id=second_page.next_after_id)
+    assert [item.id for item in last_page.items] == [5]
+    assert last_page.next_after_id is None
+
+    fetched = asyncio.run(fetch_findings(scan_uuid, db, page_size=2))
+    assert [item["id"] for item in fetched] == [1, 2, 3, 4, 5]
+
+
+def test_cached_findings_total_follows_rewritten_findings():
+    scan = SimpleNamespace(uuid=uuid_lib.uuid4(), user_uuid=None, updated_at=1)
+    findings = [_build_finding_record(scan.uuid, item_id, "HIGH", "SAST", f"src/file_{item_id}.py") for item_id in (1, 2)]
+    db = FakeDB(scans_data=[scan], findings_data=findings)
+
+    assert get_findings_response(db, scan.uuid, limit=1).total == 2
+
+    # A rescan persisting into the same row rewrites the findings and bumps updated_at.
+    db._mapping[Finding].append(_build_finding_record(scan.uuid, 3, "HIGH", "SAST", "src/file_3.py"))
+    assert get_findings_response(db, scan.uuid, limit=1, after_id=1).total == 2
+    scan.updated_at = 2
+    assert get_findings_response(db, scan.uuid, limit=1, after_id=1).total == 3
+
+
+def test_findings_accumulator_matches_batch_aggregation():
+    findings = [
+        {
+            "type": "rsa_generation",
+            "severity": "HIGH",
+            "algorithm": "RSA",
+            "file_path": "src/auth.py",
+            "line_start": 10,
+            "line_end": 10,
+            "evidence": "RSA.generate(2048)",
+            "meta": {"scanner_type": "SAST", "rule_id": "rsa_generation", "duplicate_count": 3},
+        },
+        {
+            "type": "node-rsa",
+            "severity": "MEDIUM",
+            "algorithm": None,
+            "file_path": "package.json",
+            "line_start": None,
+            "line_end": None,
+            "evidence": "node-rsa@1.0.0",
+            "meta": {"scanner_type": "SCA", "rule_id": "node-rsa", "library": "node-rsa"},
+        },
+    ]
+    stream = [findings[0], dict(findings[0]), findings[1]]
+
+    aggregate = FindingsAccumulator().extend(stream)
+    deduped = deduplicate_findings(stream)
+
+    assert aggregate.findings == deduped
+    assert aggregate.inputs_summary() == summarize_inputs(deduped, source_count=len(stream))
+    assert aggregate.risk_metrics() == compute_risk_metrics(deduped)
+
+
+def test_upsert_promotes_cache_signature_and_mode():
+    scan_uuid = uuid_lib.uuid4()
+    payload = _sample_ai_payload().model_copy(
+        update={
+            "analysis_mode": "real",
+            "inputs_summary": {"cache": {"algorithm_signature": "ECC|RSA", "cache_hit": False}},
+        }
+    )
+
+    snapshot = upsert_ai_analysis_snapshot(
+        FakeDB(),
+        scan_uuid,
+        payload,
+        citations=[{"doc_id": "fips203.pdf"}],
+        nist_references=["FIPS 203 (ML-KEM)"],
+        analysis_version="v1",
+    )
+
+    assert snapshot.algorithm_signature == "ECC|RSA"
+    assert snapshot.analysis_mode == "real"
+    assert snapshot.citations_count == 1
+
+
 def test_ai_analysis_post_enqueues_task_and_get_returns_saved_snapshot(monkeypatch):
     scan_uuid = uuid_lib.uuid4()
     user_uuid = uuid_lib.uuid4()
-    fake_scan = SimpleNamespace(uuid=scan_uuid)
+    fake_scan = SimpleNamespace(uuid=scan_uuid, status="COMPLETED")
     delayed_calls = []
     payload = _sample_ai_payload()
 
@@ -181,7 +305,7 @@ def test_ai_analysis_post_enqueues_task_and_get_returns_saved_snapshot(monkeypat
 def test_ai_analysis_post_returns_ready_when_snapshot_exists(monkeypatch):
     scan_uuid = uuid_lib.uuid4()
     user_uuid = uuid_lib.uuid4()
-    fake_scan = SimpleNamespace(uuid=scan_uuid)
+    fake_scan = SimpleNamespace(uuid=scan_uuid, status="COMPLETED")
     delayed_calls = []
 
     class FakeScopedQuery:
@@ -194,7 +318,11 @@ def test_ai_analysis_post_returns_ready_when_snapshot_exists(monkeypatch):
         def first(self):
             return self._result
 
-    existing_snapshot = SimpleNamespace(scan_uuid=scan_uuid)
+    existing_snapshot = SimpleNamespace(
+        scan_uuid=scan_uuid,
+        analysis_version=scans.AI_ANALYSIS_VERSION,
+        analysis_mode="real",
+    )
     monkeypatch.setattr(scans, "_scoped_scan_query", lambda _db, _user_uuid: FakeScopedQuery(fake_scan))
     monkeypatch.setattr(scans, "get_ai_analysis_snapshot", lambda _db, _scan_uuid: existing_snapshot)
     monkeypatch.setattr(scans.run_ai_analysis, "delay", lambda value: delayed_calls.append(value))
@@ -207,6 +335,65 @@ def test_ai_analysis_post_returns_ready_when_snapshot_exists(monkeypatch):
     assert delayed_calls == []
 
 
+def test_ai_analysis_post_skips_enqueue_while_chained_scan_runs_and_reruns_stale_snapshot(monkeypatch):
+    scan_uuid = uuid_lib.uuid4()
+    fake_scan = SimpleNamespace(uuid=scan_uuid, status="IN_PROGRESS")
+    delayed_calls = []
+    snapshot = SimpleNamespace(
+        scan_uuid=scan_uuid,
+        analysis_version=scans.AI_ANALYSIS_VERSION,
+        analysis_mode="error",
+        updated_at=datetime(2026, 1, 1, tzinfo=timezone.utc),
+    )
+
+    class FakeScopedQuery:
+        def filter(self, *_args, **_kwargs):
+            return self
+
+        def first(self):
+            return fake_scan
+
+    monkeypatch.setattr(scans, "AI_AUTO_ANALYSIS_ENABLED", True)
+    monkeypatch.setattr(scans, "_scoped_scan_query", lambda _db, _user_uuid: FakeScopedQuery())
+    monkeypatch.setattr(scans, "get_ai_analysis_snapshot", lambda _db, _scan_uuid: None)
+    monkeypatch.setattr(scans.run_ai_analysis, "delay", lambda value: delayed_calls.append(value))
+
+    response = scans.create_ai_analysis(str(scan_uuid), db=object(), user_uuid=uuid_lib.uuid4())
+    assert response.status == "QUEUED"
+    assert delayed_calls == []
+
+    fake_scan.status = "COMPLETED"
+    monkeypatch.setattr(scans, "get_ai_analysis_snapshot", lambda _db, _scan_uuid: snapshot)
+    response = scans.create_ai_analysis(str(scan_uuid), db=object(), user_uuid=uuid_lib.uuid4())
+    assert response.status == "QUEUED"
+    assert response.snapshot_updated_at == snapshot.updated_at
+    assert delayed_calls == [str(scan_uuid)]
+
+
+def test_scan_workflow_routes_clone_scan_and_ai_analysis_to_their_queues(monkeypatch):
+    import app.tasks as tasks
+    from app.celery_app import celery_app
+
+    monkeypatch.setattr(tasks, "AI_AUTO_ANALYSIS_ENABLED", True)
+    workflow = tasks.build_scan_workflow("scan-1")
+
+    assert [signature.task for signature in workflow.tasks] == [
+        "clone_scan_repository",
+        "scan_cloned_repository",
+        "run_ai_analysis",
+    ]
+    assert workflow.tasks[2].args == ("scan-1",)
+    assert workflow.tasks[2].immutable
+    route = celery_app.amqp.router.route
+    assert [route({}, signature.task)["queue"].name for signature in workflow.tasks] == ["io", "cpu", "ai"]
+
+    monkeypatch.setattr(tasks, "AI_AUTO_ANALYSIS_ENABLED", False)
+    assert [signature.task for signature in tasks.build_scan_workflow("scan-1").tasks] == [
+        "clone_scan_repository",
+        "scan_cloned_repository",
+    ]
+
+
 def test_duplicate_noise_does_not_break_ai_analysis():
     finding = {
         "type": "rsa_generation",
@@ -255,8 +442,8 @@ def test_rag_llm_payload_path_uses_mocked_generation(monkeypatch):
     )
     monkeypatch.setattr(
         orchestrator,
-        "retrieve_relevant_chunks_with_debug",
-        lambda _query, top_k=8: SimpleNamespace(
+        "retrieve_guidance_for_findings",
+        lambda _findings, top_k=8: SimpleNamespace(
             chunks=[
                 {
                     "doc_id": "fips203.pdf",
@@ -274,40 +461,42 @@ def test_rag_llm_payload_path_uses_mocked_generation(monkeypatch):
 
     monkeypatch.setattr(
         orchestrator,
-        "generate_grounded_ai_analysis",
-        lambda **_kwargs: {
-            "risk_score": 77,
-            "pqc_readiness_score": 31,
-            "severity_weighted_index": 4.2,
-            "refactor_cost_estimate": {
-                "level": "MEDIUM",
-                "explanation": "1 files affected, centralized usage.",
-                "affected_files": 1,
-            },
-            "priority_rank": 1,
-            "recommendations": [
-                {
-                    "title": "Adopt ML-KEM for key establishment",
-                    "description": "Replace RSA key establishment code paths.",
-                    "nist_standard_reference": "FIPS 203 (ML-KEM)",
-                    "citations": [
-                        {
-                            "doc_id": "fips203.pdf",
-                            "title": "FIPS 203",
-                            "section": "page 12",
-                            "page": 12,
-                            "url": None,
-                            "snippet": "ML-KEM replaces classical key establishment.",
-                        }
-                    ],
-                    "confidence": 0.84,
-                }
-            ],
-            "analysis_summary": "Critical RSA usage should migrate to ML-KEM.",
-            "confidence_score": 0.84,
-            "citation_missing": False,
-            "inputs_summary": {"total_findings": 1},
-        },
+        "agenerate_grounded_ai_analysis",
+        _returns(
+            {
+                "risk_score": 77,
+                "pqc_readiness_score": 31,
+                "severity_weighted_index": 4.2,
+                "refactor_cost_estimate": {
+                    "level": "MEDIUM",
+                    "explanation": "1 files affected, centralized usage.",
+                    "affected_files": 1,
+                },
+                "priority_rank": 1,
+                "recommendations": [
+                    {
+                        "title": "Adopt ML-KEM for key establishment",
+                        "description": "Replace RSA key establishment code paths.",
+                        "nist_standard_reference": "FIPS 203 (ML-KEM)",
+                        "citations": [
+                            {
+                                "doc_id": "fips203.pdf",
+                                "title": "FIPS 203",
+                                "section": "page 12",
+                                "page": 12,
+                                "url": None,
+                                "snippet": "ML-KEM replaces classical key establishment.",
+                            }
+                        ],
+                        "confidence": 0.84,
+                    }
+                ],
+                "analysis_summary": "Critical RSA usage should migrate to ML-KEM.",
+                "confidence_score": 0.84,
+                "citation_missing": False,
+                "inputs_summary": {"total_findings": 1},
+            }
+        ),
     )
 
     response, citations, references = asyncio.run(analyze_findings([finding], corpus_path="Z:\\missing"))
@@ -0,0 +1,189 @@
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from types import SimpleNamespace
+
+os.environ.setdefault("DATABASE_URL_SYNC", "sqlite+pysqlite:///:memory:")
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import app.ai_module.llm.async_client as async_client
+import app.ai_module.llm.openai_client as openai_client
+import app.routes.scans as scan_routes
+from app.ai_module.llm.stub_server import StubLLMServer
+from app.analysis_events import AnalysisEventPublisher, InMemoryEventBackend, stream_analysis_events
+
+
+def _parse_frames(frames):
+    events = []
+    for frame in frames:
+        if frame.startswith(":"):
+            continue
+        data = next(line for line in frame.splitlines() if line.startswith("data: "))
+        events.append(json.loads(data[len("data: ") :]))
+    return events
+
+
+async def _no_snapshot():
+    return None
+
+
+def test_stream_relays_published_stage_events_until_completed():
+    backend = InMemoryEventBackend()
+
+    def _run_task():
+        publisher = AnalysisEventPublisher("scan-1", backend=backend)
+        publisher.emit("started")
+        publisher.emit("retrieval_done", chunks=4)
+        for piece in ('{"risk_', 'score": 70', "}"):
+            publisher.token_delta(piece)
+        publisher.flush_tokens()
+        publisher.emit("completed", analysis={"risk_score": 70})
+        AnalysisEventPublisher("scan-2", backend=backend).emit("completed")
+
+    async def _consume():
+        stream = stream_analysis_events("scan-1", load_snapshot=_no_snapshot, backend=backend, heartbeat_seconds=0.05)
+        frames = [await stream.__anext__()]
+        task = asyncio.create_task(asyncio.to_thread(_run_task))
+        async for frame in stream:
+            frames.append(frame)
+        await task
+        return frames
+
+    events = _parse_frames(asyncio.run(_consume()))
+
+    assert [event["stage"] for event in events] == ["subscribed", "started", "retrieval_done", "llm_delta", "completed"]
+    assert events[3]["text"] == '{"risk_score": 70}'
+    assert events[-1]["analysis"] == {"risk_score": 70}
+    assert [event["seq"] for event in events[1:]] == [1, 2, 3, 4]
+
+
+def test_stream_returns_persisted_snapshot_immediately():
+    backend = InMemoryEventBackend()
+
+    async def _snapshot():
+        return {"risk_score": 55}
+
+    async def _consume():
+        return [frame async for frame in stream_analysis_events("scan-1", load_snapshot=_snapshot, backend=backend)]
+
+    events = _parse_frames(asyncio.run(_consume()))
+
+    assert [event["stage"] for event in events] == ["subscribed", "completed"]
+    assert events[-1]["analysis"] == {"risk_score": 55}
+    assert backend._subscribers["qshield:ai_analysis_events:scan-1"] == []
+
+
+def test_publishing_does_not_wait_on_a_slow_backend():
+    published = []
+    release = threading.Event()
+
+    class _SlowBackend:
+        def publish(self, channel, event):
+            release.wait(1.0)
+            published.append(event["stage"])
+
+    publisher = AnalysisEventPublisher("scan-1", backend=_SlowBackend())
+    started = time.perf_counter()
+    publisher.emit("started")
+    publisher.token_delta("x" * 300)
+    publisher.emit("completed")
+    assert time.perf_counter() - started < 0.2
+    assert published == []
+
+    release.set()
+    publisher.close()
+    assert published == ["started", "llm_delta", "completed"]
+
+
+def test_stream_only_serves_snapshots_no_queued_run_will_replace(monkeypatch):
+    updated_at = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    snapshot = SimpleNamespace(analysis_version=scan_routes.AI_ANALYSIS_VERSION, analysis_mode="real", updated_at=updated_at)
+
+    class _Session:
+        def close(self):
+            pass
+
+    monkeypatch.setattr(scan_routes, "SessionLocal", _Session)
+    monkeypatch.setattr(scan_routes, "get_ai_analysis_snapshot", lambda _db, _scan_uuid: snapshot)
+    monkeypatch.setattr(
+        scan_routes,
+        "serialize_ai_analysis_snapshot",
+        lambda snap: SimpleNamespace(model_dump=lambda mode=None: {"analysis_mode": snap.analysis_mode}),
+    )
+    scan_uuid = uuid.uuid4()
+
+    assert scan_routes._load_ai_analysis_payload(scan_uuid) == {"analysis_mode": "real"}
+    # After POST ?force=true the client passes the replaced snapshot's timestamp.
+    assert scan_routes._load_ai_analysis_payload(scan_uuid, after=updated_at) is None
+    assert scan_routes._load_ai_analysis_payload(scan_uuid, after=updated_at - timedelta(seconds=1)) is not None
+
+    snapshot.analysis_mode = "error"
+    assert scan_routes._load_ai_analysis_payload(scan_uuid) is None
+    snapshot.analysis_mode, snapshot.analysis_version = "real", "v0"
+    assert scan_routes._load_ai_analysis_payload(scan_uuid) is None
+
+
+def test_streamed_completion_passes_deltas_and_parses_final_payload(monkeypatch):
+    server = StubLLMServer().start()
+    try:
+        monkeypatch.setattr(async_client, "OPENAI_BASE_URL", server.base_url)
+        monkeypatch.setattr(async_client, "OPENAI_API_KEY", "test-key")
+        monkeypatch.setattr(openai_client, "get_llm_response_cache", lambda: None)
+        deltas = []
+
+        payload = asyncio.run(
+            openai_client.agenerate_grounded_ai_analysis(
+                findings=[{"type": "rsa_generation", "algorithm": "RSA", "file_path": "src/a.py"}],
+                retrieved_chunks=[],
+                risk_metrics={"risk_score": 70, "pqc_readiness_score": 30, "severity_weighted_index": 2.5},
+                refactor_cost_estimate={"level": "LOW", "explanation": "one file", "affected_files": 1},
+                priority_rank=1,
+                inputs_summary={"total_findings": 1},
+                on_delta=deltas.append,
+            )
+        )
+    finally:
+        server.stop()
+
+    assert server.requests[0]["stream"] is True
+    assert len(deltas) > 1
+    assert json.loads("".join(deltas)) == payload
+    assert payload["risk_score"] == 70
+
+
+def test_stream_route_releases_its_session_before_streaming(monkeypatch):
+    sessions = []
+
+    class _Query:
+        def filter(self, *_args):
+            return self
+
+        def first(self):
+            return object()
+
+    class _Session:
+        closed = False
+
+        def __init__(self):
+            sessions.append(self)
+
+        def query(self, _model):
+            return _Query()
+
+        def close(self):
+            self.closed = True
+
+    monkeypatch.setattr(scan_routes, "SessionLocal", _Session)
+
+    response = scan_routes.stream_ai_analysis(str(uuid.uuid4()), user_uuid=uuid.uuid4())
+
+    assert response.media_type == "text/event-stream"
+    assert [session.closed for session in sessions] == [True]
@@ -0,0 +1,54 @@
+import os
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+os.environ.setdefault("DATABASE_URL_SYNC", "sqlite+pysqlite:///:memory:")
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import app.ai_module.rag.embeddings as embeddings
+from app.ai_module.rag.embedding_cache import EmbeddingCache, text_hash
+
+
+class _FakeEmbeddingsClient:
+    def __init__(self):
+        self.calls = []
+        self.embeddings = SimpleNamespace(create=self._create)
+
+    def _create(self, *, model, input):
+        self.calls.append(list(input))
+        return SimpleNamespace(
+            data=[SimpleNamespace(embedding=[float(len(text)), 0.5, -1.25]) for text in input]
+        )
+
+
+def test_embed_texts_only_sends_cache_misses(monkeypatch, tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "embeddings.sqlite3"))
+    client = _FakeEmbeddingsClient()
+    monkeypatch.setattr(embeddings, "get_embedding_cache", lambda: cache)
+    monkeypatch.setattr(embeddings, "_get_client", lambda: client)
+
+    first = embeddings.embed_texts(["alpha", "beta", "alpha"])
+    second = embeddings.embed_texts(["beta", "gamma-long", "alpha"])
+    third = embeddings.embed_texts(["alpha", "beta", "gamma-long"])
+
+    assert client.calls == [["alpha", "beta"], ["gamma-long"]]
+    assert first == [[5.0, 0.5, -1.25], [4.0, 0.5, -1.25], [5.0, 0.5, -1.25]]
+    assert second[1] == [10.0, 0.5, -1.25]
+    assert third == [first[0], first[1], second[1]]
+
+
+def test_cache_is_keyed_by_model_and_evicts_least_recently_used(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "embeddings.sqlite3"), max_entries=2)
+
+    cache.put_many({text_hash("a"): [1.0], text_hash("b"): [2.0]}, "model-1")
+    assert cache.get_many([text_hash("a")], "model-2") == {}
+    assert cache.get_many([text_hash("a")], "model-1") == {text_hash("a"): [1.0]}
+
+    cache.put_many({text_hash("c"): [3.0]}, "model-1")
+
+    assert cache.count() == 2
+    remaining = cache.get_many([text_hash("a"), text_hash("b"), text_hash("c")], "model-1")
+    assert set(remaining) == {text_hash("a"), text_hash("c")}
@@ -0,0 +1,141 @@
+import os
+import sys
+from pathlib import Path
+
+os.environ.setdefault("DATABASE_URL_SYNC", "sqlite+pysqlite:///:memory:")
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import app.ai_module.rag.retriever as retriever
+from app.ai_module.rag.embeddings import hashing_embed_texts
+from app.ai_module.rag.ingest import IngestManifest
+from app.ai_module.rag.numpy_store import NumpyVectorStore
+from app.ai_module.rag.queries import build_cluster_queries, query_for_signal
+from app.ai_module.rag.ranking import fuse_ranked_lists, mmr_select
+from app.ai_module.rag.retrieval_cache import RetrievalCache
+
+
+def test_cluster_queries_follow_algorithm_and_rule_clusters():
+    findings = [
+        {"algorithm": "RSA", "type": "rsa_generation"},
+        {"algorithm": "RSA", "type": "rsa_import"},
+        {"algorithm": "ECC/ECDSA", "type": "ecdsa_sign"},
+        {"algorithm": None, "type": "outdated_tls", "meta": {"rule_id": "outdated_tls"}},
+        {"algorithm": "Unknown", "meta": {"library": "python-rsa"}},
+    ]
+
+    queries = build_cluster_queries(findings)
+
+    assert queries == [
+        query_for_signal("RSA"),
+        query_for_signal("ECC/ECDSA"),
+        query_for_signal("outdated_tls"),
+    ]
+
+
+def test_mmr_skips_near_duplicate_chunks():
+    base = [1.0, 0.0, 0.0]
+    duplicate = [0.99, 0.01, 0.0]
+    distinct = [0.0, 1.0, 0.0]
+    vector_lists = [
+        [
+            {"doc_id": "a.pdf", "section": "page 1", "page": 1, "text": "chunk one", "embedding": base},
+            {"doc_id": "a.pdf", "section": "page 1", "page": 1, "text": "chunk one again", "embedding": duplicate},
+            {"doc_id": "b.pdf", "section": "page 2", "page": 2, "text": "other topic", "embedding": distinct},
+        ]
+    ]
+
+    selected = mmr_select(fuse_ranked_lists(vector_lists, []), top_k=2)
+
+    assert [chunk["text"] for chunk in selected] == ["chunk one", "other topic"]
+    assert all("embedding" not in chunk for chunk in selected)
+
+
+def test_hybrid_retrieval_batches_embeddings_and_fuses_lexical_hits(monkeypatch, tmp_path):
+    texts = {
+        "fips204.pdf": "ML-DSA digital signatures replace ECDSA signatures",
+        "fips203.pdf": "ML-KEM key encapsulation replaces RSA key transport",
+        "sp800-52.pdf": "TLS 1.0 and TLS 1.1 are deprecated for servers",
+    }
+    store = NumpyVectorStore(collection_name="nist", persist_dir=str(tmp_path))
+    chunks = [
+        {"chunk_id": f"{doc_id}::p1::c1", "doc_id": doc_id, "title": doc_id, "page": 1, "section": "page 1", "text": text}
+        for doc_id, text in texts.items()
+    ]
+    store.upsert_chunks(chunks, hashing_embed_texts(list(texts.values()), dim=64))
+    store.flush()
+
+    embed_calls = []
+    batch_calls = []
+
+    def _embed(queries):
+        embed_calls.append(list(queries))
+        return hashing_embed_texts(queries, dim=64)
+
+    original_query_batch = store.query_batch
+
+    def _query_batch(embeddings, **kwargs):
+        batch_calls.append(len(embeddings))
+        return original_query_batch(embeddings, **kwargs)
+
+    class _LexicalIndex:
+        def search(self, query, *, top_k=3):
+            if "TLS" not in query:
+                return []
+            return [{"doc_id": "sp800-52.pdf", "title": "sp800-52", "section": "page 1", "page": 1, "snippet": "TLS"}]
+
+    monkeypatch.setattr(store, "query_batch", _query_batch)
+    monkeypatch.setattr(retriever, "get_vector_store", lambda: store)
+    monkeypatch.setattr(retriever, "embed_texts", _embed)
+    monkeypatch.setattr(retriever, "open_index", lambda corpus_path=None: _LexicalIndex())
+
+    queries = [query_for_signal("ECC/ECDSA"), query_for_signal("RSA"), query_for_signal("outdated_tls")]
+    result = retriever.retrieve_relevant_chunks_with_debug(queries, top_k=3)
+
+    assert result.failure_reason is None
+    assert embed_calls == [queries]
+    assert batch_calls == [3]
+    assert result.to_dict()["query_count"] == 3
+    assert result.to_dict()["lexical_hits"] == 1
+    assert {chunk["doc_id"] for chunk in result.chunks} == set(texts)
+
+
+def test_retrieval_cache_hits_until_corpus_manifest_changes(monkeypatch, tmp_path):
+    store = NumpyVectorStore(collection_name="nist", persist_dir=str(tmp_path))
+    text = "ML-KEM key encapsulation replaces RSA key transport"
+    store.upsert_chunks(
+        [{"chunk_id": "fips203.pdf::p1::c1", "doc_id": "fips203.pdf", "title": "fips203", "page": 1, "section": "page 1", "text": text}],
+        hashing_embed_texts([text], dim=64),
+    )
+    store.flush()
+    manifest = IngestManifest.for_store(store)
+    manifest.documents["fips203.pdf"] = {"content_hash": "v1"}
+    manifest.save()
+
+    embed_calls = []
+
+    def _embed(queries):
+        embed_calls.append(list(queries))
+        return hashing_embed_texts(queries, dim=64)
+
+    cache = RetrievalCache(str(tmp_path / "retrievals.sqlite3"))
+    monkeypatch.setattr(retriever, "get_retrieval_cache", lambda: cache)
+    monkeypatch.setattr(retriever, "get_vector_store", lambda: store)
+    monkeypatch.setattr(retriever, "embed_texts", _embed)
+    monkeypatch.setattr(retriever, "open_index", lambda corpus_path=None: None)
+
+    first = retriever.retrieve_relevant_chunks_with_debug(["RSA  key transport"], top_k=2)
+    second = retriever.retrieve_relevant_chunks_with_debug(["rsa key transport"], top_k=2)
+
+    assert first.to_dict()["cache_hit"] is False
+    assert second.to_dict()["cache_hit"] is True
+    assert second.chunks == first.chunks
+    assert len(embed_calls) == 1
+
+    manifest.documents["fips203.pdf"] = {"content_hash": "v2"}
+    manifest.save()
+    third = retriever.retrieve_relevant_chunks_with_debug(["rsa key transport"], top_k=2)
+
+    assert third.cache_hit is False
+    assert len(embed_calls) == 2
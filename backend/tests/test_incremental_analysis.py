@@ -0,0 +1,215 @@
+import asyncio
+import os
+import sys
+import uuid as uuid_lib
+from pathlib import Path
+from types import SimpleNamespace
+
+os.environ.setdefault("DATABASE_URL_SYNC", "sqlite+pysqlite:///:memory:")
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import app.ai_module.orchestrator as orchestrator
+from app.ai_module.incremental import (
+    IncrementalPlan,
+    carry_forward_recommendations,
+    compute_findings_delta,
+)
+from app.ai_module.schemas import AiAnalysisResponse
+
+
+def _finding(file_path, line, rule_id="rsa_generation", algorithm="RSA", evidence="RSA.generate(2048)"):
+    return {
+        "type": rule_id,
+        "severity": "HIGH",
+        "algorithm": algorithm,
+        "context": "SAST",
+        "file_path": file_path,
+        "line_start": line,
+        "line_end": line,
+        "evidence": evidence,
+        "meta": {"scanner_type": "SAST", "rule_id": rule_id},
+    }
+
+
+def _previous_response():
+    return AiAnalysisResponse.model_validate(
+        {
+            "risk_score": 40,
+            "pqc_readiness_score": 60,
+            "severity_weighted_index": 4.8,
+            "refactor_cost_estimate": {"level": "LOW", "explanation": "2 files", "affected_files": 2},
+            "priority_rank": 3,
+            "recommendations": [
+                {
+                    "title": "Replace RSA in auth",
+                    "description": "Migrate auth RSA usage.",
+                    "nist_standard_reference": "FIPS 203 (ML-KEM)",
+                    "affected_locations": [
+                        {"file_path": "src/auth.py", "rule_id": "rsa_generation", "scanner_type": "SAST"}
+                    ],
+                    "citations": [
+                        {"doc_id": "fips203.pdf", "title": "FIPS 203", "section": "page 1", "snippet": "ML-KEM"}
+                    ],
+                    "confidence": 0.8,
+                },
+                {
+                    "title": "Replace RSA in legacy module",
+                    "description": "Legacy module RSA usage.",
+                    "nist_standard_reference": "FIPS 203 (ML-KEM)",
+                    "affected_locations": [
+                        {"file_path": "src/legacy.py", "rule_id": "rsa_generation", "scanner_type": "SAST"}
+                    ],
+                    "confidence": 0.7,
+                },
+            ],
+            "analysis_summary": "RSA usage in two modules.",
+            "confidence_score": 0.7,
+            "citation_missing": False,
+            "inputs_summary": {},
+            "analysis_mode": "real",
+        }
+    )
+
+
+def test_delta_ignores_line_shifts_and_detects_changes():
+    previous = [_finding("src/auth.py", 10), _finding("src/legacy.py", 4)]
+    current = [_finding("src/auth.py", 42), _finding("src/new.py", 7, rule_id="ecdsa_sign", algorithm="ECDSA")]
+
+    delta = compute_findings_delta(current, previous, previous_scan_uuid=uuid_lib.uuid4())
+
+    assert [item["file_path"] for item in delta.unchanged] == ["src/auth.py"]
+    assert [item["file_path"] for item in delta.added] == ["src/new.py"]
+    assert [item["file_path"] for item in delta.removed] == ["src/legacy.py"]
+
+
+def test_recommendations_tied_to_removed_findings_are_not_carried_forward():
+    delta = compute_findings_delta(
+        [_finding("src/auth.py", 10)],
+        [_finding("src/auth.py", 10), _finding("src/legacy.py", 4)],
+        previous_scan_uuid=uuid_lib.uuid4(),
+    )
+
+    carried = carry_forward_recommendations(_previous_response().recommendations, delta)
+
+    assert [item.title for item in carried] == ["Replace RSA in auth"]
+
+
+def test_incremental_analysis_sends_only_delta_to_llm(monkeypatch):
+    current = [_finding("src/auth.py", 10), _finding("src/new.py", 7, rule_id="ecdsa_sign", algorithm="ECDSA")]
+    delta = compute_findings_delta(
+        current,
+        [_finding("src/auth.py", 10), _finding("src/legacy.py", 4)],
+        previous_scan_uuid=uuid_lib.uuid4(),
+    )
+    previous = _previous_response()
+    plan = IncrementalPlan(
+        delta=delta,
+        previous_response=previous,
+        carried_forward=carry_forward_recommendations(previous.recommendations, delta),
+    )
+    llm_calls = []
+
+    monkeypatch.setattr(
+        orchestrator,
+        "inspect_rag_corpus",
+        lambda _corpus_path=None: SimpleNamespace(
+            to_dict=lambda: {"rag_corpus_loaded": True, "vector_store_ready": True, "vector_count": 10}
+        ),
+    )
+    monkeypatch.setattr(
+        orchestrator,
+        "retrieve_guidance_for_findings",
+        lambda _findings, top_k=8: SimpleNamespace(
+            chunks=[{"doc_id": "fips204.pdf", "title": "FIPS 204", "section": "page 3", "text": "ML-DSA"}],
+            failure_reason=None,
+            vector_store_collection="qshield_nist_rag",
+        ),
+    )
+
+    async def _generate(**kwargs):
+        llm_calls.append(kwargs)
+        payload = previous.model_dump()
+        payload["risk_score"] = 99
+        payload["recommendations"] = [
+            {
+                "title": "Replace ECDSA in new module",
+                "description": "Adopt ML-DSA.",
+                "nist_standard_reference": "FIPS 204 (ML-DSA)",
+                "citations": [
+                    {"doc_id": "fips204.pdf", "title": "FIPS 204", "section": "page 3", "snippet": "ML-DSA"}
+                ],
+                "confidence": 0.8,
+            }
+        ]
+        return payload
+
+    monkeypatch.setattr(orchestrator, "agenerate_grounded_ai_analysis", _generate)
+
+    response, citations, _refs = asyncio.run(orchestrator.analyze_findings(current, incremental=plan))
+
+    assert [item["file_path"] for item in llm_calls[0]["findings"]] == ["src/new.py"]
+    assert [item["file_path"] for item in llm_calls[0]["removed_findings"]] == ["src/legacy.py"]
+    assert llm_calls[0]["previous_analysis"]["carried_forward_recommendations"][0]["title"] == "Replace RSA in auth"
+    assert [item.title for item in response.recommendations] == [
+        "Replace RSA in auth",
+        "Replace ECDSA in new module",
+    ]
+    assert response.risk_score != 99
+    assert response.inputs_summary["incremental"]["added"] == 1
+    assert {citation["doc_id"] for citation in citations} == {"fips203.pdf", "fips204.pdf"}
+
+
+def test_rescan_with_only_resolved_findings_skips_llm(monkeypatch):
+    current = [_finding("src/auth.py", 10)]
+    delta = compute_findings_delta(
+        current,
+        [_finding("src/auth.py", 10), _finding("src/legacy.py", 4)],
+        previous_scan_uuid=uuid_lib.uuid4(),
+    )
+    previous = _previous_response()
+    plan = IncrementalPlan(
+        delta=delta,
+        previous_response=previous,
+        carried_forward=carry_forward_recommendations(previous.recommendations, delta),
+    )
+
+    def _fail(*_args, **_kwargs):
+        raise AssertionError("no retrieval or LLM call expected")
+
+    monkeypatch.setattr(orchestrator, "inspect_rag_corpus", _fail)
+    monkeypatch.setattr(orchestrator, "agenerate_grounded_ai_analysis", _fail)
+
+    response, _citations, _refs = asyncio.run(orchestrator.analyze_findings(current, incremental=plan))
+
+    assert response.analysis_mode == "real"
+    assert [item.title for item in response.recommendations] == ["Replace RSA in auth"]
+    assert "resolved 1 finding" in response.analysis_summary
+
+
+def test_unchanged_rescan_is_not_reported_as_a_cache_hit(monkeypatch):
+    current = [_finding("src/auth.py", 10)]
+    previous_scan_uuid = uuid_lib.uuid4()
+    delta = compute_findings_delta(current, current, previous_scan_uuid=previous_scan_uuid)
+    previous = _previous_response()
+    plan = IncrementalPlan(
+        delta=delta,
+        previous_response=previous,
+        carried_forward=carry_forward_recommendations(previous.recommendations, delta),
+    )
+    stored = []
+    monkeypatch.setattr(orchestrator, "serialize_ai_analysis_snapshot", lambda snapshot: previous)
+    monkeypatch.setattr(orchestrator, "_enrich_recommendations_for_code_fix", lambda payload, findings: payload)
+    monkeypatch.setattr(orchestrator, "upsert_ai_analysis_snapshot", lambda db, scan_uuid, payload, **_: stored.append(payload))
+    snapshot = SimpleNamespace(scan_uuid=previous_scan_uuid, citations=[], nist_standard_reference="FIPS 203")
+
+    response = orchestrator._persist_cached_snapshot(
+        None, uuid_lib.uuid4(), snapshot, findings=current, algorithm_signature="sig", incremental=plan
+    )
+
+    assert delta.is_empty
+    assert response.debug_message == "Incremental rescan: no finding changes"
+    assert response.inputs_summary["cache"]["cache_hit"] is False
+    assert response.inputs_summary["incremental"]["mode"] == "unchanged"
+    assert stored == [response]
@@ -0,0 +1,60 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+os.environ.setdefault("DATABASE_URL_SYNC", "sqlite+pysqlite:///:memory:")
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import app.ai_module.rag.indexer as indexer
+import app.ai_module.rag.loader as loader
+from app.ai_module.rag.retriever import _retrieve_legacy_citations
+
+
+def test_legacy_citations_use_bm25_and_resync_changed_documents(monkeypatch, tmp_path):
+    corpus = tmp_path / "corpus"
+    corpus.mkdir()
+    (corpus / "fips203.txt").write_text(
+        "ML-KEM is a key encapsulation mechanism. ML-KEM replaces RSA key transport.",
+        encoding="utf-8",
+    )
+    (corpus / "fips204.txt").write_text("ML-DSA is a digital signature algorithm replacing ECDSA.", encoding="utf-8")
+    (corpus / "sp800-52.txt").write_text("TLS servers shall support TLS 1.2 and should support TLS 1.3.", encoding="utf-8")
+    monkeypatch.setattr(indexer, "AI_RAG_CACHE_PATH", str(tmp_path / "legacy.sqlite3"))
+    monkeypatch.setattr(loader, "AI_RAG_TEXT_CACHE_DIR", str(tmp_path / "text_cache"))
+
+    citations = _retrieve_legacy_citations("ECDSA signature migration", top_k=2, corpus_path=str(corpus))
+
+    assert citations[0].doc_id == "fips204.txt"
+    assert citations[0].section == "page 1"
+    assert citations[0].page == 1
+    assert citations[0].snippet.startswith("ML-DSA")
+    assert _retrieve_legacy_citations('"OR" ( NEAR *', top_k=2, corpus_path=str(corpus)) == []
+
+    (corpus / "fips204.txt").write_text("FN-DSA guidance for constrained devices.", encoding="utf-8")
+    (corpus / "sp800-52.txt").unlink()
+
+    assert _retrieve_legacy_citations("ECDSA", top_k=2, corpus_path=str(corpus)) == []
+    assert _retrieve_legacy_citations("TLS", top_k=2, corpus_path=str(corpus)) == []
+    assert [item.doc_id for item in _retrieve_legacy_citations("FN-DSA", corpus_path=str(corpus))] == ["fips204.txt"]
+
+
+def test_query_path_opens_the_index_built_at_ingest_without_syncing(monkeypatch, tmp_path):
+    corpus = tmp_path / "corpus"
+    corpus.mkdir()
+    (corpus / "fips204.txt").write_text("ML-DSA is a digital signature algorithm replacing ECDSA.", encoding="utf-8")
+    monkeypatch.setattr(indexer, "AI_RAG_CACHE_PATH", str(tmp_path / "hybrid.sqlite3"))
+    monkeypatch.setattr(loader, "AI_RAG_TEXT_CACHE_DIR", str(tmp_path / "text_cache"))
+    monkeypatch.setattr(indexer, "_indexes", {})
+
+    assert indexer.open_index(str(corpus)) is None
+
+    indexer.build_or_update_index(str(corpus))
+    monkeypatch.setattr(indexer, "_indexes", {})
+    monkeypatch.setattr(indexer, "list_corpus_files", lambda root: pytest.fail("query path touched the corpus"))
+
+    index = indexer.open_index(str(corpus))
+    assert [row["doc_id"] for row in index.search("ECDSA")] == ["fips204.txt"]
@@ -0,0 +1,194 @@
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+os.environ.setdefault("DATABASE_URL_SYNC", "sqlite+pysqlite:///:memory:")
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import app.ai_module.llm.async_client as async_client
+import app.ai_module.llm.openai_client as openai_client
+import app.ai_module.orchestrator as orchestrator
+import app.ai_module.rag.embeddings as embeddings
+import app.ai_module.rag.retriever as retriever
+import app.ai_module.resilience as resilience
+from app.ai_module.llm.stub_server import StubLLMServer
+from app.ai_module.rag.numpy_store import NumpyVectorStore
+from app.ai_module.resilience import CircuitBreaker, CircuitOpenError
+
+
+def _finding():
+    return {
+        "type": "rsa_generation",
+        "severity": "CRITICAL",
+        "algorithm": "RSA-2048",
+        "context": "SAST",
+        "file_path": "src/auth.py",
+        "line_start": 33,
+        "line_end": 33,
+        "evidence": "RSA.generate(2048)",
+        "meta": {"scanner_type": "SAST", "rule_id": "rsa_generation"},
+    }
+
+
+def _analysis_kwargs():
+    return {
+        "findings": [_finding()],
+        "retrieved_chunks": [{"doc_id": "fips203.pdf", "title": "FIPS 203", "section": "page 1", "page": 1, "text": "ML-KEM"}],
+        "risk_metrics": {"risk_score": 70, "pqc_readiness_score": 30, "severity_weighted_index": 2.5},
+        "refactor_cost_estimate": {"level": "LOW", "explanation": "one file", "affected_files": 1},
+        "priority_rank": 1,
+        "inputs_summary": {"total_findings": 1},
+    }
+
+
+@pytest.fixture
+def stub_server(monkeypatch):
+    server = StubLLMServer().start()
+    breaker = CircuitBreaker("llm", failure_threshold=2, reset_seconds=60)
+    monkeypatch.setattr(async_client, "OPENAI_BASE_URL", server.base_url)
+    monkeypatch.setattr(async_client, "OPENAI_API_KEY", "test-key")
+    monkeypatch.setattr(openai_client, "get_llm_response_cache", lambda: None)
+    monkeypatch.setattr(openai_client, "get_circuit_breaker", lambda _name: breaker)
+    monkeypatch.setattr(orchestrator, "get_circuit_breaker", lambda _name: breaker)
+    server.breaker = breaker
+    try:
+        yield server
+    finally:
+        server.stop()
+
+
+def test_llm_call_times_out_and_counts_against_breaker(stub_server, monkeypatch):
+    stub_server.latency_seconds = 1.0
+    monkeypatch.setattr(openai_client, "AI_LLM_TIMEOUT_SECONDS", 0.2)
+
+    started = time.perf_counter()
+    with pytest.raises(openai_client.LLMClientError, match="deadline"):
+        asyncio.run(openai_client.agenerate_grounded_ai_analysis(**_analysis_kwargs()))
+
+    assert time.perf_counter() - started < 0.8
+    assert stub_server.breaker.state == "closed"
+    with pytest.raises(openai_client.LLMClientError):
+        asyncio.run(openai_client.agenerate_grounded_ai_analysis(**_analysis_kwargs()))
+    assert stub_server.breaker.state == "open"
+
+
+def test_hedged_request_beats_a_slow_first_attempt(stub_server, monkeypatch):
+    stub_server.latency_overrides = [1.5]
+    monkeypatch.setattr(openai_client, "AI_LLM_TIMEOUT_SECONDS", 1.0)
+    monkeypatch.setattr(openai_client, "AI_LLM_HEDGE_DELAY_SECONDS", 0.1)
+    debug = {}
+
+    started = time.perf_counter()
+    payload = asyncio.run(openai_client.agenerate_grounded_ai_analysis(**_analysis_kwargs(), debug=debug))
+
+    assert time.perf_counter() - started < 0.8
+    assert payload["risk_score"] == 70
+    assert debug["llm_hedged"] is True
+    assert len(stub_server.requests) == 2
+    assert stub_server.breaker.state == "closed"
+
+
+def test_breaker_reopens_after_failed_half_open_trial():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_seconds=0.05)
+    with pytest.raises(RuntimeError):
+        resilience.call_with_breaker(breaker, lambda: (_ for _ in ()).throw(RuntimeError("down")))
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    time.sleep(0.06)
+    assert breaker.state == "half_open"
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+
+def test_open_llm_circuit_falls_back_to_deterministic_analysis(stub_server, monkeypatch):
+    stub_server.fail_status = 503
+    monkeypatch.setattr(
+        orchestrator,
+        "inspect_rag_corpus",
+        lambda _corpus_path=None: SimpleNamespace(
+            to_dict=lambda: {
+                "rag_corpus_loaded": True,
+                "vector_store_ready": True,
+                "vector_count": 10,
+                "vector_store_collection": "qshield_nist_rag",
+            }
+        ),
+    )
+    monkeypatch.setattr(
+        orchestrator,
+        "retrieve_guidance_for_findings",
+        lambda _findings, top_k=8: SimpleNamespace(
+            chunks=_analysis_kwargs()["retrieved_chunks"],
+            failure_reason=None,
+            vector_store_collection="qshield_nist_rag",
+        ),
+    )
+    monkeypatch.setattr(orchestrator, "build_recommendations", lambda findings, corpus_path=None: ([], [], True, []))
+
+    modes = [asyncio.run(orchestrator.analyze_findings([_finding()]))[0].analysis_mode for _ in range(2)]
+    assert modes == ["error", "error"]
+    assert stub_server.breaker.state == "open"
+
+    requests_before = len(stub_server.requests)
+    response, _citations, _refs = asyncio.run(orchestrator.analyze_findings([_finding()]))
+
+    assert response.analysis_mode == "fallback"
+    assert "LLM circuit open" in response.failure_reason
+    assert len(stub_server.requests) == requests_before
+
+
+def test_embedding_timeouts_fall_back_once_the_breaker_opens(monkeypatch, tmp_path):
+    embedding_calls = []
+
+    def _create(**_kwargs):
+        embedding_calls.append(1)
+        raise TimeoutError("Request timed out.")
+
+    store = NumpyVectorStore(collection_name="nist", persist_dir=str(tmp_path))
+    store.upsert_chunks(
+        [{"chunk_id": "fips203.pdf::p1::c1", "doc_id": "fips203.pdf", "title": "FIPS 203", "page": 1, "section": "page 1", "text": "ML-KEM"}],
+        embeddings.hashing_embed_texts(["ML-KEM"], dim=64),
+    )
+    store.flush()
+    breakers = {"embeddings": CircuitBreaker("embeddings", failure_threshold=2, reset_seconds=60)}
+    monkeypatch.setattr(embeddings, "AI_EMBEDDING_PROVIDER", "openai")
+    monkeypatch.setattr(embeddings, "get_embedding_cache", lambda: None)
+    monkeypatch.setattr(embeddings, "_get_client", lambda: SimpleNamespace(embeddings=SimpleNamespace(create=_create)))
+    monkeypatch.setattr(embeddings, "get_circuit_breaker", breakers.__getitem__)
+    monkeypatch.setattr(orchestrator, "get_circuit_breaker", breakers.__getitem__)
+    monkeypatch.setattr(retriever, "get_vector_store", lambda: store)
+    monkeypatch.setattr(retriever, "get_retrieval_cache", lambda: None)
+    monkeypatch.setattr(retriever, "open_index", lambda corpus_path=None: None)
+    monkeypatch.setattr(
+        orchestrator,
+        "inspect_rag_corpus",
+        lambda _corpus_path=None: SimpleNamespace(
+            to_dict=lambda: {"rag_corpus_loaded": True, "vector_store_ready": True, "vector_count": 1}
+        ),
+    )
+    monkeypatch.setattr(orchestrator, "build_recommendations", lambda findings, corpus_path=None: ([], [], True, []))
+
+    first = asyncio.run(orchestrator.analyze_findings([_finding()]))[0]
+    assert first.analysis_mode == "error"
+    assert "Embedding request failed" in first.failure_reason
+
+    second = asyncio.run(orchestrator.analyze_findings([_finding()]))[0]
+    assert second.analysis_mode == "fallback"
+    assert "Embeddings circuit open" in second.failure_reason
+    assert breakers["embeddings"].state == "open"
+
+    calls_before = len(embedding_calls)
+    third = asyncio.run(orchestrator.analyze_findings([_finding()]))[0]
+    assert third.analysis_mode == "fallback"
+    assert len(embedding_calls) == calls_before
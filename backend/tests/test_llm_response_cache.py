@@ -0,0 +1,191 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+os.environ.setdefault("DATABASE_URL_SYNC", "sqlite+pysqlite:///:memory:")
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import app.ai_module.llm.openai_client as openai_client
+from app.ai_module.llm.response_cache import LLMResponseCache, prompt_cache_key
+from app.single_flight import InMemoryLockBackend, SingleFlight
+
+
+class _FakeResponsesClient:
+    def __init__(self, delay=0.0):
+        self.calls = []
+        self._delay = delay
+        self.responses = SimpleNamespace(create=self._create)
+
+    def _create(self, *, model, input):
+        self.calls.append(input)
+        time.sleep(self._delay)
+        return SimpleNamespace(output_text='{"risk_score": 42, "recommendations": []}')
+
+
+def _generate(**overrides):
+    kwargs = {
+        "findings": [{"type": "rsa_generation", "algorithm": "RSA", "severity": "HIGH"}],
+        "retrieved_chunks": [{"doc_id": "fips203.pdf", "title": "FIPS 203", "text": "ML-KEM"}],
+        "risk_metrics": {"risk_score": 42},
+        "refactor_cost_estimate": {"level": "LOW"},
+        "priority_rank": 1,
+        "inputs_summary": {},
+    }
+    kwargs.update(overrides)
+    return openai_client.generate_grounded_ai_analysis(**kwargs)
+
+
+def _install(monkeypatch, tmp_path, client):
+    cache = LLMResponseCache(str(tmp_path / "llm.sqlite3"))
+    flight = SingleFlight("llm_response", lock_ttl_seconds=30, backend=InMemoryLockBackend())
+    monkeypatch.setattr(openai_client, "get_llm_response_cache", lambda: cache)
+    monkeypatch.setattr(openai_client, "_get_client", lambda: client)
+    monkeypatch.setattr(openai_client, "_llm_flight", flight)
+    monkeypatch.setattr(openai_client, "AI_SINGLE_FLIGHT_POLL_SECONDS", 0.05)
+    return cache, flight
+
+
+def test_identical_prompts_are_served_from_cache(monkeypatch, tmp_path):
+    client = _FakeResponsesClient()
+    cache, _ = _install(monkeypatch, tmp_path, client)
+
+    first_debug, second_debug = {}, {}
+    first = _generate(debug=first_debug)
+    second = _generate(debug=second_debug)
+
+    assert first == second == {"risk_score": 42, "recommendations": []}
+    assert len(client.calls) == 1
+    assert first_debug["llm_cache"] == "miss"
+    assert first_debug["prompt_tokens"] == second_debug["prompt_tokens"] > 0
+    assert second_debug["llm_cache"] == "hit"
+    assert cache.count() == 1
+
+    _generate(priority_rank=2)
+    assert len(client.calls) == 2
+
+
+def test_prompt_key_ignores_trailing_whitespace_and_line_endings():
+    base = [{"role": "user", "content": "line one\nline two"}]
+    noisy = [{"role": "user", "content": "line one  \r\nline two\n"}]
+
+    assert prompt_cache_key("gpt", base) == prompt_cache_key("gpt", noisy)
+    assert prompt_cache_key("gpt", base) != prompt_cache_key("other-model", base)
+
+
+def test_concurrent_identical_prompts_make_one_request(monkeypatch, tmp_path):
+    client = _FakeResponsesClient(delay=0.2)
+    _, flight = _install(monkeypatch, tmp_path, client)
+    outcomes = []
+
+    def _worker():
+        debug = {}
+        _generate(debug=debug)
+        outcomes.append(debug["llm_cache"])
+
+    threads = [threading.Thread(target=_worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(client.calls) == 1
+    assert sorted(outcomes) == ["coalesced", "coalesced", "coalesced", "miss"]
+    assert flight.metrics() == {"leader": 1}
+
+
+def test_cache_expires_and_evicts_oldest_entries(monkeypatch, tmp_path):
+    cache = LLMResponseCache(str(tmp_path / "llm.sqlite3"), ttl_seconds=60, max_entries=2)
+    for index in range(3):
+        cache.put(f"key-{index}", model="gpt", output_text="{}", payload={"index": index})
+        time.sleep(0.01)
+
+    assert cache.count() == 2
+    assert cache.get("key-0") is None
+    assert cache.get("key-2").payload == {"index": 2}
+
+    monkeypatch.setattr(time, "time", lambda: 10**12)
+    assert cache.get("key-2") is None
+
+
+def test_payloads_failing_validation_are_not_cached(monkeypatch, tmp_path):
+    client = _FakeResponsesClient()
+    cache, _ = _install(monkeypatch, tmp_path, client)
+
+    def _reject(payload):
+        raise ValueError("missing analysis_summary")
+
+    assert _generate(validate=_reject) == {"risk_score": 42, "recommendations": []}
+    assert cache.count() == 0
+
+    _generate(validate=lambda payload: payload)
+    assert cache.count() == 1
+    assert openai_client._local_flights == {}
+
+
+def test_follower_takes_over_when_the_leader_fails(monkeypatch, tmp_path):
+    client = _FakeResponsesClient()
+    _, flight = _install(monkeypatch, tmp_path, client)
+    monkeypatch.setattr(openai_client, "AI_SINGLE_FLIGHT_WAIT_SECONDS", 30)
+    messages = openai_client._grounded_messages(
+        findings=[{"type": "rsa_generation", "algorithm": "RSA", "severity": "HIGH"}],
+        retrieved_chunks=[{"doc_id": "fips203.pdf", "title": "FIPS 203", "text": "ML-KEM"}],
+        risk_metrics={"risk_score": 42},
+        refactor_cost_estimate={"level": "LOW"},
+        priority_rank=1,
+        inputs_summary={},
+        previous_analysis=None,
+        removed_findings=None,
+    )
+    # Another worker leads this prompt and fails after a short while, without caching anything.
+    lease = flight.try_acquire(openai_client.OPENAI_MODEL, prompt_cache_key(openai_client.OPENAI_MODEL, messages))
+    threading.Timer(0.2, flight.release, args=(lease,)).start()
+
+    started = time.monotonic()
+    debug = {}
+    _generate(debug=debug)
+
+    assert time.monotonic() - started < 5
+    assert debug["llm_cache"] == "miss"
+    assert len(client.calls) == 1
+    assert flight.metrics() == {"leader": 1}
+
+
+def test_async_cache_reads_and_writes_run_off_the_event_loop(monkeypatch, tmp_path):
+    cache = LLMResponseCache(str(tmp_path / "llm.sqlite3"))
+    io_threads = []
+
+    class _RecordingCache:
+        def get(self, key):
+            io_threads.append(threading.get_ident())
+            return cache.get(key)
+
+        def put(self, key, **kwargs):
+            io_threads.append(threading.get_ident())
+            cache.put(key, **kwargs)
+
+    async def _request(messages, debug, on_delta):
+        return '{"risk_score": 42}', {"risk_score": 42}
+
+    monkeypatch.setattr(openai_client, "get_llm_response_cache", lambda: _RecordingCache())
+    monkeypatch.setattr(openai_client, "_llm_flight", SingleFlight("llm_response", lock_ttl_seconds=30, backend=InMemoryLockBackend()))
+    monkeypatch.setattr(openai_client, "_arequest_completion", _request)
+    messages = [{"role": "user", "content": "analyze"}]
+
+    async def _run():
+        loop_thread = threading.get_ident()
+        first, second = {}, {}
+        await openai_client._acached_completion(messages, first)
+        await openai_client._acached_completion(messages, second)
+        return loop_thread, first["llm_cache"], second["llm_cache"]
+
+    loop_thread, first_outcome, second_outcome = asyncio.run(_run())
+
+    assert (first_outcome, second_outcome) == ("miss", "hit")
+    assert len(io_threads) == 3
+    assert loop_thread not in io_threads
@@ -0,0 +1,189 @@
+import asyncio
+import os
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+os.environ.setdefault("DATABASE_URL_SYNC", "sqlite+pysqlite:///:memory:")
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import app.ai_module.llm.async_client as async_client
+import app.ai_module.llm.openai_client as openai_client
+import app.ai_module.map_reduce as map_reduce
+import app.ai_module.orchestrator as orchestrator
+from app.ai_module.llm.stub_server import StubLLMServer
+from app.ai_module.rag.retriever import RetrievalResult
+from app.ai_module.schemas import AiAnalysisResponse
+
+
+def _finding(index, file_path, algorithm="RSA"):
+    return {
+        "type": "rsa_generation",
+        "algorithm": algorithm,
+        "severity": "HIGH",
+        "file_path": file_path,
+        "line_start": index,
+        "line_end": index,
+        "evidence": "rsa.generate_private_key(key_size=2048)",
+        "meta": {"rule_id": "rsa_generation", "scanner_type": "sast"},
+    }
+
+
+def _payload(risk_score=70):
+    return {
+        "risk_score": risk_score,
+        "pqc_readiness_score": 30,
+        "severity_weighted_index": 2.5,
+        "refactor_cost_estimate": {"level": "HIGH", "explanation": "many files", "affected_files": 100},
+        "priority_rank": 2,
+        "recommendations": [],
+        "analysis_summary": "RSA key generation across services",
+        "confidence_score": 0.6,
+        "citation_missing": False,
+        "inputs_summary": {},
+    }
+
+
+def _chunk(doc_id):
+    return {"doc_id": doc_id, "title": doc_id, "section": "page 1", "page": 1, "text": f"guidance from {doc_id}"}
+
+
+def test_partitions_follow_top_level_directories_and_services():
+    findings = [
+        _finding(1, "services/billing/app.py"),
+        _finding(2, "services/billing/keys.py"),
+        _finding(3, "services/auth/login.py"),
+        _finding(4, "web/src/app.ts"),
+        _finding(5, "setup.py"),
+        _finding(6, "tools/gen.py"),
+    ]
+
+    partitions = map_reduce.partition_findings(findings, max_partitions=10)
+    assert {name: len(members) for name, members in partitions.items()} == {
+        "services/billing": 2,
+        "services/auth": 1,
+        "web": 1,
+        "(root)": 1,
+        "tools": 1,
+    }
+
+    capped = map_reduce.partition_findings(findings, max_partitions=3)
+    assert list(capped) == ["services/billing", "(root)", "(other)"]
+    assert sum(len(members) for members in capped.values()) == len(findings)
+
+
+def test_map_reduce_runs_partitions_concurrently_against_stub_server(monkeypatch):
+    server = StubLLMServer(latency_seconds=0.2).start()
+    try:
+        monkeypatch.setattr(async_client, "OPENAI_BASE_URL", server.base_url)
+        monkeypatch.setattr(async_client, "OPENAI_API_KEY", "test-key")
+        monkeypatch.setattr(openai_client, "get_llm_response_cache", lambda: None)
+        monkeypatch.setattr(
+            map_reduce,
+            "retrieve_guidance_for_findings",
+            lambda findings, *, top_k: RetrievalResult(
+                query_text="RSA",
+                top_k=top_k,
+                chunks=[{"doc_id": "fips203.pdf", "title": "FIPS 203", "section": "page 1", "page": 1, "text": "ML-KEM"}],
+            ),
+        )
+        findings = [
+            _finding(index, f"{directory}/module_{index}.py")
+            for directory in ("api", "worker", "cli", "web")
+            for index in range(25)
+        ]
+        debug = {}
+
+        result = asyncio.run(
+            map_reduce.run_map_reduce_analysis(
+                findings,
+                retrieved_chunks=[],
+                risk_metrics={"risk_score": 70, "pqc_readiness_score": 30, "severity_weighted_index": 2.5},
+                refactor_cost_estimate={"level": "HIGH", "explanation": "many files", "affected_files": 100},
+                priority_rank=2,
+                inputs_summary={"total_findings": len(findings)},
+                concurrency=4,
+                debug=debug,
+            )
+        )
+    finally:
+        server.stop()
+
+    response = AiAnalysisResponse.model_validate(result.payload)
+    assert len(server.requests) == 5
+    assert response.risk_score == 70
+    assert response.recommendations
+    assert {partition["partition"] for partition in debug["map_reduce"]["partitions"]} == {"api", "worker", "cli", "web"}
+    latency = debug["map_reduce"]["stage_latency_ms"]
+    # Four 200 ms partition calls overlap instead of taking 800 ms back to back.
+    assert latency["map"] < 600
+    assert latency["reduce"] >= 200
+
+
+def test_malformed_partition_analysis_is_validated_and_left_out_of_the_reduce(monkeypatch):
+    map_validators = []
+    reduced = {}
+
+    async def _map_call(*, inputs_summary, validate=None, **_kwargs):
+        map_validators.append(validate)
+        return {"unexpected": True} if inputs_summary["partition"] == "web" else _payload()
+
+    async def _reduce_call(*, partition_summaries, **_kwargs):
+        reduced["partitions"] = [summary["partition"] for summary in partition_summaries]
+        return _payload()
+
+    monkeypatch.setattr(
+        map_reduce,
+        "retrieve_guidance_for_findings",
+        lambda findings, *, top_k: RetrievalResult(query_text="RSA", top_k=top_k, chunks=[_chunk("fips203.pdf")]),
+    )
+    monkeypatch.setattr(map_reduce, "agenerate_grounded_ai_analysis", _map_call)
+    monkeypatch.setattr(map_reduce, "agenerate_reduced_ai_analysis", _reduce_call)
+    findings = [_finding(index, f"{directory}/module_{index}.py") for directory in ("api", "web") for index in range(5)]
+
+    asyncio.run(
+        map_reduce.run_map_reduce_analysis(
+            findings,
+            retrieved_chunks=[],
+            risk_metrics={"risk_score": 70, "pqc_readiness_score": 30, "severity_weighted_index": 2.5},
+            refactor_cost_estimate={"level": "HIGH", "explanation": "many files", "affected_files": 10},
+            priority_rank=2,
+            inputs_summary={"total_findings": len(findings)},
+            validate=AiAnalysisResponse.model_validate,
+        )
+    )
+
+    assert map_validators == [AiAnalysisResponse.model_validate] * 2
+    assert reduced["partitions"] == ["api"]
+
+
+def test_map_reduce_debug_counts_the_chunks_the_reduce_prompt_used(monkeypatch):
+    reduce_chunks = [_chunk("fips203.pdf"), _chunk("fips204.pdf"), _chunk("sp800-208.pdf")]
+
+    async def _run_map_reduce(findings, *, debug, **_kwargs):
+        return map_reduce.MapReduceResult(payload=_payload(), retrieved_chunks=reduce_chunks)
+
+    monkeypatch.setattr(
+        orchestrator,
+        "inspect_rag_corpus",
+        lambda _corpus_path=None: SimpleNamespace(
+            to_dict=lambda: {"rag_corpus_loaded": True, "vector_store_ready": True, "vector_count": 10}
+        ),
+    )
+    monkeypatch.setattr(
+        orchestrator,
+        "retrieve_guidance_for_findings",
+        lambda _findings, top_k=8: SimpleNamespace(
+            chunks=reduce_chunks[:1], failure_reason=None, vector_store_collection="qshield_nist_rag"
+        ),
+    )
+    monkeypatch.setattr(orchestrator, "should_map_reduce", lambda _findings: True)
+    monkeypatch.setattr(orchestrator, "run_map_reduce_analysis", _run_map_reduce)
+    monkeypatch.setattr(orchestrator, "build_recommendations", lambda findings, corpus_path=None: ([], [], True, []))
+
+    response = asyncio.run(orchestrator.analyze_findings([_finding(1, "api/a.py"), _finding(2, "web/b.py")]))[0]
+
+    assert response.analysis_mode == "real"
+    assert response.rag_chunks_retrieved == 3
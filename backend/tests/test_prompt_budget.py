@@ -0,0 +1,87 @@
+import json
+import os
+import sys
+from pathlib import Path
+
+os.environ.setdefault("DATABASE_URL_SYNC", "sqlite+pysqlite:///:memory:")
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from app.ai_module.llm.prompts import _compact_findings, _format_context_blocks, build_user_prompt
+from app.ai_module.llm.tokens import estimate_tokens
+
+
+def _finding(index, *, algorithm, rule_id, directory, severity="MEDIUM"):
+    return {
+        "type": rule_id,
+        "algorithm": algorithm,
+        "severity": severity,
+        "file_path": f"{directory}/file_{index}.py",
+        "line_start": index,
+        "evidence": "rsa.generate_private_key(public_exponent=65537, key_size=2048) " * 5,
+        "meta": {"rule_id": rule_id, "scanner_type": "sast"},
+    }
+
+
+def test_findings_are_grouped_with_counts_and_stratified_examples():
+    findings = [_finding(i, algorithm="RSA", rule_id="rsa_generation", directory="src/crypto") for i in range(50)]
+    findings += [_finding(i, algorithm="Weak Hash", rule_id="md5_usage", directory="src/legacy") for i in range(3)]
+    findings += [
+        _finding(0, algorithm="ECC/ECDSA", rule_id="ecdsa_sign", directory="services/auth", severity="CRITICAL")
+    ]
+
+    compact = _compact_findings(findings, max_examples=4)
+
+    assert compact["total_findings"] == 54
+    assert [(group["rule_id"], group["count"]) for group in compact["finding_groups"]] == [
+        ("ecdsa_sign", 1),
+        ("rsa_generation", 50),
+        ("md5_usage", 3),
+    ]
+    # Each group is represented before the largest group gets a second example.
+    assert [example["rule_id"] for example in compact["example_findings"]] == [
+        "ecdsa_sign",
+        "rsa_generation",
+        "md5_usage",
+        "rsa_generation",
+    ]
+
+
+def test_context_is_deduplicated_and_truncated_to_budget():
+    long_text = "Key establishment with ML-KEM per FIPS 203. " * 200
+    chunks = [
+        {"doc_id": "fips203.pdf", "title": "FIPS 203", "page": 1, "text": long_text},
+        {"doc_id": "fips203.pdf", "title": "FIPS 203", "page": 1, "text": long_text[:500]},
+        {"doc_id": "fips204.pdf", "title": "FIPS 204", "page": 2, "text": "ML-DSA signatures. " * 200},
+    ]
+
+    blocks = _format_context_blocks(chunks, token_budget=800)
+
+    assert blocks.count("[DOC") == 2
+    assert "source=fips204.pdf" in blocks
+    assert estimate_tokens(blocks) <= 800
+
+
+def test_user_prompt_fits_budget_for_large_findings_sets():
+    findings = [
+        _finding(i, algorithm="RSA", rule_id=f"rule_{i % 30}", directory=f"pkg{i % 25}")
+        for i in range(5000)
+    ]
+
+    prompt = build_user_prompt(
+        findings=findings,
+        retrieved_chunks=[{"doc_id": "fips203.pdf", "title": "FIPS 203", "page": 1, "text": "ML-KEM " * 1000}],
+        risk_metrics={"risk_score": 80},
+        refactor_cost_estimate={"level": "HIGH"},
+        priority_rank=1,
+        inputs_summary={"total_findings": 5000},
+        token_budget=3000,
+        context_token_budget=500,
+    )
+
+    assert estimate_tokens(prompt) <= 3000
+    compact = json.loads(prompt.split("SCAN_FINDINGS_COMPACT_JSON:\n", 1)[1].split("\n\nRETRIEVED_NIST_CONTEXT", 1)[0])
+    assert compact["total_findings"] == 5000
+    assert compact["finding_groups"]
+    assert compact["omitted_groups"] > 0
@@ -0,0 +1,85 @@
+import os
+import sys
+from collections import defaultdict
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+os.environ.setdefault("DATABASE_URL_SYNC", "sqlite+pysqlite:///:memory:")
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import app.main as main
+import app.queue_metrics as queue_metrics
+from app.celery_app import celery_app
+
+
+class FakeRedis:
+    def __init__(self, lists=None):
+        self.hashes = defaultdict(dict)
+        self.lists = lists or {}
+
+    def hincrby(self, key, field, amount):
+        self.hashes[key][field] = int(self.hashes[key].get(field, 0)) + amount
+
+    def hincrbyfloat(self, key, field, amount):
+        self.hashes[key][field] = float(self.hashes[key].get(field, 0.0)) + amount
+
+    def hset(self, key, field, value):
+        self.hashes[key][field] = value
+
+    def hgetall(self, key):
+        return {name.encode(): str(value).encode() for name, value in self.hashes.get(key, {}).items()}
+
+    def llen(self, key):
+        return self.lists.get(key, 0)
+
+
+def test_long_tasks_ack_late_with_single_prefetch():
+    assert celery_app.conf.task_acks_late is True
+    assert celery_app.conf.worker_prefetch_multiplier == 1
+    assert {queue.name for queue in celery_app.conf.task_queues} == {"io", "cpu", "ai"}
+
+
+def test_prerun_records_queue_wait_from_publish_header(monkeypatch):
+    client = FakeRedis(lists={"cpu": 3, "ai": 1})
+    monkeypatch.setattr(queue_metrics, "get_metrics_client", lambda: client)
+
+    headers = {}
+    queue_metrics._on_before_publish(headers=headers)
+    headers[queue_metrics.ENQUEUED_AT_HEADER] -= 2.0
+    task = SimpleNamespace(
+        name="scan_cloned_repository",
+        request=SimpleNamespace(delivery_info={"routing_key": "cpu"}, **headers),
+    )
+    queue_metrics._on_task_prerun(task=task)
+    queue_metrics._on_task_prerun(
+        task=SimpleNamespace(name="run_ai_analysis", request=SimpleNamespace(delivery_info={"routing_key": "ai"}))
+    )
+
+    metrics = queue_metrics.queue_metrics(["io", "cpu", "ai"])
+
+    assert metrics["io"] == {"depth": 0, "started": 0, "avg_wait_ms": None, "last_wait_ms": None}
+    assert metrics["cpu"]["depth"] == 3
+    assert metrics["cpu"]["started"] == 1
+    assert 2000 <= metrics["cpu"]["avg_wait_ms"] < 3000
+    assert metrics["ai"]["started"] == 1
+    assert metrics["ai"]["avg_wait_ms"] is None
+
+
+def test_queue_metrics_route_requires_auth_and_hides_backend_errors(monkeypatch):
+    assert TestClient(main.app).get("/metrics/queues").status_code == 401
+
+    def _unavailable():
+        raise ConnectionError("Error 111 connecting to redis-internal:6379")
+
+    monkeypatch.setattr(main, "queue_metrics", _unavailable)
+    with pytest.raises(HTTPException) as unavailable:
+        main.get_queue_metrics(_user_uuid=None)
+
+    assert unavailable.value.status_code == 503
+    assert "redis-internal" not in unavailable.value.detail
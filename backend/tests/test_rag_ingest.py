@@ -0,0 +1,141 @@
+import os
+import sys
+from pathlib import Path
+
+os.environ.setdefault("DATABASE_URL_SYNC", "sqlite+pysqlite:///:memory:")
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import app.ai_module.rag.ingest as ingest
+import app.ai_module.rag.loader as loader
+import app.ai_module.rag.retriever as retriever
+from app.ai_module.rag.embeddings import hashing_embed_texts
+from app.ai_module.rag.numpy_store import NumpyVectorStore
+
+
+class _FakeVectorStore:
+    def __init__(self, persist_dir):
+        self.persist_dir = str(persist_dir)
+        self.collection_name = "test_collection"
+        self.chunks = {}
+        self.deleted = []
+
+    def reset(self):
+        self.chunks.clear()
+
+    def count(self):
+        return len(self.chunks)
+
+    def delete_document(self, doc_id):
+        self.deleted.append(doc_id)
+        self.chunks = {key: value for key, value in self.chunks.items() if value["doc_id"] != doc_id}
+
+    def flush(self):
+        return None
+
+    def upsert_chunks(self, chunks, embeddings):
+        assert len(chunks) == len(embeddings)
+        for chunk in chunks:
+            self.chunks[chunk["chunk_id"]] = chunk
+
+
+def test_ingest_skips_unchanged_documents_and_removes_deleted_ones(monkeypatch, tmp_path):
+    corpus = tmp_path / "corpus"
+    corpus.mkdir()
+    (corpus / "fips203.txt").write_text("ML-KEM key encapsulation " * 20, encoding="utf-8")
+    (corpus / "fips204.txt").write_text("ML-DSA signatures " * 20, encoding="utf-8")
+
+    store = _FakeVectorStore(tmp_path / "vectors")
+    embedded_texts = []
+
+    def _embed(texts):
+        embedded_texts.extend(texts)
+        return [[1.0, 0.0] for _ in texts]
+
+    monkeypatch.setattr(ingest, "get_vector_store", lambda collection_name: store)
+    monkeypatch.setattr(ingest, "embed_texts", _embed)
+    monkeypatch.setattr(loader, "AI_RAG_TEXT_CACHE_DIR", "")
+
+    first = ingest.ingest_corpus(corpus_path=str(corpus), chunk_size=100, overlap=10, batch_size=2)
+    embedded_after_first = len(embedded_texts)
+
+    assert first > 0
+    assert embedded_after_first == first
+    assert (corpus / loader.TEXT_CACHE_DIRNAME).is_dir()
+
+    assert ingest.ingest_corpus(corpus_path=str(corpus), chunk_size=100, overlap=10, batch_size=2) == 0
+    assert len(embedded_texts) == embedded_after_first
+
+    (corpus / "fips204.txt").write_text("ML-DSA revised text", encoding="utf-8")
+    (corpus / "fips203.txt").unlink()
+
+    third = ingest.ingest_corpus(corpus_path=str(corpus), chunk_size=100, overlap=10, batch_size=2)
+
+    assert third == 1
+    assert embedded_texts[-1] == "ML-DSA revised text"
+    assert set(store.deleted) == {"fips203.txt", "fips204.txt"}
+    assert {chunk["doc_id"] for chunk in store.chunks.values()} == {"fips204.txt"}
+    assert [chunk["text"] for chunk in store.chunks.values()] == ["ML-DSA revised text"]
+
+
+def test_embed_with_retry_backs_off_on_transient_errors(monkeypatch):
+    attempts = []
+
+    def _flaky(texts):
+        attempts.append(texts)
+        if len(attempts) < 3:
+            raise TimeoutError("provider timeout")
+        return [[0.5] for _ in texts]
+
+    monkeypatch.setattr(ingest, "embed_texts", _flaky)
+    monkeypatch.setattr(ingest, "AI_RAG_EMBED_RETRY_BACKOFF_SECONDS", 0.0)
+
+    assert ingest._embed_with_retry(["a"]) == [[0.5]]
+    assert len(attempts) == 3
+
+
+def test_ingest_precomputes_guidance_used_without_embedding_calls(monkeypatch, tmp_path):
+    corpus = tmp_path / "corpus"
+    corpus.mkdir()
+    (corpus / "fips203.txt").write_text("ML-KEM key encapsulation replaces RSA key transport. " * 5, encoding="utf-8")
+    (corpus / "sp800-131a.txt").write_text("SHA-1 and MD5 hash functions are disallowed. " * 5, encoding="utf-8")
+
+    store = NumpyVectorStore(collection_name="nist", persist_dir=str(tmp_path / "vectors"))
+    monkeypatch.setattr(ingest, "get_vector_store", lambda collection_name: store)
+    monkeypatch.setattr(ingest, "embed_texts", lambda texts: hashing_embed_texts(texts, dim=64))
+    monkeypatch.setattr(ingest, "AI_RAG_TOP_K", 2)
+    monkeypatch.setattr(loader, "AI_RAG_TEXT_CACHE_DIR", "")
+    monkeypatch.setattr("app.ai_module.rag.indexer.AI_RAG_CACHE_PATH", str(tmp_path / "lexical.sqlite3"))
+
+    assert ingest.ingest_corpus(corpus_path=str(corpus), chunk_size=100, overlap=10) > 0
+
+    live_queries = []
+
+    def _live(queries, *, top_k):
+        live_queries.append(list(queries))
+        return retriever.RetrievalResult(
+            query_text=" | ".join(queries),
+            top_k=top_k,
+            chunks=[{"doc_id": "live.txt", "section": "page 1", "text": "live hit"}],
+        )
+
+    monkeypatch.setattr(retriever, "get_vector_store", lambda: store)
+    monkeypatch.setattr(retriever, "retrieve_relevant_chunks_with_debug", _live)
+
+    known = retriever.retrieve_guidance_for_findings(
+        [{"algorithm": "RSA"}, {"algorithm": "Weak Hash"}], top_k=2
+    )
+
+    assert live_queries == []
+    assert known.precomputed_signals == 2
+    assert len(known.chunks) == 2
+    assert all("embedding" not in chunk for chunk in known.chunks)
+
+    mixed = retriever.retrieve_guidance_for_findings(
+        [{"algorithm": "RSA"}, {"algorithm": "RSA"}, {"algorithm": "Kyber-512"}], top_k=2
+    )
+
+    assert live_queries == [["NIST guidance for migrating Kyber-512 cryptography to post-quantum algorithms"]]
+    assert mixed.precomputed_signals == 1
+    assert mixed.chunks[1]["doc_id"] == "live.txt"
@@ -0,0 +1,160 @@
+import os
+import sys
+import uuid
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+os.environ.setdefault("DATABASE_URL_SYNC", "sqlite+pysqlite:///:memory:")
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from celery.exceptions import Ignore
+
+import app.scan_cancellation as scan_cancellation
+import app.tasks as tasks
+from app.scan_cancellation import CancellationCheck, InMemoryCancelBackend, ScanCancelled
+from models.file_metadata import FileCategory, FileMetadata
+from scanners.sast.scanner import SASTScanner
+
+
+@pytest.fixture
+def cancel_backend(monkeypatch):
+    backend = InMemoryCancelBackend()
+    monkeypatch.setattr(scan_cancellation, "get_cancel_backend", lambda: backend)
+    return backend
+
+
+def test_check_reads_the_flag_once_per_batch_of_files(cancel_backend, monkeypatch):
+    reads = []
+    original = cancel_backend.is_set
+    monkeypatch.setattr(cancel_backend, "is_set", lambda key: reads.append(key) or original(key))
+    check = CancellationCheck("scan-1", every_files=10, interval_seconds=3600)
+
+    for _ in range(25):
+        check()
+    assert len(reads) == 2
+
+    scan_cancellation.request_scan_cancel("scan-1")
+    with pytest.raises(ScanCancelled):
+        for _ in range(10):
+            check()
+
+
+def test_scanner_stops_at_the_first_cancellation_point(tmp_path):
+    targets = []
+    for index in range(5):
+        path = tmp_path / f"m{index}.py"
+        path.write_text("import hashlib\n", encoding="utf-8")
+        targets.append(
+            FileMetadata(
+                file_path=path.name,
+                absolute_path=str(path),
+                file_name=path.name,
+                extension=".py",
+                language="python",
+                category=FileCategory.SOURCE_CODE,
+                size_bytes=15,
+            )
+        )
+    calls = []
+
+    def _cancel_after_two():
+        calls.append(1)
+        if len(calls) > 2:
+            raise ScanCancelled("cancelled")
+
+    with pytest.raises(ScanCancelled):
+        SASTScanner().scan_repository(targets, cancel_check=_cancel_after_two)
+    assert len(calls) == 3
+
+
+def test_cancelled_shard_removes_the_clone_and_stops_the_workflow(tmp_path, cancel_backend, monkeypatch):
+    scan_uuid = uuid.uuid4()
+    repo_path = tmp_path / "repo"
+    repo_path.mkdir()
+    shard_dir = tmp_path / "repo.shards"
+    shard_dir.mkdir()
+    updates = []
+
+    class _Query:
+        def filter(self, *_args):
+            return self
+
+        def update(self, values, synchronize_session=False):
+            updates.append(values)
+
+    class _Session:
+        def query(self, _model):
+            return _Query()
+
+        def rollback(self):
+            pass
+
+        def commit(self):
+            pass
+
+        def close(self):
+            pass
+
+    monkeypatch.setattr(tasks, "SessionLocal", _Session)
+    scan_cancellation.request_scan_cancel(str(scan_uuid))
+
+    with pytest.raises(Ignore):
+        tasks.scan_shard.run(str(scan_uuid), str(repo_path), 0, 2)
+
+    assert not repo_path.exists()
+    assert not shard_dir.exists()
+    assert updates == [{"status": "CANCELLED", "message": "Cancelled"}]
+
+
+def test_ensure_in_flight_rejects_cancelled_and_deleted_scans():
+    tasks._ensure_in_flight(SimpleNamespace(status="IN_PROGRESS"), "scan-1")
+    for scan in (None, SimpleNamespace(status="CANCELLED")):
+        with pytest.raises(ScanCancelled):
+            tasks._ensure_in_flight(scan, "scan-1")
+
+
+def test_late_cancel_is_not_overwritten_by_completion(tmp_path, cancel_backend, monkeypatch):
+    repo_path = tmp_path / "repo"
+    repo_path.mkdir()
+    scan = SimpleNamespace(status="IN_PROGRESS", progress=0.3, message="")
+    updates = []
+
+    class _Query:
+        def filter(self, *_args):
+            return self
+
+        def first(self):
+            return scan
+
+        def update(self, values, synchronize_session=False):
+            updates.append(values)
+            # The cancel endpoint committed CANCELLED after the last cancellation point.
+            return 0
+
+    class _Session:
+        def query(self, _model):
+            return _Query()
+
+        def rollback(self):
+            pass
+
+        def commit(self):
+            pass
+
+        def close(self):
+            pass
+
+    monkeypatch.setattr(tasks, "SessionLocal", _Session)
+    monkeypatch.setattr(tasks, "merge_partial_reports", lambda *_args: (None, None, None))
+    monkeypatch.setattr(tasks, "_persist_scan_results", lambda *_args, **_kwargs: None)
+
+    with pytest.raises(Ignore):
+        tasks.merge_scan_shards.run(str(uuid.uuid4()), str(repo_path), 2)
+
+    assert updates[0]["status"] == "COMPLETED"
+    assert scan.status == "IN_PROGRESS"
+    assert not repo_path.exists()
@@ -0,0 +1,147 @@
+import json
+import os
+import sys
+import uuid
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+os.environ.setdefault("DATABASE_URL_SYNC", "sqlite+pysqlite:///:memory:")
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import app.scan_cancellation as scan_cancellation
+import app.scan_checkpoints as scan_checkpoints
+import app.tasks as tasks
+from app.scan_cancellation import InMemoryCancelBackend
+from app.scan_checkpoints import DiskCheckpointStore, ScanCheckpoints
+from models.file_metadata import FileCategory, FileMetadata, ScannerTargets
+from models.scan_result import ConfigScanReport, SASTResult, SASTScanReport, SCAScanReport
+
+
+def _meta(name):
+    return FileMetadata(
+        file_path=name,
+        absolute_path=f"/repo/{name}",
+        file_name=name,
+        extension=".py",
+        language="python",
+        category=FileCategory.SOURCE_CODE,
+        size_bytes=120,
+    )
+
+
+def _sast_report():
+    results = [
+        SASTResult(
+            file_path=f"src/m{i}.py",
+            language="python",
+            vulnerabilities=[{"severity": "HIGH", "algorithm": "RSA", "line": i}],
+            total_issues=1,
+        )
+        for i in range(50)
+    ]
+    return SASTScanReport(50, 50, {"HIGH": 50, "MEDIUM": 0, "LOW": 0}, {"RSA": 50}, results)
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = DiskCheckpointStore(tmp_path / "checkpoints")
+    monkeypatch.setattr(scan_checkpoints, "get_checkpoint_store", lambda: store)
+    return store
+
+
+def test_checkpoint_payloads_roundtrip_and_compress():
+    report = _sast_report()
+    payload = scan_checkpoints.report_to_payload(report)
+
+    data = scan_checkpoints.encode_checkpoint(payload)
+    restored = scan_checkpoints.report_from_payload("sast", scan_checkpoints.decode_checkpoint(data))
+
+    assert restored.detailed_results == report.detailed_results
+    assert restored.algorithm_breakdown == report.algorithm_breakdown
+    assert len(data) < len(json.dumps(payload)) / 4
+
+    targets = ScannerTargets(sast_targets=[_meta("a.py")], sca_targets=[], config_targets=[_meta("b.py")])
+    restored_targets = scan_checkpoints.targets_from_payload(scan_checkpoints.targets_to_payload(targets))
+    assert [meta.absolute_path for meta in restored_targets.config_targets] == ["/repo/b.py"]
+    assert restored_targets.sast_targets[0].category == FileCategory.SOURCE_CODE
+
+
+def test_unreadable_checkpoints_are_ignored(store):
+    checkpoints = ScanCheckpoints("scan-1", store=store)
+    store.save("scan-1", "sast", b"not a checkpoint")
+
+    assert checkpoints.load("sast") is None
+    assert checkpoints.load("sca") is None
+
+
+def test_stale_checkpoints_are_purged(store):
+    ScanCheckpoints("old", store=store).save("clone", {"repo_path": "/tmp/old"})
+    ScanCheckpoints("new", store=store).save("clone", {"repo_path": "/tmp/new"})
+    old_dir = store._root / "old"
+    os.utime(old_dir, (0, 0))
+
+    assert store.purge_stale(3600) == 1
+    assert not old_dir.exists()
+    assert ScanCheckpoints("new", store=store).load("clone") == {"repo_path": "/tmp/new"}
+
+
+def test_redelivered_scan_resumes_after_the_last_checkpoint(tmp_path, store, monkeypatch):
+    scan_uuid = str(uuid.uuid4())
+    repo_path = tmp_path / "repo"
+    repo_path.mkdir()
+    scan = SimpleNamespace(status="IN_PROGRESS", progress=0.4, message="", commit_sha="abc123", ruleset_fingerprint=None)
+    checkpoints = ScanCheckpoints(scan_uuid)
+    checkpoints.save("clone", {"repo_path": str(repo_path), "commit_sha": "abc123"})
+    checkpoints.save("analysis", scan_checkpoints.targets_to_payload(ScannerTargets([_meta("a.py")], [], [])))
+    checkpoints.save("sast", scan_checkpoints.report_to_payload(_sast_report()))
+    checkpoints.save("sca", scan_checkpoints.report_to_payload(SCAScanReport(0, 0, 0, [])))
+
+    class _Query:
+        def filter(self, *_args):
+            return self
+
+        def first(self):
+            return scan
+
+        def update(self, values, synchronize_session=False):
+            scan.__dict__.update(values)
+            return 1
+
+    class _Session:
+        def query(self, _model):
+            return _Query()
+
+        def commit(self):
+            pass
+
+        def close(self):
+            pass
+
+    def _not_rerun(*_args, **_kwargs):
+        raise AssertionError("checkpointed stage ran again")
+
+    persisted = []
+    monkeypatch.setattr(scan_cancellation, "get_cancel_backend", lambda: InMemoryCancelBackend())
+    monkeypatch.setattr(tasks, "SessionLocal", _Session)
+    monkeypatch.setattr(tasks, "clone_repository", _not_rerun)
+    monkeypatch.setattr(tasks, "RepositoryAnalyzer", _not_rerun)
+    monkeypatch.setattr(tasks, "SASTScanner", _not_rerun)
+    monkeypatch.setattr(tasks, "SCAScanner", _not_rerun)
+    monkeypatch.setattr(
+        tasks,
+        "ConfigScanner",
+        lambda: SimpleNamespace(scan_repository=lambda targets, cancel_check=None: ConfigScanReport(0, 0, [])),
+    )
+    monkeypatch.setattr(
+        tasks, "_persist_scan_results", lambda db, scan_uuid_obj, path, sast, sca, config, **_: persisted.append(sast)
+    )
+
+    assert tasks._run_scan(scan_uuid, None) == 0
+
+    assert persisted[0].total_vulnerabilities == 50
+    assert scan.status == "COMPLETED"
+    assert not (store._root / scan_uuid).exists()
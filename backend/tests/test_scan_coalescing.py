@@ -0,0 +1,99 @@
+import os
+import sys
+import uuid as uuid_lib
+from pathlib import Path
+from types import SimpleNamespace
+
+os.environ.setdefault("DATABASE_URL_SYNC", "sqlite+pysqlite:///:memory:")
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from sqlalchemy.exc import IntegrityError
+
+import app.routes.scans as scans
+from app.schemas import ScanCreateRequest
+
+
+class _FakeDB:
+    def __init__(self, *, conflict=False):
+        self.conflict = conflict
+        self.added = []
+        self.rolled_back = False
+
+    def add(self, obj):
+        self.added.append(obj)
+
+    def commit(self):
+        if self.conflict:
+            raise IntegrityError("INSERT INTO scans", {}, Exception("ux_scans_in_flight_repo"))
+        for obj in self.added:
+            obj.uuid = obj.uuid or uuid_lib.uuid4()
+
+    def rollback(self):
+        self.rolled_back = True
+
+    def refresh(self, _obj):
+        pass
+
+
+def _patch_common(monkeypatch, in_flight):
+    dispatched = []
+    lookups = []
+
+    def _find(db, user_uuid, repo_key):
+        lookups.append(repo_key)
+        return in_flight.pop(0) if in_flight else None
+
+    monkeypatch.setattr(scans, "_find_in_flight_scan", _find)
+    monkeypatch.setattr(scans, "_get_or_create_repository", lambda db, user_uuid, url: SimpleNamespace(id=7))
+    monkeypatch.setattr(scans, "dispatch_scan_pipeline", dispatched.append)
+    return dispatched, lookups
+
+
+def test_duplicate_request_attaches_to_the_in_flight_scan(monkeypatch):
+    existing = SimpleNamespace(uuid=uuid_lib.uuid4())
+    dispatched, lookups = _patch_common(monkeypatch, [existing])
+    db = _FakeDB()
+
+    response = scans.create_scan(
+        ScanCreateRequest(githubUrl="https://github.com/Org/Repo.git"), db=db, user_uuid=uuid_lib.uuid4()
+    )
+
+    assert response.uuid == str(existing.uuid)
+    assert response.coalesced is True
+    assert lookups == ["github.com/org/repo"]
+    assert db.added == []
+    assert dispatched == []
+
+
+def test_concurrent_insert_losing_the_unique_index_returns_the_winner(monkeypatch):
+    winner = SimpleNamespace(uuid=uuid_lib.uuid4())
+    dispatched, _ = _patch_common(monkeypatch, [None, winner])
+    db = _FakeDB(conflict=True)
+
+    response = scans.create_scan(
+        ScanCreateRequest(githubUrl="https://github.com/org/repo"), db=db, user_uuid=uuid_lib.uuid4()
+    )
+
+    assert db.rolled_back is True
+    assert response.uuid == str(winner.uuid)
+    assert response.coalesced is True
+    assert dispatched == []
+
+
+def test_force_supersedes_the_in_flight_scan_and_queues_a_new_one(monkeypatch):
+    dispatched, lookups = _patch_common(monkeypatch, [])
+    superseded = []
+    monkeypatch.setattr(scans, "_supersede_in_flight_scans", lambda db, user_uuid, repo_key: superseded.append(repo_key))
+    db = _FakeDB()
+
+    response = scans.create_scan(
+        ScanCreateRequest(githubUrl="https://github.com/org/repo", force=True), db=db, user_uuid=uuid_lib.uuid4()
+    )
+
+    assert superseded == ["github.com/org/repo"]
+    assert lookups == []
+    assert response.coalesced is False
+    assert db.added[0].repo_key == "github.com/org/repo"
+    assert dispatched == [response.uuid]
@@ -0,0 +1,99 @@
+import os
+import sys
+import uuid
+from pathlib import Path
+from types import SimpleNamespace
+
+os.environ.setdefault("DATABASE_URL_SYNC", "sqlite+pysqlite:///:memory:")
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from sqlalchemy.dialects import postgresql
+
+import app.scan_reuse as scan_reuse
+import app.tasks as tasks
+
+
+class _FakeDB:
+    def __init__(self):
+        self.executed = []
+        self.commits = 0
+
+    def execute(self, statement):
+        self.executed.append(statement)
+
+    def commit(self):
+        self.commits += 1
+
+
+def test_normalize_repo_url_ignores_case_suffix_and_trailing_slash():
+    assert scan_reuse.normalize_repo_url("https://GitHub.com/Org/Repo.git/") == "github.com/org/repo"
+    assert scan_reuse.normalize_repo_url("https://github.com/org/repo") == "github.com/org/repo"
+    assert scan_reuse.normalize_repo_url("https://github.com/fork/repo") != "github.com/org/repo"
+
+
+def test_copy_statements_copy_every_result_table_without_primary_keys():
+    source, target = uuid.uuid4(), uuid.uuid4()
+
+    compiled = [
+        str(statement.compile(dialect=postgresql.dialect()))
+        for statement in scan_reuse.copy_statements(source, target)
+    ]
+
+    inserts = [sql for sql in compiled if sql.startswith("INSERT")]
+    assert [sql.split()[2] for sql in inserts] == [
+        "inventory_snapshots",
+        "heatmap_snapshots",
+        "recommendations",
+        "findings",
+    ]
+    findings_insert = inserts[-1]
+    assert "INSERT INTO findings (scan_uuid, type, severity" in findings_insert
+    assert "ORDER BY findings.id" in findings_insert
+    # Each copy first clears the target, so a redelivered task does not duplicate rows.
+    assert compiled[0].startswith("DELETE FROM inventory_snapshots")
+
+
+def test_reuse_links_to_the_scan_that_actually_ran():
+    original = uuid.uuid4()
+    source = SimpleNamespace(uuid=uuid.uuid4(), reused_from=original)
+    scan = SimpleNamespace(uuid=uuid.uuid4(), commit_sha="a" * 40, reused_from=None, status="IN_PROGRESS")
+    db = _FakeDB()
+
+    scan_reuse.reuse_scan_results(db, scan, source)
+
+    assert scan.reused_from == original
+    assert scan.status == "COMPLETED"
+    assert scan.progress == 1.0
+    assert len(db.executed) == 8
+    assert db.commits == 1
+
+
+def test_clone_task_skips_clone_when_results_are_reused(monkeypatch):
+    scan_uuid = uuid.uuid4()
+    scan = SimpleNamespace(uuid=scan_uuid, github_url="https://github.com/org/repo", status="QUEUED", commit_sha=None)
+    source = SimpleNamespace(uuid=uuid.uuid4(), reused_from=None)
+
+    class _Session(_FakeDB):
+        def query(self, _model):
+            return SimpleNamespace(filter=lambda *_: SimpleNamespace(first=lambda: scan))
+
+        def close(self):
+            pass
+
+    def _clone(*_args, **_kwargs):
+        raise AssertionError("repository must not be cloned")
+
+    reused = []
+    monkeypatch.setattr(tasks, "SessionLocal", _Session)
+    monkeypatch.setattr(tasks, "SCAN_REUSE_ENABLED", True)
+    monkeypatch.setattr(tasks, "resolve_remote_head", lambda url: "b" * 40)
+    monkeypatch.setattr(tasks, "find_reusable_scan", lambda db, candidate: source)
+    monkeypatch.setattr(tasks, "reuse_scan_results", lambda db, target, src: reused.append((target, src)))
+    monkeypatch.setattr(tasks, "clone_repository", _clone)
+
+    assert tasks.clone_scan_repository.run(str(scan_uuid)) is None
+    assert reused == [(scan, source)]
+    assert scan.commit_sha == "b" * 40
+    assert scan.ruleset_fingerprint == scan_reuse.ruleset_fingerprint()
@@ -0,0 +1,167 @@
+import os
+import sys
+import uuid
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+os.environ.setdefault("DATABASE_URL_SYNC", "sqlite+pysqlite:///:memory:")
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from celery.exceptions import Ignore
+
+import app.scan_cancellation as scan_cancellation
+import app.scan_sharding as scan_sharding
+import app.tasks as tasks
+from app.scan_cancellation import InMemoryCancelBackend
+from models.file_metadata import FileCategory, FileMetadata
+from models.scan_result import ConfigResult, ConfigScanReport, SASTResult, SASTScanReport, SCAResult, SCAScanReport
+
+
+def _meta(name, size):
+    return FileMetadata(
+        file_path=name,
+        absolute_path=f"/repo/{name}",
+        file_name=name.rsplit("/", 1)[-1],
+        extension=name.rsplit(".", 1)[-1],
+        language="python",
+        category=FileCategory.SOURCE_CODE,
+        size_bytes=size,
+    )
+
+
+def _sast(targets):
+    results = [
+        SASTResult(
+            file_path=meta.file_path,
+            language=meta.language,
+            vulnerabilities=[{"severity": "HIGH", "algorithm": "RSA"}] * (meta.size_bytes % 3),
+            total_issues=meta.size_bytes % 3,
+        )
+        for meta in targets
+    ]
+    return SASTScanReport(
+        total_files_scanned=len(results),
+        total_vulnerabilities=sum(r.total_issues for r in results),
+        severity_breakdown={"HIGH": sum(r.total_issues for r in results), "MEDIUM": 0, "LOW": 0},
+        algorithm_breakdown={"RSA": sum(r.total_issues for r in results)} if any(r.total_issues for r in results) else {},
+        detailed_results=results,
+    )
+
+
+def _sca(targets):
+    results = [SCAResult(file_path=meta.file_path, total_dependencies=2, vulnerable_dependencies=[]) for meta in targets]
+    return SCAScanReport(len(results), 2 * len(results), 0, results)
+
+
+def _config(targets):
+    results = [ConfigResult(file_path=meta.file_path, total_findings=1, findings=[{"type": "rsa_cipher"}]) for meta in targets]
+    return ConfigScanReport(len(results), len(results), results)
+
+
+def test_balance_shards_spreads_bytes_evenly():
+    sizes = [9000, 7000, 5000, 4000, 3000, 3000, 2000, 1500]
+
+    shards = scan_sharding.balance_shards(sizes, 3)
+
+    assert sorted(index for shard in shards for index in shard) == list(range(len(sizes)))
+    loads = [sum(sizes[index] for index in shard) for shard in shards]
+    assert max(loads) - min(loads) <= 2000
+
+
+def test_small_repositories_are_not_sharded(tmp_path, monkeypatch):
+    monkeypatch.setattr(scan_sharding, "SCAN_SHARD_MIN_FILES", 100)
+    targets = SimpleNamespace(sast_targets=[_meta("a.py", 10)], sca_targets=[], config_targets=[])
+
+    assert scan_sharding.write_shard_plan(targets, str(tmp_path / "repo")) == 0
+    assert not scan_sharding.shard_dir(str(tmp_path / "repo")).exists()
+
+
+def test_merged_shard_reports_match_an_unsharded_scan(tmp_path, monkeypatch):
+    monkeypatch.setattr(scan_sharding, "SCAN_SHARD_MIN_FILES", 4)
+    monkeypatch.setattr(scan_sharding, "SCAN_SHARD_FILES_PER_SHARD", 4)
+    repo_path = str(tmp_path / "repo")
+    targets = SimpleNamespace(
+        sast_targets=[_meta(f"src/m{i}.py", 100 * (i + 1)) for i in range(10)],
+        sca_targets=[_meta("requirements.txt", 50), _meta("web/package.json", 70)],
+        config_targets=[_meta("nginx.conf", 30)],
+    )
+
+    shard_count = scan_sharding.write_shard_plan(targets, repo_path)
+
+    assert shard_count == 4
+    finished = []
+    for index in reversed(range(shard_count)):
+        shard = scan_sharding.load_shard_targets(repo_path, index)
+        finished.append(
+            scan_sharding.write_partial_report(
+                repo_path,
+                index,
+                targets=shard,
+                sast_report=_sast([meta for _, meta in shard["sast"]]),
+                sca_report=_sca([meta for _, meta in shard["sca"]]),
+                config_report=_config([meta for _, meta in shard["config"]]),
+            )
+        )
+    assert finished == [1, 2, 3, 4]
+
+    sast_report, sca_report, config_report = scan_sharding.merge_partial_reports(repo_path, shard_count)
+    expected_sast = _sast(targets.sast_targets)
+
+    assert sast_report.detailed_results == expected_sast.detailed_results
+    assert sast_report.total_vulnerabilities == expected_sast.total_vulnerabilities
+    assert sast_report.severity_breakdown == expected_sast.severity_breakdown
+    assert sast_report.algorithm_breakdown == expected_sast.algorithm_breakdown
+    assert sca_report.detailed_results == _sca(targets.sca_targets).detailed_results
+    assert sca_report.total_dependencies == 4
+    assert config_report.total_findings == 1
+
+    scan_sharding.remove_shard_dir(repo_path)
+    assert not scan_sharding.shard_dir(repo_path).exists()
+
+
+def test_failed_shard_workflow_cleans_up_the_clone(tmp_path):
+    repo_path = tmp_path / "repo"
+    repo_path.mkdir()
+    scan_sharding.shard_dir(str(repo_path)).mkdir()
+
+    workflow = tasks.build_shard_workflow("scan-1", str(repo_path), 3)
+    errbacks = workflow.body.options["link_error"]
+
+    assert [errback["task"] for errback in errbacks] == ["cleanup_scan_shards"]
+    tasks.cleanup_scan_shards.run(*errbacks[0]["args"])
+    assert not repo_path.exists()
+    assert not scan_sharding.shard_dir(str(repo_path)).exists()
+
+
+def test_queued_shards_of_a_failed_scan_do_not_scan(tmp_path, monkeypatch):
+    repo_path = tmp_path / "repo"
+    repo_path.mkdir()
+
+    class _Query:
+        def filter(self, *_args):
+            return self
+
+        def first(self):
+            return SimpleNamespace(status="FAILED")
+
+    class _Session:
+        def query(self, _model):
+            return _Query()
+
+        def rollback(self):
+            pass
+
+        def close(self):
+            pass
+
+    monkeypatch.setattr(scan_cancellation, "get_cancel_backend", lambda: InMemoryCancelBackend())
+    monkeypatch.setattr(tasks, "SessionLocal", _Session)
+    monkeypatch.setattr(tasks, "load_shard_targets", lambda *_args: pytest.fail("shard was scanned"))
+
+    with pytest.raises(Ignore):
+        tasks.scan_shard.run(str(uuid.uuid4()), str(repo_path), 1, 3)
+    assert not repo_path.exists()
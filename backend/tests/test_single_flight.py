@@ -0,0 +1,105 @@
+import asyncio
+import os
+import sys
+import uuid as uuid_lib
+from pathlib import Path
+from types import SimpleNamespace
+
+os.environ.setdefault("DATABASE_URL_SYNC", "sqlite+pysqlite:///:memory:")
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import app.ai_module.orchestrator as orchestrator
+from app.ai_module.risk_aggregation import FindingsAccumulator
+from app.ai_module.schemas import AiAnalysisResponse
+from app.single_flight import InMemoryLockBackend, SingleFlight
+
+
+def _finding():
+    return {
+        "type": "rsa_generation",
+        "severity": "HIGH",
+        "algorithm": "RSA",
+        "context": "SAST",
+        "file_path": "src/auth.py",
+        "line_start": 12,
+        "line_end": 12,
+        "evidence": "RSA.generate(2048)",
+        "meta": {"scanner_type": "SAST", "rule_id": "rsa_generation"},
+    }
+
+
+def _payload():
+    return AiAnalysisResponse.model_validate(
+        {
+            "risk_score": 40,
+            "pqc_readiness_score": 60,
+            "severity_weighted_index": 4.8,
+            "refactor_cost_estimate": {"level": "LOW", "explanation": "1 file", "affected_files": 1},
+            "priority_rank": 3,
+            "recommendations": [],
+            "analysis_summary": "Leader snapshot",
+            "confidence_score": 0.7,
+            "citation_missing": False,
+            "inputs_summary": {},
+            "analysis_mode": "real",
+        }
+    )
+
+
+def test_single_flight_allows_one_holder_until_release():
+    flight = SingleFlight("test", lock_ttl_seconds=30, backend=InMemoryLockBackend())
+
+    lease = flight.try_acquire("RSA", "v1")
+    assert lease is not None
+    assert flight.try_acquire("RSA", "v1") is None
+    assert flight.try_acquire("ECC", "v1") is not None
+
+    flight.release(lease)
+    assert flight.try_acquire("RSA", "v1") is not None
+
+
+def test_follower_reuses_leader_snapshot(monkeypatch):
+    backend = InMemoryLockBackend()
+    flight = SingleFlight("ai_analysis", lock_ttl_seconds=30, backend=backend)
+    monkeypatch.setattr(orchestrator, "_analysis_flight", flight)
+    monkeypatch.setattr(orchestrator, "AI_SINGLE_FLIGHT_POLL_SECONDS", 0.01)
+    monkeypatch.setattr(orchestrator, "AI_SINGLE_FLIGHT_WAIT_SECONDS", 5)
+
+    scan_uuid = uuid_lib.uuid4()
+    leader_scan = uuid_lib.uuid4()
+    aggregate = FindingsAccumulator().extend([_finding()])
+    signature = orchestrator.build_algorithm_signature(aggregate.findings)
+    leader_lease = flight.try_acquire(signature, orchestrator.AI_ANALYSIS_VERSION)
+
+    lookups = []
+    leader_snapshot = SimpleNamespace(scan_uuid=leader_scan, citations=[], nist_standard_reference="FIPS 203")
+
+    def _find_cached(_db, **_kwargs):
+        lookups.append(1)
+        # The leader persists its snapshot while the follower is waiting.
+        return leader_snapshot if len(lookups) >= 3 else None
+
+    persisted = []
+
+    async def _load(_scan_uuid, _db):
+        return aggregate
+
+    async def _analyze(*_args, **_kwargs):
+        raise AssertionError("follower must not run its own analysis")
+
+    monkeypatch.setattr(orchestrator, "load_findings_for_analysis", _load)
+    monkeypatch.setattr(orchestrator, "find_cached_snapshot_by_algorithm_signature", _find_cached)
+    monkeypatch.setattr(orchestrator, "serialize_ai_analysis_snapshot", lambda _snapshot: _payload())
+    monkeypatch.setattr(orchestrator, "upsert_ai_analysis_snapshot", lambda _db, uuid, payload, **_kw: persisted.append((uuid, payload)))
+    monkeypatch.setattr(orchestrator, "analyze_findings", _analyze)
+
+    response = asyncio.run(orchestrator.compute_and_persist_ai_analysis(scan_uuid, db=object()))
+
+    assert response.inputs_summary["cache"]["cache_hit"] is True
+    assert response.inputs_summary["cache"]["coalesced"] is True
+    assert response.inputs_summary["cache"]["cache_source_scan"] == str(leader_scan)
+    assert persisted[0][0] == scan_uuid
+    assert flight.metrics() == {"coalesced": 1}
+    flight.release(leader_lease)
@@ -0,0 +1,143 @@
+import os
+import sys
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+
+os.environ.setdefault("DATABASE_URL_SYNC", "sqlite+pysqlite:///:memory:")
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import app.ai_module.rag.retriever as retriever
+import app.ai_module.rag.vector_store as vector_store
+
+
+def test_vector_store_registry_opens_each_collection_once(monkeypatch, tmp_path):
+    opened = []
+
+    def _open(*, collection_name, persist_dir):
+        opened.append((collection_name, persist_dir))
+        return SimpleNamespace(collection_name=collection_name)
+
+    monkeypatch.setattr(vector_store, "open_vector_store", _open)
+    vector_store.clear_vector_store_registry()
+
+    stores = []
+    threads = [
+        threading.Thread(
+            target=lambda: stores.append(
+                vector_store.get_vector_store(collection_name="nist", persist_dir=str(tmp_path))
+            )
+        )
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    other = vector_store.get_vector_store(collection_name="other", persist_dir=str(tmp_path))
+
+    assert len(opened) == 2
+    assert all(store is stores[0] for store in stores)
+    assert other is not stores[0]
+    vector_store.clear_vector_store_registry()
+
+
+def test_corpus_status_reglobs_only_after_directory_changes(monkeypatch, tmp_path):
+    (tmp_path / "fips203.pdf").write_bytes(b"%PDF")
+    monkeypatch.setattr(
+        retriever,
+        "get_vector_store",
+        lambda: SimpleNamespace(collection_name="nist", count=lambda: 3),
+    )
+    glob_calls = []
+    original_glob = Path.glob
+
+    def _counting_glob(self, pattern):
+        glob_calls.append(pattern)
+        return original_glob(self, pattern)
+
+    monkeypatch.setattr(Path, "glob", _counting_glob)
+
+    first = retriever.inspect_rag_corpus(str(tmp_path))
+    calls_after_first = len(glob_calls)
+    second = retriever.inspect_rag_corpus(str(tmp_path))
+
+    assert first.pdf_count == second.pdf_count == 1
+    assert len(glob_calls) == calls_after_first
+
+    (tmp_path / "notes.md").write_text("ML-KEM", encoding="utf-8")
+    os.utime(tmp_path, ns=(0, tmp_path.stat().st_mtime_ns + 1_000_000))
+    third = retriever.inspect_rag_corpus(str(tmp_path))
+
+    assert third.text_count == 1
+    assert len(glob_calls) > calls_after_first
+
+
+def _chunk(doc_id, index, text):
+    return {
+        "chunk_id": f"{doc_id}::p1::c{index}",
+        "doc_id": doc_id,
+        "title": doc_id,
+        "page": 1,
+        "section": "page 1",
+        "text": text,
+    }
+
+
+def test_numpy_store_exact_top_k_persists_and_deletes(tmp_path):
+    from app.ai_module.rag.embeddings import hashing_embed_texts
+    from app.ai_module.rag.numpy_store import NumpyVectorStore
+
+    texts = [
+        "ML-KEM key encapsulation replaces RSA key transport",
+        "ML-DSA digital signatures replace ECDSA",
+        "SHA-1 is deprecated for digital signatures",
+        "TLS 1.3 configuration guidance",
+    ]
+    chunks = [_chunk("fips203.pdf" if index < 2 else "sp800-131a.pdf", index, text) for index, text in enumerate(texts)]
+    store = NumpyVectorStore(collection_name="nist", persist_dir=str(tmp_path))
+    store.upsert_chunks(chunks, hashing_embed_texts(texts, dim=64))
+    store.flush()
+
+    reopened = NumpyVectorStore(collection_name="nist", persist_dir=str(tmp_path), dtype="float16")
+    queries = hashing_embed_texts(["ECDSA digital signatures", "TLS configuration"], dim=64)
+    batch = reopened.query_batch(queries, top_k=2)
+
+    assert reopened.count() == 4
+    assert [row["text"] for row in batch[0]][0] == texts[1]
+    assert batch[1][0]["text"] == texts[3]
+    assert batch[0][0]["distance"] <= batch[0][1]["distance"]
+    assert [row["text"] for row in reopened.query(queries[0], top_k=2)] == [row["text"] for row in batch[0]]
+
+    store.delete_document("fips203.pdf")
+    store.flush()
+
+    assert reopened.count() == 2
+    assert {row["doc_id"] for row in reopened.query(queries[0], top_k=10)} == {"sp800-131a.pdf"}
+
+
+def test_hashing_embeddings_are_deterministic_and_normalized():
+    from app.ai_module.rag.embeddings import hashing_embed_texts
+
+    first, second = hashing_embed_texts(["RSA 2048 key", "RSA 2048 key"], dim=32)
+
+    assert first == second
+    assert abs(sum(value * value for value in first) - 1.0) < 1e-9
+
+
+def test_numpy_store_keeps_the_last_of_repeated_chunk_ids_in_a_batch(tmp_path):
+    from app.ai_module.rag.embeddings import hashing_embed_texts
+    from app.ai_module.rag.numpy_store import NumpyVectorStore
+
+    texts = ["RSA key transport", "ML-KEM key encapsulation", "ML-DSA signatures"]
+    chunks = [_chunk("fips203.pdf", 0, texts[0]), _chunk("fips204.pdf", 1, texts[1]), _chunk("fips203.pdf", 0, texts[2])]
+    store = NumpyVectorStore(collection_name="nist", persist_dir=str(tmp_path))
+
+    store.upsert_chunks(chunks, hashing_embed_texts(texts, dim=64))
+    store.flush()
+
+    assert store.count() == 2
+    top = store.query(hashing_embed_texts(["ML-DSA signatures"], dim=64)[0], top_k=1)
+    assert top[0]["text"] == "ML-DSA signatures"
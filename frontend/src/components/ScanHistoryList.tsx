@@ -49,6 +49,14 @@ const getStatusConfig = (status: ScanStatus) => {
         borderColor: 'border-red-500/30',
         label: 'Failed',
       }
+    case 'CANCELLED':
+      return {
+        icon: XCircle,
+        color: 'text-slate-400',
+        bgColor: 'bg-slate-500/10',
+        borderColor: 'border-slate-500/30',
+        label: 'Cancelled',
+      }
     case 'PENDING':
       return {
         icon: Clock,
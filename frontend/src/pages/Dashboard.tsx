@@ -53,7 +53,7 @@ export const Dashboard = () => {
           }
         }
 
-        if (status.status === 'COMPLETED' || status.status === 'FAILED') {
+        if (status.status === 'COMPLETED' || status.status === 'FAILED' || status.status === 'CANCELLED') {
           if (pollingInterval) {
             clearInterval(pollingInterval)
             pollingInterval = null
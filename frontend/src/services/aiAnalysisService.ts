@@ -1,7 +1,8 @@
 import { apiClient } from '../api'
+import { tokenStore } from '../auth/tokenStore'
 import { config } from '../config'
 import { handleError, type AppError, ErrorType } from '../utils/errorHandler'
-import { logError } from '../utils/logger'
+import { logError, logWarn } from '../utils/logger'
 
 export interface AiCitation {
   doc_id: string
@@ -72,6 +73,18 @@ interface StartAiAnalysisResponse {
   status: string
   scan_id: string
   ai_analysis_id?: string | null
+  snapshot_updated_at?: string | null
+}
+
+interface AnalysisStreamEvent {
+  stage: string
+  analysis?: AiAnalysisResponse
+  reason?: string
+}
+
+interface StreamAnalysisOptions {
+  after?: string | null
+  signal?: AbortSignal
 }
 
 interface StartAnalysisOptions {
@@ -102,6 +115,15 @@ const shouldUseDevFallback = (error: AppError): boolean => {
   return error.type === ErrorType.API_ERROR && (error.statusCode ?? 0) >= 500
 }
 
+const parseSseFrame = (frame: string): AnalysisStreamEvent | null => {
+  const data = frame
+    .split('\n')
+    .filter((line) => line.startsWith('data:'))
+    .map((line) => line.slice('data:'.length).trimStart())
+    .join('\n')
+  return data ? (JSON.parse(data) as AnalysisStreamEvent) : null
+}
+
 const delay = (ms: number) => new Promise((resolve) => window.setTimeout(resolve, ms))
 
 const inflightEnsureAnalysis = new Map<string, Promise<AiAnalysisResponse>>()
@@ -164,6 +186,56 @@ export const aiAnalysisService = {
     return response.data
   },
 
+  // EventSource cannot send the Bearer token, so the SSE stream is read through fetch.
+  async streamAnalysis(uuid: string, options?: StreamAnalysisOptions): Promise<AiAnalysisResponse> {
+    const query = options?.after ? `?after=${encodeURIComponent(options.after)}` : ''
+    const accessToken = tokenStore.getAccessToken()
+    const response = await fetch(`${config.apiBaseURL}/scans/${uuid}/ai-analysis/stream${query}`, {
+      headers: {
+        Accept: 'text/event-stream',
+        ...(accessToken ? { Authorization: `Bearer ${accessToken}` } : {}),
+      },
+      signal: options?.signal,
+    })
+    if (!response.ok || !response.body) {
+      throw new Error(`AI analysis stream unavailable (HTTP ${response.status})`)
+    }
+
+    const reader = response.body.pipeThrough(new TextDecoderStream()).getReader()
+    let buffer = ''
+    try {
+      for (;;) {
+        const { value, done } = await reader.read()
+        if (done) {
+          break
+        }
+        buffer += value.replace(/\r\n/g, '\n')
+        let boundary = buffer.indexOf('\n\n')
+        while (boundary !== -1) {
+          const event = parseSseFrame(buffer.slice(0, boundary))
+          buffer = buffer.slice(boundary + 2)
+          boundary = buffer.indexOf('\n\n')
+          if (event?.stage === 'completed' && event.analysis) {
+            return event.analysis
+          }
+          if (event?.stage === 'failed') {
+            const failedError: AppError = {
+              type: ErrorType.API_ERROR,
+              message: event.reason || 'AI analysis failed',
+            }
+            throw failedError
+          }
+          if (event?.stage === 'timeout') {
+            throw new Error('AI analysis stream timed out')
+          }
+        }
+      }
+    } finally {
+      reader.cancel().catch(() => undefined)
+    }
+    throw new Error('AI analysis stream closed before completion')
+  },
+
   async ensureAnalysis(uuid: string, options?: EnsureAnalysisOptions): Promise<AiAnalysisResponse> {
     const forceRefresh = Boolean(options?.forceRefresh)
     const cacheKey = `${uuid}:${forceRefresh ? 'force' : 'default'}`
@@ -192,8 +264,9 @@ export const aiAnalysisService = {
         }
       }
 
+      let started: StartAiAnalysisResponse
       try {
-        await this.startAnalysis(uuid, { force: forceRefresh })
+        started = await this.startAnalysis(uuid, { force: forceRefresh })
       } catch (error) {
         const appError = toAppError(error)
         if (!shouldUseDevFallback(appError)) {
@@ -202,6 +275,21 @@ export const aiAnalysisService = {
         return buildMockAiAnalysis()
       }
 
+      if (started.status !== 'READY') {
+        // Stage events arrive as the run progresses; polling is only the fallback.
+        try {
+          return await this.streamAnalysis(uuid, { after: started.snapshot_updated_at })
+        } catch (error) {
+          if (isAppError(error)) {
+            throw error
+          }
+          logWarn('AI analysis stream failed; falling back to polling', {
+            uuid,
+            reason: error instanceof Error ? error.message : String(error),
+          })
+        }
+      }
+
       for (let attempt = 0; attempt < maxAttempts; attempt += 1) {
         try {
           return await this.getAnalysis(uuid)